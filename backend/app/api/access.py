@@ -13,7 +13,7 @@ from pydantic import BaseModel, Field
 from typing import Dict, List, Optional
 from datetime import datetime, timezone
 
-from app.services import db_client
+from app.services import async_db_client
 from app.services.rules_engine import evaluate_and_execute
 
 router = APIRouter()
@@ -104,7 +104,7 @@ async def check_access(request: AccessCheckRequest) -> Dict:
     reason = "card not registered"
 
     try:
-        card = db_client.get_rfid_card(request.card_uid)
+        card = await async_db_client.get_rfid_card(request.card_uid)
         if card is None:
             reason = "card not registered"
         elif not card.get("active", False):
@@ -122,7 +122,7 @@ async def check_access(request: AccessCheckRequest) -> Dict:
     # Write audit log (best-effort – do not let logging failure affect response)
     checked_at = datetime.now(timezone.utc).isoformat()
     try:
-        db_client.log_access_attempt(
+        await async_db_client.log_access_attempt(
             card_uid=request.card_uid,
             device_id=request.device_id,
             granted=granted,
@@ -159,7 +159,7 @@ async def check_access(request: AccessCheckRequest) -> Dict:
 async def list_cards() -> List[Dict]:
     """Return all RFID cards in the whitelist."""
     try:
-        return db_client.list_rfid_cards()
+        return await async_db_client.list_rfid_cards()
     except Exception as exc:
         print(f"[ACCESS] Failed to list cards: {exc}")
         raise HTTPException(
@@ -180,7 +180,7 @@ async def register_card(request: RFIDCardRequest) -> Dict:
     If the card UID already exists, the record is updated.
     """
     try:
-        db_client.upsert_rfid_card(
+        await async_db_client.upsert_rfid_card(
             card_uid=request.card_uid,
             user_id=request.user_id,
             label=request.label,
@@ -207,7 +207,7 @@ async def register_card(request: RFIDCardRequest) -> Dict:
 async def get_access_logs(limit: int = 50) -> List[Dict]:
     """Return the most recent access log entries (up to *limit*)."""
     try:
-        return db_client.get_access_logs(limit=min(limit, 500))
+        return await async_db_client.get_access_logs(limit=min(limit, 500))
     except Exception as exc:
         print(f"[ACCESS] Failed to retrieve logs: {exc}")
         raise HTTPException(
@@ -9,6 +9,10 @@ from fastapi import APIRouter, HTTPException
 from datetime import datetime
 from typing import Dict
 
+from app.services import (
+    db_client, device_clocks, device_rate_limiter, ingest_admission, ingest_dedup, ingest_pipeline,
+)
+
 router = APIRouter()
 
 
@@ -49,6 +53,34 @@ async def health_check() -> Dict:
     return health_status
 
 
+@router.get("/health/metrics")
+def metrics() -> Dict:
+    """
+    In-process counters for the ingest path
+
+    Returns:
+        dict: Admission control (in flight, queued, shed), per-device rate
+            limits (with the noisiest devices), per-stage ingest latency,
+            replay filter, device clock models, write-behind buffer,
+            presence and latest-state trackers, rollup accumulator, disk
+            spool backlog, connection pools and device registry stats
+    """
+    return {
+        "ingest_admission": ingest_admission.stats(),
+        "rate_limits": device_rate_limiter.stats(),
+        "ingest_stages": ingest_pipeline.stats(),
+        "ingest_replays": ingest_dedup.stats(),
+        "device_clocks": device_clocks.stats(),
+        "write_buffer": db_client.write_buffer.stats(),
+        "presence": db_client.presence.stats(),
+        "latest_state": db_client.latest_state.stats(),
+        "rollups": db_client.rollups.stats(),
+        "spool": db_client.spool.stats(),
+        "db_pools": db_client.pool_stats(),
+        "device_registry": db_client.devices.stats(),
+    }
+
+
 @router.get("/health/ready")
 async def readiness_check() -> Dict:
     """
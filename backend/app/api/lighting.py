@@ -10,6 +10,7 @@ Handles control commands for room-node and lighting devices including:
 
 from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 from typing import Dict
 from app.services import ws_manager, db_client
 
@@ -65,7 +66,7 @@ async def set_dimmer_brightness(device_id: str, request: DimmerControlRequest) -
         HTTPException: 404 if device not found, 503 if device offline
     """
     # Check if device exists
-    device = db_client.get_device(device_id)
+    device = await run_in_threadpool(db_client.get_device, device_id)
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -89,7 +90,7 @@ async def set_dimmer_brightness(device_id: str, request: DimmerControlRequest) -
         )
     
     # Log command in database
-    db_client.insert_dimmer_state(device_id, request.brightness)
+    await run_in_threadpool(db_client.insert_dimmer_state, device_id, request.brightness)
     
     return {
         "status": "success",
@@ -117,7 +118,7 @@ async def set_relay_state(device_id: str, request: RelayControlRequest) -> Dict:
         HTTPException: 404 if device not found, 503 if device offline
     """
     # Check if device exists
-    device = db_client.get_device(device_id)
+    device = await run_in_threadpool(db_client.get_device, device_id)
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -141,7 +142,7 @@ async def set_relay_state(device_id: str, request: RelayControlRequest) -> Dict:
         )
     
     # Log command in database
-    db_client.insert_relay_state(device_id, request.channel, request.state)
+    await run_in_threadpool(db_client.insert_relay_state, device_id, request.channel, request.state)
     
     state_str = "ON" if request.state else "OFF"
     return {
@@ -170,7 +171,7 @@ async def set_daylight_harvest_mode(device_id: str, request: DaylightHarvestRequ
         HTTPException: 404 if device not found, 503 if device offline
     """
     # Check if device exists
-    device = db_client.get_device(device_id)
+    device = await run_in_threadpool(db_client.get_device, device_id)
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -202,7 +203,7 @@ async def set_daylight_harvest_mode(device_id: str, request: DaylightHarvestRequ
 
 
 @router.get("/status/{device_id}")
-async def get_device_status(device_id: str) -> Dict:
+def get_device_status(device_id: str) -> Dict:
     """
     Get current status of a lighting control device
     
@@ -230,7 +231,7 @@ async def get_device_status(device_id: str) -> Dict:
     
     # Get latest data from database if not in cache
     if not device_state:
-        latest_data = db_client.get_latest_lighting_data(device_id)
+        latest_data = db_client.get_latest_state(device_id) or db_client.get_latest_lighting_data(device_id)
         if latest_data:
             device_state = latest_data
     
@@ -262,7 +263,7 @@ async def set_fan_state(device_id: str, request: FanControlRequest) -> Dict:
     Raises:
         HTTPException: 404 if device not found, 503 if device offline
     """
-    device = db_client.get_device(device_id)
+    device = await run_in_threadpool(db_client.get_device, device_id)
     if not device:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -282,7 +283,7 @@ async def set_fan_state(device_id: str, request: FanControlRequest) -> Dict:
             detail=f"Failed to send fan command to device {device_id}",
         )
 
-    db_client.insert_fan_state(device_id, request.fan_on)
+    await run_in_threadpool(db_client.insert_fan_state, device_id, request.fan_on)
 
     state_str = "ON" if request.fan_on else "OFF"
     return {
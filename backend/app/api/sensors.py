@@ -8,21 +8,43 @@ Handles incoming sensor data from ESP32 devices including:
 - Relay states
 """
 
-from fastapi import APIRouter, HTTPException, status
-from datetime import datetime
-from typing import Dict, Optional, List
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from functools import partial
+import asyncio
+import csv
+import io
+import itertools
+import time
+from typing import Annotated, Any, Callable, Dict, Iterator, Literal, Optional, List, Union
 from pydantic import BaseModel, Field
-from app.services import db_client, ws_manager, broker
+from app.config import settings
+from app.services import (
+    broker, db_client, device_clocks, device_rate_limiter, ingest_compressor, ingest_dedup,
+    ingest_pipeline, ws_manager,
+)
+from app.services.rate_limit import limit_type, retry_after_seconds
+from app.services.resolution import parse_bucket_width
 from app.services.rules_engine import evaluate_and_execute
+from app.utils.logger import get_logger
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.payloads import NegotiatedRoute
+from app.utils.serialization import dumps
+
+logger = get_logger(__name__)
 
-router = APIRouter()
+# Ingest accepts JSON or MessagePack bodies (see app.utils.payloads)
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 # Request/Response Models
 class EnvironmentalSensorData(BaseModel):
     """Environmental sensor data from BME280"""
     device_id: str = Field(..., description="Unique device identifier")
-    timestamp: str = Field(..., description="ISO 8601 timestamp")
+    timestamp: str = Field(..., description="ISO 8601 or uptime (ms since boot) timestamp")
     temperature: Optional[float] = Field(None, description="Temperature in Celsius")
     humidity: Optional[float] = Field(None, description="Humidity percentage")
     pressure: Optional[float] = Field(None, description="Pressure in hPa")
@@ -31,7 +53,7 @@ class EnvironmentalSensorData(BaseModel):
 class LightingSensorData(BaseModel):
     """Lighting sensor and control data from ESP32 lighting control"""
     device_id: str = Field(..., description="Unique device identifier")
-    timestamp: str = Field(..., description="ISO 8601 timestamp")
+    timestamp: str = Field(..., description="ISO 8601 or uptime (ms since boot) timestamp")
     light_level: Optional[float] = Field(None, description="Ambient light level (0-100%)")
     light_lux: Optional[float] = Field(None, description="Calculated lux value")
     dimmer_brightness: Optional[int] = Field(None, description="Current dimmer setting (0-100%)")
@@ -48,7 +70,7 @@ class RoomNodeSensorData(BaseModel):
     """
     device_id: str = Field(..., description="Device ID, e.g. 'room-node-01'")
     room: Optional[str] = Field(None, description="Human-readable room label")
-    timestamp: str = Field(..., description="ISO 8601 or uptime timestamp")
+    timestamp: str = Field(..., description="ISO 8601 or uptime (ms since boot) timestamp")
     # Environmental (BME280)
     temperature: Optional[float] = Field(None, description="Temperature in °C")
     humidity: Optional[float] = Field(None, description="Relative humidity %")
@@ -73,126 +95,304 @@ class SensorDataResponse(BaseModel):
     timestamp: str
 
 
+# Batch ingest models – each reading carries a `type` discriminator so a
+# single request can mix lighting, environmental and room-node payloads.
+class BatchEnvironmentalReading(EnvironmentalSensorData):
+    type: Literal["environmental"]
+
+
+class BatchLightingReading(LightingSensorData):
+    type: Literal["lighting"]
+
+
+class BatchRoomNodeReading(RoomNodeSensorData):
+    type: Literal["room_node"]
+
+
+BatchReading = Annotated[
+    Union[BatchEnvironmentalReading, BatchLightingReading, BatchRoomNodeReading],
+    Field(discriminator="type"),
+]
+
+
+class BatchIngestRequest(BaseModel):
+    """Buffered readings flushed by a device after reconnecting"""
+    readings: List[BatchReading] = Field(
+        ...,
+        min_length=1,
+        max_length=settings.INGEST_BATCH_MAX_READINGS,
+        description="Readings in the order they were sampled",
+    )
+
+
+class BatchRejectedReading(BaseModel):
+    """A reading from a batch that was not accepted"""
+    index: int
+    device_id: str
+    reason: str
+
+
+class BatchIngestResponse(BaseModel):
+    """Response for batch sensor data ingestion"""
+    status: str
+    message: str
+    accepted: int
+    rejected: int
+    duplicates: int = 0
+    compressed: int = 0
+    errors: List[BatchRejectedReading]
+
+
+def _environmental_rules_context(data: EnvironmentalSensorData) -> Dict[str, Any]:
+    return {
+        "temperature": data.temperature,
+        "humidity": data.humidity,
+        "pressure": data.pressure,
+    }
+
+
+def _lighting_rules_context(data: LightingSensorData) -> Dict[str, Any]:
+    return {
+        "light_lux": data.light_lux,
+        "light_level": data.light_level,
+        "lighting_device_id": data.device_id,
+    }
+
+
+def _room_node_rules_context(data: RoomNodeSensorData) -> Dict[str, Any]:
+    return {
+        "temperature": data.temperature,
+        "humidity": data.humidity,
+        "pressure": data.pressure,
+        "light_lux": data.light_lux,
+        "light_level": data.light_level,
+        "hvac_device_id": data.device_id,
+        "lighting_device_id": data.device_id,
+    }
+
+
+# Payload fields that identify a reading rather than describe it
+_IDENTITY_FIELDS = {"device_id", "timestamp", "room", "type"}
+
+
+async def _get_registered_device(device_id: str) -> Dict[str, Any]:
+    """
+    Look the device up and apply its rate limit.
+
+    Raises:
+        HTTPException: 404 if the device is not registered, 429 if it is
+            over the token-bucket limit of its registered type
+    """
+    device = await run_in_threadpool(db_client.get_device, device_id)
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device {device_id} not registered"
+        )
+    wait = device_rate_limiter.acquire(device_id, limit_type(device))
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded for device {device_id}",
+            headers={"Retry-After": str(retry_after_seconds(wait))},
+        )
+    return device
+
+
+def _compress(data: BaseModel, at: datetime) -> Optional[Dict[str, Any]]:
+    """
+    Run a reading through the ingest compressor.
+
+    Args:
+        data: Validated reading
+        at: Normalised reading time (see ``device_clocks``)
+
+    Returns:
+        The payload with dropped metrics set to None and the normalised
+        ``time`` added (for storage), or None if the reading adds nothing
+        and should be dropped entirely.
+    """
+    payload = data.model_dump(exclude={"type"})
+    values = {name: value for name, value in payload.items() if name not in _IDENTITY_FIELDS}
+    kept = ingest_compressor.sample(data.device_id, values, at=at.timestamp())
+    if not kept:
+        return None
+    stored = {
+        name: (value if name in _IDENTITY_FIELDS or name in kept else None)
+        for name, value in payload.items()
+    }
+    stored["time"] = at
+    return stored
+
+
+async def _stored(write: Callable[[], Future]) -> None:
+    """Queue a write-behind insert and wait until the flush holding it commits."""
+    await asyncio.wrap_future(await run_in_threadpool(write))
+
+
 @router.post("/ingest/environmental", response_model=SensorDataResponse, status_code=status.HTTP_202_ACCEPTED)
-async def ingest_environmental_data(data: EnvironmentalSensorData) -> Dict:
+async def ingest_environmental_data(data: EnvironmentalSensorData, background_tasks: BackgroundTasks) -> Dict:
     """
     Ingest environmental sensor data (temperature, humidity, pressure)
     
-    This endpoint receives data from BME280 sensors and queues it for
-    asynchronous processing via the configured message broker
-    (MQTT by default, Redis Streams as an alternative).
+    This endpoint receives data from BME280 sensors, publishes it to the
+    configured message broker (MQTT by default, Redis Streams as an
+    alternative) and stores it in the sensor_readings hypertable. Storage
+    and rule evaluation run after the response is sent.
     
     Args:
         data: Environmental sensor readings
+        background_tasks: Off-response-path stages
     
     Returns:
         SensorDataResponse: Acknowledgment of data receipt
     """
-    # TODO: Validate device_id against registered devices
-    # TODO: Store in TimescaleDB via background worker
-    
-    print(f"[SENSOR] Environmental data from {data.device_id}:")
-    print(f"  Temperature: {data.temperature}°C")
-    print(f"  Humidity: {data.humidity}%")
-    print(f"  Pressure: {data.pressure} hPa")
+    # Unknown ids would fail the sensor_readings FK
+    await _get_registered_device(data.device_id)
 
-    # Publish event to message broker (fire-and-forget)
-    try:
-        await broker.publish(
-            channel="sensors/environmental",
-            payload=data.model_dump(),
-        )
-        try:
-            await evaluate_and_execute(
-                {
-                    "temperature": data.temperature,
-                    "humidity": data.humidity,
-                    "pressure": data.pressure,
-                }
-            )
-        except Exception as exc:
-            print(f"[RULES] Environmental rules evaluation failed: {exc}")
-    except Exception as e:
-        # Broker failures should not break ingestion for now; just log.
-        print(f"[BROKER] Failed to publish environmental data: {e}")
-    
-    return {
+    logger.debug(
+        "Environmental data from %s: temperature=%s°C humidity=%s%% pressure=%s hPa",
+        data.device_id, data.temperature, data.humidity, data.pressure,
+    )
+    response = {
         "status": "accepted",
         "message": "Environmental sensor data queued for processing",
         "device_id": data.device_id,
         "timestamp": data.timestamp,
     }
 
+    # Retried POSTs are acknowledged without being processed again
+    if ingest_dedup.seen(data.device_id, data.timestamp, "environmental"):
+        logger.debug("Dropped replayed environmental reading from %s", data.device_id)
+        return response
+
+    # Flat readings are acknowledged but not published, evaluated or stored
+    stored = _compress(data, device_clocks.normalise(data.device_id, data.timestamp))
+    if stored is None:
+        return response
+
+    # Publish before replying; broker failures are logged, not raised
+    await ingest_pipeline.run("environmental", {
+        "publish": partial(broker.publish, channel="sensors/environmental", payload=data.model_dump()),
+    })
+
+    # Persist to the sensor_readings hypertable and evaluate rules after replying
+    background_tasks.add_task(ingest_pipeline.run, "environmental", {
+        "store": partial(db_client.insert_sensor_readings, [stored]),
+        "latest": partial(db_client.record_latest_state, [stored]),
+        "rollups": partial(db_client.record_rollups, [stored]),
+        "rules": partial(evaluate_and_execute, _environmental_rules_context(data)),
+    })
+    
+    return response
+
 
 @router.post("/ingest/lighting", response_model=SensorDataResponse, status_code=status.HTTP_202_ACCEPTED)
-async def ingest_lighting_data(data: LightingSensorData) -> Dict:
+async def ingest_lighting_data(data: LightingSensorData, background_tasks: BackgroundTasks) -> Dict:
     """
     Ingest lighting sensor and control data
     
     This endpoint receives data from TEMT6000 light sensors and lighting
     control systems, queuing it for asynchronous processing.
+
+    The dashboard broadcast and the insert run concurrently before the
+    response. The insert is group-committed by the write-behind buffer
+    and the handler waits for that flush, so a failed insert answers 500
+    and the device's retry is let through. While the database is
+    unreachable the row is spooled to disk and the reading is
+    acknowledged. Rule evaluation and
+    the device status update run after the response.
     
     Args:
         data: Lighting sensor readings and control states
+        background_tasks: Off-response-path stages
     
     Returns:
         SensorDataResponse: Acknowledgment of data receipt
     """
-    # Validate device exists
-    device = db_client.get_device(data.device_id)
-    if not device:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Device {data.device_id} not registered"
-        )
+    await _get_registered_device(data.device_id)
+
+    response = {
+        "status": "accepted",
+        "message": "Lighting sensor data processed successfully",
+        "device_id": data.device_id,
+        "timestamp": data.timestamp,
+    }
+
+    # Retried POSTs are acknowledged without being processed again
+    if ingest_dedup.seen(data.device_id, data.timestamp, "lighting"):
+        logger.debug("Dropped replayed lighting reading from %s", data.device_id)
+        return response
+
+    # Flat readings only refresh the device's last_seen
+    at = device_clocks.normalise(data.device_id, data.timestamp)
+    if _compress(data, at) is None:
+        background_tasks.add_task(ingest_pipeline.run, "lighting", {
+            "status": partial(db_client.update_device_status, data.device_id, 'online'),
+        })
+        return response
     
-    # Store in database
-    try:
-        db_client.insert_lighting_data(data.model_dump())
-        
-        # Update device status
-        db_client.update_device_status(data.device_id, 'online')
-        
-        # Broadcast to WebSocket clients for real-time updates
-        await ws_manager.broadcast_to_clients({
+    # Broadcast to WebSocket clients while the reading is stored
+    stored = {**data.model_dump(), "time": at}
+    outcome = await ingest_pipeline.run("lighting", {
+        "broadcast": partial(ws_manager.broadcast_to_clients, {
             'type': 'lighting_data',
             'device_id': data.device_id,
             'data': data.model_dump()
-        })
-        try:
-            await evaluate_and_execute(
-                {
-                    "light_lux": data.light_lux,
-                    "light_level": data.light_level,
-                    "lighting_device_id": data.device_id,
-                }
-            )
-        except Exception as exc:
-            print(f"[RULES] Lighting rules evaluation failed: {exc}")
-        
-        print(f"[SENSOR] Lighting data from {data.device_id}:")
-        print(f"  Light Level: {data.light_level}% ({data.light_lux} lux)")
-        print(f"  Dimmer: {data.dimmer_brightness}%")
-        print(f"  Daylight Harvest: {data.daylight_harvest_mode}")
-        print(f"  Relays: {data.relays}")
-        
-    except Exception as e:
-        print(f"[ERROR] Failed to process lighting data: {e}")
+        }),
+        "store": partial(_stored, partial(db_client.insert_lighting_data, stored)),
+    })
+    if outcome["store"] is not None:
+        logger.error("Failed to process lighting data: %s", outcome["store"])
+        # Let the device's retry through since this attempt was not stored
+        ingest_dedup.forget(data.device_id, data.timestamp, "lighting")
+        ingest_compressor.reset(data.device_id)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process sensor data"
         )
+
+    logger.debug(
+        "Lighting data from %s: light=%s%% (%s lux) dimmer=%s%% daylight_harvest=%s relays=%s",
+        data.device_id, data.light_level, data.light_lux, data.dimmer_brightness,
+        data.daylight_harvest_mode, data.relays,
+    )
+
+    # Update device status and latest state, and evaluate rules after replying
+    background_tasks.add_task(ingest_pipeline.run, "lighting", {
+        "status": partial(db_client.update_device_status, data.device_id, 'online'),
+        "latest": partial(db_client.record_latest_state, [stored]),
+        "rollups": partial(db_client.record_rollups, [stored]),
+        "rules": partial(evaluate_and_execute, _lighting_rules_context(data)),
+    })
     
-    return {
-        "status": "accepted",
-        "message": "Lighting sensor data processed successfully",
-        "device_id": data.device_id,
-        "timestamp": data.timestamp,
-    }
+    return response
+
+
+@router.get("/latest")
+def get_latest_sensor_data_all() -> Dict:
+    """
+    Get the latest value of every metric for every device
+
+    One primary-key scan of device_latest_state, so a dashboard loads the
+    whole house in a single request.
+
+    Returns:
+        dict: ``devices`` (one latest-state row per device) and ``count``
+    """
+    try:
+        states = db_client.get_latest_states()
+    except Exception as e:
+        logger.error("Failed to query latest state: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve latest sensor data"
+        )
+    return {"devices": states, "count": len(states)}
 
 
 @router.get("/latest/{device_id}")
-async def get_latest_sensor_data(device_id: str) -> Dict:
+def get_latest_sensor_data(device_id: str) -> Dict:
     """
     Get the latest sensor reading for a specific device
     
@@ -222,8 +422,9 @@ async def get_latest_sensor_data(device_id: str) -> Dict:
             "data": cached_state
         }
     
-    # Fall back to database
-    latest_data = db_client.get_latest_lighting_data(device_id)
+    # Fall back to the latest-state row, then (data ingested before that
+    # table existed) the lighting hypertable
+    latest_data = db_client.get_latest_state(device_id) or db_client.get_latest_lighting_data(device_id)
     if latest_data:
         return {
             "device_id": device_id,
@@ -238,27 +439,148 @@ async def get_latest_sensor_data(device_id: str) -> Dict:
     )
 
 
+# Rows per JSON page, and per chunk written by the streaming exports
+HISTORY_PAGE_MAX = 1000
+HISTORY_STREAM_CHUNK_ROWS = 500
+
+_HISTORY_FIELDS = ['time', 'device_id', 'light_level', 'light_lux', 'dimmer_brightness', 'daylight_harvest_mode']
+
+# Range charted when a downsampled request gives no start_time
+HISTORY_DEFAULT_RANGE = timedelta(hours=24)
+# Points returned by downsample=lttb when the request gives no points
+HISTORY_LTTB_DEFAULT_POINTS = 1000
+
+_HISTORY_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _parse_time_param(name: str, value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name} format. Use ISO 8601 format."
+        )
+
+
+def _parse_bucket_param(name: str, value: Optional[str]) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        return parse_bucket_width(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name}. Use seconds or a width such as 30s, 5m, 1h or 1d."
+        )
+
+
+def _rollup_range(start_dt: Optional[datetime], end_dt: Optional[datetime]):
+    """Fill in an open range for downsampled history (end defaults to now, naive is UTC)."""
+    if start_dt and start_dt.tzinfo is None:
+        start_dt = start_dt.replace(tzinfo=timezone.utc)
+    if end_dt and end_dt.tzinfo is None:
+        end_dt = end_dt.replace(tzinfo=timezone.utc)
+    end_dt = end_dt or datetime.now(timezone.utc)
+    start_dt = start_dt or end_dt - HISTORY_DEFAULT_RANGE
+    if start_dt >= end_dt:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start_time must be before end_time"
+        )
+    return start_dt, end_dt
+
+
+def _ndjson_chunk(rows: List[dict]) -> bytes:
+    return b"".join(dumps(row) + b"\n" for row in rows)
+
+
+def _csv_chunk(rows: List[dict], header: bool) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(_HISTORY_FIELDS)
+    writer.writerows([row[field] for field in _HISTORY_FIELDS] for row in rows)
+    return buf.getvalue()
+
+
+def _stream_history(rows: Iterator[dict], fmt: str) -> Iterator[Union[bytes, str]]:
+    """Encode streamed rows in chunks; the DB cursor is closed when the client goes away."""
+    try:
+        chunk: List[dict] = []
+        header = fmt == "csv"
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= HISTORY_STREAM_CHUNK_ROWS:
+                yield _ndjson_chunk(chunk) if fmt == "ndjson" else _csv_chunk(chunk, header)
+                chunk, header = [], False
+        if chunk or header:
+            yield _ndjson_chunk(chunk) if fmt == "ndjson" else _csv_chunk(chunk, header)
+    except Exception as exc:
+        # Headers are already sent; the truncated body is all we can signal.
+        logger.error("History export for %s failed mid-stream: %s", fmt, exc)
+    finally:
+        close = getattr(rows, "close", None)
+        if close:
+            close()
+
+
 @router.get("/history/{device_id}")
-async def get_sensor_history(
+def get_sensor_history(
     device_id: str,
     start_time: Optional[str] = None,
     end_time: Optional[str] = None,
-    limit: int = 100
-) -> Dict:
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    fmt: Literal["json", "ndjson", "csv"] = Query("json", alias="format"),
+    points: Optional[int] = Query(None, ge=3),
+    bucket: Optional[str] = None,
+    downsample: Optional[Literal["lttb"]] = None,
+    metric: Literal["light_level", "light_lux", "dimmer_brightness"] = "light_level",
+):
     """
     Get historical sensor data for a device
     
+    ``format=json`` (default) returns one page, newest first, of at most
+    1000 rows. Pass the returned ``next_cursor`` as ``cursor`` to get the
+    next page; pages are keyset-paginated on (device_id, time), so deep
+    pages cost the same as the first.
+    
+    ``format=ndjson`` or ``format=csv`` streams the whole range (or
+    ``limit`` rows), oldest first, from a server-side cursor with flat
+    memory use however large the range is.
+    
+    ``points`` (target point count) or ``bucket`` (width such as ``5m``)
+    returns the range downsampled to avg/min/max per bucket, oldest first,
+    read from raw rows, the hourly aggregate or an on-the-fly rollup
+    (whichever is cheapest). The range defaults to the last 24 hours.
+    
+    ``downsample=lttb`` instead keeps ``points`` (default 1000) real rows
+    chosen by Largest-Triangle-Three-Buckets on ``metric``, so charts keep
+    the peaks and dips that bucket averages flatten.
+    
     Args:
         device_id: Device identifier
         start_time: Start timestamp (ISO 8601)
         end_time: End timestamp (ISO 8601)
-        limit: Maximum number of records to return
+        limit: Maximum number of records (default 100 per JSON page)
+        cursor: ``next_cursor`` from the previous JSON page
+        fmt: Response format: json, ndjson or csv
+        points: Target number of points (downsampled JSON)
+        bucket: Bucket width, e.g. 30s, 5m, 1h, 1d (downsampled JSON)
+        downsample: "lttb" to downsample raw rows with LTTB
+        metric: Series LTTB preserves the shape of
     
     Returns:
-        dict: Historical sensor data
+        dict: Historical sensor data (JSON), or a streamed NDJSON/CSV body
     
     Raises:
-        HTTPException: 404 if device not found
+        HTTPException: 404 if device not found, 400 for a bad time or cursor
     """
     # Check if device exists
     device = db_client.get_device(device_id)
@@ -269,26 +591,108 @@ async def get_sensor_history(
         )
     
     # Parse timestamps if provided
-    start_dt = None
-    end_dt = None
-    
-    if start_time:
+    start_dt = _parse_time_param("start_time", start_time)
+    end_dt = _parse_time_param("end_time", end_time)
+    bucket_seconds = _parse_bucket_param("bucket", bucket)
+
+    downsampled = downsample is not None or points is not None or bucket_seconds is not None
+    if downsampled and fmt != "json":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="points, bucket and downsample are only supported with format=json"
+        )
+
+    if downsample == "lttb":
+        start_dt, end_dt = _rollup_range(start_dt, end_dt)
         try:
-            start_dt = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
-        except ValueError:
+            result = db_client.get_lighting_lttb(
+                device_id=device_id,
+                start_time=start_dt,
+                end_time=end_dt,
+                points=points or HISTORY_LTTB_DEFAULT_POINTS,
+                metric=metric,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        except Exception as e:
+            logger.error("Failed to query LTTB history: %s", e)
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid start_time format. Use ISO 8601 format."
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve sensor history"
             )
-    
-    if end_time:
+        return {
+            "device_id": device_id,
+            "resolution": "lttb",
+            "metric": metric,
+            "source_rows": result["source_rows"],
+            "data": result["data"],
+            "total_records": len(result["data"]),
+            "start_time": start_dt.isoformat(),
+            "end_time": end_dt.isoformat(),
+        }
+
+    if downsampled:
+        start_dt, end_dt = _rollup_range(start_dt, end_dt)
+        try:
+            rollup = db_client.get_lighting_rollup(
+                device_id=device_id,
+                start_time=start_dt,
+                end_time=end_dt,
+                points=points,
+                bucket_seconds=bucket_seconds,
+            )
+        except Exception as e:
+            logger.error("Failed to query history rollup: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve sensor history"
+            )
+        return {
+            "device_id": device_id,
+            "resolution": rollup["resolution"],
+            "bucket_seconds": rollup["bucket_seconds"],
+            "data": rollup["data"],
+            "total_records": len(rollup["data"]),
+            "start_time": start_dt.isoformat(),
+            "end_time": end_dt.isoformat(),
+        }
+
+    if fmt != "json":
+        try:
+            rows = db_client.iter_lighting_history(
+                device_id=device_id, start_time=start_dt, end_time=end_dt, limit=limit,
+            )
+            # Pull the first row here so a database error is still a 500
+            first = next(rows, None)
+        except Exception as e:
+            logger.error("Failed to query history: %s", e)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve sensor history"
+            )
+        if first is not None:
+            rows = itertools.chain([first], rows)
+        return StreamingResponse(
+            _stream_history(rows, fmt),
+            media_type=_HISTORY_MEDIA_TYPES[fmt],
+            headers={
+                "Content-Disposition": f'attachment; filename="{device_id}-history.{fmt}"',
+            },
+        )
+
+    before = None
+    if cursor:
         try:
-            end_dt = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
+            cursor_device, before = decode_cursor(cursor)
         except ValueError:
+            cursor_device = None
+        if cursor_device != device_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid end_time format. Use ISO 8601 format."
+                detail="Invalid cursor for this device"
             )
+
+    page_size = min(limit or 100, HISTORY_PAGE_MAX)
     
     # Query database
     try:
@@ -296,24 +700,96 @@ async def get_sensor_history(
             device_id=device_id,
             start_time=start_dt,
             end_time=end_dt,
-            limit=min(limit, 1000)  # Cap at 1000 records
+            limit=page_size,
+            before=before,
         )
-        
-        return {
-            "device_id": device_id,
-            "data": history,
-            "total_records": len(history),
-            "start_time": start_time,
-            "end_time": end_time,
-            "limit": limit
-        }
     except Exception as e:
-        print(f"[ERROR] Failed to query history: {e}")
+        logger.error("Failed to query history: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to retrieve sensor history"
         )
 
+    next_cursor = None
+    if len(history) == page_size:
+        next_cursor = encode_cursor(device_id, datetime.fromisoformat(history[-1]["time"]))
+
+    return {
+        "device_id": device_id,
+        "data": history,
+        "total_records": len(history),
+        "start_time": start_time,
+        "end_time": end_time,
+        "limit": page_size,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/readings")
+def get_sensor_readings(
+    device_id: str,
+    start_time: str,
+    end_time: str,
+    interval: Optional[str] = None,
+    points: Optional[int] = Query(None, ge=2),
+) -> Dict:
+    """
+    Get environmental sensor readings aggregated per interval
+
+    Args:
+        device_id: Device identifier
+        start_time: Start timestamp (ISO 8601)
+        end_time: End timestamp (ISO 8601)
+        interval: Bucket width, e.g. 1m, 5m, 1h, 1d
+        points: Target number of points (ignored when interval is given)
+
+    Returns:
+        dict: One row per bucket with ``<sensor>_avg/_min/_max``. Without
+        interval or points, raw readings when the range is small enough,
+        otherwise the finest rollup that fits the response cap.
+
+    Raises:
+        HTTPException: 404 if device not found, 400 for a bad time or interval
+    """
+    device = db_client.get_device(device_id)
+    if not device:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Device {device_id} not found"
+        )
+
+    start_dt, end_dt = _rollup_range(
+        _parse_time_param("start_time", start_time),
+        _parse_time_param("end_time", end_time),
+    )
+    bucket_seconds = _parse_bucket_param("interval", interval)
+
+    try:
+        rollup = db_client.get_sensor_readings_rollup(
+            device_id=device_id,
+            start_time=start_dt,
+            end_time=end_dt,
+            points=points,
+            bucket_seconds=bucket_seconds,
+        )
+    except Exception as e:
+        logger.error("Failed to query sensor readings: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve sensor readings"
+        )
+
+    return {
+        "device_id": device_id,
+        "start_time": start_time,
+        "end_time": end_time,
+        "interval": interval,
+        "resolution": rollup["resolution"],
+        "bucket_seconds": rollup["bucket_seconds"],
+        "count": len(rollup["data"]),
+        "readings": rollup["data"],
+    }
+
 
 # ---------------------------------------------------------------------------
 # Room-node combined ingest endpoint
@@ -325,7 +801,7 @@ async def get_sensor_history(
     status_code=status.HTTP_202_ACCEPTED,
     summary="Ingest combined room-node sensor data",
 )
-async def ingest_room_node_data(data: RoomNodeSensorData) -> Dict:
+async def ingest_room_node_data(data: RoomNodeSensorData, background_tasks: BackgroundTasks) -> Dict:
     """
     Ingest combined sensor data from a room-node ESP32.
 
@@ -334,58 +810,293 @@ async def ingest_room_node_data(data: RoomNodeSensorData) -> Dict:
     WebSocket message.  This endpoint accepts HTTP POST submissions of
     that same payload for devices that prefer REST over WebSocket.
 
-    The payload is:
-    1. Published to the message broker so background workers can persist it.
-    2. Broadcast to all connected WebSocket clients for real-time updates.
-    3. Device status is updated to 'online' in the database.
+    Readings from unregistered devices are rejected with 404.
+
+    Before the response, concurrently:
+    1. Broadcast to all connected WebSocket clients for real-time updates.
+    2. Published to the message broker.
+
+    After the response, concurrently:
+    3. Stored in the sensor_readings hypertable, one row per metric.
+    4. Evaluated by the automation rules.
+    5. Device status is updated to 'online' and the reading is merged
+       into device_latest_state.
     """
-    print(f"[SENSOR] Room-node data from {data.device_id} ({data.room}):")
-    print(f"  Temp: {data.temperature}°C  Hum: {data.humidity}%  Press: {data.pressure} hPa")
-    print(f"  Light: {data.light_level}% ({data.light_lux} lux)  Dimmer: {data.dimmer_brightness}%")
-    print(f"  Fan: {data.fan_on}  DH: {data.daylight_harvest_mode}")
+    # Unknown ids would fail the sensor_readings FK
+    await _get_registered_device(data.device_id)
 
-    # Publish to broker (fire-and-forget)
-    try:
-        await broker.publish(
-            channel="sensors/room-node",
-            payload=data.model_dump(),
-        )
-        try:
-            await evaluate_and_execute(
-                {
-                    "temperature": data.temperature,
-                    "humidity": data.humidity,
-                    "pressure": data.pressure,
-                    "light_lux": data.light_lux,
-                    "light_level": data.light_level,
-                    "hvac_device_id": data.device_id,
-                    "lighting_device_id": data.device_id,
-                }
-            )
-        except Exception as exc:
-            print(f"[RULES] Room-node rules evaluation failed: {exc}")
-    except Exception as exc:
-        print(f"[BROKER] Failed to publish room-node data: {exc}")
+    logger.debug(
+        "Room-node data from %s (%s): temp=%s°C hum=%s%% press=%s hPa light=%s%% (%s lux) "
+        "dimmer=%s%% fan=%s daylight_harvest=%s",
+        data.device_id, data.room, data.temperature, data.humidity, data.pressure,
+        data.light_level, data.light_lux, data.dimmer_brightness, data.fan_on,
+        data.daylight_harvest_mode,
+    )
+    response = {
+        "status": "accepted",
+        "message": "Room-node sensor data queued for processing",
+        "device_id": data.device_id,
+        "timestamp": data.timestamp,
+    }
 
-    # Broadcast to WebSocket clients
-    try:
-        await ws_manager.broadcast_to_clients({
+    # Retried POSTs are acknowledged without being processed again
+    if ingest_dedup.seen(data.device_id, data.timestamp, "room_node"):
+        logger.debug("Dropped replayed room-node reading from %s", data.device_id)
+        return response
+
+    # Flat readings are not published, evaluated, stored or broadcast
+    stored = _compress(data, device_clocks.normalise(data.device_id, data.timestamp))
+    if stored is None:
+        background_tasks.add_task(ingest_pipeline.run, "room_node", {
+            "status": partial(db_client.update_device_status, data.device_id, "online"),
+        })
+        return response
+
+    # Broadcast and publish before replying (best-effort, logged on failure)
+    payload = data.model_dump()
+    await ingest_pipeline.run("room_node", {
+        "broadcast": partial(ws_manager.broadcast_to_clients, {
             "type": "room_node_data",
             "device_id": data.device_id,
-            "data": data.model_dump(),
+            "data": payload,
+        }),
+        "publish": partial(broker.publish, channel="sensors/room-node", payload=payload),
+    })
+
+    # Persist, evaluate rules and update device status after replying
+    background_tasks.add_task(ingest_pipeline.run, "room_node", {
+        "store": partial(db_client.insert_sensor_readings, [stored]),
+        "latest": partial(db_client.record_latest_state, [stored]),
+        "rollups": partial(db_client.record_rollups, [stored]),
+        "rules": partial(evaluate_and_execute, _room_node_rules_context(data)),
+        "status": partial(db_client.update_device_status, data.device_id, "online"),
+    })
+
+    return response
+
+
+@router.get("/compression", summary="Ingest compression report")
+def get_compression_report() -> Dict:
+    """
+    Report how much the ingest compressor drops and what it costs.
+
+    For each field: samples offered and kept, the compression ratio, and
+    the max / RMS error of dropped samples against the reconstruction
+    (last kept value for deadband, linear interpolation for swinging
+    door). Use it to tune ``COMPRESSION_TOLERANCES``.
+    """
+    return ingest_compressor.report()
+
+
+# ---------------------------------------------------------------------------
+# Batch ingest endpoint
+# ---------------------------------------------------------------------------
+
+_BATCH_BROADCAST_TYPES = {
+    "environmental": "environmental_data",
+    "lighting": "lighting_data",
+    "room_node": "room_node_data",
+}
+
+_BATCH_RULES_CONTEXT = {
+    "environmental": _environmental_rules_context,
+    "lighting": _lighting_rules_context,
+    "room_node": _room_node_rules_context,
+}
+
+
+async def _gather_all(calls: List[Any]) -> None:
+    """Await coroutine calls concurrently; raise the first failure after all finish."""
+    results = await asyncio.gather(*(call() for call in calls), return_exceptions=True)
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+
+def _without_time(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Payload as the device sent it, without the normalised storage time."""
+    return {name: value for name, value in row.items() if name != "time"}
+
+
+@router.post(
+    "/ingest/batch",
+    response_model=BatchIngestResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Ingest a batch of buffered sensor readings",
+)
+async def ingest_batch(batch: BatchIngestRequest, background_tasks: BackgroundTasks) -> Dict:
+    """
+    Ingest many lighting, environmental and room-node readings at once.
+
+    Room-nodes buffer readings while Wi-Fi is down and flush them through
+    this endpoint when they reconnect. The whole batch is validated in one
+    pass and costs a fixed number of round trips regardless of its size:
+
+    1. One query resolves every device ID in the batch.
+    2. Lighting readings are written with a single multi-row INSERT.
+    3. Environmental and room-node readings are exploded into
+       sensor_readings rows and bulk-loaded with COPY, and published to
+       the broker as one message per reading type.
+    4. One UPDATE marks every reporting device as 'online'.
+
+    Both stores go through the write-behind buffer and the response waits
+    for their flush while broadcasts and broker messages go out. If either
+    store fails the batch answers 500 and none of it counts as ingested,
+    so the room-node's retry is processed in full. The status update,
+    latest state, rollups and rule evaluation run after the response is
+    sent.
+
+    Readings are stored at their normalised time: the newest reading per
+    device updates that device's clock model and the buffered ones are
+    mapped through it (see ``app.services.clock_sync``).
+
+    Only the newest reading per device is broadcast to dashboard clients
+    and evaluated by the rules engine; older buffered samples are history.
+
+    Each device in the batch costs one token of the rate limit of its
+    registered type; readings from devices over their limit are rejected
+    individually (429 if every device is over). Readings from unregistered devices are rejected
+    individually and
+    reported in ``errors`` without failing the rest of the batch. Readings
+    already ingested (a retried flush) are counted in ``duplicates`` and
+    skipped, and readings the ingest compressor finds flat are counted in
+    ``compressed`` and skipped.
+    """
+    known_devices = await run_in_threadpool(
+        db_client.get_devices, {reading.device_id for reading in batch.readings}
+    )
+    waits = {
+        device_id: device_rate_limiter.acquire(device_id, limit_type(device))
+        for device_id, device in known_devices.items()
+    }
+    limited = {device_id for device_id, wait in waits.items() if wait}
+    if limited and len(limited) == len(waits):
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded for every device in the batch",
+            headers={"Retry-After": str(retry_after_seconds(min(waits.values())))},
+        )
+
+    # Buffered readings were delayed on the device, so only the newest one
+    # per device (sent just before the flush) updates its clock model.
+    received = time.time()
+    newest = {reading.device_id: reading for reading in batch.readings}
+    for device_id, reading in newest.items():
+        if device_id in known_devices:
+            device_clocks.normalise(device_id, reading.timestamp, received)
+
+    errors: List[Dict] = []
+    accepted: Dict[str, List[Dict]] = {kind: [] for kind in _BATCH_BROADCAST_TYPES}
+    latest: Dict[tuple, BaseModel] = {}
+    duplicates = 0
+    compressed = 0
+
+    for index, reading in enumerate(batch.readings):
+        if reading.device_id in limited:
+            errors.append({
+                "index": index,
+                "device_id": reading.device_id,
+                "reason": "rate limited",
+            })
+            continue
+        if reading.device_id not in known_devices:
+            errors.append({
+                "index": index,
+                "device_id": reading.device_id,
+                "reason": "device not registered",
+            })
+            continue
+        if ingest_dedup.seen(reading.device_id, reading.timestamp, reading.type):
+            duplicates += 1
+            continue
+        at = device_clocks.normalise(reading.device_id, reading.timestamp, received, learn=False)
+        stored = _compress(reading, at)
+        if stored is None:
+            compressed += 1
+            continue
+        if reading.type == "lighting":
+            stored = {**reading.model_dump(exclude={"type"}), "time": at}
+        accepted[reading.type].append(stored)
+        latest[(reading.type, reading.device_id)] = reading
+
+    accepted_count = sum(len(rows) for rows in accepted.values())
+    if accepted_count:
+        readings = accepted["environmental"] + accepted["room_node"]
+        # Every reading is stored before replying so a failure can be
+        # retried; dashboards and the broker are fed at the same time.
+        stores = {}
+        if accepted["lighting"]:
+            stores["store_lighting"] = partial(
+                _stored, partial(db_client.insert_lighting_data_batch, accepted["lighting"])
+            )
+        if readings:
+            stores["store_readings"] = partial(
+                _stored, partial(db_client.insert_sensor_readings_batch, readings)
+            )
+        foreground = {
+            **stores,
+            "broadcast": partial(_gather_all, [
+                partial(ws_manager.broadcast_to_clients, {
+                    "type": _BATCH_BROADCAST_TYPES[kind],
+                    "device_id": device_id,
+                    "data": reading.model_dump(exclude={"type"}),
+                })
+                for (kind, device_id), reading in latest.items()
+            ]),
+            "publish": partial(_gather_all, [
+                partial(
+                    broker.publish,
+                    channel=f"sensors/{kind.replace('_', '-')}/batch",
+                    payload={"readings": [_without_time(row) for row in accepted[kind]]},
+                )
+                for kind in ("environmental", "room_node")
+                if accepted[kind]
+            ]),
+        }
+        outcome = await ingest_pipeline.run("batch", foreground)
+        failed = {stage: outcome[stage] for stage in stores if outcome[stage] is not None}
+        if failed:
+            logger.error("Failed to store batch: %s", failed)
+            # Let the room-node's retry through in full; rows that were
+            # stored are skipped by the inserts' ON CONFLICT DO NOTHING.
+            for kind, rows in accepted.items():
+                for row in rows:
+                    ingest_dedup.forget(row["device_id"], row["timestamp"], kind)
+                    ingest_compressor.reset(row["device_id"])
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to process sensor data"
+            )
+
+        background_tasks.add_task(ingest_pipeline.run, "batch", {
+            "status": partial(
+                db_client.update_devices_status, {device_id for _, device_id in latest}, "online"
+            ),
+            "latest": partial(
+                db_client.record_latest_state,
+                [row for rows in accepted.values() for row in rows],
+            ),
+            "rollups": partial(
+                db_client.record_rollups,
+                [row for rows in accepted.values() for row in rows],
+            ),
+            "rules": partial(_gather_all, [
+                partial(evaluate_and_execute, _BATCH_RULES_CONTEXT[kind](reading))
+                for (kind, _), reading in latest.items()
+            ]),
         })
-    except Exception as exc:
-        print(f"[WS] Failed to broadcast room-node data: {exc}")
 
-    # Update device status (best-effort)
-    try:
-        db_client.update_device_status(data.device_id, "online")
-    except Exception as exc:
-        print(f"[DB] Failed to update device status: {exc}")
+    logger.info(
+        "Batch of %d readings: %d accepted, %d rejected, %d duplicates, %d compressed",
+        len(batch.readings), accepted_count, len(errors), duplicates, compressed,
+    )
 
     return {
         "status": "accepted",
-        "message": "Room-node sensor data queued for processing",
-        "device_id": data.device_id,
-        "timestamp": data.timestamp,
+        "message": f"{accepted_count} sensor readings queued for processing",
+        "accepted": accepted_count,
+        "rejected": len(errors),
+        "duplicates": duplicates,
+        "compressed": compressed,
+        "errors": errors,
     }
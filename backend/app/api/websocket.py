@@ -8,42 +8,51 @@ Handles WebSocket connections for:
 """
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-import json
+from starlette.concurrency import run_in_threadpool
 import asyncio
-from app.services import ws_manager
+from app.services import db_client, device_rate_limiter, ws_manager
+from app.services.rate_limit import limit_type
 from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.payloads import (
+    FORMAT_JSON,
+    FORMAT_MSGPACK,
+    receive_message,
+    send_message,
+    websocket_format,
+)
+from app.utils.serialization import dumps_text, loads
+
+logger = get_logger(__name__)
 
 router = APIRouter()
 
-async def perform_ws_handshake(websocket: WebSocket, role: str):
+async def perform_ws_handshake(websocket: WebSocket, role: str, fmt: str = FORMAT_JSON):
     nonce, issued_at = ws_manager.issue_challenge()
-    await websocket.send_text(json.dumps({
+    await send_message(websocket, {
         "type": "ws_challenge",
         "role": role,
         "nonce": nonce,
         "issued_at": issued_at,
         "algo": "hmac-sha256",
-    }))
+    }, fmt)
 
     try:
-        data = await asyncio.wait_for(
-            websocket.receive_text(),
+        message = await asyncio.wait_for(
+            receive_message(websocket),
             timeout=settings.WS_AUTH_CHALLENGE_TIMEOUT_SECONDS
         )
     except asyncio.TimeoutError:
-        await websocket.send_text(json.dumps({"type": "ws_auth_error", "error": "handshake_timeout"}))
+        await send_message(websocket, {"type": "ws_auth_error", "error": "handshake_timeout"}, fmt)
         await websocket.close(code=1008)
         return None
-
-    try:
-        message = json.loads(data)
-    except json.JSONDecodeError:
-        await websocket.send_text(json.dumps({"type": "ws_auth_error", "error": "invalid_json"}))
+    except ValueError:
+        await send_message(websocket, {"type": "ws_auth_error", "error": "invalid_json"}, fmt)
         await websocket.close(code=1008)
         return None
 
-    if message.get("type") != "ws_auth":
-        await websocket.send_text(json.dumps({"type": "ws_auth_error", "error": "auth_required_first"}))
+    if not isinstance(message, dict) or message.get("type") != "ws_auth":
+        await send_message(websocket, {"type": "ws_auth_error", "error": "auth_required_first"}, fmt)
         await websocket.close(code=1008)
         return None
 
@@ -54,7 +63,7 @@ async def perform_ws_handshake(websocket: WebSocket, role: str):
     request_role = str(message.get("role") or "")
 
     if request_nonce != nonce:
-        await websocket.send_text(json.dumps({"type": "ws_auth_error", "error": "nonce_mismatch"}))
+        await send_message(websocket, {"type": "ws_auth_error", "error": "nonce_mismatch"}, fmt)
         await websocket.close(code=1008)
         return None
 
@@ -66,53 +75,73 @@ async def perform_ws_handshake(websocket: WebSocket, role: str):
         signature=signature,
     )
     if not ok or request_role != role or not client_id:
-        await websocket.send_text(json.dumps({"type": "ws_auth_error", "error": reason}))
+        await send_message(websocket, {"type": "ws_auth_error", "error": reason}, fmt)
         await websocket.close(code=1008)
         return None
     return client_id
 
 
+def _device_type(device_id: str) -> str:
+    """Device type for rate limiting, from the (cached) device registry."""
+    try:
+        device = db_client.get_device(device_id)
+    except Exception as exc:
+        logger.warning("Device lookup failed for %s: %s", device_id, exc)
+        device = None
+    return limit_type(device)
+
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for ESP32 devices
     
     Devices send sensor data and receive control commands via this endpoint.
+    A device that connects with the ``msgpack`` subprotocol (or
+    ``?format=msgpack``) exchanges binary MessagePack frames instead of JSON
+    text, including the handshake and any commands sent to it.
     """
-    await websocket.accept()
+    fmt = websocket_format(websocket)
+    subprotocol = FORMAT_MSGPACK if FORMAT_MSGPACK in websocket.scope.get("subprotocols", []) else None
+    await websocket.accept(subprotocol=subprotocol)
     device_id = None
 
     try:
-        device_id = await perform_ws_handshake(websocket, role="device")
+        device_id = await perform_ws_handshake(websocket, role="device", fmt=fmt)
         if not device_id:
             return
 
         # Register device connection
-        await ws_manager.connect_device(device_id, websocket)
+        await ws_manager.connect_device(device_id, websocket, fmt)
+        device_type = await run_in_threadpool(_device_type, device_id)
 
         # Confirm connection
-        await websocket.send_text(json.dumps({
+        await send_message(websocket, {
             'type': 'ws_authenticated',
             'status': 'connected',
             'device_id': device_id,
-        }))
+            'format': fmt,
+        }, fmt)
 
         # Handle incoming messages
         while True:
-            data = await websocket.receive_text()
-            message = json.loads(data)
+            message = await receive_message(websocket)
             if message.get("type") == "ws_auth":
                 # Ignore redundant auth packets after connection is established.
                 continue
+            if device_rate_limiter.acquire(device_id, device_type):
+                # Over the limit: keep the newest state, skip fan-out and rules.
+                ws_manager.coalesce_device_message(device_id, message)
+                continue
             # Process device message and broadcast to clients
             await ws_manager.handle_device_message(device_id, message)
 
     except WebSocketDisconnect:
         if device_id:
             ws_manager.disconnect_device(device_id)
-        print(f"[WS] Device {device_id} disconnected")
+        logger.info("Device %s disconnected", device_id)
     except Exception as e:
-        print(f"[WS] Error handling device WebSocket: {e}")
+        logger.warning("Error handling device WebSocket: %s", e)
         if device_id:
             ws_manager.disconnect_device(device_id)
 
@@ -134,7 +163,7 @@ async def client_websocket_endpoint(websocket: WebSocket):
         await ws_manager.connect_client(websocket)
 
         # Send initial connection confirmation after auth
-        await websocket.send_text(json.dumps({
+        await websocket.send_text(dumps_text({
             'type': 'ws_authenticated',
             'status': 'connected',
             'id': client_id,
@@ -145,18 +174,18 @@ async def client_websocket_endpoint(websocket: WebSocket):
         while True:
             # Wait for messages (if client sends any)
             data = await websocket.receive_text()
-            message = json.loads(data)
+            message = loads(data)
             if message.get("type") == "ws_auth":
                 continue
             # Handle client commands if needed
             # For now, just echo back
-            await websocket.send_text(json.dumps({
+            await websocket.send_text(dumps_text({
                 'echo': message
             }))
 
     except WebSocketDisconnect:
         ws_manager.disconnect_client(websocket)
-        print("[WS] Client disconnected")
+        logger.info("Client disconnected")
     except Exception as e:
-        print(f"[WS] Error handling client WebSocket: {e}")
+        logger.warning("Error handling client WebSocket: %s", e)
         ws_manager.disconnect_client(websocket)
@@ -9,6 +9,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
 from app.api import health, sensors, lighting, websocket, access, rules
+from app.middleware import AdmissionControlMiddleware, RequestDecompressionMiddleware
+from app.services.admission import ingest_admission
+from app.utils.logger import setup_logging, shutdown_logging
+from app.utils.serialization import FastJSONResponse
 
 # Initialize FastAPI application
 app = FastAPI(
@@ -17,6 +21,8 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    # orjson-backed when installed (see app.utils.serialization)
+    default_response_class=FastJSONResponse,
 )
 
 # Configure CORS middleware (browser dashboard on :3000 must be allowed for /health + REST)
@@ -31,6 +37,22 @@ if _cors_regex:
     _cors_kwargs["allow_origin_regex"] = _cors_regex
 app.add_middleware(CORSMiddleware, **_cors_kwargs)
 
+# Inflate gzip/deflate bodies from devices uploading buffered readings
+app.add_middleware(
+    RequestDecompressionMiddleware,
+    max_body_bytes=settings.MAX_DECOMPRESSED_BODY_BYTES,
+    path_prefixes=("/api/sensors/ingest",),
+)
+
+# Admission control runs outermost so shed requests are never read or inflated.
+# Only sensor ingest is gated; access control (card checks at the door) and
+# every other route are never shed.
+app.add_middleware(
+    AdmissionControlMiddleware,
+    controller=ingest_admission,
+    path_prefixes=("/api/sensors/ingest",),
+)
+
 # Include routers
 app.include_router(health.router, tags=["health"])
 app.include_router(sensors.router, prefix="/api/sensors", tags=["sensors"])
@@ -44,13 +66,19 @@ app.include_router(rules.router, prefix="/api/rules", tags=["rules"])
 async def startup_event():
     """
     Application startup tasks:
+    - Configure non-blocking logging
     - Initialize database connections
+    - Load the device registry cache
+    - Start the write-behind buffer, presence and latest-state trackers
     - Initialize Redis connection
     - Start background workers
     """
     print("=" * 50)
     print("Smart Home Backend Starting...")
     print("=" * 50)
+
+    setup_logging(settings.LOG_LEVEL, settings.LOG_SAMPLING)
+    print(f"[OK] Logging configured (level {settings.LOG_LEVEL})")
     
     # Initialize database connection (tables are created by init.sql)
     from app.services import db_client
@@ -59,8 +87,28 @@ async def startup_event():
         # startup if Postgres is temporarily unavailable.
         db_client.create_tables()
         print("[OK] Database client initialized")
+        loaded = db_client.load_device_registry()
+        print(f"[OK] Device registry loaded ({loaded} devices)")
     except Exception as exc:
         print(f"[WARN] Database init skipped: {exc}")
+
+    if settings.SPOOL_ENABLED:
+        db_client.start_spool_replayer()
+        print("[OK] Disk spool replayer started")
+
+    if settings.WRITE_BUFFER_ENABLED:
+        db_client.start_write_buffer()
+        print("[OK] Write-behind buffer started")
+
+    db_client.start_presence_tracker()
+    print("[OK] Presence tracker started")
+
+    db_client.start_latest_state_tracker()
+    print("[OK] Latest-state tracker started")
+
+    if settings.ROLLUP_ENABLED:
+        db_client.start_rollup_accumulator()
+        print("[OK] Rollup accumulator started")
     
     # Initialize WebSocket manager
     from app.services import ws_manager
@@ -73,9 +121,12 @@ async def startup_event():
 async def shutdown_event():
     """
     Application shutdown tasks:
+    - Flush buffered sensor writes, heartbeats, latest device state and rollups
+    - Sync the disk spool (its backlog is replayed on the next start)
     - Close database connections
     - Close Redis connections
     - Stop background workers
+    - Drain queued log records
     """
     print("=" * 50)
     print("Smart Home Backend Shutting Down...")
@@ -83,11 +134,25 @@ async def shutdown_event():
     
     # Close database connections
     from app.services import db_client
-    if hasattr(db_client, 'engine'):
-        db_client.engine.dispose()
-        print("[OK] Database connections closed")
+    db_client.stop_write_buffer()
+    print("[OK] Write-behind buffer flushed")
+    db_client.stop_presence_tracker()
+    print("[OK] Presence heartbeats flushed")
+    db_client.stop_latest_state_tracker()
+    print("[OK] Latest device state flushed")
+    db_client.stop_rollup_accumulator()
+    print("[OK] Rollup buckets flushed")
+    db_client.stop_spool_replayer()
+    print("[OK] Disk spool synced")
+    db_client.dispose()
+    print("[OK] Database connections closed")
+
+    from app.services import async_db_client
+    await async_db_client.dispose()
+    print("[OK] Async database pool closed")
     
     print("Shutdown complete.")
+    shutdown_logging()
 
 
 @app.get("/")
@@ -0,0 +1,6 @@
+"""Middleware Package - ASGI middleware applied in app.main"""
+
+from .admission import AdmissionControlMiddleware
+from .decompression import RequestDecompressionMiddleware
+
+__all__ = ["AdmissionControlMiddleware", "RequestDecompressionMiddleware"]
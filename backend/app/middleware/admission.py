@@ -0,0 +1,86 @@
+"""
+Ingest Admission Middleware
+
+Applies an ``AdmissionController`` to HTTP requests under the given path
+prefixes before any body is read or decompressed. Shed requests get 503
+with ``Retry-After``; every other path goes straight through.
+
+The slot is returned as soon as the last response body chunk is sent, so
+``BackgroundTasks`` that run after the response (storage, rules) do not
+count against admission. Each shed request is counted by the controller
+(``GET /health/metrics``) and logged on the sampled ``app.ingest.shed``
+logger.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.admission import AdmissionController
+from app.utils.logger import get_logger
+
+# One record per shed request; sampled via LOG_SAMPLING
+shed_logger = get_logger("app.ingest.shed")
+
+
+class AdmissionControlMiddleware:
+    """
+    Bound concurrent ingest requests and shed the excess.
+
+    Args:
+        app: Wrapped ASGI application
+        controller: Shared admission controller
+        path_prefixes: Paths subject to admission control
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        controller: AdmissionController,
+        path_prefixes: Iterable[str],
+    ) -> None:
+        self.app = app
+        self.controller = controller
+        self.path_prefixes = tuple(path_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith(self.path_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        shed_reason = await self.controller.acquire()
+        if shed_reason is not None:
+            retry_after = self.controller.retry_after()
+            shed_logger.info("Shed %s (%s); retry after %ds", path, shed_reason, retry_after)
+            response = JSONResponse(
+                {"detail": "Ingest is overloaded, retry later", "reason": shed_reason},
+                status_code=503,
+                headers={"Retry-After": str(retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self.controller.release()
+
+        async def send_then_release(message: Message) -> None:
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                release()
+
+        try:
+            await self.app(scope, receive, send_then_release)
+        finally:
+            release()
+
+
+__all__ = ["AdmissionControlMiddleware"]
@@ -7,6 +7,10 @@ from .lighting import (
     RelayState,
     DimmerState,
     Device,
+    SensorReading,
+    DeviceLatestState,
+    SensorRollup1m,
+    SensorRollup15m,
 )
 
 __all__ = [
@@ -14,5 +18,9 @@ __all__ = [
     'RelayState',
     'DimmerState',
     'Device',
+    'SensorReading',
+    'DeviceLatestState',
+    'SensorRollup1m',
+    'SensorRollup15m',
 ]
 
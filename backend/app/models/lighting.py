@@ -3,7 +3,8 @@ SQLAlchemy models for lighting control system
 """
 
 from sqlalchemy import Column, String, Float, Integer, Boolean, CheckConstraint, ForeignKey, TIMESTAMP, Text
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm import declarative_base, declared_attr
 from sqlalchemy.sql import func
 
 Base = declarative_base()
@@ -89,6 +90,85 @@ class Device(Base):
         return f"<Device(device_id='{self.device_id}', name='{self.name}', status='{self.status}')>"
 
 
+class SensorReading(Base):
+    """
+    Generic sensor readings hypertable (long format)
+    One row per (time, device, metric) – temperature, humidity, pressure, light.
+    """
+    __tablename__ = 'sensor_readings'
+
+    time = Column(TIMESTAMP(timezone=True), primary_key=True, nullable=False)
+    device_id = Column(String(50), ForeignKey('devices.device_id', ondelete='CASCADE'),
+                       primary_key=True, nullable=False)
+    sensor_type = Column(String(50), primary_key=True, nullable=False)
+    value = Column(Float, nullable=False)
+    unit = Column(String(20))
+
+    def __repr__(self):
+        return f"<SensorReading(device_id='{self.device_id}', sensor_type='{self.sensor_type}', value={self.value})>"
+
+
+class DeviceLatestState(Base):
+    """
+    Latest value of every metric per device (one row per device)
+    Upserted by the ingest path so "current state" reads are a primary-key
+    lookup instead of an ORDER BY time DESC scan over the hypertables.
+    """
+    __tablename__ = 'device_latest_state'
+
+    device_id = Column(String(50), ForeignKey('devices.device_id', ondelete='CASCADE'),
+                       primary_key=True)
+    time = Column(TIMESTAMP(timezone=True), nullable=False)  # Newest reading merged in
+    temperature = Column(Float)
+    humidity = Column(Float)
+    pressure = Column(Float)
+    light_level = Column(Float)
+    light_lux = Column(Float)
+    dimmer_brightness = Column(Integer)
+    daylight_harvest_mode = Column(Boolean)
+    fan_on = Column(Boolean)
+    relays = Column(ARRAY(Boolean))
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<DeviceLatestState(device_id='{self.device_id}', time='{self.time}')>"
+
+
+class _SensorRollupColumns:
+    """
+    Columns shared by the ingest-time rollup tiers (long format)
+    One row per (bucket, device, metric) with count/sum/min/max and the last
+    value, so tiers re-bucket exactly: avg = sum(sum) / sum(count).
+    """
+    bucket = Column(TIMESTAMP(timezone=True), primary_key=True, nullable=False)
+    metric = Column(String(50), primary_key=True, nullable=False)
+    count = Column(Integer, nullable=False)
+    sum = Column(Float, nullable=False)
+    min = Column(Float, nullable=False)
+    max = Column(Float, nullable=False)
+    last = Column(Float, nullable=False)
+    last_time = Column(TIMESTAMP(timezone=True), nullable=False)
+
+    @declared_attr
+    def device_id(cls):
+        return Column(String(50), ForeignKey('devices.device_id', ondelete='CASCADE'),
+                      primary_key=True, nullable=False)
+
+    def __repr__(self):
+        return (f"<{type(self).__name__}(device_id='{self.device_id}', metric='{self.metric}', "
+                f"bucket='{self.bucket}', count={self.count})>")
+
+
+class SensorRollup1m(_SensorRollupColumns, Base):
+    """1-minute rollups maintained by the ingest path (see app.services.rollups)"""
+    __tablename__ = 'sensor_rollup_1m'
+
+
+class SensorRollup15m(_SensorRollupColumns, Base):
+    """15-minute rollups maintained by the ingest path (see app.services.rollups)"""
+    __tablename__ = 'sensor_rollup_15m'
+
+
 class FanState(Base):
     """
     Fan state history table
@@ -135,7 +215,9 @@ class AccessLog(Base):
     device_id = Column(String(50), nullable=False)
     granted = Column(Boolean, nullable=False)
     reason = Column(Text)
-    timestamp = Column(TIMESTAMP(timezone=True), server_default=func.now(), nullable=False)
+    # Part of the primary key: access_log is a hypertable on timestamp
+    timestamp = Column(TIMESTAMP(timezone=True), primary_key=True, server_default=func.now(),
+                       nullable=False)
 
     def __repr__(self):
         return f"<AccessLog(log_id={self.log_id}, card_uid='{self.card_uid}', granted={self.granted})>"
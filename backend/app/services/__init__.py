@@ -1,15 +1,36 @@
 """Services Package - Business Logic Layer"""
 
 from .db_client import DatabaseClient, db_client
+from .async_db_client import AsyncDatabaseClient, async_db_client
 from .websocket_manager import ConnectionManager, ws_manager
 from .broker import MessageBroker, broker
+from .dedup import ReplayFilter, ingest_dedup
+from .compression import StreamCompressor, ingest_compressor
+from .admission import AdmissionController, ingest_admission
+from .rate_limit import DeviceRateLimiter, device_rate_limiter
+from .clock_sync import ClockSync, device_clocks
+from .pipeline import IngestPipeline, ingest_pipeline
 
 __all__ = [
     "DatabaseClient",
     "db_client",
+    "AsyncDatabaseClient",
+    "async_db_client",
     "ConnectionManager",
     "ws_manager",
     "MessageBroker",
     "broker",
+    "ReplayFilter",
+    "ingest_dedup",
+    "StreamCompressor",
+    "ingest_compressor",
+    "AdmissionController",
+    "ingest_admission",
+    "DeviceRateLimiter",
+    "device_rate_limiter",
+    "ClockSync",
+    "device_clocks",
+    "IngestPipeline",
+    "ingest_pipeline",
 ]
 
@@ -0,0 +1,124 @@
+"""
+Ingest Admission Control
+
+Bounds the ingest work the backend takes on at once. Up to
+``max_concurrency`` requests run; up to ``queue_depth`` more wait (FIFO)
+for at most ``queue_timeout_seconds``. Anything beyond that is shed
+immediately so a reconnect storm cannot pile up requests that each hold a
+pooled database connection until they time out.
+
+Shed requests are answered with 503 and a ``Retry-After`` that the
+firmware honours; the value is jittered so rebooted nodes do not all come
+back in the same second.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from app.config import settings
+
+SHED_QUEUE_FULL = "queue_full"
+SHED_TIMEOUT = "queue_timeout"
+
+
+class AdmissionController:
+    """Concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        queue_depth: int,
+        queue_timeout_seconds: float,
+        retry_after_seconds: int,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.queue_depth = queue_depth
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed: Dict[str, int] = {SHED_QUEUE_FULL: 0, SHED_TIMEOUT: 0}
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Take an ingest slot, waiting in the queue if necessary.
+
+        Returns:
+            None when admitted (call ``release`` afterwards), otherwise the
+            reason the request was shed.
+        """
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return None
+        if len(self._waiters) >= self.queue_depth:
+            self.shed[SHED_QUEUE_FULL] += 1
+            return SHED_QUEUE_FULL
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # The slot was handed over just as the timeout fired; keep it.
+                self.admitted += 1
+                return None
+            waiter.cancel()
+            self.shed[SHED_TIMEOUT] += 1
+            return SHED_TIMEOUT
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Handed a slot just before the request was cancelled; pass it on.
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.admitted += 1
+        return None
+
+    def release(self) -> None:
+        """Return a slot, handing it straight to the oldest waiter if any."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait, jittered up to 2x."""
+        return self.retry_after_seconds + random.randint(0, self.retry_after_seconds)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed[SHED_QUEUE_FULL],
+            "shed_timeout": self.shed[SHED_TIMEOUT],
+        }
+
+
+# Global admission controller for the sensor ingest routes
+ingest_admission = AdmissionController(
+    max_concurrency=settings.INGEST_MAX_CONCURRENCY,
+    queue_depth=settings.INGEST_QUEUE_DEPTH,
+    queue_timeout_seconds=settings.INGEST_QUEUE_TIMEOUT_SECONDS,
+    retry_after_seconds=settings.INGEST_RETRY_AFTER_SECONDS,
+)
+
+
+__all__ = ["AdmissionController", "SHED_QUEUE_FULL", "SHED_TIMEOUT", "ingest_admission"]
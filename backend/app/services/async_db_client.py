@@ -0,0 +1,218 @@
+"""
+Async Database Client Service
+
+asyncio counterpart of ``DatabaseClient`` built on SQLAlchemy's asyncio
+extension and the asyncpg driver, with its own connection pool. Method
+names and return shapes match ``DatabaseClient`` so request handlers can
+``await`` the same calls without blocking the event loop.
+
+Hot lookups and inserts (RFID cards, access log, automation rules,
+devices) run the synchronous client's precompiled Core statements on a
+pooled connection, without an ORM session. Sensor and control-state
+writes stay on the synchronous client (write-behind buffer, COPY loads),
+which handlers reach through ``run_in_threadpool``; background workers
+use it on their own threads.
+"""
+
+from __future__ import annotations
+
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.config import settings
+from app.models.lighting import AutomationRule, Device, RFIDCard
+from app.services.db_client import (
+    _INSERT_ACCESS_LOG, _INSERT_AUTOMATION_RULE, _SELECT_ACCESS_LOGS, _SELECT_AUTOMATION_RULES,
+    _SELECT_DEVICES_BY_ID, _SELECT_RFID_CARD, _SELECT_RFID_CARDS,
+    _access_log_dict, _card_dict, _device_dict, _new_rule_values, _parse_timestamp, _rule_dict,
+    _update_rule_statement, db_client,
+)
+
+
+def _async_database_url(database_url: str) -> str:
+    """Point a postgresql:// URL at the asyncpg driver."""
+    url = make_url(database_url)
+    if url.drivername in ("postgresql", "postgresql+psycopg2"):
+        url = url.set(drivername="postgresql+asyncpg")
+    return url.render_as_string(hide_password=False)
+
+
+class AsyncDatabaseClient:
+    """Async database client for TimescaleDB operations"""
+
+    def __init__(self, database_url: str = None):
+        """
+        Initialize async database client
+
+        Args:
+            database_url: Database connection string (defaults to settings.DATABASE_URL)
+        """
+        self.database_url = _async_database_url(database_url or settings.DATABASE_URL)
+
+        # Separate pool from the synchronous client
+        self.engine = create_async_engine(
+            self.database_url,
+            pool_size=settings.ASYNC_DB_POOL_SIZE,
+            max_overflow=settings.ASYNC_DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+            echo=False,
+        )
+
+        self.SessionLocal = async_sessionmaker(
+            bind=self.engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+
+    @asynccontextmanager
+    async def get_session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Get an async database session context manager
+
+        Yields:
+            AsyncSession: SQLAlchemy async session
+        """
+        async with self.SessionLocal() as session:
+            try:
+                yield session
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    @asynccontextmanager
+    async def connect(self) -> AsyncIterator[AsyncConnection]:
+        """Pooled connection for Core statements (no ORM session or transaction)"""
+        async with self.engine.connect() as connection:
+            yield connection
+
+    @asynccontextmanager
+    async def begin(self) -> AsyncIterator[AsyncConnection]:
+        """Pooled connection in a transaction, committed on exit"""
+        async with self.engine.begin() as connection:
+            yield connection
+
+    async def dispose(self):
+        """Close all pooled connections"""
+        await self.engine.dispose()
+
+    # Device Operations
+
+    async def get_device(self, device_id: str) -> Optional[dict]:
+        devices = await self.get_devices([device_id])
+        return devices.get(device_id)
+
+    async def get_devices(self, device_ids: Iterable[str]) -> Dict[str, dict]:
+        device_ids = list(set(device_ids))
+        if not device_ids:
+            return {}
+        async with self.connect() as connection:
+            rows = await connection.execute(_SELECT_DEVICES_BY_ID, {'device_ids': device_ids})
+            return {row.device_id: _device_dict(row) for row in rows}
+
+    async def update_device_status(self, device_id: str, status: str) -> bool:
+        async with self.get_session() as session:
+            result = await session.execute(
+                update(Device)
+                .where(Device.device_id == device_id)
+                .values(status=status, last_seen=datetime.utcnow())
+            )
+        # The row is cached by the sync client's device registry
+        db_client.invalidate_device(device_id)
+        return result.rowcount > 0
+
+    # RFID Card Operations
+
+    async def get_rfid_card(self, card_uid: str) -> Optional[dict]:
+        async with self.connect() as connection:
+            row = (await connection.execute(_SELECT_RFID_CARD, {'card_uid': card_uid})).first()
+            return _card_dict(row) if row is not None else None
+
+    async def upsert_rfid_card(
+        self,
+        card_uid: str,
+        user_id: str,
+        label: Optional[str] = None,
+        active: bool = True,
+    ) -> bool:
+        async with self.get_session() as session:
+            card = await session.get(RFIDCard, card_uid)
+            if card:
+                card.user_id = user_id
+                card.label = label
+                card.active = active
+            else:
+                session.add(RFIDCard(
+                    card_uid=card_uid, user_id=user_id, label=label, active=active,
+                ))
+        return True
+
+    async def list_rfid_cards(self) -> List[dict]:
+        async with self.connect() as connection:
+            return [_card_dict(row) for row in await connection.execute(_SELECT_RFID_CARDS)]
+
+    # Access Log Operations
+
+    async def log_access_attempt(
+        self,
+        card_uid: str,
+        device_id: str,
+        granted: bool,
+        reason: str,
+        timestamp: str,
+    ) -> bool:
+        async with self.begin() as connection:
+            await connection.execute(_INSERT_ACCESS_LOG, {
+                'card_uid': card_uid,
+                'device_id': device_id,
+                'granted': granted,
+                'reason': reason,
+                'timestamp': _parse_timestamp(timestamp),
+            })
+        return True
+
+    async def get_access_logs(self, limit: int = 50) -> List[dict]:
+        async with self.connect() as connection:
+            rows = await connection.execute(_SELECT_ACCESS_LOGS, {'limit': limit})
+            return [_access_log_dict(row) for row in rows]
+
+    # Automation Rules Operations
+
+    async def list_automation_rules(self) -> List[dict]:
+        async with self.connect() as connection:
+            return [_rule_dict(row) for row in await connection.execute(_SELECT_AUTOMATION_RULES)]
+
+    async def create_automation_rule(self, payload: dict) -> dict:
+        async with self.begin() as connection:
+            row = (await connection.execute(_INSERT_AUTOMATION_RULE, _new_rule_values(payload))).one()
+            return _rule_dict(row)
+
+    async def update_automation_rule(self, rule_id: str, payload: dict) -> Optional[dict]:
+        async with self.begin() as connection:
+            row = (await connection.execute(_update_rule_statement(rule_id, payload))).first()
+            return _rule_dict(row) if row is not None else None
+
+    async def toggle_automation_rule(self, rule_id: str, enabled: bool) -> Optional[dict]:
+        async with self.get_session() as session:
+            rule = await session.get(AutomationRule, rule_id)
+            if not rule:
+                return None
+            rule.enabled = enabled
+            await session.flush()
+            return {"id": rule.rule_id, "enabled": rule.enabled}
+
+    async def delete_automation_rule(self, rule_id: str) -> bool:
+        async with self.get_session() as session:
+            result = await session.execute(
+                delete(AutomationRule).where(AutomationRule.rule_id == rule_id)
+            )
+            return result.rowcount > 0
+
+
+# Global async database client instance
+async_db_client = AsyncDatabaseClient()
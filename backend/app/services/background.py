@@ -0,0 +1,79 @@
+"""
+Background Worker Helpers
+
+Small building blocks for services that do periodic work off the request
+path (flushing buffers, writing coalesced updates). The database client is
+synchronous, so workers run on daemon threads rather than on the event loop.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class PeriodicWorker:
+    """
+    Runs ``run_once`` on a daemon thread every ``interval`` seconds.
+
+    ``wake()`` triggers an early run (e.g. when a buffer fills up) and
+    ``stop()`` performs one final synchronous run so nothing pending is
+    lost on shutdown. Subclasses implement ``run_once``.
+    """
+
+    def __init__(self, name: str, interval: float) -> None:
+        self.name = name
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the worker thread (no-op if already running)."""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._wake_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        """Run the next iteration now instead of waiting for the interval."""
+        self._wake_event.set()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker thread, then run one final iteration synchronously."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._wake_event.set()
+            self._thread.join(timeout)
+            self._thread = None
+        self._run_safely()
+
+    def run_once(self) -> None:
+        raise NotImplementedError
+
+    def _run_safely(self) -> None:
+        try:
+            self.run_once()
+        except Exception:
+            logger.exception("[%s] Background iteration failed", self.name)
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._wake_event.wait(self.interval)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                break
+            self._run_safely()
+
+
+__all__ = ["PeriodicWorker"]
@@ -19,6 +19,9 @@ from abc import ABC, abstractmethod
 from typing import Any, Dict
 
 from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 class MessageBroker(ABC):
@@ -52,7 +55,7 @@ class MQTTBroker(MessageBroker):
     async def publish(self, channel: str, payload: Dict[str, Any]) -> None:
         # TODO: Integrate an async MQTT client (e.g. asyncio-mqtt) and
         # perform a real publish to the configured broker.
-        print(f"[MQTT] ({self.broker_url}) {channel}: {payload}")
+        logger.debug("[MQTT] (%s) %s: %s", self.broker_url, channel, payload)
 
 
 class RedisBroker(MessageBroker):
@@ -71,7 +74,7 @@ class RedisBroker(MessageBroker):
         # TODO: Integrate an async Redis client (e.g. redis.asyncio) and
         # push payloads to a Redis Stream.
         stream = channel
-        print(f"[REDIS] ({self.redis_url}) XADD {stream}: {payload}")
+        logger.debug("[REDIS] (%s) XADD %s: %s", self.redis_url, stream, payload)
 
 
 def _create_broker() -> MessageBroker:
@@ -82,11 +85,11 @@ def _create_broker() -> MessageBroker:
     broker_type = (settings.BROKER_TYPE or "mqtt").lower()
 
     if broker_type == "redis":
-        print(f"[BROKER] Using Redis Streams broker ({settings.REDIS_URL})")
+        logger.info("Using Redis Streams broker (%s)", settings.REDIS_URL)
         return RedisBroker(settings.REDIS_URL)
 
     # Default: MQTT
-    print(f"[BROKER] Using MQTT broker ({settings.MQTT_BROKER_URL})")
+    logger.info("Using MQTT broker (%s)", settings.MQTT_BROKER_URL)
     return MQTTBroker(settings.MQTT_BROKER_URL)
 
 
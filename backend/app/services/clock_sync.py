@@ -0,0 +1,248 @@
+"""
+Device Clock Synchronisation
+
+ESP32 firmware has no NTP yet, so a reading's ``timestamp`` is either a
+wall-clock ISO 8601 string from a clock that may be hours or years off,
+or the device uptime in milliseconds. Storing those as-is puts readings
+in the wrong hypertable chunks, out of order, or fails the insert.
+
+``ClockSync`` keeps a small clock model per device and maps every device
+timestamp onto server time:
+
+    server_time = device_time + offset + drift * (device_time - reference)
+
+``offset`` and ``drift`` are fitted against server receive times with
+exponentially weighted least squares over roughly the last
+``window`` samples. The fit is five running sums, so observing and
+normalising a reading is O(1) with no per-device history.
+
+- Wall clocks whose fitted offset is within ``trusted_skew_seconds`` are
+  left untouched (a synced clock only picks up network jitter).
+- A sample more than ``reset_threshold_seconds`` away from the model, or
+  uptime going backwards (a reboot), restarts the model from that sample.
+- Normalised times never lie in the future of the receive time.
+
+Buffered readings (batch uploads) arrive long after they were sampled;
+they are normalised with ``learn=False`` so the delay does not skew the
+model.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+
+CLOCK_WALL = "wall"
+CLOCK_UPTIME = "uptime"
+
+# Uptime may run backwards by this much (seconds) before it counts as a reboot.
+REBOOT_TOLERANCE_SECONDS = 1.0
+
+
+def parse_device_time(timestamp: str) -> Tuple[str, float]:
+    """
+    Classify and parse a device timestamp.
+
+    Returns:
+        (CLOCK_WALL, epoch seconds) for ISO 8601 strings (naive means UTC),
+        or (CLOCK_UPTIME, seconds since boot) for millisecond counters.
+
+    Raises:
+        ValueError: If the timestamp is neither
+    """
+    # ISO dates always have '-' at index 4; anything else must be a counter.
+    if len(timestamp) >= 10 and timestamp[4] == "-":
+        parsed = datetime.fromisoformat(timestamp)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return CLOCK_WALL, parsed.timestamp()
+    millis = float(timestamp)
+    if not millis >= 0 or millis == float("inf"):
+        raise ValueError(f"Invalid uptime timestamp: {timestamp!r}")
+    return CLOCK_UPTIME, millis / 1000.0
+
+
+class _DeviceClock:
+    """Exponentially weighted linear fit of (receive - device) against device time."""
+
+    __slots__ = (
+        "kind", "reference", "base_offset", "last_device",
+        "weight", "sum_x", "sum_y", "sum_xx", "sum_xy",
+        "offset", "drift", "samples", "resets",
+    )
+
+    def __init__(self, kind: str, device_time: float, observed_offset: float) -> None:
+        self.resets = 0
+        self.restart(kind, device_time, observed_offset)
+
+    def restart(self, kind: str, device_time: float, observed_offset: float) -> None:
+        self.kind = kind
+        self.reference = device_time
+        self.base_offset = observed_offset
+        self.last_device = device_time
+        self.weight = self.sum_x = self.sum_y = self.sum_xx = self.sum_xy = 0.0
+        self.offset = observed_offset
+        self.drift = 0.0
+        self.samples = 0
+
+    def predict(self, device_time: float) -> float:
+        """Estimated offset (server - device) at a device time."""
+        return self.offset + self.drift * (device_time - self.reference)
+
+    def observe(self, device_time: float, observed_offset: float, decay: float) -> None:
+        x = device_time - self.reference
+        y = observed_offset - self.base_offset
+        self.weight = decay * self.weight + 1.0
+        self.sum_x = decay * self.sum_x + x
+        self.sum_y = decay * self.sum_y + y
+        self.sum_xx = decay * self.sum_xx + x * x
+        self.sum_xy = decay * self.sum_xy + x * y
+        self.samples += 1
+        self.last_device = max(self.last_device, device_time)
+
+        denominator = self.weight * self.sum_xx - self.sum_x * self.sum_x
+        # A slope needs samples spread over time; until then only track the offset.
+        if self.samples >= 2 and denominator > 1e-9 * self.weight * self.weight:
+            slope = (self.weight * self.sum_xy - self.sum_x * self.sum_y) / denominator
+        else:
+            slope = 0.0
+        self.drift = slope
+        self.offset = self.base_offset + (self.sum_y - slope * self.sum_x) / self.weight
+
+
+class ClockSync:
+    """Per-device clock offset and drift models for ingest timestamps."""
+
+    def __init__(
+        self,
+        window: int = 64,
+        trusted_skew_seconds: float = 2.0,
+        reset_threshold_seconds: float = 60.0,
+        max_devices: int = 10000,
+    ) -> None:
+        self.window = window
+        self.decay = 1.0 - 1.0 / max(window, 1)
+        self.trusted_skew_seconds = trusted_skew_seconds
+        self.reset_threshold_seconds = reset_threshold_seconds
+        self.max_devices = max_devices
+        self._clocks: "OrderedDict[str, _DeviceClock]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.normalised = 0
+        self.corrected = 0
+        self.invalid = 0
+
+    def normalise(
+        self,
+        device_id: str,
+        timestamp: str,
+        received: Optional[float] = None,
+        learn: bool = True,
+    ) -> datetime:
+        """
+        Map a device timestamp onto server time.
+
+        Args:
+            device_id: Device identifier
+            timestamp: Timestamp as sent by the device (ISO 8601 or uptime ms)
+            received: Server receive time in epoch seconds (defaults to now)
+            learn: Update the device's clock model with this sample; pass
+                False for readings that were buffered on the device
+
+        Returns:
+            datetime: Timezone-aware UTC time to store the reading at. An
+            unparseable timestamp falls back to the receive time.
+        """
+        received = time.time() if received is None else received
+        try:
+            kind, device_time = parse_device_time(timestamp)
+        except (TypeError, ValueError):
+            with self._lock:
+                self.invalid += 1
+            return datetime.fromtimestamp(received, timezone.utc)
+
+        observed = received - device_time
+        with self._lock:
+            self.normalised += 1
+            clock = self._clocks.get(device_id)
+            if clock is None:
+                clock = _DeviceClock(kind, device_time, observed)
+                self._clocks[device_id] = clock
+                while len(self._clocks) > self.max_devices:
+                    self._clocks.popitem(last=False)
+            else:
+                self._clocks.move_to_end(device_id)
+
+            if learn:
+                if self._needs_restart(clock, kind, device_time, observed):
+                    clock.restart(kind, device_time, observed)
+                    clock.resets += 1
+                clock.observe(device_time, observed, self.decay)
+
+            if clock.kind != kind:
+                # A buffered reading from before the clock changed kind; only
+                # its receive time is known.
+                return datetime.fromtimestamp(received, timezone.utc)
+            offset = clock.predict(device_time)
+            if kind == CLOCK_WALL and abs(offset) <= self.trusted_skew_seconds:
+                at = min(device_time, received + self.trusted_skew_seconds)
+            else:
+                self.corrected += 1
+                at = min(device_time + offset, received)
+        return datetime.fromtimestamp(at, timezone.utc)
+
+    def _needs_restart(self, clock: _DeviceClock, kind: str, device_time: float, observed: float) -> bool:
+        if clock.kind != kind:
+            return True
+        if kind == CLOCK_UPTIME and device_time < clock.last_device - REBOOT_TOLERANCE_SECONDS:
+            return True
+        return abs(observed - clock.predict(device_time)) > self.reset_threshold_seconds
+
+    def forget(self, device_id: str) -> None:
+        with self._lock:
+            self._clocks.pop(device_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clocks.clear()
+            self.normalised = self.corrected = self.invalid = 0
+
+    def estimate(self, device_id: str) -> Optional[Dict[str, object]]:
+        """Current clock model for a device, or None if it has not reported."""
+        with self._lock:
+            clock = self._clocks.get(device_id)
+            if clock is None:
+                return None
+            return {
+                "clock": clock.kind,
+                "offset_seconds": round(clock.predict(clock.last_device), 3),
+                "drift_ppm": round(clock.drift * 1e6, 1),
+                "samples": clock.samples,
+                "resets": clock.resets,
+            }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            uptime = sum(1 for clock in self._clocks.values() if clock.kind == CLOCK_UPTIME)
+            return {
+                "devices": len(self._clocks),
+                "uptime_clocks": uptime,
+                "normalised": self.normalised,
+                "corrected": self.corrected,
+                "invalid": self.invalid,
+            }
+
+
+# Global clock models shared by the ingest endpoints
+device_clocks = ClockSync(
+    window=settings.CLOCK_SYNC_WINDOW,
+    trusted_skew_seconds=settings.CLOCK_SYNC_TRUSTED_SKEW_SECONDS,
+    reset_threshold_seconds=settings.CLOCK_SYNC_RESET_THRESHOLD_SECONDS,
+)
+
+
+__all__ = ["CLOCK_UPTIME", "CLOCK_WALL", "ClockSync", "device_clocks", "parse_device_time"]
@@ -0,0 +1,235 @@
+"""
+Ingest Stream Compression
+
+Room-node readings are mostly flat (temperature moves 0.01 °C between
+samples), so storing, broadcasting and evaluating every sample is wasted
+work. ``StreamCompressor`` decides per device and per field whether a new
+value adds information:
+
+- ``deadband``: keep a metric when it moved more than its tolerance from
+  the last kept value (reconstruction: hold the last kept value).
+- ``swinging_door``: keep a metric when no straight line from the last
+  kept point stays within the tolerance of every sample since
+  (reconstruction: linear interpolation between kept points). The
+  violating sample itself is kept, so a decision is made as each reading
+  arrives instead of holding readings back.
+- ``off``: keep everything.
+
+Fields without a tolerance (dimmer, fan, relay and mode states) are kept
+whenever they change. Every field is kept at least once per
+``keepalive_seconds`` so dashboards and gap detection see the device.
+
+Dropped samples are compared with the reconstruction once the next sample
+is kept, giving per-metric max and RMS error for tuning the tolerances.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from app.config import settings
+
+COMPRESSION_MODES = ("off", "deadband", "swinging_door")
+
+# Dropped samples remembered per stream for the reconstruction-error report.
+MAX_PENDING_SAMPLES = 512
+
+
+def parse_tolerances(spec: str) -> Dict[str, float]:
+    """Parse ``"temperature=0.1,humidity=0.5"`` into ``{metric: tolerance}``."""
+    tolerances: Dict[str, float] = {}
+    for item in (spec or "").split(","):
+        name, sep, value = item.partition("=")
+        if not sep or not name.strip():
+            continue
+        try:
+            tolerances[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return tolerances
+
+
+class _Stream:
+    """Compression state for one (device, field) pair."""
+
+    __slots__ = ("kept_at", "kept_value", "upper", "lower", "pending")
+
+    def __init__(self, at: float, value: Any) -> None:
+        self.kept_at = at
+        self.kept_value = value
+        self.upper = math.inf
+        self.lower = -math.inf
+        self.pending: List[Tuple[float, float]] = []
+
+
+class _MetricStats:
+    __slots__ = ("offered", "kept", "errors", "sum_sq_error", "max_error")
+
+    def __init__(self) -> None:
+        self.offered = 0
+        self.kept = 0
+        self.errors = 0
+        self.sum_sq_error = 0.0
+        self.max_error = 0.0
+
+
+class StreamCompressor:
+    """Per-device, per-field deadband / swinging-door filter."""
+
+    def __init__(
+        self,
+        tolerances: Mapping[str, float],
+        mode: str = "deadband",
+        keepalive_seconds: float = 300.0,
+        max_devices: int = 10000,
+    ) -> None:
+        if mode not in COMPRESSION_MODES:
+            raise ValueError(f"Unknown compression mode: {mode}")
+        self.tolerances = dict(tolerances)
+        self.mode = mode
+        self.keepalive_seconds = keepalive_seconds
+        self.max_devices = max_devices
+        self._streams: "OrderedDict[str, Dict[str, _Stream]]" = OrderedDict()
+        self._stats: Dict[str, _MetricStats] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def sample(self, device_id: str, values: Mapping[str, Any], at: Optional[float] = None) -> Set[str]:
+        """
+        Offer one reading and return the fields worth keeping.
+
+        Args:
+            device_id: Device identifier
+            values: Field name to value; None values are ignored
+            at: Sample time in seconds (defaults to now)
+
+        Returns:
+            Set[str]: Kept field names; empty if the reading adds nothing
+        """
+        present = {name: value for name, value in values.items() if value is not None}
+        if not self.enabled:
+            return set(present)
+
+        at = time.time() if at is None else at
+        kept: Set[str] = set()
+        with self._lock:
+            streams = self._device_streams(device_id)
+            force = any(
+                name not in streams or at - streams[name].kept_at >= self.keepalive_seconds
+                for name in present
+            )
+            for name, value in present.items():
+                stats = self._stats.setdefault(name, _MetricStats())
+                stats.offered += 1
+                stream = streams.get(name)
+                if stream is None:
+                    streams[name] = _Stream(at, value)
+                    keep = True
+                elif force or self._should_keep(stream, name, at, value):
+                    self._close_segment(stream, stats, at, value)
+                    keep = True
+                else:
+                    keep = False
+                if keep:
+                    stats.kept += 1
+                    kept.add(name)
+        return kept
+
+    def report(self) -> Dict[str, Any]:
+        """Per-field compression ratio and reconstruction error."""
+        with self._lock:
+            metrics = {}
+            for name, stats in sorted(self._stats.items()):
+                dropped = stats.offered - stats.kept
+                metrics[name] = {
+                    "tolerance": self.tolerances.get(name),
+                    "offered": stats.offered,
+                    "kept": stats.kept,
+                    "dropped": dropped,
+                    "compression_ratio": round(stats.offered / stats.kept, 3) if stats.kept else None,
+                    "max_error": stats.max_error,
+                    "rms_error": math.sqrt(stats.sum_sq_error / stats.errors) if stats.errors else 0.0,
+                }
+            return {
+                "mode": self.mode,
+                "keepalive_seconds": self.keepalive_seconds,
+                "devices": len(self._streams),
+                "metrics": metrics,
+            }
+
+    def reset(self, device_id: str) -> None:
+        """Forget a device's kept values so its next reading is kept in full."""
+        with self._lock:
+            self._streams.pop(device_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._streams.clear()
+            self._stats.clear()
+
+    def _device_streams(self, device_id: str) -> Dict[str, _Stream]:
+        streams = self._streams.get(device_id)
+        if streams is None:
+            streams = self._streams[device_id] = {}
+            while len(self._streams) > self.max_devices:
+                self._streams.popitem(last=False)
+        else:
+            self._streams.move_to_end(device_id)
+        return streams
+
+    def _should_keep(self, stream: _Stream, name: str, at: float, value: Any) -> bool:
+        tolerance = self.tolerances.get(name)
+        if tolerance is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return value != stream.kept_value
+
+        dt = at - stream.kept_at
+        if self.mode == "deadband" or dt <= 0:
+            keep = abs(value - stream.kept_value) > tolerance
+        else:
+            upper = min(stream.upper, (value + tolerance - stream.kept_value) / dt)
+            lower = max(stream.lower, (value - tolerance - stream.kept_value) / dt)
+            keep = lower > upper
+            if not keep:
+                stream.upper, stream.lower = upper, lower
+
+        if not keep and len(stream.pending) < MAX_PENDING_SAMPLES:
+            stream.pending.append((at, float(value)))
+        return keep
+
+    def _close_segment(self, stream: _Stream, stats: _MetricStats, at: float, value: Any) -> None:
+        """Score dropped samples against the reconstruction, then restart at this point."""
+        if stream.pending:
+            start_at, start_value = stream.kept_at, float(stream.kept_value)
+            span = at - start_at
+            for sample_at, sample_value in stream.pending:
+                if self.mode == "swinging_door" and span > 0:
+                    estimate = start_value + (float(value) - start_value) * (sample_at - start_at) / span
+                else:
+                    estimate = start_value
+                error = abs(sample_value - estimate)
+                stats.errors += 1
+                stats.sum_sq_error += error * error
+                stats.max_error = max(stats.max_error, error)
+            stream.pending.clear()
+        stream.kept_at = at
+        stream.kept_value = value
+        stream.upper = math.inf
+        stream.lower = -math.inf
+
+
+# Global compressor shared by the ingest endpoints
+ingest_compressor = StreamCompressor(
+    tolerances=parse_tolerances(settings.COMPRESSION_TOLERANCES),
+    mode=settings.COMPRESSION_MODE,
+    keepalive_seconds=settings.COMPRESSION_KEEPALIVE_SECONDS,
+)
+
+
+__all__ = ["COMPRESSION_MODES", "StreamCompressor", "ingest_compressor", "parse_tolerances"]
@@ -4,72 +4,801 @@ Database Client Service
 Provides database connection management and operations for lighting data.
 """
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy import (
+    TIMESTAMP, Float, Integer, String, bindparam, case, cast, column, func, insert,
+    literal_column, or_, select, table, update, values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from concurrent.futures import Future
 from contextlib import contextmanager
-from typing import List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+import csv
+import io
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 
 from app.config import settings
 from app.models.lighting import (
     Base, LightingSensorData, RelayState, DimmerState, Device,
     FanState, RFIDCard, AccessLog,
-    AutomationRule,
+    AutomationRule, SensorReading, DeviceLatestState, SensorRollup1m, SensorRollup15m,
+)
+from app.services.device_registry import DeviceRegistry
+from app.services.latest_state import (
+    LATEST_STATE_FIELDS, LatestStateTracker, latest_state_dict, merge_states,
+)
+from app.services.pools import POOL_ANALYTICS, POOL_REALTIME, ConnectionPool, PoolConfig
+from app.services.presence import PresenceTracker
+from app.services.resolution import (
+    HOURLY_BUCKET_SECONDS, RESOLUTION_HOURLY, RESOLUTION_RAW, RESOLUTION_ROLLUP_15M,
+    RESOLUTION_ROLLUP_1M, ResolutionPlan, plan_resolution,
+)
+from app.services.rollups import ROLLUP_TIERS, RollupAccumulator, rollup_rows
+from app.services.spool import DiskSpool, SpoolReplayer
+from app.services.storage import bootstrap_storage
+from app.services.write_errors import is_unavailable
+from app.services.write_buffer import WriteBehindBuffer
+from app.utils.downsampling import lttb_indices, stack_batches
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Tables whose inserts may be deferred to the write-behind buffer.
+_WRITE_BEHIND_MODELS = {
+    model.__tablename__: model
+    for model in (LightingSensorData, DimmerState, FanState, RelayState, SensorReading)
+}
+
+# Core fast paths for hot lookups and inserts. The statements are built once
+# with bound parameters, so every call hits the engine's compiled-statement
+# cache with the same key and only binds values; rows come back as plain
+# tuples (no ORM instances or identity map) and are mapped to dicts directly.
+_INSERT_IGNORE = {
+    name: pg_insert(model.__table__).on_conflict_do_nothing()
+    for name, model in _WRITE_BEHIND_MODELS.items()
+}
+# COPY target for sensor_readings. Temporary tables live per connection, so
+# each pooled connection creates it once; ON COMMIT DELETE ROWS empties it
+# after every load.
+_CREATE_SENSOR_READINGS_STAGING = (
+    "CREATE TEMP TABLE IF NOT EXISTS sensor_readings_staging "
+    "(LIKE sensor_readings INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+)
+_MOVE_SENSOR_READINGS_STAGING = (
+    "INSERT INTO sensor_readings (time, device_id, sensor_type, value, unit) "
+    "SELECT time, device_id, sensor_type, value, unit FROM sensor_readings_staging "
+    "ON CONFLICT DO NOTHING"
+)
+_DEVICE_COLUMNS = (
+    Device.device_id, Device.device_type, Device.name, Device.location,
+    Device.status, Device.last_seen,
+)
+_SELECT_DEVICES = select(*_DEVICE_COLUMNS)
+_SELECT_DEVICES_BY_ID = _SELECT_DEVICES.where(
+    Device.device_id.in_(bindparam('device_ids', expanding=True))
+)
+_SELECT_RFID_CARDS = select(RFIDCard.card_uid, RFIDCard.user_id, RFIDCard.label, RFIDCard.active)
+_SELECT_RFID_CARD = _SELECT_RFID_CARDS.where(RFIDCard.card_uid == bindparam('card_uid'))
+_INSERT_ACCESS_LOG = insert(AccessLog.__table__)
+_SELECT_ACCESS_LOGS = select(
+    AccessLog.log_id, AccessLog.card_uid, AccessLog.device_id,
+    AccessLog.granted, AccessLog.reason, AccessLog.timestamp,
+).order_by(AccessLog.timestamp.desc()).limit(bindparam('limit'))
+_RULE_COLUMNS = (
+    AutomationRule.rule_id, AutomationRule.name, AutomationRule.trigger,
+    AutomationRule.comparator, AutomationRule.threshold, AutomationRule.action,
+    AutomationRule.action_value, AutomationRule.enabled,
+    AutomationRule.created_at, AutomationRule.updated_at,
+)
+_SELECT_AUTOMATION_RULES = select(*_RULE_COLUMNS).order_by(AutomationRule.created_at.asc())
+_INSERT_AUTOMATION_RULE = insert(AutomationRule.__table__).returning(*_RULE_COLUMNS)
+
+
+def _card_dict(row) -> dict:
+    return {
+        'card_uid': row.card_uid,
+        'user_id': row.user_id,
+        'label': row.label,
+        'active': row.active,
+    }
+
+
+def _access_log_dict(row) -> dict:
+    return {
+        'log_id': row.log_id,
+        'card_uid': row.card_uid,
+        'device_id': row.device_id,
+        'granted': row.granted,
+        'reason': row.reason,
+        'timestamp': row.timestamp.isoformat() if row.timestamp else None,
+    }
+
+
+def _rule_dict(row) -> dict:
+    return {
+        "id": row.rule_id,
+        "name": row.name,
+        "trigger": row.trigger,
+        "comparator": row.comparator,
+        "threshold": row.threshold,
+        "action": row.action,
+        "action_value": row.action_value,
+        "enabled": row.enabled,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+
+def _new_rule_values(payload: dict) -> dict:
+    """Column values for a new automation rule (an id is generated if absent)."""
+    return {
+        "rule_id": payload.get("id") or f"rule-{uuid.uuid4().hex[:10]}",
+        "name": payload["name"],
+        "trigger": payload["trigger"],
+        "comparator": payload["comparator"],
+        "threshold": float(payload["threshold"]),
+        "action": payload["action"],
+        "action_value": str(payload.get("action_value", "")),
+        "enabled": bool(payload.get("enabled", True)),
+    }
+
+
+def _update_rule_statement(rule_id: str, payload: dict):
+    """UPDATE ... RETURNING for the fields present in ``payload``."""
+    changes = {name: payload[name] for name in ("name", "trigger", "comparator", "action") if name in payload}
+    if "threshold" in payload:
+        changes["threshold"] = float(payload["threshold"])
+    if "action_value" in payload:
+        changes["action_value"] = str(payload["action_value"])
+    if "enabled" in payload:
+        changes["enabled"] = bool(payload["enabled"])
+    return (
+        update(AutomationRule.__table__)
+        .where(AutomationRule.rule_id == rule_id)
+        .values(updated_at=func.now(), **changes)
+        .returning(*_RULE_COLUMNS)
+    )
+
+
+def _spooled_row(row: dict) -> dict:
+    """Undo JSON encoding of a spooled row (``time`` comes back as an ISO string)."""
+    time = row.get('time')
+    if isinstance(time, str):
+        return {**row, 'time': datetime.fromisoformat(time)}
+    return row
+
+
+# Payload fields stored in the long-format sensor_readings hypertable, with units.
+SENSOR_READING_UNITS = {
+    'temperature': '°C',
+    'humidity': '%',
+    'pressure': 'hPa',
+    'light_level': '%',
+    'light_lux': 'lux',
+}
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp as sent by the ESP32 firmware ('Z' suffix allowed)."""
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def _reading_time(data: dict) -> datetime:
+    """Row time: the ingest-normalised ``time`` if set, else the raw ISO timestamp."""
+    time = data.get('time')
+    return time if time is not None else _parse_timestamp(data['timestamp'])
+
+
+def _lighting_row(data: dict) -> dict:
+    """Map an ingest payload onto lighting_sensor_data columns."""
+    return {
+        'time': _reading_time(data),
+        'device_id': data['device_id'],
+        'light_level': data.get('light_level'),
+        'light_lux': data.get('light_lux'),
+        'dimmer_brightness': data.get('dimmer_brightness'),
+        'daylight_harvest_mode': data.get('daylight_harvest_mode'),
+    }
+
+
+def _lighting_history_query(
+    device_id: str,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    descending: bool,
+):
+    """Column-only SELECT over one device's lighting rows, ordered on the (device_id, time) index."""
+    table = LightingSensorData.__table__.c
+    query = select(
+        table.time, table.device_id, table.light_level, table.light_lux,
+        table.dimmer_brightness, table.daylight_harvest_mode,
+    ).where(table.device_id == device_id)
+    if start_time:
+        query = query.where(table.time >= start_time)
+    if end_time:
+        query = query.where(table.time <= end_time)
+    return query.order_by(table.time.desc() if descending else table.time.asc())
+
+
+def _lighting_history_dict(row) -> dict:
+    return {
+        'time': row.time.isoformat(),
+        'device_id': row.device_id,
+        'light_level': row.light_level,
+        'light_lux': row.light_lux,
+        'dimmer_brightness': row.dimmer_brightness,
+        'daylight_harvest_mode': row.daylight_harvest_mode,
+    }
+
+
+# Lighting metrics reported per bucket (avg/min/max) by history rollups.
+LIGHTING_ROLLUP_METRICS = ('light_level', 'light_lux', 'dimmer_brightness')
+
+_ROLLUP_STATS = ('avg', 'min', 'max')
+
+# Continuous aggregates defined in infrastructure/timescaledb/init.sql.
+_lighting_hourly = table(
+    'lighting_sensor_data_hourly',
+    column('bucket', TIMESTAMP(timezone=True)),
+    column('device_id', String),
+    column('reading_count', Integer),
+    *(
+        column(f'{stat}_{metric}', Float)
+        for metric in LIGHTING_ROLLUP_METRICS for stat in _ROLLUP_STATS
+    ),
+)
+
+_sensor_readings_hourly = table(
+    'sensor_readings_hourly',
+    column('bucket', TIMESTAMP(timezone=True)),
+    column('device_id', String),
+    column('sensor_type', String),
+    column('avg_value', Float),
+    column('min_value', Float),
+    column('max_value', Float),
+    column('reading_count', Integer),
 )
 
 
+def _time_bucket(bucket_seconds: int, time_column):
+    # The width is inlined rather than bound so GROUP BY and ORDER BY repeat
+    # the exact select-list expression.
+    width = literal_column(f"INTERVAL '{int(bucket_seconds)} seconds'")
+    return func.time_bucket(width, time_column)
+
+
+def _hourly_range(view, device_id: str, start_time: datetime, end_time: datetime) -> list:
+    """Predicates for hourly buckets overlapping [start_time, end_time]."""
+    return [
+        view.c.device_id == device_id,
+        view.c.bucket > start_time - timedelta(seconds=HOURLY_BUCKET_SECONDS),
+        view.c.bucket <= end_time,
+    ]
+
+
+def _weighted_avg(avg_column, count_column):
+    """Re-bucket per-hour averages: count-weighted over the hours that have a value."""
+    weight = func.sum(count_column).filter(avg_column.isnot(None))
+    return func.sum(avg_column * count_column) / func.nullif(weight, 0)
+
+
+def _lighting_rollup_query(
+    plan: ResolutionPlan, device_id: str, start_time: datetime, end_time: datetime,
+):
+    """avg/min/max per bucket of one device's lighting rows (hourly aggregate or raw)."""
+    if plan.source == RESOLUTION_HOURLY:
+        view = _lighting_hourly.c
+        bucket = _time_bucket(plan.bucket_seconds, view.bucket)
+        columns = [bucket.label('bucket'), func.sum(view.reading_count).label('count')]
+        for metric in LIGHTING_ROLLUP_METRICS:
+            columns += [
+                _weighted_avg(view[f'avg_{metric}'], view.reading_count).label(f'{metric}_avg'),
+                func.min(view[f'min_{metric}']).label(f'{metric}_min'),
+                func.max(view[f'max_{metric}']).label(f'{metric}_max'),
+            ]
+        predicates = _hourly_range(_lighting_hourly, device_id, start_time, end_time)
+    else:
+        table_ = LightingSensorData.__table__.c
+        bucket = _time_bucket(plan.bucket_seconds, table_.time)
+        columns = [bucket.label('bucket'), func.count().label('count')]
+        for metric in LIGHTING_ROLLUP_METRICS:
+            columns += [
+                func.avg(table_[metric]).label(f'{metric}_avg'),
+                func.min(table_[metric]).label(f'{metric}_min'),
+                func.max(table_[metric]).label(f'{metric}_max'),
+            ]
+        predicates = [
+            table_.device_id == device_id,
+            table_.time >= start_time,
+            table_.time <= end_time,
+        ]
+    return select(*columns).where(*predicates).group_by(bucket).order_by(bucket)
+
+
+def _sensor_readings_rollup_query(
+    plan: ResolutionPlan, device_id: str, start_time: datetime, end_time: datetime,
+):
+    """avg/min/max per (bucket, sensor_type) of one device's sensor_readings."""
+    if plan.source == RESOLUTION_HOURLY:
+        view = _sensor_readings_hourly.c
+        bucket = _time_bucket(plan.bucket_seconds, view.bucket)
+        columns = [
+            func.sum(view.reading_count).label('count'),
+            _weighted_avg(view.avg_value, view.reading_count).label('avg'),
+            func.min(view.min_value).label('min'),
+            func.max(view.max_value).label('max'),
+        ]
+        predicates = _hourly_range(_sensor_readings_hourly, device_id, start_time, end_time)
+        sensor_type = view.sensor_type
+    else:
+        table_ = SensorReading.__table__.c
+        bucket = _time_bucket(plan.bucket_seconds, table_.time)
+        columns = [
+            func.count().label('count'),
+            func.avg(table_.value).label('avg'),
+            func.min(table_.value).label('min'),
+            func.max(table_.value).label('max'),
+        ]
+        predicates = [
+            table_.device_id == device_id,
+            table_.time >= start_time,
+            table_.time <= end_time,
+        ]
+        sensor_type = table_.sensor_type
+    return (
+        select(bucket.label('bucket'), sensor_type.label('sensor_type'), *columns)
+        .where(*predicates)
+        .group_by(bucket, sensor_type)
+        .order_by(bucket)
+    )
+
+
+# Columns read by LTTB downsampling, in array column order (time is epoch seconds).
+_LTTB_COLUMNS = ('time', 'light_level', 'light_lux', 'dimmer_brightness', 'daylight_harvest_mode')
+
+
+def _lttb_row_dict(device_id: str, values) -> dict:
+    """A row of the LTTB array in lighting history shape (NaN is NULL)."""
+    epoch, light_level, light_lux, dimmer, harvest = values.tolist()
+    return {
+        'time': datetime.fromtimestamp(round(epoch, 6), timezone.utc).isoformat(),
+        'device_id': device_id,
+        'light_level': None if light_level != light_level else light_level,
+        'light_lux': None if light_lux != light_lux else light_lux,
+        'dimmer_brightness': None if dimmer != dimmer else int(dimmer),
+        'daylight_harvest_mode': None if harvest != harvest else bool(harvest),
+    }
+
+
+def _float_or_none(value) -> Optional[float]:
+    # avg() of an integer column comes back as Decimal
+    return float(value) if value is not None else None
+
+
+def _lighting_rollup_dict(row) -> dict:
+    data = row._mapping
+    out = {'time': row.bucket.isoformat(), 'count': int(row.count)}
+    for metric in LIGHTING_ROLLUP_METRICS:
+        for stat in _ROLLUP_STATS:
+            out[f'{metric}_{stat}'] = _float_or_none(data[f'{metric}_{stat}'])
+    return out
+
+
+def _lighting_raw_rollup_dict(row) -> dict:
+    """A raw row in rollup shape: a bucket of one reading."""
+    out = {'time': row.time.isoformat(), 'count': 1}
+    for metric in LIGHTING_ROLLUP_METRICS:
+        value = _float_or_none(getattr(row, metric))
+        for stat in _ROLLUP_STATS:
+            out[f'{metric}_{stat}'] = value
+    return out
+
+
+def _pivot_rollups(
+    rows: Iterable[tuple], time_key: str = 'timestamp', metrics: Iterable[str] = (),
+) -> List[dict]:
+    """
+    Pivot (time, metric, count, avg, min, max) rows, ordered by time, into
+    one row per time with ``<metric>_avg/_min/_max`` columns (``metrics``
+    are always present, None when the bucket has no value for them).
+    """
+    empty = {f'{metric}_{stat}': None for metric in metrics for stat in _ROLLUP_STATS}
+    pivoted: List[dict] = []
+    for time, metric, count, avg, low, high in rows:
+        stamp = time.isoformat()
+        if not pivoted or pivoted[-1][time_key] != stamp:
+            pivoted.append({time_key: stamp, 'count': 0, **empty})
+        out = pivoted[-1]
+        out['count'] = max(out['count'], int(count))
+        out[f'{metric}_avg'] = _float_or_none(avg)
+        out[f'{metric}_min'] = _float_or_none(low)
+        out[f'{metric}_max'] = _float_or_none(high)
+    return pivoted
+
+
+# Rollup tier tables, by tier name and by planner source.
+_ROLLUP_MODELS = {'1m': SensorRollup1m, '15m': SensorRollup15m}
+_ROLLUP_SOURCE_TIERS = {RESOLUTION_ROLLUP_1M: '1m', RESOLUTION_ROLLUP_15M: '15m'}
+
+
+def _tier_rollup_query(
+    tier: str, bucket_seconds: int, device_id: str, metrics: Iterable[str],
+    start_time: datetime, end_time: datetime,
+):
+    """count/sum/min/max per (bucket, metric) re-bucketed from a rollup tier."""
+    table_ = _ROLLUP_MODELS[tier].__table__.c
+    bucket = _time_bucket(bucket_seconds, table_.bucket)
+    return (
+        select(
+            bucket.label('bucket'), table_.metric,
+            func.sum(table_.count), func.sum(table_.sum),
+            func.min(table_.min), func.max(table_.max),
+        )
+        .where(
+            table_.device_id == device_id,
+            table_.metric.in_(list(metrics)),
+            table_.bucket > start_time - timedelta(seconds=ROLLUP_TIERS[tier]),
+            table_.bucket <= end_time,
+        )
+        .group_by(bucket, table_.metric)
+        .order_by(bucket)
+    )
+
+
+def _merge_tier_rows(
+    stored: Iterable[tuple], pending: Iterable[dict], bucket_seconds: int,
+    metrics: Iterable[str], start_time: datetime, end_time: datetime, tier_seconds: int,
+) -> List[tuple]:
+    """
+    Combine stored tier buckets with not-yet-flushed ones, as
+    (time, metric, count, avg, min, max) rows ordered by time.
+    """
+    merged: Dict[tuple, list] = {}
+    for bucket, metric, count, total, low, high in stored:
+        merged[(bucket, metric)] = [int(count), float(total), low, high]
+    wanted = set(metrics)
+    lower = start_time - timedelta(seconds=tier_seconds)
+    for row in pending:
+        if row['metric'] not in wanted or not (lower < row['bucket'] <= end_time):
+            continue
+        epoch = row['bucket'].timestamp()
+        bucket = datetime.fromtimestamp(epoch - epoch % bucket_seconds, timezone.utc)
+        current = merged.get((bucket, row['metric']))
+        if current is None:
+            merged[(bucket, row['metric'])] = [row['count'], row['sum'], row['min'], row['max']]
+        else:
+            current[0] += row['count']
+            current[1] += row['sum']
+            current[2] = min(current[2], row['min'])
+            current[3] = max(current[3], row['max'])
+    return [
+        (bucket, metric, count, total / count if count else None, low, high)
+        for (bucket, metric), (count, total, low, high) in sorted(merged.items())
+    ]
+
+
+def _latest_state_row(data: dict) -> dict:
+    """Map an ingest payload onto device_latest_state columns."""
+    time = _reading_time(data)
+    if time.tzinfo is None:
+        time = time.replace(tzinfo=timezone.utc)
+    row = {'device_id': data['device_id'], 'time': time}
+    for field in LATEST_STATE_FIELDS:
+        row[field] = data.get(field)
+    return row
+
+
+def _latest_state_model_row(state: DeviceLatestState) -> dict:
+    return {
+        'device_id': state.device_id,
+        'time': state.time,
+        **{field: getattr(state, field) for field in LATEST_STATE_FIELDS},
+    }
+
+
+def _device_dict(device: Device) -> dict:
+    return {
+        'device_id': device.device_id,
+        'device_type': device.device_type,
+        'name': device.name,
+        'location': device.location,
+        'status': device.status,
+        'last_seen': device.last_seen.isoformat() if device.last_seen else None,
+    }
+
+
+def _sensor_reading_rows(data: dict) -> List[dict]:
+    """Explode one environmental/room-node payload into sensor_readings rows."""
+    time = _reading_time(data)
+    return [
+        {
+            'time': time,
+            'device_id': data['device_id'],
+            'sensor_type': sensor_type,
+            'value': float(data[sensor_type]),
+            'unit': unit,
+        }
+        for sensor_type, unit in SENSOR_READING_UNITS.items()
+        if data.get(sensor_type) is not None
+    ]
+
+
 class DatabaseClient:
     """Database client for TimescaleDB operations"""
     
-    def __init__(self, database_url: str = None):
+    def __init__(self, database_url: str = None, analytics_database_url: str = None):
         """
         Initialize database client
-        
+
         Args:
             database_url: Database connection string (defaults to settings.DATABASE_URL)
+            analytics_database_url: Connection string for analytics reads, e.g. a
+                read replica (defaults to settings.ANALYTICS_DATABASE_URL, then database_url)
         """
         self.database_url = database_url or settings.DATABASE_URL
-        
-        # Create engine with connection pooling
-        self.engine = create_engine(
-            self.database_url,
-            poolclass=QueuePool,
-            pool_size=5,
-            max_overflow=10,
-            pool_pre_ping=True,  # Verify connections before using
-            echo=False,  # Set to True for SQL logging
+        analytics_url = analytics_database_url or settings.ANALYTICS_DATABASE_URL
+
+        # Named pools: hot-path work never waits behind long history reads.
+        self.pools = {
+            POOL_REALTIME: ConnectionPool(POOL_REALTIME, PoolConfig(
+                self.database_url,
+                size=settings.DB_REALTIME_POOL_SIZE,
+                max_overflow=settings.DB_REALTIME_MAX_OVERFLOW,
+                timeout_seconds=settings.DB_REALTIME_POOL_TIMEOUT_SECONDS,
+                statement_timeout_ms=settings.DB_REALTIME_STATEMENT_TIMEOUT_MS,
+            )),
+            POOL_ANALYTICS: ConnectionPool(POOL_ANALYTICS, PoolConfig(
+                analytics_url or self.database_url,
+                size=settings.DB_ANALYTICS_POOL_SIZE,
+                max_overflow=settings.DB_ANALYTICS_MAX_OVERFLOW,
+                timeout_seconds=settings.DB_ANALYTICS_POOL_TIMEOUT_SECONDS,
+                statement_timeout_ms=settings.DB_ANALYTICS_STATEMENT_TIMEOUT_MS,
+            ), replica=bool(analytics_url)),
+        }
+        # Primary engine (DDL, COPY and anything not routed to analytics)
+        self.engine = self.pools[POOL_REALTIME].engine
+
+        # In-memory device registry so existence checks skip the database.
+        self.devices = DeviceRegistry(
+            fetch=self._fetch_devices,
+            ttl_seconds=settings.DEVICE_CACHE_TTL_SECONDS,
+            negative_ttl_seconds=settings.DEVICE_CACHE_NEGATIVE_TTL_SECONDS,
         )
-        
-        # Create session factory
-        self.SessionLocal = sessionmaker(
-            autocommit=False,
-            autoflush=False,
-            bind=self.engine
+
+        # Coalesces devices.last_seen heartbeats into periodic bulk updates.
+        self.presence = PresenceTracker(
+            writer=self.bulk_update_last_seen,
+            flush_interval_seconds=settings.PRESENCE_FLUSH_INTERVAL_SECONDS,
+        )
+
+        # Group-commit buffer for sensor/state inserts. Inserts go straight
+        # to the database until start_write_buffer() is called.
+        self.write_buffer = WriteBehindBuffer(
+            writer=self._write_rows,
+            flush_interval_ms=settings.WRITE_BUFFER_FLUSH_INTERVAL_MS,
+            batch_size=settings.WRITE_BUFFER_BATCH_SIZE,
+            max_depth=settings.WRITE_BUFFER_MAX_DEPTH,
+        )
+
+        # Coalesces per-device latest values into periodic bulk upserts.
+        # Upserts go straight to the database until started.
+        self.latest_state = LatestStateTracker(
+            writer=self.upsert_latest_states,
+            flush_interval_seconds=settings.LATEST_STATE_FLUSH_INTERVAL_SECONDS,
+        )
+
+        # 1m/15m count/sum/min/max/last accumulators, flushed as buckets close.
+        # Rollups are upserted per call until started.
+        self.rollups = RollupAccumulator(
+            writer=self.upsert_rollups,
+            flush_interval_seconds=settings.ROLLUP_FLUSH_INTERVAL_SECONDS,
+            grace_seconds=settings.ROLLUP_GRACE_SECONDS,
+            max_requeue_buckets=settings.ROLLUP_MAX_REQUEUE_BUCKETS,
+        )
+
+        # On-disk spool for rows the database could not take; the replayer
+        # writes them back once it is reachable. Started by start_spool_replayer().
+        self.spool = SpoolReplayer(
+            spool=DiskSpool(
+                settings.SPOOL_DIR,
+                segment_bytes=settings.SPOOL_SEGMENT_BYTES,
+                max_bytes=settings.SPOOL_MAX_BYTES,
+                fsync_interval_seconds=settings.SPOOL_FSYNC_INTERVAL_MS / 1000,
+            ),
+            writer=self.replay_rows,
+            interval_seconds=settings.SPOOL_FSYNC_INTERVAL_MS / 1000,
+            retry_seconds=settings.SPOOL_REPLAY_RETRY_SECONDS,
+            batch_rows=settings.SPOOL_REPLAY_BATCH_ROWS,
         )
     
     @contextmanager
-    def get_session(self) -> Session:
+    def get_session(self, pool: str = POOL_REALTIME) -> Session:
         """
         Get a database session context manager
-        
+
+        Args:
+            pool: Named pool to check the connection out of ("realtime" or "analytics")
+
         Yields:
             Session: SQLAlchemy session
         """
-        session = self.SessionLocal()
-        try:
+        with self.pools[pool].session() as session:
             yield session
-            session.commit()
+
+    def connect(self, pool: str = POOL_REALTIME):
+        """Check out a Core connection from a named pool (use as a context manager)"""
+        return self.pools[pool].connect()
+
+    def begin(self, pool: str = POOL_REALTIME):
+        """Core connection from a named pool inside a transaction (context manager)"""
+        return self.pools[pool].begin()
+
+    def pool_stats(self) -> Dict[str, dict]:
+        """Usage, checkout waits and timeouts per named pool"""
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def dispose(self):
+        """Close all pooled connections"""
+        for pool in self.pools.values():
+            pool.dispose()
+
+    def start_write_buffer(self):
+        """Start deferring sensor/state inserts to the write-behind buffer"""
+        self.write_buffer.start()
+
+    def stop_write_buffer(self):
+        """Stop the write-behind buffer and synchronously flush pending rows"""
+        self.write_buffer.stop()
+
+    def bulk_insert(self, table: str, rows: List[dict]) -> int:
+        """
+        Insert many rows into one table in a single transaction
+
+        Rows that collide with an existing key (a replayed reading) are
+        skipped with ON CONFLICT DO NOTHING instead of failing the batch.
+
+        Args:
+            table: Table name (one of the write-behind tables)
+            rows: Column dictionaries
+
+        Returns:
+            int: Number of rows written
+        """
+        if not rows:
+            return 0
+        if table == SensorReading.__tablename__:
+            return self.copy_sensor_readings(rows)
+        with self.begin() as connection:
+            connection.execute(_INSERT_IGNORE[table], rows)
+        return len(rows)
+
+    def copy_sensor_readings(self, rows: List[dict]) -> int:
+        """
+        Bulk-load sensor_readings rows with COPY FROM STDIN
+
+        Rows are copied into a session-local staging table and moved over
+        with INSERT ... SELECT ... ON CONFLICT DO NOTHING, so a reading
+        already stored (a retried batch, a replayed spool segment) is
+        skipped instead of aborting the whole COPY on the primary key.
+
+        Args:
+            rows: Dictionaries with time, device_id, sensor_type, value, unit
+
+        Returns:
+            int: Number of rows written (duplicates excluded)
+        """
+        if not rows:
+            return 0
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in rows:
+            writer.writerow((
+                row['time'].isoformat(),
+                row['device_id'],
+                row['sensor_type'],
+                row['value'],
+                row['unit'] if row['unit'] is not None else '',
+            ))
+        buf.seek(0)
+
+        connection = self.pools[POOL_REALTIME].raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(_CREATE_SENSOR_READINGS_STAGING)
+                cursor.copy_expert(
+                    "COPY sensor_readings_staging (time, device_id, sensor_type, value, unit) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buf,
+                )
+                cursor.execute(_MOVE_SENSOR_READINGS_STAGING)
+                written = cursor.rowcount
+            connection.commit()
         except Exception:
-            session.rollback()
+            connection.rollback()
             raise
         finally:
-            session.close()
-    
+            connection.close()
+        return written
+
+    def _insert_rows(self, table: str, rows: List[dict]) -> None:
+        """Queue rows on the write-behind buffer if running, else write now"""
+        if self.write_buffer.running:
+            self.write_buffer.submit_many(table, rows)
+        else:
+            self._write_rows(table, rows)
+
+    def _insert_rows_acked(self, table: str, rows: List[dict]) -> Future:
+        """
+        Like _insert_rows, but return a future that resolves once the rows
+        are committed (or spooled) and fails if they could not be stored
+        """
+        if self.write_buffer.running:
+            return self.write_buffer.submit_acked(table, rows)
+        ack: Future = Future()
+        try:
+            self._write_rows(table, rows)
+        except Exception as exc:
+            ack.set_exception(exc)
+        else:
+            ack.set_result(None)
+        return ack
+
+    def _write_rows(self, table: str, rows: List[dict]) -> int:
+        """
+        bulk_insert, falling back to the disk spool while the database is
+        unreachable and the spool replayer is running
+
+        Once a write has failed for lack of a connection, further rows go
+        straight to the spool (no per-request connect timeouts) until the
+        replayer has drained it successfully.
+        """
+        if not self.spool.running:
+            return self.bulk_insert(table, rows)
+        if self.spool.healthy:
+            try:
+                return self.bulk_insert(table, rows)
+            except Exception as exc:
+                if not is_unavailable(exc):
+                    raise
+                logger.warning("Database unavailable, spooling %d %s rows: %s", len(rows), table, exc)
+                self.spool.mark_unavailable(exc)
+        self.spool.spool.append(table, rows)
+        return len(rows)
+
+    def replay_rows(self, table: str, rows: List[dict]) -> int:
+        """
+        Write spooled rows back (ON CONFLICT DO NOTHING against each table's
+        unique key, so replays are idempotent)
+
+        Unlike bulk_insert, sensor_readings also goes through a plain INSERT
+        rather than COPY via the staging table.
+
+        Returns:
+            int: Number of rows sent
+        """
+        if not rows:
+            return 0
+        with self.get_session() as session:
+            session.execute(
+                pg_insert(_WRITE_BEHIND_MODELS[table]).on_conflict_do_nothing(),
+                [_spooled_row(row) for row in rows],
+            )
+        return len(rows)
+
+    def start_spool_replayer(self):
+        """Start syncing the disk spool and replaying its backlog"""
+        self.spool.start()
+
+    def stop_spool_replayer(self):
+        """Stop the replayer (one last replay attempt) and close the spool"""
+        self.spool.stop()
+
     def create_tables(self):
-        """Create all tables in the database"""
+        """Create all tables, then apply hypertable/compression/retention policies"""
         Base.metadata.create_all(bind=self.engine)
+        if settings.STORAGE_BOOTSTRAP_ENABLED:
+            bootstrap_storage(self.engine)
     
     def drop_tables(self):
         """Drop all tables in the database (use with caution!)"""
@@ -77,28 +806,248 @@ class DatabaseClient:
     
     # Lighting Sensor Data Operations
     
-    def insert_lighting_data(self, data: dict) -> bool:
+    def insert_lighting_data(self, data: dict) -> Future:
         """
         Insert lighting sensor data
+
+        The row is group-committed by the write-behind buffer. The returned
+        future lets the ingest handler wait for that flush and answer 500
+        on failure so the device retries. While the database is
+        unreachable the row goes to the disk spool instead (see
+        ``_write_rows``).
         
         Args:
             data: Dictionary containing lighting sensor data
         
         Returns:
-            bool: True if successful
+            Future: Resolves once the row is stored
         """
-        with self.get_session() as session:
-            lighting_data = LightingSensorData(
-                time=datetime.fromisoformat(data['timestamp'].replace('Z', '+00:00')),
-                device_id=data['device_id'],
-                light_level=data.get('light_level'),
-                light_lux=data.get('light_lux'),
-                dimmer_brightness=data.get('dimmer_brightness'),
-                daylight_harvest_mode=data.get('daylight_harvest_mode')
-            )
-            session.add(lighting_data)
-        return True
+        return self._insert_rows_acked('lighting_sensor_data', [_lighting_row(data)])
+
+    def insert_lighting_data_batch(self, readings: List[dict]) -> Future:
+        """
+        Insert many lighting sensor readings in a single transaction
+
+        Rows are sent as one executemany INSERT, which SQLAlchemy batches
+        into multi-row VALUES statements for psycopg2. Like
+        ``insert_lighting_data`` the rows go through the write-behind
+        buffer and the returned future resolves once they are stored.
+
+        Args:
+            readings: List of lighting sensor payload dictionaries
+
+        Returns:
+            Future: Resolves once every row is stored
+        """
+        return self._insert_rows_acked('lighting_sensor_data', [_lighting_row(data) for data in readings])
     
+    # Environmental / Room-Node Sensor Readings
+
+    def insert_sensor_readings(self, readings: List[dict]) -> int:
+        """
+        Store environmental and room-node readings in sensor_readings
+
+        Each payload is exploded into long-format rows, one per metric
+        present (temperature, humidity, pressure, light_level, light_lux),
+        and bulk-loaded with COPY via the write-behind buffer.
+
+        Args:
+            readings: Environmental or room-node payload dictionaries
+
+        Returns:
+            int: Number of sensor_readings rows queued or written
+        """
+        rows = [row for data in readings for row in _sensor_reading_rows(data)]
+        if rows:
+            self._insert_rows(SensorReading.__tablename__, rows)
+        return len(rows)
+
+    def insert_sensor_readings_batch(self, readings: List[dict]) -> Future:
+        """
+        Store environmental and room-node readings, acknowledging the flush
+
+        Like ``insert_sensor_readings``, but the returned future resolves
+        once the rows are stored, so the batch endpoint can answer 500 on
+        failure and let the room-node retry.
+
+        Args:
+            readings: Environmental or room-node payload dictionaries
+
+        Returns:
+            Future: Resolves once every row is stored
+        """
+        rows = [row for data in readings for row in _sensor_reading_rows(data)]
+        return self._insert_rows_acked(SensorReading.__tablename__, rows)
+
+    # Latest State Operations
+
+    def record_latest_state(self, readings: List[dict]) -> int:
+        """
+        Merge ingest payloads into device_latest_state
+
+        While the latest-state tracker is running the readings are merged
+        in memory and upserted in bulk on its next flush; otherwise they are
+        upserted now.
+
+        Args:
+            readings: Ingest payload dictionaries (normalised ``time`` or ISO ``timestamp``)
+
+        Returns:
+            int: Number of readings recorded
+        """
+        rows = [_latest_state_row(data) for data in readings]
+        if not rows:
+            return 0
+        if self.latest_state.running:
+            self.latest_state.record(rows)
+        else:
+            self.upsert_latest_states(list(merge_states(rows).values()))
+        return len(rows)
+
+    def upsert_latest_states(self, rows: List[dict]) -> int:
+        """
+        Upsert merged latest-state rows (at most one per device) in one statement
+
+        A row only replaces a stored one that is not newer, and metrics it
+        does not report (None) keep their stored value.
+
+        Args:
+            rows: device_latest_state rows
+
+        Returns:
+            int: Number of rows inserted or updated
+        """
+        if not rows:
+            return 0
+        statement = pg_insert(DeviceLatestState)
+        excluded = statement.excluded
+        table = DeviceLatestState.__table__.c
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.device_id],
+            set_={
+                'time': excluded.time,
+                'updated_at': func.now(),
+                **{field: func.coalesce(excluded[field], table[field]) for field in LATEST_STATE_FIELDS},
+            },
+            where=table.time <= excluded.time,
+        )
+        with self.get_session() as session:
+            result = session.execute(statement, rows)
+            return result.rowcount
+
+    # Rollup Tier Operations
+
+    def record_rollups(self, readings: List[dict]) -> int:
+        """
+        Add ingest payloads to the 1m/15m rollup accumulators
+
+        While the accumulator is running, buckets are flushed in bulk as they
+        close; otherwise the readings are upserted into the tiers now.
+
+        Args:
+            readings: Ingest payload dictionaries (normalised ``time`` or ISO ``timestamp``)
+
+        Returns:
+            int: Number of readings recorded (0 when ROLLUP_ENABLED is off)
+        """
+        if not settings.ROLLUP_ENABLED:
+            return 0
+        rows = [{**data, 'time': _reading_time(data)} for data in readings]
+        if not rows:
+            return 0
+        if self.rollups.running:
+            return self.rollups.record(rows)
+        for tier, tier_rows in rollup_rows(rows).items():
+            self.upsert_rollups(tier, tier_rows)
+        return len(rows)
+
+    def upsert_rollups(self, tier: str, rows: List[dict]) -> int:
+        """
+        Merge rollup buckets into a tier table in one statement
+
+        An existing bucket is combined with the incoming one: counts and
+        sums add, min/max widen and ``last`` keeps the newer reading.
+
+        Args:
+            tier: Tier name ("1m" or "15m")
+            rows: Bucket rows (bucket, device_id, metric, count, sum, min, max, last, last_time)
+
+        Returns:
+            int: Number of rows inserted or updated
+        """
+        if not rows:
+            return 0
+        model = _ROLLUP_MODELS[tier]
+        statement = pg_insert(model)
+        excluded = statement.excluded
+        table = model.__table__.c
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.device_id, table.metric, table.bucket],
+            set_={
+                'count': table.count + excluded.count,
+                'sum': table.sum + excluded.sum,
+                'min': func.least(table.min, excluded.min),
+                'max': func.greatest(table.max, excluded.max),
+                'last': case((excluded.last_time >= table.last_time, excluded.last), else_=table.last),
+                'last_time': func.greatest(table.last_time, excluded.last_time),
+            },
+        )
+        with self.get_session() as session:
+            result = session.execute(statement, rows)
+            return result.rowcount
+
+    def start_rollup_accumulator(self):
+        """Start accumulating rollup buckets in memory"""
+        self.rollups.start()
+
+    def stop_rollup_accumulator(self):
+        """Stop the rollup accumulator and flush every bucket, open ones included"""
+        self.rollups.stop()
+
+    def get_latest_state(self, device_id: str) -> Optional[dict]:
+        """
+        Get the latest value of every metric for one device (primary-key lookup)
+
+        Args:
+            device_id: Device identifier
+
+        Returns:
+            dict: Latest state with ISO ``time``, or None if the device never reported
+        """
+        with self.get_session() as session:
+            stored = session.get(DeviceLatestState, device_id)
+            row = _latest_state_model_row(stored) if stored else None
+        pending = self.latest_state.pending(device_id)
+        if pending:
+            row = merge_states(([row] if row else []) + list(pending.values()))[device_id]
+        return latest_state_dict(row) if row else None
+
+    def get_latest_states(self) -> List[dict]:
+        """
+        Get the latest state of every device in one read
+
+        Returns:
+            List[dict]: Latest state per device, ordered by device_id
+        """
+        with self.get_session() as session:
+            stored = {
+                state.device_id: _latest_state_model_row(state)
+                for state in session.query(DeviceLatestState).all()
+            }
+        for device_id, row in self.latest_state.pending().items():
+            stored[device_id] = merge_states(
+                ([stored[device_id]] if device_id in stored else []) + [row]
+            )[device_id]
+        return [latest_state_dict(stored[device_id]) for device_id in sorted(stored)]
+
+    def start_latest_state_tracker(self):
+        """Start coalescing latest-state upserts in the tracker"""
+        self.latest_state.start()
+
+    def stop_latest_state_tracker(self):
+        """Stop the latest-state tracker and synchronously flush pending rows"""
+        self.latest_state.stop()
+
     def get_latest_lighting_data(self, device_id: str) -> Optional[dict]:
         """
         Get the latest lighting sensor data for a device
@@ -130,43 +1079,293 @@ class DatabaseClient:
         device_id: str, 
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
-        limit: int = 100
+        limit: int = 100,
+        before: Optional[datetime] = None,
     ) -> List[dict]:
         """
-        Get historical lighting data for a device
+        Get one page of historical lighting data for a device, newest first
+        
+        Pages are keyset-paginated on (device_id, time): pass the ``time``
+        of the last row of a page as ``before`` to get the next one. Each
+        page is a single range scan of the (device_id, time) index however
+        deep it is.
         
         Args:
             device_id: Device identifier
             start_time: Start timestamp
             end_time: End timestamp
             limit: Maximum number of records
+            before: Only rows strictly older than this (keyset cursor)
         
         Returns:
             List[dict]: List of lighting data records
         """
-        with self.get_session() as session:
-            query = session.query(LightingSensorData).filter(
-                LightingSensorData.device_id == device_id
+        query = _lighting_history_query(device_id, start_time, end_time, descending=True)
+        if before is not None:
+            query = query.where(LightingSensorData.time < before)
+        with self.get_session(POOL_ANALYTICS) as session:
+            rows = session.execute(query.limit(limit)).all()
+            return [_lighting_history_dict(row) for row in rows]
+
+    def iter_lighting_history(
+        self,
+        device_id: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        limit: Optional[int] = None,
+        batch_size: int = 5000,
+    ) -> Iterator[dict]:
+        """
+        Stream historical lighting data for a device, oldest first
+
+        Rows come from a server-side cursor (``stream_results``) fetched
+        ``batch_size`` at a time, so memory stays flat regardless of how
+        large the range is. The connection is held until the iterator is
+        exhausted or closed.
+
+        Args:
+            device_id: Device identifier
+            start_time: Start timestamp
+            end_time: End timestamp
+            limit: Maximum number of records (None for the whole range)
+            batch_size: Rows fetched per round trip
+
+        Yields:
+            dict: Lighting data records
+        """
+        query = _lighting_history_query(device_id, start_time, end_time, descending=False)
+        if limit is not None:
+            query = query.limit(limit)
+        with self.connect(POOL_ANALYTICS) as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=batch_size
+            ).execute(query)
+            for row in result:
+                yield _lighting_history_dict(row)
+
+    # History Rollups
+
+    def plan_history(
+        self,
+        start_time: datetime,
+        end_time: datetime,
+        points: Optional[int] = None,
+        bucket_seconds: Optional[int] = None,
+    ) -> ResolutionPlan:
+        """
+        Choose raw rows, the hourly aggregate, a rollup tier or an on-the-fly rollup for a range
+
+        Args:
+            start_time: Range start
+            end_time: Range end
+            points: Target number of points
+            bucket_seconds: Explicit bucket width in seconds
+
+        Returns:
+            ResolutionPlan: Source and bucket width (see app.services.resolution)
+        """
+        now = datetime.now(timezone.utc)
+        rollup_tiers = {
+            RESOLUTION_ROLLUP_1M: (
+                ROLLUP_TIERS['1m'], now - timedelta(days=settings.ROLLUP_1M_RETENTION_DAYS),
+            ),
+            RESOLUTION_ROLLUP_15M: (
+                ROLLUP_TIERS['15m'], now - timedelta(days=settings.ROLLUP_15M_RETENTION_DAYS),
+            ),
+        }
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=timezone.utc)
+        return plan_resolution(
+            start_time, end_time, points=points, bucket_seconds=bucket_seconds,
+            raw_max_bucket_seconds=settings.HISTORY_RAW_MAX_BUCKET_SECONDS,
+            max_points=settings.HISTORY_MAX_POINTS,
+            rollup_tiers=rollup_tiers if settings.ROLLUP_ENABLED else None,
+        )
+
+    def get_lighting_rollup(
+        self,
+        device_id: str,
+        start_time: datetime,
+        end_time: datetime,
+        points: Optional[int] = None,
+        bucket_seconds: Optional[int] = None,
+    ) -> dict:
+        """
+        Get lighting history downsampled to avg/min/max per bucket, oldest first
+
+        Args:
+            device_id: Device identifier
+            start_time: Range start
+            end_time: Range end
+            points: Target number of points
+            bucket_seconds: Explicit bucket width in seconds
+
+        Returns:
+            dict: ``resolution`` (raw, hourly or bucket), ``bucket_seconds``
+            and ``data`` rows of ``time``, ``count`` and
+            ``<metric>_avg/_min/_max`` for each lighting metric
+        """
+        plan = self.plan_history(start_time, end_time, points, bucket_seconds)
+        if plan.source in _ROLLUP_SOURCE_TIERS:
+            rows = self._read_rollup_tier(plan, device_id, LIGHTING_ROLLUP_METRICS, start_time, end_time)
+            data = _pivot_rollups(rows, 'time', LIGHTING_ROLLUP_METRICS)
+            return {'resolution': plan.source, 'bucket_seconds': plan.bucket_seconds, 'data': data}
+        with self.get_session(POOL_ANALYTICS) as session:
+            if plan.source == RESOLUTION_RAW:
+                query = _lighting_history_query(device_id, start_time, end_time, descending=False)
+                rows = session.execute(query.limit(settings.HISTORY_MAX_POINTS)).all()
+                data = [_lighting_raw_rollup_dict(row) for row in rows]
+            else:
+                rows = session.execute(
+                    _lighting_rollup_query(plan, device_id, start_time, end_time)
+                ).all()
+                data = [_lighting_rollup_dict(row) for row in rows]
+        return {'resolution': plan.source, 'bucket_seconds': plan.bucket_seconds, 'data': data}
+
+    def _read_rollup_tier(
+        self,
+        plan: ResolutionPlan,
+        device_id: str,
+        metrics: Iterable[str],
+        start_time: datetime,
+        end_time: datetime,
+    ) -> List[tuple]:
+        """Re-bucketed tier rows plus the accumulator's unflushed buckets, oldest first."""
+        tier = _ROLLUP_SOURCE_TIERS[plan.source]
+        metrics = list(metrics)
+        with self.get_session(POOL_ANALYTICS) as session:
+            stored = session.execute(_tier_rollup_query(
+                tier, plan.bucket_seconds, device_id, metrics, start_time, end_time,
+            )).all()
+        return _merge_tier_rows(
+            stored, self.rollups.open_buckets(tier, device_id), plan.bucket_seconds,
+            metrics, start_time, end_time, ROLLUP_TIERS[tier],
+        )
+
+    def get_lighting_lttb(
+        self,
+        device_id: str,
+        start_time: datetime,
+        end_time: datetime,
+        points: int,
+        metric: str = 'light_level',
+        batch_size: int = 5000,
+    ) -> dict:
+        """
+        Get lighting history downsampled to ``points`` rows with LTTB, oldest first
+
+        Rows are streamed from a server-side cursor into a float64 array
+        (five values per row) and reduced with Largest-Triangle-Three-Buckets
+        on ``metric``. The rows kept are real readings, so peaks and dips
+        survive where bucket averages would flatten them.
+
+        Args:
+            device_id: Device identifier
+            start_time: Range start
+            end_time: Range end
+            points: Number of rows to return
+            metric: Column LTTB preserves the shape of (one of LIGHTING_ROLLUP_METRICS)
+            batch_size: Rows fetched per round trip
+
+        Returns:
+            dict: ``source_rows`` (rows read) and ``data`` (lighting history rows)
+
+        Raises:
+            ValueError: If ``metric`` is unknown or the range holds more than
+                HISTORY_LTTB_MAX_ROWS rows
+        """
+        if metric not in LIGHTING_ROLLUP_METRICS:
+            raise ValueError(f"Unknown LTTB metric: {metric!r}")
+        max_rows = settings.HISTORY_LTTB_MAX_ROWS
+        table_ = LightingSensorData.__table__.c
+        query = (
+            select(
+                cast(func.extract('epoch', table_.time), Float),
+                table_.light_level, table_.light_lux, table_.dimmer_brightness,
+                table_.daylight_harvest_mode,
             )
-            
-            if start_time:
-                query = query.filter(LightingSensorData.time >= start_time)
-            if end_time:
-                query = query.filter(LightingSensorData.time <= end_time)
-            
-            results = query.order_by(
-                LightingSensorData.time.desc()
-            ).limit(limit).all()
-            
-            return [{
-                'time': r.time.isoformat(),
-                'device_id': r.device_id,
-                'light_level': r.light_level,
-                'light_lux': r.light_lux,
-                'dimmer_brightness': r.dimmer_brightness,
-                'daylight_harvest_mode': r.daylight_harvest_mode,
-            } for r in results]
-    
+            .where(
+                table_.device_id == device_id,
+                table_.time >= start_time,
+                table_.time <= end_time,
+                table_[metric].isnot(None),
+            )
+            .order_by(table_.time.asc())
+            .limit(max_rows + 1)
+        )
+        with self.connect(POOL_ANALYTICS) as connection:
+            result = connection.execution_options(
+                stream_results=True, yield_per=batch_size
+            ).execute(query)
+            rows = stack_batches(
+                ([tuple(row) for row in batch] for batch in result.partitions()),
+                len(_LTTB_COLUMNS),
+            )
+        if len(rows) > max_rows:
+            raise ValueError(
+                f"Range holds more than {max_rows} rows; narrow it or use bucketed history"
+            )
+        keep = lttb_indices(rows[:, 0], rows[:, _LTTB_COLUMNS.index(metric)], points)
+        return {
+            'source_rows': len(rows),
+            'data': [_lttb_row_dict(device_id, rows[index]) for index in keep],
+        }
+
+    def get_sensor_readings_rollup(
+        self,
+        device_id: str,
+        start_time: datetime,
+        end_time: datetime,
+        points: Optional[int] = None,
+        bucket_seconds: Optional[int] = None,
+    ) -> dict:
+        """
+        Get sensor_readings downsampled to avg/min/max per bucket, oldest first
+
+        Args:
+            device_id: Device identifier
+            start_time: Range start
+            end_time: Range end
+            points: Target number of points
+            bucket_seconds: Explicit bucket width in seconds
+
+        Returns:
+            dict: ``resolution``, ``bucket_seconds`` and ``data`` rows of
+            ``timestamp``, ``count`` and ``<sensor_type>_avg/_min/_max``
+        """
+        plan = self.plan_history(start_time, end_time, points, bucket_seconds)
+        if plan.source in _ROLLUP_SOURCE_TIERS:
+            rows = self._read_rollup_tier(plan, device_id, SENSOR_READING_UNITS, start_time, end_time)
+            return {
+                'resolution': plan.source,
+                'bucket_seconds': plan.bucket_seconds,
+                'data': _pivot_rollups(rows),
+            }
+        with self.get_session(POOL_ANALYTICS) as session:
+            if plan.source == RESOLUTION_RAW:
+                table_ = SensorReading.__table__.c
+                query = (
+                    select(
+                        table_.time, table_.sensor_type, literal_column('1'),
+                        table_.value, table_.value, table_.value,
+                    )
+                    .where(
+                        table_.device_id == device_id,
+                        table_.time >= start_time,
+                        table_.time <= end_time,
+                    )
+                    .order_by(table_.time)
+                    .limit(settings.HISTORY_MAX_POINTS * len(SENSOR_READING_UNITS))
+                )
+            else:
+                query = _sensor_readings_rollup_query(plan, device_id, start_time, end_time)
+            rows = session.execute(query).all()
+        return {
+            'resolution': plan.source,
+            'bucket_seconds': plan.bucket_seconds,
+            'data': _pivot_rollups(rows),
+        }
+
     # Relay State Operations
     
     def insert_relay_state(self, device_id: str, channel: int, state: bool) -> bool:
@@ -181,14 +1380,12 @@ class DatabaseClient:
         Returns:
             bool: True if successful
         """
-        with self.get_session() as session:
-            relay_state = RelayState(
-                time=datetime.utcnow(),
-                device_id=device_id,
-                channel=channel,
-                state=state
-            )
-            session.add(relay_state)
+        self._insert_rows('relay_state', [{
+            'time': datetime.utcnow(),
+            'device_id': device_id,
+            'channel': channel,
+            'state': state,
+        }])
         return True
     
     # Dimmer State Operations
@@ -204,13 +1401,11 @@ class DatabaseClient:
         Returns:
             bool: True if successful
         """
-        with self.get_session() as session:
-            dimmer_state = DimmerState(
-                time=datetime.utcnow(),
-                device_id=device_id,
-                brightness=brightness
-            )
-            session.add(dimmer_state)
+        self._insert_rows('dimmer_state', [{
+            'time': datetime.utcnow(),
+            'device_id': device_id,
+            'brightness': brightness,
+        }])
         return True
     
     # Device Operations
@@ -218,6 +1413,9 @@ class DatabaseClient:
     def get_device(self, device_id: str) -> Optional[dict]:
         """
         Get device information
+
+        Served from the in-memory device registry; the devices table is
+        only queried on a cache miss or after the entry's TTL expires.
         
         Args:
             device_id: Device identifier
@@ -225,25 +1423,67 @@ class DatabaseClient:
         Returns:
             dict: Device data or None
         """
-        with self.get_session() as session:
-            device = session.query(Device).filter(
-                Device.device_id == device_id
-            ).first()
-            
-            if device:
-                return {
-                    'device_id': device.device_id,
-                    'device_type': device.device_type,
-                    'name': device.name,
-                    'location': device.location,
-                    'status': device.status,
-                    'last_seen': device.last_seen.isoformat() if device.last_seen else None,
-                }
-            return None
+        return self.devices.get(device_id)
     
+    def get_devices(self, device_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Get information for several devices
+
+        Served from the device registry; misses are fetched in one query.
+
+        Args:
+            device_ids: Device identifiers to look up
+
+        Returns:
+            dict: Device data keyed by device_id (unknown IDs are omitted)
+        """
+        return self.devices.get_many(device_ids)
+
+    def list_devices(self) -> List[dict]:
+        """
+        Return every row of the devices table
+
+        Returns:
+            List[dict]: Device records
+        """
+        with self.connect() as connection:
+            return [_device_dict(row) for row in connection.execute(_SELECT_DEVICES)]
+
+    def load_device_registry(self) -> int:
+        """
+        Populate the device registry from the devices table
+
+        Returns:
+            int: Number of devices loaded
+        """
+        return self.devices.load(self.list_devices())
+
+    def invalidate_device(self, device_id: Optional[str] = None):
+        """
+        Drop a device (or all devices) from the registry after its row changed
+
+        Status writers that know the new values update the cached row in
+        place; anything else that changes or deletes device rows (including
+        the async client and devices found missing on update) calls this.
+
+        Args:
+            device_id: Device identifier, or None to clear the whole registry
+        """
+        self.devices.invalidate(device_id)
+
+    def _fetch_devices(self, device_ids: List[str]) -> Dict[str, dict]:
+        """Registry loader: query the given devices in one round trip"""
+        with self.connect() as connection:
+            rows = connection.execute(_SELECT_DEVICES_BY_ID, {'device_ids': list(device_ids)})
+            return {row.device_id: _device_dict(row) for row in rows}
+
     def update_device_status(self, device_id: str, status: str) -> bool:
         """
         Update device status
+
+        While the presence tracker is running, a call that does not change
+        the device's status only records a heartbeat in memory; last_seen
+        is written later in bulk. Status transitions are written immediately.
         
         Args:
             device_id: Device identifier
@@ -252,6 +1492,15 @@ class DatabaseClient:
         Returns:
             bool: True if successful
         """
+        if self.presence.running:
+            device = self.devices.get(device_id)
+            if device is None:
+                return False
+            if device.get('status') == status:
+                seen_at = self.presence.touch(device_id)
+                self.devices.update(device_id, last_seen=seen_at.isoformat())
+                return True
+
         with self.get_session() as session:
             device = session.query(Device).filter(
                 Device.device_id == device_id
@@ -260,8 +1509,96 @@ class DatabaseClient:
             if device:
                 device.status = status
                 device.last_seen = datetime.utcnow()
+                self.devices.update(
+                    device_id, status=status, last_seen=device.last_seen.isoformat()
+                )
                 return True
-            return False
+        # The row is gone: stop serving a cached copy of it
+        self.invalidate_device(device_id)
+        return False
+
+    def update_devices_status(self, device_ids: Iterable[str], status: str) -> int:
+        """
+        Update status and last_seen for several devices
+
+        Devices whose status is unchanged are coalesced into the presence
+        tracker (when running); the rest are updated with one UPDATE.
+
+        Args:
+            device_ids: Device identifiers
+            status: New status ('online', 'offline', etc.)
+
+        Returns:
+            int: Number of devices updated
+        """
+        device_ids = set(device_ids)
+        coalesced = 0
+        if self.presence.running:
+            known = self.devices.get_many(device_ids)
+            device_ids = set()
+            for device_id, device in known.items():
+                if device.get('status') == status:
+                    seen_at = self.presence.touch(device_id)
+                    self.devices.update(device_id, last_seen=seen_at.isoformat())
+                    coalesced += 1
+                else:
+                    device_ids.add(device_id)
+        if not device_ids:
+            return coalesced
+
+        last_seen = datetime.utcnow()
+        with self.get_session() as session:
+            updated = set(session.execute(
+                update(Device)
+                .where(Device.device_id.in_(device_ids))
+                .values(status=status, last_seen=last_seen)
+                .returning(Device.device_id)
+            ).scalars())
+        for device_id in device_ids:
+            if device_id in updated:
+                self.devices.update(device_id, status=status, last_seen=last_seen.isoformat())
+            else:
+                self.invalidate_device(device_id)
+        return coalesced + len(updated)
+
+    def bulk_update_last_seen(self, last_seen: Dict[str, datetime]) -> int:
+        """
+        Write coalesced heartbeats with one UPDATE ... FROM (VALUES ...)
+
+        Rows whose stored last_seen is already newer are left untouched.
+
+        Args:
+            last_seen: Newest seen timestamp per device_id
+
+        Returns:
+            int: Number of device rows updated
+        """
+        if not last_seen:
+            return 0
+        heartbeats = values(
+            column('device_id', String),
+            column('last_seen', TIMESTAMP(timezone=True)),
+            name='heartbeats',
+        ).data(list(last_seen.items()))
+        with self.get_session() as session:
+            result = session.execute(
+                update(Device)
+                .where(Device.device_id == heartbeats.c.device_id)
+                .where(or_(
+                    Device.last_seen.is_(None),
+                    Device.last_seen < heartbeats.c.last_seen,
+                ))
+                .values(last_seen=heartbeats.c.last_seen)
+            )
+            return result.rowcount
+
+    def start_presence_tracker(self):
+        """Start coalescing last_seen heartbeats in the presence tracker"""
+        self.presence.start()
+
+    def stop_presence_tracker(self):
+        """Stop the presence tracker and synchronously flush pending heartbeats"""
+        self.presence.stop()
 
     # -----------------------------------------------------------------------
     # Fan State Operations
@@ -278,13 +1615,11 @@ class DatabaseClient:
         Returns:
             bool: True if successful
         """
-        with self.get_session() as session:
-            fan_state = FanState(
-                time=datetime.utcnow(),
-                device_id=device_id,
-                fan_on=fan_on,
-            )
-            session.add(fan_state)
+        self._insert_rows('fan_state', [{
+            'time': datetime.utcnow(),
+            'device_id': device_id,
+            'fan_on': fan_on,
+        }])
         return True
 
     # -----------------------------------------------------------------------
@@ -301,18 +1636,9 @@ class DatabaseClient:
         Returns:
             dict with card data, or None if not found
         """
-        with self.get_session() as session:
-            card = session.query(RFIDCard).filter(
-                RFIDCard.card_uid == card_uid
-            ).first()
-            if card:
-                return {
-                    'card_uid': card.card_uid,
-                    'user_id': card.user_id,
-                    'label': card.label,
-                    'active': card.active,
-                }
-            return None
+        with self.connect() as connection:
+            row = connection.execute(_SELECT_RFID_CARD, {'card_uid': card_uid}).first()
+            return _card_dict(row) if row is not None else None
 
     def upsert_rfid_card(
         self,
@@ -358,17 +1684,8 @@ class DatabaseClient:
         Returns:
             List[dict]: List of card records
         """
-        with self.get_session() as session:
-            cards = session.query(RFIDCard).all()
-            return [
-                {
-                    'card_uid': c.card_uid,
-                    'user_id': c.user_id,
-                    'label': c.label,
-                    'active': c.active,
-                }
-                for c in cards
-            ]
+        with self.connect() as connection:
+            return [_card_dict(row) for row in connection.execute(_SELECT_RFID_CARDS)]
 
     # -----------------------------------------------------------------------
     # Access Log Operations
@@ -395,15 +1712,14 @@ class DatabaseClient:
         Returns:
             bool: True if successful
         """
-        with self.get_session() as session:
-            log = AccessLog(
-                card_uid=card_uid,
-                device_id=device_id,
-                granted=granted,
-                reason=reason,
-                timestamp=datetime.fromisoformat(timestamp.replace('Z', '+00:00')),
-            )
-            session.add(log)
+        with self.begin() as connection:
+            connection.execute(_INSERT_ACCESS_LOG, {
+                'card_uid': card_uid,
+                'device_id': device_id,
+                'granted': granted,
+                'reason': reason,
+                'timestamp': _parse_timestamp(timestamp),
+            })
         return True
 
     def get_access_logs(self, limit: int = 50) -> List[dict]:
@@ -416,100 +1732,27 @@ class DatabaseClient:
         Returns:
             List[dict]: Access log entries ordered by timestamp descending
         """
-        with self.get_session() as session:
-            logs = session.query(AccessLog).order_by(
-                AccessLog.timestamp.desc()
-            ).limit(limit).all()
-            return [
-                {
-                    'log_id': log.log_id,
-                    'card_uid': log.card_uid,
-                    'device_id': log.device_id,
-                    'granted': log.granted,
-                    'reason': log.reason,
-                    'timestamp': log.timestamp.isoformat() if log.timestamp else None,
-                }
-                for log in logs
-            ]
+        with self.connect(POOL_ANALYTICS) as connection:
+            rows = connection.execute(_SELECT_ACCESS_LOGS, {'limit': limit})
+            return [_access_log_dict(row) for row in rows]
 
     # -----------------------------------------------------------------------
     # Automation Rules Operations
     # -----------------------------------------------------------------------
 
     def list_automation_rules(self) -> List[dict]:
-        with self.get_session() as session:
-            rules = session.query(AutomationRule).order_by(AutomationRule.created_at.asc()).all()
-            return [
-                {
-                    "id": rule.rule_id,
-                    "name": rule.name,
-                    "trigger": rule.trigger,
-                    "comparator": rule.comparator,
-                    "threshold": rule.threshold,
-                    "action": rule.action,
-                    "action_value": rule.action_value,
-                    "enabled": rule.enabled,
-                    "created_at": rule.created_at.isoformat() if rule.created_at else None,
-                    "updated_at": rule.updated_at.isoformat() if rule.updated_at else None,
-                }
-                for rule in rules
-            ]
+        with self.connect() as connection:
+            return [_rule_dict(row) for row in connection.execute(_SELECT_AUTOMATION_RULES)]
 
     def create_automation_rule(self, payload: dict) -> dict:
-        with self.get_session() as session:
-            rule_id = payload.get("id") or f"rule-{uuid.uuid4().hex[:10]}"
-            rule = AutomationRule(
-                rule_id=rule_id,
-                name=payload["name"],
-                trigger=payload["trigger"],
-                comparator=payload["comparator"],
-                threshold=float(payload["threshold"]),
-                action=payload["action"],
-                action_value=str(payload.get("action_value", "")),
-                enabled=bool(payload.get("enabled", True)),
-            )
-            session.add(rule)
-            session.flush()
-            return {
-                "id": rule.rule_id,
-                "name": rule.name,
-                "trigger": rule.trigger,
-                "comparator": rule.comparator,
-                "threshold": rule.threshold,
-                "action": rule.action,
-                "action_value": rule.action_value,
-                "enabled": rule.enabled,
-            }
+        with self.begin() as connection:
+            row = connection.execute(_INSERT_AUTOMATION_RULE, _new_rule_values(payload)).one()
+            return _rule_dict(row)
 
     def update_automation_rule(self, rule_id: str, payload: dict) -> Optional[dict]:
-        with self.get_session() as session:
-            rule = session.query(AutomationRule).filter(AutomationRule.rule_id == rule_id).first()
-            if not rule:
-                return None
-
-            rule.name = payload.get("name", rule.name)
-            rule.trigger = payload.get("trigger", rule.trigger)
-            rule.comparator = payload.get("comparator", rule.comparator)
-            if "threshold" in payload:
-                rule.threshold = float(payload["threshold"])
-            if "action" in payload:
-                rule.action = payload["action"]
-            if "action_value" in payload:
-                rule.action_value = str(payload["action_value"])
-            if "enabled" in payload:
-                rule.enabled = bool(payload["enabled"])
-            session.flush()
-
-            return {
-                "id": rule.rule_id,
-                "name": rule.name,
-                "trigger": rule.trigger,
-                "comparator": rule.comparator,
-                "threshold": rule.threshold,
-                "action": rule.action,
-                "action_value": rule.action_value,
-                "enabled": rule.enabled,
-            }
+        with self.begin() as connection:
+            row = connection.execute(_update_rule_statement(rule_id, payload)).first()
+            return _rule_dict(row) if row is not None else None
 
     def toggle_automation_rule(self, rule_id: str, enabled: bool) -> Optional[dict]:
         with self.get_session() as session:
@@ -0,0 +1,97 @@
+"""
+Ingest Replay Filter
+
+ESP32 firmware retries a POST when the response times out, so the same
+reading can arrive more than once. ``ReplayFilter`` remembers the most
+recent ``(kind, timestamp)`` keys per device and reports repeats so the
+ingest handlers can acknowledge them without writing, broadcasting or
+re-running rules.
+
+Memory is bounded twice: each device keeps at most
+``max_keys_per_device`` keys (oldest evicted first) and at most
+``max_devices`` devices are tracked (least recently seen evicted first).
+The database write itself is ``ON CONFLICT DO NOTHING`` as the backstop
+for replays that outlive the cache.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Tuple
+
+from app.config import settings
+
+ReplayKey = Tuple[str, Hashable]
+
+
+class ReplayFilter:
+    """Bounded per-device cache of recently ingested reading keys."""
+
+    def __init__(self, max_keys_per_device: int = 64, max_devices: int = 10000) -> None:
+        self.max_keys_per_device = max_keys_per_device
+        self.max_devices = max_devices
+        self._devices: "OrderedDict[str, OrderedDict[ReplayKey, None]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.replays = 0
+
+    def seen(self, device_id: str, timestamp: Hashable, kind: str = "") -> bool:
+        """
+        Record a reading key and report whether it was already ingested.
+
+        Args:
+            device_id: Device identifier
+            timestamp: Reading timestamp as sent by the device
+            kind: Reading type, so different streams from one device do not collide
+
+        Returns:
+            bool: True if this key was seen recently (a replay)
+        """
+        key = (kind, timestamp)
+        with self._lock:
+            self.checked += 1
+            keys = self._devices.get(device_id)
+            if keys is None:
+                keys = self._devices[device_id] = OrderedDict()
+                while len(self._devices) > self.max_devices:
+                    self._devices.popitem(last=False)
+            else:
+                self._devices.move_to_end(device_id)
+
+            if key in keys:
+                self.replays += 1
+                return True
+
+            keys[key] = None
+            while len(keys) > self.max_keys_per_device:
+                keys.popitem(last=False)
+            return False
+
+    def forget(self, device_id: str, timestamp: Hashable, kind: str = "") -> None:
+        """Drop a key so a retry is processed again (used when the write failed)."""
+        with self._lock:
+            keys = self._devices.get(device_id)
+            if keys is not None:
+                keys.pop((kind, timestamp), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._devices.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "devices": len(self._devices),
+            "checked": self.checked,
+            "replays": self.replays,
+        }
+
+
+# Global replay filter shared by the ingest endpoints
+ingest_dedup = ReplayFilter(
+    max_keys_per_device=settings.INGEST_DEDUP_KEYS_PER_DEVICE,
+    max_devices=settings.INGEST_DEDUP_MAX_DEVICES,
+)
+
+
+__all__ = ["ReplayFilter", "ingest_dedup"]
@@ -0,0 +1,129 @@
+"""
+Device Registry Cache
+
+In-memory copy of the ``devices`` table so that the existence checks done
+by every ingest and control handler are dictionary lookups instead of ORM
+round trips.
+
+- Entries expire after ``ttl_seconds`` and are re-fetched on next access.
+- Unknown device IDs are remembered for ``negative_ttl_seconds`` so a flood
+  of readings from an unregistered device does not hit Postgres each time
+  (set it to 0 to disable the negative cache).
+- Writers that change device rows call ``update`` or ``invalidate``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# fetch(device_ids) returns device dicts keyed by device_id; missing IDs are omitted.
+DeviceFetcher = Callable[[List[str]], Dict[str, dict]]
+
+
+class DeviceRegistry:
+    """TTL cache of device rows with an optional bounded negative cache."""
+
+    def __init__(
+        self,
+        fetch: DeviceFetcher,
+        ttl_seconds: float = 300.0,
+        negative_ttl_seconds: float = 30.0,
+        max_negative_entries: int = 10000,
+    ) -> None:
+        self.fetch = fetch
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_negative_entries = max_negative_entries
+        self._devices: Dict[str, Tuple[dict, float]] = {}
+        self._missing: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, devices: Iterable[dict]) -> int:
+        """Replace the cache contents with a full snapshot of the devices table."""
+        expires = time.monotonic() + self.ttl_seconds
+        snapshot = {device['device_id']: (dict(device), expires) for device in devices}
+        with self._lock:
+            self._devices = snapshot
+            self._missing.clear()
+        return len(snapshot)
+
+    def get(self, device_id: str) -> Optional[dict]:
+        """Return a copy of the device row, or None if it is not registered."""
+        return self.get_many((device_id,)).get(device_id)
+
+    def get_many(self, device_ids: Iterable[str]) -> Dict[str, dict]:
+        """Return copies of the known device rows, fetching misses in one call."""
+        now = time.monotonic()
+        found: Dict[str, dict] = {}
+        to_fetch: List[str] = []
+        with self._lock:
+            for device_id in set(device_ids):
+                entry = self._devices.get(device_id)
+                if entry is not None and entry[1] > now:
+                    found[device_id] = dict(entry[0])
+                    continue
+                missing_until = self._missing.get(device_id)
+                if missing_until is not None and missing_until > now:
+                    continue
+                to_fetch.append(device_id)
+            self.hits += len(found)
+            self.misses += len(to_fetch)
+
+        if not to_fetch:
+            return found
+
+        fetched = self.fetch(to_fetch)
+        fetched_at = time.monotonic()
+        expires = fetched_at + self.ttl_seconds
+        with self._lock:
+            for device_id in to_fetch:
+                device = fetched.get(device_id)
+                if device is not None:
+                    self._devices[device_id] = (dict(device), expires)
+                    self._missing.pop(device_id, None)
+                    found[device_id] = dict(device)
+                else:
+                    self._devices.pop(device_id, None)
+                    self._remember_missing(device_id, fetched_at)
+        return found
+
+    def update(self, device_id: str, **fields) -> None:
+        """Apply a local change to a cached device row (no-op if not cached)."""
+        with self._lock:
+            entry = self._devices.get(device_id)
+            if entry is not None:
+                entry[0].update(fields)
+
+    def invalidate(self, device_id: Optional[str] = None) -> None:
+        """Forget one device (or everything) so the next lookup re-fetches it."""
+        with self._lock:
+            if device_id is None:
+                self._devices.clear()
+                self._missing.clear()
+            else:
+                self._devices.pop(device_id, None)
+                self._missing.pop(device_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "devices": len(self._devices),
+            "negative_entries": len(self._missing),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _remember_missing(self, device_id: str, now: float) -> None:
+        if self.negative_ttl_seconds <= 0:
+            return
+        self._missing[device_id] = now + self.negative_ttl_seconds
+        self._missing.move_to_end(device_id)
+        while len(self._missing) > self.max_negative_entries:
+            self._missing.popitem(last=False)
+
+
+__all__ = ["DeviceRegistry"]
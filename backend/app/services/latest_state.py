@@ -0,0 +1,163 @@
+"""
+Latest State Tracker
+
+Keeps ``device_latest_state`` (one row per device, one column per metric)
+current without a write per reading. Ingest merges each reading into an
+in-memory row for its device; a worker thread periodically upserts every
+pending row with one multi-row ``INSERT ... ON CONFLICT DO UPDATE``.
+
+Merging mirrors the upsert: a reading older than the device's pending row
+is ignored, and metrics absent from a reading (None, e.g. dropped by the
+ingest compressor) keep their previous value. Pending rows are also what
+reads overlay on the table, so "current state" is fresh between flushes.
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.services.background import PeriodicWorker
+from app.services.write_errors import write_isolating
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Metric columns of device_latest_state, as named in ingest payloads.
+LATEST_STATE_FIELDS = (
+    'temperature',
+    'humidity',
+    'pressure',
+    'light_level',
+    'light_lux',
+    'dimmer_brightness',
+    'daylight_harvest_mode',
+    'fan_on',
+    'relays',
+)
+
+# writer(rows) upserts merged rows, returning rows written.
+LatestStateWriter = Callable[[List[dict]], int]
+
+
+def merge_state(current: Optional[dict], reading: dict) -> dict:
+    """
+    Merge a reading into a latest-state row.
+
+    Args:
+        current: Existing row (device_id, time and metric columns) or None
+        reading: Row for a new reading; None metrics are "not reported"
+
+    Returns:
+        dict: The merged row (``current`` unchanged if the reading is older)
+    """
+    if current is None:
+        return {'device_id': reading['device_id'], 'time': reading['time'],
+                **{field: reading.get(field) for field in LATEST_STATE_FIELDS}}
+    if reading['time'] < current['time']:
+        return current
+    merged = dict(current)
+    merged['time'] = reading['time']
+    for field in LATEST_STATE_FIELDS:
+        value = reading.get(field)
+        if value is not None:
+            merged[field] = value
+    return merged
+
+
+def merge_states(rows: Iterable[dict]) -> Dict[str, dict]:
+    """Collapse readings to one merged row per device."""
+    merged: Dict[str, dict] = {}
+    for row in rows:
+        merged[row['device_id']] = merge_state(merged.get(row['device_id']), row)
+    return merged
+
+
+class LatestStateTracker(PeriodicWorker):
+    """Merges readings per device in memory and upserts them in bulk."""
+
+    def __init__(self, writer: LatestStateWriter, flush_interval_seconds: float = 2.0) -> None:
+        super().__init__("latest-state", flush_interval_seconds)
+        self.writer = writer
+        self._pending: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.rejected_rows = 0
+
+    def record(self, rows: Iterable[dict]) -> None:
+        """Merge reading rows (device_id, time and metric columns) into the pending state."""
+        with self._lock:
+            for row in rows:
+                self._pending[row['device_id']] = merge_state(self._pending.get(row['device_id']), row)
+                self.recorded += 1
+
+    def pending(self, device_id: Optional[str] = None) -> Dict[str, dict]:
+        """Pending rows, for all devices or just one."""
+        with self._lock:
+            if device_id is None:
+                return {key: dict(row) for key, row in self._pending.items()}
+            row = self._pending.get(device_id)
+            return {device_id: dict(row)} if row else {}
+
+    def flush(self) -> int:
+        """
+        Upsert all pending rows.
+
+        If the database is unreachable, the unwritten rows are merged back
+        for the next flush. Rows the database rejects (e.g. a device that
+        was deleted) are isolated from the batch, dropped and counted, so
+        the other devices are still written.
+        """
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        result = write_isolating(self.writer, list(batch.values()), "latest-state")
+        self.rejected_rows += len(result.rejected)
+        if result.retry:
+            self.failed_flushes += 1
+            logger.warning("Latest-state flush of %d devices failed: %s", len(result.retry), result.error)
+            with self._lock:
+                for row in result.retry:
+                    newer = self._pending.get(row['device_id'])
+                    self._pending[row['device_id']] = merge_state(row, newer) if newer else row
+        else:
+            self.flushes += 1
+        self.rows_written += result.written
+        return result.written
+
+    def run_once(self) -> None:
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failed_flushes": self.failed_flushes,
+            "rejected_rows": self.rejected_rows,
+        }
+
+
+def latest_state_dict(row: dict) -> dict:
+    """API shape of a latest-state row (ISO time)."""
+    time = row['time']
+    return {
+        'device_id': row['device_id'],
+        'time': time.isoformat() if isinstance(time, datetime) else time,
+        **{field: row.get(field) for field in LATEST_STATE_FIELDS},
+    }
+
+
+__all__ = [
+    "LATEST_STATE_FIELDS",
+    "LatestStateTracker",
+    "latest_state_dict",
+    "merge_state",
+    "merge_states",
+]
@@ -0,0 +1,134 @@
+"""
+Ingest Pipeline Stages
+
+An ingest request fans out into independent side effects: broadcast to
+dashboards, publish to the broker, persist, evaluate automation rules and
+refresh the device's last_seen. ``IngestPipeline.run`` executes one group
+of those stages concurrently and times each of them, so a handler can:
+
+- await the latency-sensitive group (broadcast, publish) before replying,
+- hand the slow group (persistence, rules, status) to FastAPI
+  ``BackgroundTasks`` so it runs after the response is sent.
+
+A stage is a zero-argument callable. Coroutine functions (including
+``functools.partial`` of one) are awaited on the event loop; plain
+functions are blocking database calls and run in the threadpool. Stages
+are best-effort: a failure is logged and returned, never raised, so one
+stage cannot cancel its siblings.
+
+Per-stage counts, errors and latency percentiles are reported under
+``ingest_stages`` in ``GET /health/metrics``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Mapping, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+Stage = Callable[[], Any]
+
+# Recent durations kept per stage for the percentile report.
+LATENCY_WINDOW = 512
+
+
+class _StageStats:
+    __slots__ = ("count", "errors", "total_ms", "max_ms", "recent")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.recent: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class IngestPipeline:
+    """Runs groups of independent ingest stages concurrently and times them."""
+
+    def __init__(self) -> None:
+        self._stages: Dict[str, _StageStats] = {}
+        self._lock = threading.Lock()
+
+    async def run(self, pipeline: str, stages: Mapping[str, Stage]) -> Dict[str, Optional[BaseException]]:
+        """
+        Run stages concurrently.
+
+        Args:
+            pipeline: Pipeline name, used as the metrics prefix (e.g. "room_node")
+            stages: Stage name to zero-argument callable
+
+        Returns:
+            Dict[str, Optional[BaseException]]: Each stage's exception, or None
+            if it succeeded
+        """
+        names = list(stages)
+        outcomes = await asyncio.gather(
+            *(self._run_stage(f"{pipeline}.{name}", stages[name]) for name in names)
+        )
+        return dict(zip(names, outcomes))
+
+    async def _run_stage(self, name: str, stage: Stage) -> Optional[BaseException]:
+        start = time.perf_counter()
+        error: Optional[BaseException] = None
+        try:
+            if inspect.iscoroutinefunction(stage):
+                await stage()
+            else:
+                await run_in_threadpool(stage)
+        except Exception as exc:
+            error = exc
+            logger.warning("Ingest stage %s failed: %s", name, exc)
+        self._record(name, (time.perf_counter() - start) * 1000, error is not None)
+        return error
+
+    def _record(self, name: str, elapsed_ms: float, failed: bool) -> None:
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageStats()
+            stats.count += 1
+            stats.errors += failed
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.recent.append(elapsed_ms)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage count, errors and latency (ms) over recent runs."""
+        with self._lock:
+            report = {}
+            for name, stats in sorted(self._stages.items()):
+                ordered = sorted(stats.recent)
+                report[name] = {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "avg_ms": round(stats.total_ms / stats.count, 3),
+                    "p50_ms": round(_percentile(ordered, 0.50), 3),
+                    "p95_ms": round(_percentile(ordered, 0.95), 3),
+                    "max_ms": round(stats.max_ms, 3),
+                }
+            return report
+
+
+# Global pipeline shared by the ingest endpoints
+ingest_pipeline = IngestPipeline()
+
+
+__all__ = ["IngestPipeline", "Stage", "ingest_pipeline"]
@@ -0,0 +1,147 @@
+"""
+Named Connection Pools
+
+The synchronous client used to share one pool between ingest writes,
+device lookups and history exports, so a long export could hold every
+connection while a door check waited. Work is now split across named
+pools, each with its own size, checkout timeout and per-connection
+``statement_timeout``:
+
+- ``realtime``: ingest writes, device/card lookups and background flushes;
+  small timeouts so a stalled database fails fast instead of queueing;
+- ``analytics``: history, rollup, downsampling and export reads; a longer
+  statement timeout, and optionally a read replica (``ANALYTICS_DATABASE_URL``).
+
+Callers name the pool per call (``db_client.get_session(POOL_ANALYTICS)``).
+Every checkout is timed; pool usage, checkout waits and timeouts are
+reported under ``db_pools`` in ``GET /health/metrics``.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, NamedTuple
+
+from sqlalchemy import create_engine, exc as sa_exc
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+POOL_REALTIME = "realtime"
+POOL_ANALYTICS = "analytics"
+
+
+class PoolConfig(NamedTuple):
+    """Sizing and timeouts for one named pool."""
+
+    url: str
+    size: int = 5
+    max_overflow: int = 10
+    timeout_seconds: float = 30.0
+    statement_timeout_ms: int = 0
+
+
+def _connect_args(statement_timeout_ms: int) -> Dict[str, Any]:
+    """libpq options that set ``statement_timeout`` on every new connection (0 disables)."""
+    if not statement_timeout_ms:
+        return {}
+    return {"options": f"-c statement_timeout={int(statement_timeout_ms)}"}
+
+
+class ConnectionPool:
+    """One engine/QueuePool with timed checkouts."""
+
+    def __init__(self, name: str, config: PoolConfig, replica: bool = False) -> None:
+        self.name = name
+        self.config = config
+        self.replica = replica
+        self.engine = create_engine(
+            config.url,
+            poolclass=QueuePool,
+            pool_size=config.size,
+            max_overflow=config.max_overflow,
+            pool_timeout=config.timeout_seconds,
+            pool_pre_ping=True,  # Verify connections before using
+            connect_args=_connect_args(config.statement_timeout_ms),
+            echo=False,  # Set to True for SQL logging
+        )
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _timed(self, checkout):
+        started = time.perf_counter()
+        try:
+            connection = checkout()
+        except sa_exc.TimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            if waited > self.wait_max:
+                self.wait_max = waited
+        return connection
+
+    def connect(self) -> Connection:
+        """Check out a Core connection (use as a context manager)."""
+        return self._timed(self.engine.connect)
+
+    def raw_connection(self):
+        """Check out a DBAPI connection (for COPY)."""
+        return self._timed(self.engine.raw_connection)
+
+    @contextmanager
+    def begin(self) -> Iterator[Connection]:
+        """Core connection inside a transaction; commits on success, rolls back on error."""
+        with self.connect() as connection, connection.begin():
+            yield connection
+
+    @contextmanager
+    def session(self) -> Iterator[Session]:
+        """Session on a connection from this pool; commits on success, rolls back on error."""
+        with self.connect() as connection:
+            session = self.SessionLocal(bind=connection)
+            try:
+                yield session
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+    def dispose(self) -> None:
+        self.engine.dispose()
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        with self._lock:
+            checkouts = self.checkouts
+            return {
+                "size": pool.size(),
+                "max_overflow": self.config.max_overflow,
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(self.wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "statement_timeout_ms": self.config.statement_timeout_ms,
+                "replica": self.replica,
+            }
+
+
+__all__ = [
+    "POOL_ANALYTICS",
+    "POOL_REALTIME",
+    "ConnectionPool",
+    "PoolConfig",
+]
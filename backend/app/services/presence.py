@@ -0,0 +1,87 @@
+"""
+Device Presence Tracker
+
+Coalesces the ``devices.last_seen`` heartbeat that every reading used to
+write individually. Readings only record a timestamp in memory; a worker
+thread periodically writes the newest timestamp per device with one bulk
+UPDATE. Status transitions (online/offline) bypass the tracker and are
+written immediately by ``DatabaseClient.update_device_status``.
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from app.services.background import PeriodicWorker
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# writer({device_id: last_seen}) persists the heartbeats, returning rows updated.
+LastSeenWriter = Callable[[Dict[str, datetime]], int]
+
+
+class PresenceTracker(PeriodicWorker):
+    """Collects last-seen timestamps and flushes them in bulk."""
+
+    def __init__(self, writer: LastSeenWriter, flush_interval_seconds: float = 5.0) -> None:
+        super().__init__("presence-tracker", flush_interval_seconds)
+        self.writer = writer
+        self._pending: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+        self.touches = 0
+        self.flushes = 0
+        self.rows_updated = 0
+        self.failed_flushes = 0
+
+    def touch(self, device_id: str, seen_at: Optional[datetime] = None) -> datetime:
+        """Record that ``device_id`` was seen (now, unless ``seen_at`` is given)."""
+        seen_at = seen_at or datetime.utcnow()
+        with self._lock:
+            previous = self._pending.get(device_id)
+            if previous is None or seen_at > previous:
+                self._pending[device_id] = seen_at
+            self.touches += 1
+        return seen_at
+
+    def pending(self) -> Dict[str, datetime]:
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self) -> int:
+        """Write all pending heartbeats; on failure keep them for the next flush."""
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        try:
+            updated = self.writer(batch)
+        except Exception as exc:
+            self.failed_flushes += 1
+            logger.warning("Presence flush of %d devices failed: %s", len(batch), exc)
+            with self._lock:
+                for device_id, seen_at in batch.items():
+                    current = self._pending.get(device_id)
+                    if current is None or seen_at > current:
+                        self._pending[device_id] = seen_at
+            return 0
+        self.flushes += 1
+        self.rows_updated += updated
+        return updated
+
+    def run_once(self) -> None:
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "touches": self.touches,
+            "flushes": self.flushes,
+            "rows_updated": self.rows_updated,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+__all__ = ["PresenceTracker"]
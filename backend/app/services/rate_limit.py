@@ -0,0 +1,141 @@
+"""
+Per-Device Rate Limiting
+
+In-memory token buckets keyed by device ID, so one ESP32 stuck in a reboot
+loop cannot flood ingest or its WebSocket and starve the other nodes.
+Each device type has its own sustained rate (messages per second) and
+burst; types without an entry use ``default``.
+
+Checks are a dictionary lookup and some arithmetic under a lock: no
+database work. Callers take the type from the device's registered row
+(see ``limit_type``), so a device gets the same limit on every route.
+Per-device counters make the noisy node easy to spot.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from app.config import settings
+
+DEFAULT_DEVICE_TYPE = "default"
+
+# Longest Retry-After sent back; a type limited to a rate of 0 never refills.
+MAX_RETRY_AFTER_SECONDS = 3600
+
+# (rate in messages/second, burst)
+BucketLimit = Tuple[float, float]
+
+
+def parse_rate_limits(spec: str) -> Dict[str, BucketLimit]:
+    """Parse ``"room_node=1:10,default=2:20"`` into ``{type: (rate, burst)}``."""
+    limits: Dict[str, BucketLimit] = {}
+    for item in (spec or "").split(","):
+        name, sep, value = item.partition("=")
+        rate, colon, burst = value.partition(":")
+        if not sep or not colon or not name.strip():
+            continue
+        try:
+            limits[name.strip()] = (float(rate), float(burst))
+        except ValueError:
+            continue
+    return limits
+
+
+def limit_type(device: Optional[dict]) -> str:
+    """Rate-limit type of a registered device row (``default`` if unknown)."""
+    return (device or {}).get("device_type") or DEFAULT_DEVICE_TYPE
+
+
+def retry_after_seconds(wait: float) -> int:
+    """Whole seconds for a Retry-After header, capped at ``MAX_RETRY_AFTER_SECONDS``."""
+    return math.ceil(min(wait, MAX_RETRY_AFTER_SECONDS))
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated", "allowed", "limited")
+
+    def __init__(self, burst: float, now: float) -> None:
+        self.tokens = burst
+        self.updated = now
+        self.allowed = 0
+        self.limited = 0
+
+
+class DeviceRateLimiter:
+    """Token bucket per device ID with limits per device type."""
+
+    def __init__(self, limits: Mapping[str, BucketLimit], max_devices: int = 10000) -> None:
+        self.limits = dict(limits)
+        self.limits.setdefault(DEFAULT_DEVICE_TYPE, (1.0, 10.0))
+        self.max_devices = max_devices
+        self._buckets: "OrderedDict[str, _Bucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, device_id: str, device_type: str = DEFAULT_DEVICE_TYPE, cost: float = 1.0) -> float:
+        """
+        Take ``cost`` tokens from the device's bucket.
+
+        Returns:
+            float: 0.0 if allowed, otherwise seconds until enough tokens refill
+        """
+        rate, burst = self.limits.get(device_type) or self.limits[DEFAULT_DEVICE_TYPE]
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(device_id)
+            if bucket is None:
+                bucket = self._buckets[device_id] = _Bucket(burst, now)
+                while len(self._buckets) > self.max_devices:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(device_id)
+                bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+                bucket.updated = now
+
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                bucket.allowed += 1
+                return 0.0
+            bucket.limited += 1
+            return (cost - bucket.tokens) / rate if rate > 0 else float("inf")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self, top: int = 10) -> Dict[str, object]:
+        """Totals plus the ``top`` devices with the most limited messages."""
+        with self._lock:
+            counts: List[Tuple[str, int, int]] = [
+                (device_id, bucket.allowed, bucket.limited)
+                for device_id, bucket in self._buckets.items()
+            ]
+        noisiest = sorted((c for c in counts if c[2]), key=lambda c: c[2], reverse=True)[:top]
+        return {
+            "devices": len(counts),
+            "allowed": sum(c[1] for c in counts),
+            "limited": sum(c[2] for c in counts),
+            "noisiest": [
+                {"device_id": device_id, "allowed": allowed, "limited": limited}
+                for device_id, allowed, limited in noisiest
+            ],
+        }
+
+
+# Global limiter shared by REST ingest and the device WebSocket
+device_rate_limiter = DeviceRateLimiter(parse_rate_limits(settings.DEVICE_RATE_LIMITS))
+
+
+__all__ = [
+    "DEFAULT_DEVICE_TYPE",
+    "MAX_RETRY_AFTER_SECONDS",
+    "DeviceRateLimiter",
+    "device_rate_limiter",
+    "limit_type",
+    "parse_rate_limits",
+    "retry_after_seconds",
+]
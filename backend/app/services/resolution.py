@@ -0,0 +1,145 @@
+"""
+History Resolution Planner
+
+Charts ask for "about N points between start and end" (or an explicit
+bucket width); nothing on screen needs more rows than pixels. The planner
+turns that into a bucket width and picks the cheapest source that can
+serve it:
+
+- ``raw``: the hypertable rows themselves, when buckets would be no wider
+  than the sampling interval (short ranges, zoomed-in charts);
+- ``hourly``: the ``*_hourly`` continuous aggregates, re-bucketed, for
+  widths that are whole hours (a month at 1h is 720 rows per series
+  instead of millions);
+- ``rollup_15m`` / ``rollup_1m``: the ingest-time rollup tiers
+  (app.services.rollups) for sub-hour widths they divide, when the range
+  lies within the tier's retention;
+- ``bucket``: an on-the-fly ``time_bucket`` rollup of raw rows otherwise.
+
+Widths derived from a point count are rounded up to a "nice" step (1m,
+5m, 15m, 1h, 6h, 1d, ...) so consecutive requests for a sliding window
+land on the same bucket boundaries. Whatever is asked for, a plan never
+returns more than ``max_points`` buckets.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from datetime import datetime
+from typing import Mapping, NamedTuple, Optional, Tuple, Union
+
+RESOLUTION_RAW = "raw"
+RESOLUTION_HOURLY = "hourly"
+RESOLUTION_BUCKET = "bucket"
+RESOLUTION_ROLLUP_1M = "rollup_1m"
+RESOLUTION_ROLLUP_15M = "rollup_15m"
+
+HOURLY_BUCKET_SECONDS = 3600
+DAY_SECONDS = 86400
+
+# Bucket widths (seconds) a point count is rounded up to.
+NICE_BUCKET_SECONDS = (
+    1, 2, 5, 10, 15, 30,
+    60, 120, 300, 600, 900, 1800,
+    3600, 7200, 10800, 21600, 43200,
+    86400, 172800, 604800,
+)
+
+_WIDTH_UNITS = {"s": 1, "m": 60, "h": 3600, "d": DAY_SECONDS, "w": 7 * DAY_SECONDS}
+_WIDTH_PATTERN = re.compile(r"^\s*(\d+)\s*([smhdw]?)\s*$")
+
+
+class ResolutionPlan(NamedTuple):
+    """Where to read a history range from, and at what bucket width."""
+
+    source: str
+    bucket_seconds: Optional[int]
+
+
+def parse_bucket_width(value: Union[str, int]) -> int:
+    """
+    Parse a bucket width such as ``"30s"``, ``"5m"``, ``"1h"``, ``"1d"``
+    or a plain number of seconds.
+
+    Raises:
+        ValueError: If the width is malformed or not positive
+    """
+    if isinstance(value, int):
+        seconds = value
+    else:
+        match = _WIDTH_PATTERN.match(value)
+        if not match:
+            raise ValueError(f"Invalid bucket width: {value!r}")
+        seconds = int(match.group(1)) * _WIDTH_UNITS[match.group(2) or "s"]
+    if seconds <= 0:
+        raise ValueError(f"Bucket width must be positive: {value!r}")
+    return seconds
+
+
+def nice_bucket_seconds(width: float) -> int:
+    """Smallest nice bucket width >= ``width`` (whole days beyond a week)."""
+    for step in NICE_BUCKET_SECONDS:
+        if step >= width:
+            return step
+    return int(math.ceil(width / DAY_SECONDS)) * DAY_SECONDS
+
+
+def plan_resolution(
+    start_time: datetime,
+    end_time: datetime,
+    points: Optional[int] = None,
+    bucket_seconds: Optional[int] = None,
+    raw_max_bucket_seconds: int = 10,
+    max_points: int = 5000,
+    rollup_tiers: Optional[Mapping[str, Tuple[int, datetime]]] = None,
+) -> ResolutionPlan:
+    """
+    Choose the source and bucket width for a history range.
+
+    Args:
+        start_time: Range start
+        end_time: Range end
+        points: Target number of points (rounded to a nice bucket width)
+        bucket_seconds: Explicit bucket width; widened only if it would
+            exceed ``max_points`` buckets
+        raw_max_bucket_seconds: Widths up to this are served from raw rows
+        max_points: Upper bound on buckets (or raw rows) returned
+        rollup_tiers: Rollup sources as source -> (bucket width, earliest
+            time still retained); the coarsest tier that divides the width
+            and covers ``start_time`` is used for sub-hour widths
+
+    Returns:
+        ResolutionPlan: ``bucket_seconds`` is None for raw plans
+    """
+    span = max((end_time - start_time).total_seconds(), 1.0)
+    floor = span / max_points
+    if bucket_seconds is not None and bucket_seconds >= floor:
+        width = bucket_seconds
+    else:
+        target = span / points if points else floor
+        width = nice_bucket_seconds(max(target, floor))
+
+    if width <= raw_max_bucket_seconds:
+        return ResolutionPlan(RESOLUTION_RAW, None)
+    if width % HOURLY_BUCKET_SECONDS == 0:
+        return ResolutionPlan(RESOLUTION_HOURLY, width)
+    tiers = sorted((rollup_tiers or {}).items(), key=lambda item: -item[1][0])
+    for source, (tier_width, retained_from) in tiers:
+        if width % tier_width == 0 and start_time >= retained_from:
+            return ResolutionPlan(source, width)
+    return ResolutionPlan(RESOLUTION_BUCKET, width)
+
+
+__all__ = [
+    "HOURLY_BUCKET_SECONDS",
+    "RESOLUTION_BUCKET",
+    "RESOLUTION_HOURLY",
+    "RESOLUTION_ROLLUP_15M",
+    "RESOLUTION_ROLLUP_1M",
+    "RESOLUTION_RAW",
+    "ResolutionPlan",
+    "nice_bucket_seconds",
+    "parse_bucket_width",
+    "plan_resolution",
+]
@@ -0,0 +1,272 @@
+"""
+Ingest-Time Rollup Tiers
+
+The hourly continuous aggregates lag real time by one to two hours
+(their refresh ``end_offset``), so charts of the last few hours would
+scan raw chunks. Instead, ingest keeps a count/sum/min/max/last
+accumulator per (device, metric) for each open 1-minute and 15-minute
+bucket. A worker thread upserts the buckets that have closed into the
+``sensor_rollup_1m`` / ``sensor_rollup_15m`` tables in bulk.
+
+Accumulators combine associatively, so:
+
+- a late reading for a bucket that has already been flushed opens a new
+  accumulator for it, and the upsert merges it with the stored row
+  (counts and sums add, min/max widen, ``last`` goes to the newer reading);
+- a flush that fails because the database is unreachable merges its
+  buckets back for the next attempt, up to ``max_requeue_buckets`` open
+  buckets per tier (the oldest failed buckets are dropped beyond that);
+- a bucket the database rejects is isolated from its batch and dropped,
+  so it cannot hold back the others;
+- ``stop()`` flushes open buckets too, and their remainder merges later.
+
+A bucket is closed once ``grace_seconds`` have passed since its end, which
+gives slightly delayed readings a chance to arrive first.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.services.background import PeriodicWorker
+from app.services.write_errors import write_isolating
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Metrics accumulated per bucket, as named in ingest payloads.
+ROLLUP_METRICS = (
+    'temperature',
+    'humidity',
+    'pressure',
+    'light_level',
+    'light_lux',
+    'dimmer_brightness',
+)
+
+# Tier name to bucket width in seconds.
+ROLLUP_TIERS: Mapping[str, int] = {'1m': 60, '15m': 900}
+
+# writer(tier, rows) upserts closed buckets, returning rows written.
+RollupWriter = Callable[[str, List[dict]], int]
+
+# (bucket start epoch, device_id, metric)
+_Key = Tuple[float, str, str]
+
+
+class _Bucket:
+    __slots__ = ("count", "sum", "min", "max", "last", "last_time")
+
+    def __init__(self, value: float, at: float) -> None:
+        self.count = 1
+        self.sum = self.min = self.max = self.last = value
+        self.last_time = at
+
+    def add(self, value: float, at: float) -> None:
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if at >= self.last_time:
+            self.last, self.last_time = value, at
+
+    def merge(self, other: "_Bucket") -> None:
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if other.last_time >= self.last_time:
+            self.last, self.last_time = other.last, other.last_time
+
+
+def _epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _row(key: _Key, bucket: _Bucket) -> dict:
+    start, device_id, metric = key
+    return {
+        'bucket': datetime.fromtimestamp(start, timezone.utc),
+        'device_id': device_id,
+        'metric': metric,
+        'count': bucket.count,
+        'sum': bucket.sum,
+        'min': bucket.min,
+        'max': bucket.max,
+        'last': bucket.last,
+        'last_time': datetime.fromtimestamp(bucket.last_time, timezone.utc),
+    }
+
+
+def _accumulate(
+    buckets: Dict[str, Dict[_Key, _Bucket]],
+    tiers: Mapping[str, int],
+    readings: Iterable[dict],
+) -> int:
+    """Add readings (device_id, time and metric fields) to per-tier buckets."""
+    recorded = 0
+    for reading in readings:
+        at = _epoch(reading['time'])
+        device_id = reading['device_id']
+        values = [
+            (metric, float(reading[metric]))
+            for metric in ROLLUP_METRICS
+            if reading.get(metric) is not None
+        ]
+        if not values:
+            continue
+        recorded += 1
+        for tier, width in tiers.items():
+            start = at - at % width
+            open_buckets = buckets[tier]
+            for metric, value in values:
+                key = (start, device_id, metric)
+                bucket = open_buckets.get(key)
+                if bucket is None:
+                    open_buckets[key] = _Bucket(value, at)
+                else:
+                    bucket.add(value, at)
+    return recorded
+
+
+def rollup_rows(readings: Iterable[dict], tiers: Mapping[str, int] = ROLLUP_TIERS) -> Dict[str, List[dict]]:
+    """Aggregate readings straight to rollup rows per tier (no open-bucket state)."""
+    buckets: Dict[str, Dict[_Key, _Bucket]] = {tier: {} for tier in tiers}
+    _accumulate(buckets, tiers, readings)
+    return {
+        tier: [_row(key, bucket) for key, bucket in open_buckets.items()]
+        for tier, open_buckets in buckets.items()
+    }
+
+
+class RollupAccumulator(PeriodicWorker):
+    """Per-device 1m/15m accumulators, flushed to rollup tables as buckets close."""
+
+    def __init__(
+        self,
+        writer: RollupWriter,
+        tiers: Mapping[str, int] = ROLLUP_TIERS,
+        flush_interval_seconds: float = 10.0,
+        grace_seconds: float = 5.0,
+        max_requeue_buckets: int = 50000,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        super().__init__("rollups", flush_interval_seconds)
+        self.writer = writer
+        self.tiers = dict(tiers)
+        self.grace_seconds = grace_seconds
+        self.max_requeue_buckets = max_requeue_buckets
+        self.clock = clock
+        self._open: Dict[str, Dict[_Key, _Bucket]] = {tier: {} for tier in self.tiers}
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.failed_flushes = 0
+        self.rejected_buckets = 0
+        self.dropped_buckets = 0
+
+    def record(self, readings: Iterable[dict]) -> int:
+        """Add readings (device_id, time and metric fields) to their open buckets."""
+        with self._lock:
+            recorded = _accumulate(self._open, self.tiers, readings)
+            self.recorded += recorded
+        return recorded
+
+    def flush(self, force: bool = False) -> int:
+        """
+        Upsert closed buckets (all buckets if ``force``).
+
+        If the database is unreachable, the unwritten buckets are merged
+        back for the next flush while the tier holds fewer than
+        ``max_requeue_buckets``; the oldest of the rest are dropped.
+        Buckets the database rejects are dropped. Both are counted.
+
+        Returns:
+            int: Rows written across tiers
+        """
+        cutoff = self.clock() - self.grace_seconds
+        with self._lock:
+            closed: Dict[str, Dict[_Key, _Bucket]] = {}
+            for tier, width in self.tiers.items():
+                open_buckets = self._open[tier]
+                keys = [key for key in open_buckets if force or key[0] + width <= cutoff]
+                if keys:
+                    closed[tier] = {key: open_buckets.pop(key) for key in keys}
+
+        written = 0
+        for tier, buckets in closed.items():
+            result = write_isolating(
+                lambda batch: self.writer(tier, [_row(key, bucket) for key, bucket in batch]),
+                list(buckets.items()), f"{tier} rollup",
+            )
+            written += result.written
+            self.rejected_buckets += len(result.rejected)
+            if not result.retry:
+                self.flushes += 1
+                continue
+            self.failed_flushes += 1
+            logger.warning("Rollup flush of %d %s buckets failed: %s", len(result.retry), tier, result.error)
+            self._requeue(tier, result.retry)
+        self.rows_written += written
+        return written
+
+    def _requeue(self, tier: str, buckets: List[Tuple[_Key, _Bucket]]) -> None:
+        """Merge failed buckets back, newest first, without growing past the cap."""
+        dropped = 0
+        with self._lock:
+            open_buckets = self._open[tier]
+            for key, bucket in sorted(buckets, key=lambda item: item[0][0], reverse=True):
+                newer = open_buckets.get(key)
+                if newer is not None:
+                    bucket.merge(newer)
+                elif len(open_buckets) >= self.max_requeue_buckets:
+                    dropped += 1
+                    continue
+                open_buckets[key] = bucket
+        if dropped:
+            self.dropped_buckets += dropped
+            logger.warning("Dropped %d %s rollup buckets over the re-queue limit", dropped, tier)
+
+    def run_once(self) -> None:
+        self.flush()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker and flush every bucket, open ones included."""
+        super().stop(timeout)
+        self.flush(force=True)
+
+    def open_buckets(self, tier: str, device_id: Optional[str] = None) -> List[dict]:
+        """Rows for the tier's not-yet-flushed buckets, oldest first."""
+        with self._lock:
+            return [
+                _row(key, bucket)
+                for key, bucket in sorted(self._open[tier].items())
+                if device_id is None or key[1] == device_id
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "open_buckets": {tier: len(buckets) for tier, buckets in self._open.items()},
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "failed_flushes": self.failed_flushes,
+            "rejected_buckets": self.rejected_buckets,
+            "dropped_buckets": self.dropped_buckets,
+        }
+
+
+__all__ = [
+    "ROLLUP_METRICS",
+    "ROLLUP_TIERS",
+    "RollupAccumulator",
+    "rollup_rows",
+]
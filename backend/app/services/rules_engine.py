@@ -6,7 +6,12 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from app.services import db_client, ws_manager
+from starlette.concurrency import run_in_threadpool
+
+from app.services import async_db_client, db_client, ws_manager
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 DEFAULT_RULESET = [
@@ -83,13 +88,13 @@ async def _execute_action(action: str, action_value: Any, context: Dict[str, Any
     if action == "set_dimmer":
         success = await ws_manager.send_dimmer_command(lighting_device, int(action_value))
         if success:
-            db_client.insert_dimmer_state(lighting_device, int(action_value))
+            await run_in_threadpool(db_client.insert_dimmer_state, lighting_device, int(action_value))
         return {"ok": success, "action": action, "value": action_value}
 
     if action == "set_fan":
         success = await ws_manager.send_fan_command(hvac_device, bool(action_value))
         if success:
-            db_client.insert_fan_state(hvac_device, bool(action_value))
+            await run_in_threadpool(db_client.insert_fan_state, hvac_device, bool(action_value))
         return {"ok": success, "action": action, "value": action_value}
 
     if action == "set_door_lock":
@@ -99,6 +104,7 @@ async def _execute_action(action: str, action_value: Any, context: Dict[str, Any
         )
         return {"ok": success, "action": action, "value": action_value}
 
+    logger.warning("Unsupported rule action: %s", action)
     return {"ok": False, "action": action, "error": "Unsupported action"}
 
 
@@ -106,7 +112,7 @@ async def evaluate_and_execute(context: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Evaluate enabled rules against incoming context and execute matching actions.
     """
-    rules = db_client.list_automation_rules()
+    rules = await async_db_client.list_automation_rules()
     results: List[Dict[str, Any]] = []
 
     for rule in rules:
@@ -129,6 +135,7 @@ async def evaluate_and_execute(context: Dict[str, Any]) -> List[Dict[str, Any]]:
 
         action_value = _normalize_action_value(rule.get("action"), rule.get("action_value"))
         execution = await _execute_action(rule.get("action"), action_value, context)
+        logger.debug("Rule %s matched: %s", rule.get("id"), execution)
         results.append(
             {
                 "rule_id": rule.get("id"),
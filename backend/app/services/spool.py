@@ -0,0 +1,441 @@
+"""
+Local Disk Spool
+
+When Postgres is unreachable, sensor rows that would otherwise be dropped
+are appended to an on-disk spool instead, and a background replayer
+writes them back in bulk once the database answers again.
+
+Layout: a directory of numbered segment files (``000000000042.seg``).
+Writes go to the newest (active) segment; once it reaches
+``segment_bytes`` a new one is started. Each record is one batch of rows
+for one table::
+
+    <u32 payload length> <u32 crc32> <f64 spooled-at epoch> <JSON payload>
+
+- Appends are single ``write`` calls; ``fsync`` is batched to at most one
+  per ``fsync_interval`` (the replayer's tick syncs whatever is left), so
+  a crash loses at most that window.
+- Segments are read through ``mmap``. A torn or corrupt record ends its
+  segment (the rest is counted as corrupt and skipped).
+- Disk use is bounded by ``max_bytes``: the oldest segments are evicted
+  first, and their records are counted as evicted.
+- Replay is at-least-once. The read position lives in memory, so after a
+  restart a half-replayed segment is replayed again; the writer must be
+  idempotent (``ON CONFLICT DO NOTHING`` against each table's unique key).
+- Only an unreachable database pauses replay. Rows the database rejects
+  (e.g. a device deleted since they were spooled) are isolated from their
+  batch, skipped and counted, so they cannot hold back later segments.
+
+Backlog (records, bytes, segments, oldest age), eviction and replay
+counters are reported under ``spool`` in ``GET /health/metrics``.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app.services.background import PeriodicWorker
+from app.services.write_errors import is_timeout, write_isolating
+from app.utils.logger import get_logger
+from app.utils.serialization import dumps, loads
+
+logger = get_logger(__name__)
+
+_HEADER = struct.Struct("<IId")
+SEGMENT_SUFFIX = ".seg"
+
+# writer(table, rows) persists replayed rows; must tolerate rows already stored.
+SpoolWriter = Callable[[str, List[dict]], Any]
+
+
+class _Segment:
+    __slots__ = ("seq", "path", "size", "records", "first_spooled_at")
+
+    def __init__(self, seq: int, path: str) -> None:
+        self.seq = seq
+        self.path = path
+        self.size = 0
+        self.records = 0
+        self.first_spooled_at: Optional[float] = None
+
+
+def _iter_records(buffer, start: int = 0) -> Iterator[Tuple[int, float, bytes]]:
+    """Yield (end offset, spooled-at, payload) until the end or the first bad record."""
+    offset = start
+    limit = len(buffer)
+    while offset + _HEADER.size <= limit:
+        length, crc, spooled_at = _HEADER.unpack_from(buffer, offset)
+        end = offset + _HEADER.size + length
+        if end > limit:
+            return
+        payload = bytes(buffer[offset + _HEADER.size:end])
+        if zlib.crc32(payload) != crc:
+            return
+        yield end, spooled_at, payload
+        offset = end
+
+
+class DiskSpool:
+    """Append-only, segment-based spool of row batches."""
+
+    def __init__(
+        self,
+        directory: str,
+        segment_bytes: int = 8 * 1024 * 1024,
+        max_bytes: int = 512 * 1024 * 1024,
+        fsync_interval_seconds: float = 0.2,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_interval_seconds = fsync_interval_seconds
+        self.clock = clock
+        self._segments: List[_Segment] = []
+        self._fd: Optional[int] = None
+        self._unsynced = False
+        self._last_sync = 0.0
+        self._lock = threading.Lock()
+        self._opened = False
+        self.appended_records = 0
+        self.evicted_records = 0
+        self.evicted_bytes = 0
+        self.corrupt_records = 0
+        self.syncs = 0
+
+    # Lifecycle
+
+    def open(self) -> None:
+        """Create the directory and index existing segments (idempotent)."""
+        with self._lock:
+            self._open_locked()
+
+    def _open_locked(self) -> None:
+        if self._opened:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(SEGMENT_SUFFIX):
+                continue
+            try:
+                seq = int(name[:-len(SEGMENT_SUFFIX)])
+            except ValueError:
+                continue
+            segment = _Segment(seq, os.path.join(self.directory, name))
+            self._index(segment)
+            self._segments.append(segment)
+        self._opened = True
+        if self._segments:
+            logger.info(
+                "Spool %s holds %d records in %d segments",
+                self.directory, self.backlog_records, len(self._segments),
+            )
+
+    def _index(self, segment: _Segment) -> None:
+        """Count a segment's records (via mmap) on startup."""
+        segment.size = os.path.getsize(segment.path)
+        if segment.size == 0:
+            return
+        with open(segment.path, "rb") as handle, \
+                mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            for _, spooled_at, _ in _iter_records(buffer):
+                segment.records += 1
+                if segment.first_spooled_at is None:
+                    segment.first_spooled_at = spooled_at
+
+    def close(self) -> None:
+        """fsync and close the active segment."""
+        with self._lock:
+            self._sync_locked()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    # Writing
+
+    def append(self, table: str, rows: List[dict]) -> None:
+        """Append one batch of rows for ``table`` (JSON-encoded; datetimes become ISO strings)."""
+        payload = dumps({"table": table, "rows": rows})
+        now = self.clock()
+        record = _HEADER.pack(len(payload), zlib.crc32(payload), now) + payload
+        with self._lock:
+            self._open_locked()
+            self._evict_locked(len(record))
+            segment = self._active_locked(len(record))
+            os.write(self._fd, record)
+            segment.size += len(record)
+            segment.records += 1
+            if segment.first_spooled_at is None:
+                segment.first_spooled_at = now
+            self.appended_records += 1
+            self._unsynced = True
+            if now - self._last_sync >= self.fsync_interval_seconds:
+                self._sync_locked()
+
+    def sync(self) -> None:
+        """fsync the active segment if anything was appended since the last sync."""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        if self._unsynced and self._fd is not None:
+            os.fsync(self._fd)
+            self.syncs += 1
+            self._unsynced = False
+        self._last_sync = self.clock()
+
+    def _active_locked(self, incoming: int) -> _Segment:
+        active = self._segments[-1] if self._fd is not None else None
+        if active is None or (active.size and active.size + incoming > self.segment_bytes):
+            self._roll_locked()
+            active = self._segments[-1]
+        return active
+
+    def _roll_locked(self) -> None:
+        """Close the active segment (if any) and start a new one."""
+        if self._fd is not None:
+            self._sync_locked()
+            os.close(self._fd)
+            self._fd = None
+        seq = self._segments[-1].seq + 1 if self._segments else 1
+        segment = _Segment(seq, os.path.join(self.directory, f"{seq:012d}{SEGMENT_SUFFIX}"))
+        self._fd = os.open(segment.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        self._segments.append(segment)
+
+    def _evict_locked(self, incoming: int) -> None:
+        """Delete oldest segments until ``incoming`` more bytes fit under max_bytes."""
+        while self.backlog_bytes and self.backlog_bytes + incoming > self.max_bytes:
+            oldest = self._segments[0]
+            if oldest is self._segments[-1] and self._fd is not None:
+                # Only the active segment is left: start over in a fresh one.
+                self._roll_locked()
+            self._segments.pop(0)
+            self.evicted_records += oldest.records
+            self.evicted_bytes += oldest.size
+            logger.warning(
+                "Spool full: evicted segment %d (%d records, %d bytes)",
+                oldest.seq, oldest.records, oldest.size,
+            )
+            self._remove(oldest.path)
+
+    # Reading
+
+    def closed_segments(self) -> List[Tuple[int, str]]:
+        """(seq, path) of segments ready to replay, oldest first; rolls a non-empty active segment."""
+        with self._lock:
+            self._open_locked()
+            if self._fd is not None and self._segments[-1].records:
+                self._sync_locked()
+                os.close(self._fd)
+                self._fd = None
+            return [
+                (segment.seq, segment.path)
+                for segment in self._segments
+                if not (segment is self._segments[-1] and self._fd is not None)
+            ]
+
+    def read(self, path: str, start: int = 0) -> Iterator[Tuple[int, str, List[dict]]]:
+        """
+        Yield (end offset, table, rows) for the records of a segment from ``start``.
+
+        A torn or corrupt tail ends the iteration.
+        """
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            return
+        with handle:
+            size = os.fstat(handle.fileno()).st_size
+            if size <= start:
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                offset = start
+                for offset, _, payload in _iter_records(buffer, start):
+                    record = loads(payload)
+                    yield offset, record["table"], record["rows"]
+                if offset < size:
+                    with self._lock:
+                        self.corrupt_records += 1
+                    logger.warning("Spool segment %s has %d unreadable bytes", path, size - offset)
+
+    def release(self, seq: int) -> None:
+        """Delete a fully replayed segment."""
+        with self._lock:
+            for index, segment in enumerate(self._segments):
+                if segment.seq == seq:
+                    if segment is self._segments[-1] and self._fd is not None:
+                        return
+                    self._segments.pop(index)
+                    self._remove(segment.path)
+                    return
+
+    def consumed(self, seq: int, records: int) -> None:
+        """Record that ``records`` records of a segment were replayed (for backlog counts)."""
+        with self._lock:
+            for segment in self._segments:
+                if segment.seq == seq:
+                    segment.records = max(segment.records - records, 0)
+                    return
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    # Metrics
+
+    @property
+    def backlog_records(self) -> int:
+        return sum(segment.records for segment in self._segments)
+
+    @property
+    def backlog_bytes(self) -> int:
+        return sum(segment.size for segment in self._segments)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            oldest = next(
+                (s.first_spooled_at for s in self._segments if s.records and s.first_spooled_at),
+                None,
+            )
+            return {
+                "backlog_records": self.backlog_records,
+                "backlog_bytes": self.backlog_bytes,
+                "segments": len(self._segments),
+                "oldest_age_seconds": round(self.clock() - oldest, 1) if oldest else None,
+                "appended_records": self.appended_records,
+                "evicted_records": self.evicted_records,
+                "evicted_bytes": self.evicted_bytes,
+                "corrupt_records": self.corrupt_records,
+                "syncs": self.syncs,
+            }
+
+
+class SpoolReplayer(PeriodicWorker):
+    """
+    Syncs the spool every tick and, when it holds a backlog, replays it
+    oldest segment first in batches of up to ``batch_rows`` rows.
+    """
+
+    def __init__(
+        self,
+        spool: DiskSpool,
+        writer: SpoolWriter,
+        interval_seconds: float = 0.2,
+        retry_seconds: float = 5.0,
+        batch_rows: int = 5000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__("spool-replayer", interval_seconds)
+        self.spool = spool
+        self.writer = writer
+        self.retry_seconds = retry_seconds
+        self.batch_rows = batch_rows
+        self.clock = clock
+        self._positions: Dict[int, int] = {}
+        self._retry_at = 0.0
+        self._replay_lock = threading.Lock()
+        self.replayed_records = 0
+        self.replayed_rows = 0
+        self.replay_failures = 0
+        self.rejected_rows = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def healthy(self) -> bool:
+        """False while the last replay attempt failed (the database is still down)."""
+        return self.last_error is None
+
+    def mark_unavailable(self, error: Exception) -> None:
+        """Record a failed database write; ``healthy`` stays False until a replay succeeds."""
+        self.last_error = str(error)
+
+    def run_once(self) -> None:
+        self.spool.sync()
+        if (self.spool.backlog_records or not self.healthy) and self.clock() >= self._retry_at:
+            self.replay()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the worker (final sync and replay attempt), then close the spool."""
+        super().stop(timeout)
+        self.spool.close()
+
+    def replay(self) -> int:
+        """
+        Replay the backlog until it is empty or the database is unreachable.
+
+        Returns:
+            int: Rows written
+        """
+        written = 0
+        with self._replay_lock:
+            for seq, path in self.spool.closed_segments():
+                batch: Dict[str, List[dict]] = {}
+                pending_rows = pending_records = 0
+                try:
+                    for end, table, rows in self.spool.read(path, self._positions.get(seq, 0)):
+                        batch.setdefault(table, []).extend(rows)
+                        pending_rows += len(rows)
+                        pending_records += 1
+                        if pending_rows >= self.batch_rows:
+                            written += self._write(batch)
+                            self._advance(seq, end, pending_records)
+                            batch, pending_rows, pending_records = {}, 0, 0
+                    if batch:
+                        written += self._write(batch)
+                        self._advance(seq, end, pending_records)
+                except Exception as exc:
+                    self.replay_failures += 1
+                    # A timed-out statement is retried later, but the
+                    # database is up: don't divert new writes to the spool.
+                    if not is_timeout(exc):
+                        self.last_error = str(exc)
+                    self._retry_at = self.clock() + self.retry_seconds
+                    logger.warning("Spool replay paused, will retry: %s", exc)
+                    return written
+                self._positions.pop(seq, None)
+                self.spool.release(seq)
+            self.last_error = None
+        if written:
+            logger.info("Replayed %d spooled rows", written)
+        return written
+
+    def _write(self, batch: Dict[str, List[dict]]) -> int:
+        """Write one batch; raises the error if the database went away or a statement timed out."""
+        written = 0
+        for table, rows in batch.items():
+            result = write_isolating(partial(self.writer, table), rows, f"spooled {table}")
+            written += result.written
+            self.rejected_rows += len(result.rejected)
+            if result.error is not None:
+                self.replayed_rows += written
+                raise result.error
+        self.replayed_rows += written
+        return written
+
+    def _advance(self, seq: int, offset: int, records: int) -> None:
+        self._positions[seq] = offset
+        self.replayed_records += records
+        self.spool.consumed(seq, records)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.spool.stats(),
+            "replayed_records": self.replayed_records,
+            "replayed_rows": self.replayed_rows,
+            "replay_failures": self.replay_failures,
+            "rejected_rows": self.rejected_rows,
+            "last_error": self.last_error,
+        }
+
+
+__all__ = ["DiskSpool", "SpoolReplayer"]
@@ -0,0 +1,238 @@
+"""
+TimescaleDB Storage Policies
+
+Schema bootstrap run by ``DatabaseClient.create_tables()`` after
+``create_all``. For each time-series table it idempotently makes sure:
+
+- the table has a unique index on its natural key, so replaying spooled
+  rows (``INSERT ... ON CONFLICT DO NOTHING``) is idempotent on databases
+  created before init.sql declared one;
+- the table is a hypertable (existing rows are migrated);
+- new chunks use an interval sized to the table's ingest rate, so one
+  chunk and its indexes stay small next to the Pi's RAM;
+- native compression is enabled, segmented by ``device_id`` and ordered
+  by time, with a policy compressing chunks older than ``compress_after``
+  (late offline-buffer uploads land in uncompressed chunks);
+- a retention policy drops chunks older than ``retain_for``.
+
+Existing compression or retention policies with a different interval are
+replaced, so changing the settings and restarting is enough. On a plain
+Postgres without the timescaledb extension the bootstrap is skipped.
+Each table is handled in its own transaction; a failure is logged and
+the remaining tables are still processed.
+"""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StoragePolicy(NamedTuple):
+    """Hypertable layout, compression and retention for one table."""
+
+    table: str
+    chunk_interval: timedelta
+    compress_after: timedelta
+    retain_for: timedelta
+    time_column: str = "time"
+    segment_by: str = "device_id"
+    order_by: str = "time DESC"
+    # Natural key rows are deduplicated on (empty: none)
+    unique_key: Tuple[str, ...] = ()
+
+
+def storage_policies() -> List[StoragePolicy]:
+    """Policies for the time-series tables, from settings."""
+    compress_after = timedelta(days=settings.STORAGE_COMPRESS_AFTER_DAYS)
+    retain_for = timedelta(days=settings.STORAGE_RETENTION_DAYS)
+    return [
+        # ~1 Hz per lighting node: one day per chunk
+        StoragePolicy("lighting_sensor_data", timedelta(days=1), compress_after, retain_for,
+                      unique_key=("device_id", "time")),
+        # Several rows per room-node reading (one per metric)
+        StoragePolicy("sensor_readings", timedelta(days=1), compress_after, retain_for,
+                      order_by="sensor_type, time DESC", unique_key=("device_id", "sensor_type", "time")),
+        # State changes: a few hundred rows a day
+        StoragePolicy("dimmer_state", timedelta(days=7), compress_after, retain_for,
+                      unique_key=("device_id", "time")),
+        StoragePolicy("fan_state", timedelta(days=7), compress_after, retain_for,
+                      unique_key=("device_id", "time")),
+        StoragePolicy("relay_state", timedelta(days=7), compress_after, retain_for,
+                      order_by="channel, time DESC", unique_key=("device_id", "channel", "time")),
+        # Door audit trail: low rate, kept longer
+        StoragePolicy("access_log", timedelta(days=30), compress_after,
+                      timedelta(days=settings.ACCESS_LOG_RETENTION_DAYS),
+                      time_column="timestamp", order_by="timestamp DESC, log_id"),
+    ]
+
+
+def _timescaledb_version(connection: Connection) -> Optional[str]:
+    return connection.execute(text(
+        "SELECT extversion FROM pg_extension WHERE extname = 'timescaledb'"
+    )).scalar()
+
+
+def _hypertable(connection: Connection, table: str):
+    return connection.execute(text(
+        "SELECT compression_enabled FROM timescaledb_information.hypertables "
+        "WHERE hypertable_schema = current_schema() AND hypertable_name = :table"
+    ), {"table": table}).first()
+
+
+def _primary_key(connection: Connection, table: str):
+    """(constraint name, key columns) of the table's primary key, or None."""
+    return connection.execute(text(
+        "SELECT c.conname, array_agg(a.attname::text) "
+        "FROM pg_constraint c "
+        "JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = ANY(c.conkey) "
+        "WHERE c.conrelid = to_regclass(:table) AND c.contype = 'p' "
+        "GROUP BY c.conname"
+    ), {"table": table}).first()
+
+
+def _ensure_unique_key(connection: Connection, policy: StoragePolicy) -> Optional[str]:
+    """Create a unique index on the policy's key unless one (or the primary key) covers it."""
+    existing = connection.execute(text(
+        "SELECT 1 FROM pg_index i "
+        "WHERE i.indrelid = to_regclass(:table) AND i.indisunique AND ARRAY("
+        "SELECT a.attname::text FROM pg_attribute a "
+        "WHERE a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) ORDER BY a.attname"
+        ") = :columns"
+    ), {"table": policy.table, "columns": sorted(policy.unique_key)}).first()
+    if existing is not None:
+        return None
+    columns = ", ".join(policy.unique_key)
+    try:
+        # Savepoint: rows stored before the key existed may already collide,
+        # which must not stop the rest of the policy.
+        with connection.begin_nested():
+            connection.execute(text(
+                f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{policy.table}_unique ON {policy.table} ({columns})"
+            ))
+    except Exception as exc:
+        logger.warning("Unique index on %s (%s) not created: %s", policy.table, columns, exc)
+        return None
+    return f"unique ({columns})"
+
+
+def _create_hypertable(connection: Connection, policy: StoragePolicy) -> List[str]:
+    actions = []
+    # Unique keys of a hypertable must include the time column
+    # (access_log has a serial log_id primary key).
+    key = _primary_key(connection, policy.table)
+    if key is not None and policy.time_column not in key[1]:
+        columns = ", ".join(list(key[1]) + [policy.time_column])
+        connection.execute(text(f'ALTER TABLE {policy.table} DROP CONSTRAINT "{key[0]}"'))
+        connection.execute(text(f"ALTER TABLE {policy.table} ADD PRIMARY KEY ({columns})"))
+        actions.append(f"primary key ({columns})")
+    connection.execute(text(
+        "SELECT create_hypertable(:table, :time_column, chunk_time_interval => :interval, "
+        "migrate_data => TRUE, if_not_exists => TRUE)"
+    ), {"table": policy.table, "time_column": policy.time_column, "interval": policy.chunk_interval})
+    actions.append("hypertable")
+    return actions
+
+
+def _ensure_policy(connection: Connection, policy: StoragePolicy, kind: str, after: timedelta) -> Optional[str]:
+    """Add a compression/retention policy, replacing one with a different interval."""
+    proc, key = {
+        "compression": ("policy_compression", "compress_after"),
+        "retention": ("policy_retention", "drop_after"),
+    }[kind]
+    current = connection.execute(text(
+        f"SELECT (config->>'{key}')::interval = :after FROM timescaledb_information.jobs "
+        "WHERE proc_name = :proc AND hypertable_schema = current_schema() AND hypertable_name = :table"
+    ), {"after": after, "proc": proc, "table": policy.table}).first()
+    if current is not None and current[0]:
+        return None
+    if current is not None:
+        connection.execute(text(f"SELECT remove_{kind}_policy(:table, if_exists => TRUE)"),
+                           {"table": policy.table})
+    connection.execute(text(f"SELECT add_{kind}_policy(:table, :after)"),
+                       {"table": policy.table, "after": after})
+    return f"{kind} after {after.days}d"
+
+
+def apply_storage_policy(connection: Connection, policy: StoragePolicy) -> List[str]:
+    """
+    Bring one table in line with its policy.
+
+    Returns:
+        List[str]: Changes made (empty if everything was already in place)
+    """
+    actions: List[str] = []
+    if policy.unique_key:
+        action = _ensure_unique_key(connection, policy)
+        if action:
+            actions.append(action)
+    hypertable = _hypertable(connection, policy.table)
+    if hypertable is None:
+        actions += _create_hypertable(connection, policy)
+        compression_enabled = False
+    else:
+        compression_enabled = bool(hypertable[0])
+    # Only affects chunks created from now on.
+    connection.execute(text("SELECT set_chunk_time_interval(:table, :interval)"),
+                       {"table": policy.table, "interval": policy.chunk_interval})
+
+    if not compression_enabled:
+        connection.execute(text(
+            f"ALTER TABLE {policy.table} SET (timescaledb.compress, "
+            f"timescaledb.compress_segmentby = '{policy.segment_by}', "
+            f"timescaledb.compress_orderby = '{policy.order_by}')"
+        ))
+        actions.append(f"compression by {policy.segment_by}")
+    for kind, after in (("compression", policy.compress_after), ("retention", policy.retain_for)):
+        action = _ensure_policy(connection, policy, kind, after)
+        if action:
+            actions.append(action)
+    return actions
+
+
+def bootstrap_storage(engine: Engine, policies: Optional[List[StoragePolicy]] = None) -> Dict[str, List[str]]:
+    """
+    Apply storage policies to every time-series table.
+
+    Args:
+        engine: Engine to run the DDL on
+        policies: Policies to apply (defaults to ``storage_policies()``)
+
+    Returns:
+        dict: Changes made per table (tables that failed are omitted)
+    """
+    with engine.connect() as connection:
+        version = _timescaledb_version(connection)
+    if version is None:
+        logger.warning("timescaledb extension not installed; storage policies skipped")
+        return {}
+
+    applied: Dict[str, List[str]] = {}
+    for policy in policies or storage_policies():
+        try:
+            with engine.begin() as connection:
+                # Migrating existing rows can outlast the pool's statement timeout.
+                connection.execute(text("SET LOCAL statement_timeout = 0"))
+                applied[policy.table] = apply_storage_policy(connection, policy)
+        except Exception as exc:
+            logger.error("Storage policy for %s failed: %s", policy.table, exc)
+            continue
+        if applied[policy.table]:
+            logger.info("Storage policy for %s: %s", policy.table, ", ".join(applied[policy.table]))
+    return applied
+
+
+__all__ = [
+    "StoragePolicy",
+    "apply_storage_policy",
+    "bootstrap_storage",
+    "storage_policies",
+]
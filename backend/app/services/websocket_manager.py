@@ -7,13 +7,20 @@ and frontend clients.
 
 from typing import Dict, List, Set, Tuple
 from fastapi import WebSocket
-import json
 from datetime import datetime
 import hashlib
 import hmac
 import secrets
 import time
 from app.config import settings
+from app.utils.logger import get_logger
+from app.utils.payloads import FORMAT_JSON, send_message
+from app.utils.serialization import dumps_text
+
+logger = get_logger(__name__)
+# Per-message loggers; sampled via LOG_SAMPLING so busy homes do not flood the log.
+broadcast_logger = get_logger("app.ws.broadcast")
+send_logger = get_logger("app.ws.send")
 
 
 class ConnectionManager:
@@ -28,20 +35,25 @@ class ConnectionManager:
         # Active client connections (frontend): Set of WebSocket objects
         self.client_connections: Set[WebSocket] = set()
         
+        # Wire format per device ("json" or "msgpack"), chosen at connect time
+        self.device_formats: Dict[str, str] = {}
+
         # Device state cache: {device_id: latest_state}
         self.device_state: Dict[str, dict] = {}
         self.active_challenges: Dict[str, float] = {}
     
-    async def connect_device(self, device_id: str, websocket: WebSocket):
+    async def connect_device(self, device_id: str, websocket: WebSocket, fmt: str = FORMAT_JSON):
         """
         Register a device WebSocket connection
         
         Args:
             device_id: Device identifier
             websocket: WebSocket connection
+            fmt: Wire format commands are sent in ("json" or "msgpack")
         """
         self.device_connections[device_id] = websocket
-        print(f"[WS] Device connected: {device_id}")
+        self.device_formats[device_id] = fmt
+        logger.info("Device connected: %s (%s)", device_id, fmt)
     
     async def connect_client(self, websocket: WebSocket):
         """
@@ -51,7 +63,7 @@ class ConnectionManager:
             websocket: WebSocket connection
         """
         self.client_connections.add(websocket)
-        print(f"[WS] Client connected. Total clients: {len(self.client_connections)}")
+        logger.info("Client connected. Total clients: %d", len(self.client_connections))
 
     @staticmethod
     def _canonical_auth_payload(role: str, client_id: str, nonce: str, issued_at: int) -> str:
@@ -112,7 +124,8 @@ class ConnectionManager:
         """
         if device_id in self.device_connections:
             del self.device_connections[device_id]
-            print(f"[WS] Device disconnected: {device_id}")
+            self.device_formats.pop(device_id, None)
+            logger.info("Device disconnected: %s", device_id)
     
     def disconnect_client(self, websocket: WebSocket):
         """
@@ -122,7 +135,7 @@ class ConnectionManager:
             websocket: WebSocket connection
         """
         self.client_connections.discard(websocket)
-        print(f"[WS] Client disconnected. Total clients: {len(self.client_connections)}")
+        logger.info("Client disconnected. Total clients: %d", len(self.client_connections))
     
     async def send_to_device(self, device_id: str, message: dict) -> bool:
         """
@@ -136,16 +149,17 @@ class ConnectionManager:
             bool: True if sent successfully, False if device offline
         """
         if device_id not in self.device_connections:
-            print(f"[WS] Device {device_id} not connected")
+            # Routine for rule actions aimed at an offline device; callers see False
+            send_logger.debug("Device %s not connected", device_id)
             return False
         
         try:
             websocket = self.device_connections[device_id]
-            await websocket.send_text(json.dumps(message))
-            print(f"[WS] Sent to {device_id}: {message}")
+            await send_message(websocket, message, self.device_formats.get(device_id, FORMAT_JSON))
+            send_logger.debug("Sent to %s: %s", device_id, message)
             return True
         except Exception as e:
-            print(f"[WS] Error sending to {device_id}: {e}")
+            send_logger.warning("Error sending to %s: %s", device_id, e)
             self.disconnect_device(device_id)
             return False
     
@@ -162,14 +176,14 @@ class ConnectionManager:
         # Add timestamp to message
         message['broadcast_time'] = datetime.utcnow().isoformat()
         
-        json_message = json.dumps(message)
+        json_message = dumps_text(message)
         disconnected = set()
         
         for websocket in self.client_connections:
             try:
                 await websocket.send_text(json_message)
             except Exception as e:
-                print(f"[WS] Error broadcasting to client: {e}")
+                broadcast_logger.warning("Error broadcasting to client: %s", e)
                 disconnected.add(websocket)
         
         # Remove disconnected clients
@@ -177,7 +191,7 @@ class ConnectionManager:
             self.disconnect_client(websocket)
         
         if self.client_connections:
-            print(f"[WS] Broadcasted to {len(self.client_connections)} clients")
+            broadcast_logger.debug("Broadcasted to %d clients", len(self.client_connections))
     
     async def handle_device_message(self, device_id: str, message: dict):
         """
@@ -187,11 +201,7 @@ class ConnectionManager:
             device_id: Device identifier
             message: Message from device
         """
-        # Update device state cache
-        self.device_state[device_id] = {
-            **message,
-            'last_update': datetime.utcnow().isoformat()
-        }
+        self.coalesce_device_message(device_id, message)
         
         # Broadcast to all connected clients
         await self.broadcast_to_clients({
@@ -200,6 +210,22 @@ class ConnectionManager:
             'data': message
         })
     
+    def coalesce_device_message(self, device_id: str, message: dict):
+        """
+        Update the cached device state without broadcasting
+        
+        Used directly for messages over a device's rate limit, so the newest
+        state is still served to clients that ask for it.
+        
+        Args:
+            device_id: Device identifier
+            message: Message from device
+        """
+        self.device_state[device_id] = {
+            **message,
+            'last_update': datetime.utcnow().isoformat()
+        }
+    
     def get_device_state(self, device_id: str) -> dict:
         """
         Get cached state for a device
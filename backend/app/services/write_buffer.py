@@ -0,0 +1,204 @@
+"""
+Write-Behind Buffer
+
+Group-commit queue for high-rate sensor and state rows. Instead of opening
+a session and committing once per reading, callers submit rows here and a
+background thread writes everything accumulated for a table in a single
+transaction every ``flush_interval_ms`` or as soon as ``batch_size`` rows
+are waiting for one table.
+
+The buffer is bounded: once ``max_depth`` rows are pending, the submitting
+caller flushes inline (backpressure). If the database is down and the
+flush fails, the oldest rows are dropped so memory stays bounded. Rows
+the database rejects (constraint violations, invalid values) are dropped
+and counted instead of being retried.
+
+Callers that must know their rows were stored (an ingest handler that
+answers 500 so the device retries) use ``submit_acked``: it wakes the
+worker and returns a future that resolves once the flush holding those
+rows has committed, or fails if they were rejected, dropped or could not
+be written yet. Rows submitted while a flush is running share the next
+one, so concurrent requests are still group-committed.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Iterable, List, Optional
+
+from app.services.background import PeriodicWorker
+from app.services.write_errors import write_isolating
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# writer(table_name, rows) persists rows for one table in one transaction.
+BatchWriter = Callable[[str, List[dict]], None]
+
+
+class WriteRejected(Exception):
+    """Acknowledged rows were rejected by the database or dropped by the buffer."""
+
+
+class WriteBehindBuffer(PeriodicWorker):
+    """Bounded per-table row buffer flushed in batches by a worker thread."""
+
+    def __init__(
+        self,
+        writer: BatchWriter,
+        flush_interval_ms: int = 500,
+        batch_size: int = 200,
+        max_depth: int = 10000,
+    ) -> None:
+        super().__init__("write-buffer", flush_interval_ms / 1000.0)
+        self.writer = writer
+        self.batch_size = batch_size
+        self.max_depth = max_depth
+        self._pending: Dict[str, Deque[dict]] = {}
+        self._depth = 0
+        # Acknowledgement per acked row, keyed by id(row) while it is queued
+        self._acks: Dict[int, Future] = {}
+        self._lock = threading.Lock()
+        # Serialises flushes between the worker thread and inline flushes.
+        self._flush_lock = threading.Lock()
+        self.rows_written = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped_rows = 0
+        self.rejected_rows = 0
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    def submit(self, table: str, row: dict) -> None:
+        """Queue one row for ``table``."""
+        self.submit_many(table, (row,))
+
+    def submit_many(self, table: str, rows: Iterable[dict]) -> None:
+        """Queue several rows for ``table``."""
+        self._submit(table, rows, None)
+
+    def submit_acked(self, table: str, rows: Iterable[dict]) -> Future:
+        """
+        Queue rows for ``table`` and flush them as soon as the worker is free.
+
+        Returns:
+            Future: Resolves to None once every row is committed. Fails with
+            ``WriteRejected`` if a row was rejected or dropped, or with the
+            database error if the flush could not reach the database (the
+            rows stay queued and are retried).
+        """
+        ack: Future = Future()
+        ack.set_running_or_notify_cancel()
+        self._submit(table, rows, ack)
+        return ack
+
+    def _submit(self, table: str, rows: Iterable[dict], ack: Optional[Future]) -> None:
+        with self._lock:
+            queue = self._pending.setdefault(table, deque())
+            before = len(queue)
+            queue.extend(rows)
+            self._depth += len(queue) - before
+            if ack is not None:
+                for index in range(before, len(queue)):
+                    self._acks[id(queue[index])] = ack
+            table_full = len(queue) >= self.batch_size
+            over_capacity = self._depth >= self.max_depth
+
+        if ack is not None and before == len(queue):
+            ack.set_result(None)
+        if over_capacity:
+            self.flush()
+            self._shed_overflow()
+        elif table_full or ack is not None:
+            self.wake()
+
+    def flush(self) -> int:
+        """
+        Write every pending row, one transaction per table.
+
+        If the database is unreachable, the unwritten rows for a table are
+        put back at the front of its queue so the next flush retries them.
+        A batch failing for data reasons (e.g. an unknown device_id) is
+        bisected: the good rows are written and the bad ones rejected and
+        counted, so they never block the rows queued behind them.
+
+        Returns:
+            int: Number of rows written
+        """
+        written = 0
+        with self._flush_lock:
+            with self._lock:
+                batches = {table: list(queue) for table, queue in self._pending.items() if queue}
+                for table in batches:
+                    self._pending[table].clear()
+                self._depth = 0
+                acks = {}
+                if self._acks:
+                    for rows in batches.values():
+                        for row in rows:
+                            ack = self._acks.pop(id(row), None)
+                            if ack is not None:
+                                acks[id(row)] = ack
+
+            for table, rows in batches.items():
+                result = write_isolating(lambda batch: self.writer(table, batch), rows, table)
+                written += result.written
+                if result.rejected:
+                    self.rejected_rows += len(result.rejected)
+                    _fail_acks(acks, result.rejected, WriteRejected(f"{table} rows rejected by the database"))
+                if result.retry:
+                    self.failed_flushes += 1
+                    logger.warning("Write-behind flush of %d %s rows failed: %s",
+                                   len(result.retry), table, result.error)
+                    _fail_acks(acks, result.retry, result.error)
+                    with self._lock:
+                        self._pending[table].extendleft(reversed(result.retry))
+                        self._depth += len(result.retry)
+
+            for ack in set(acks.values()):
+                if not ack.done():
+                    ack.set_result(None)
+
+            if batches:
+                self.flushes += 1
+                self.rows_written += written
+        return written
+
+    def run_once(self) -> None:
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": self._depth,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped_rows": self.dropped_rows,
+            "rejected_rows": self.rejected_rows,
+        }
+
+    def _shed_overflow(self) -> None:
+        """Drop the oldest rows (largest table first) until under max_depth."""
+        with self._lock:
+            while self._depth >= self.max_depth:
+                queue = max(self._pending.values(), key=len)
+                ack = self._acks.pop(id(queue.popleft()), None)
+                if ack is not None and not ack.done():
+                    ack.set_exception(WriteRejected("rows dropped: write-behind buffer full"))
+                self._depth -= 1
+                self.dropped_rows += 1
+
+
+def _fail_acks(acks: Dict[int, Future], rows: List[dict], error: BaseException) -> None:
+    """Fail the acknowledgements covering ``rows`` (first error wins)."""
+    for row in rows:
+        ack = acks.get(id(row))
+        if ack is not None and not ack.done():
+            ack.set_exception(error)
+
+
+__all__ = ["WriteBehindBuffer", "WriteRejected"]
@@ -0,0 +1,105 @@
+"""
+Write Failure Handling
+
+Background writers (write-behind buffer, latest-state tracker, rollup
+accumulator, spool replayer) keep a failed batch for a later retry only
+when the database could not be reached. Any other failure is caused by
+the rows themselves (a foreign-key violation from an unregistered
+device, an out-of-range value) and would fail again on every retry,
+holding back everything queued behind it. ``write_isolating`` bisects
+such a batch so the good rows are still written and only the offending
+rows are rejected.
+
+A statement cancelled by ``statement_timeout`` is neither: the database
+is up but busy. Its rows are kept for a later retry, but it does not
+count as an outage, so writers do not start spooling to disk over one
+slow statement.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, List, NamedTuple, Optional, Sequence
+
+import psycopg2
+from psycopg2.errors import QueryCanceled
+from sqlalchemy import exc as sa_exc
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Errors meaning "the database is unreachable" rather than "this batch is bad".
+_UNAVAILABLE_ERRORS = (
+    sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.DisconnectionError,
+    sa_exc.TimeoutError, psycopg2.OperationalError, psycopg2.InterfaceError,
+)
+
+
+def is_timeout(error: BaseException) -> bool:
+    """Whether a statement was cancelled by ``statement_timeout`` (raw or wrapped by SQLAlchemy)."""
+    return isinstance(error, QueryCanceled) or isinstance(getattr(error, 'orig', None), QueryCanceled)
+
+
+def is_unavailable(error: BaseException) -> bool:
+    """Whether a write failed because the database could not be reached."""
+    # QueryCanceled subclasses psycopg2.OperationalError
+    if is_timeout(error):
+        return False
+    return isinstance(error, _UNAVAILABLE_ERRORS) or getattr(error, 'connection_invalidated', False)
+
+
+class IsolatedWrite(NamedTuple):
+    """Outcome of ``write_isolating``."""
+
+    written: int
+    # Rows that failed on their own for data reasons
+    rejected: List[Any]
+    # Rows not written because the database became unreachable or a statement
+    # timed out (keep for retry)
+    retry: List[Any]
+    error: Optional[BaseException]
+
+
+def write_isolating(write: Callable[[List[Any]], Any], rows: Sequence[Any], label: str = "rows") -> IsolatedWrite:
+    """
+    Write ``rows``, bisecting a batch that fails for data reasons.
+
+    A batch that fails with anything other than an unavailability error is
+    split in halves and each half written separately, down to single rows;
+    single rows that still fail are rejected (and logged). An
+    unavailability error or a statement timeout stops the write: the rows
+    not yet written are returned in ``retry``, in their original order.
+
+    Args:
+        write: Writes one batch in one transaction
+        rows: Rows to write
+        label: What the rows are, for log messages
+
+    Returns:
+        IsolatedWrite: Rows written, rejected rows, rows to retry and the
+            unavailability or timeout error (if any)
+    """
+    written = 0
+    rejected: List[Any] = []
+    # Stack of batches still to write; the next one is at the end.
+    pending: List[List[Any]] = [list(rows)] if rows else []
+    while pending:
+        batch = pending.pop()
+        try:
+            write(batch)
+        except Exception as exc:
+            if is_unavailable(exc) or is_timeout(exc):
+                retry = [row for part in [batch] + pending[::-1] for row in part]
+                return IsolatedWrite(written, rejected, retry, exc)
+            if len(batch) == 1:
+                logger.warning("Rejected %s row that cannot be written: %s", label, exc)
+                rejected.extend(batch)
+                continue
+            middle = len(batch) // 2
+            pending.extend((batch[middle:], batch[:middle]))
+            continue
+        written += len(batch)
+    return IsolatedWrite(written, rejected, [], None)
+
+
+__all__ = ["IsolatedWrite", "is_timeout", "is_unavailable", "write_isolating"]
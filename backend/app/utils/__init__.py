@@ -1,4 +1,6 @@
 """Utilities Package - Helper Functions"""
+from .logger import get_logger, setup_logging, shutdown_logging
+from .serialization import FastJSONResponse
+
 # TODO: Import utility functions here
-# from .logger import setup_logger
 # from .crypto import hash_password, verify_password
@@ -0,0 +1,86 @@
+"""
+Largest-Triangle-Three-Buckets Downsampling
+
+LTTB (Steinarsson, 2013) reduces a series to ``threshold`` points that
+keep its visual shape: the first and last points are kept, the rest are
+split into ``threshold - 2`` equal-count buckets, and each bucket keeps
+the point forming the largest triangle with the previously kept point and
+the mean of the next bucket. Unlike averaging, peaks and dips survive, and
+every output point is a real reading.
+
+Selection is inherently sequential (each bucket depends on the point kept
+in the one before), so the loop runs once per *output* point; everything
+per *input* point - bucket edges, next-bucket means, triangle areas - is
+a NumPy array operation. Output matches the reference algorithm exactly.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Sequence
+
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Indices of the points LTTB keeps.
+
+    Args:
+        x: Sorted x values (e.g. epoch seconds)
+        y: y values, same length as ``x``, without NaNs
+        threshold: Number of points to keep
+
+    Returns:
+        np.ndarray: Ascending int64 indices into ``x``/``y``; all indices if
+        the series already has ``threshold`` points or fewer (or
+        ``threshold`` < 3)
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n, dtype=np.int64)
+
+    every = (n - 2) / (threshold - 2)
+    # Bucket i (0 .. threshold-3) is [edges[i], edges[i+1]); edges[-2] is the
+    # last point and edges[-1] is n.
+    edges = np.floor(np.arange(threshold) * every).astype(np.int64) + 1
+    edges[-1] = n
+
+    # Mean of the bucket after each bucket (the final point for the last one).
+    next_starts = edges[1:-1]
+    counts = np.diff(edges[1:])
+    mean_x = np.add.reduceat(x, next_starts) / counts
+    mean_y = np.add.reduceat(y, next_starts) / counts
+
+    bounds = edges.tolist()
+    mean_x = mean_x.tolist()
+    mean_y = mean_y.tolist()
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        ax, ay = x[a], y[a]
+        # Twice the triangle area; argmax keeps the first maximum, as the reference does.
+        areas = np.abs((ax - mean_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (mean_y[i] - ay))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def stack_batches(batches: Iterable[Sequence[tuple]], columns: int) -> np.ndarray:
+    """
+    Stack batches of row tuples into one float64 array, one column per field.
+
+    None becomes NaN and booleans 0/1, so a database cursor can be drained
+    batch by batch into 8 bytes per value instead of a dict per row.
+    """
+    arrays = [np.array(batch, dtype=np.float64).reshape(-1, columns) for batch in batches if len(batch)]
+    if not arrays:
+        return np.empty((0, columns), dtype=np.float64)
+    return np.concatenate(arrays)
+
+
+__all__ = ["lttb_indices", "stack_batches"]
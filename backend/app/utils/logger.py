@@ -0,0 +1,120 @@
+"""
+Logging Setup
+
+Structured, leveled logging for the backend. Hot paths log through the
+standard ``logging`` module instead of ``print()``:
+
+- The level comes from ``Settings.LOG_LEVEL``.
+- Records are handed to a ``QueueHandler`` and written to stdout by a
+  ``QueueListener`` thread, so a slow stdout (journald on the Pi) never
+  blocks the event loop.
+- High-frequency loggers (e.g. one line per broadcast) can be sampled so
+  only one record in N is emitted. Warnings and errors are never sampled.
+
+Modules get their logger with ``get_logger(__name__)``; everything lives
+under the ``app`` logger namespace.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Dict, Optional
+
+APP_LOGGER = "app"
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class SamplingFilter(logging.Filter):
+    """Pass one in every ``every`` records below WARNING; pass WARNING+ always."""
+
+    def __init__(self, every: int) -> None:
+        super().__init__()
+        self.every = max(1, int(every))
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            keep = next(self._counter) % self.every == 0
+            if not keep:
+                self.suppressed += 1
+        if keep and self.every > 1:
+            record.msg = f"{record.msg} (sampled 1/{self.every})"
+        return keep
+
+
+def parse_sampling(spec: str) -> Dict[str, int]:
+    """Parse ``"app.ws.broadcast=100,app.ws.send=20"`` into ``{name: every}``."""
+    rates: Dict[str, int] = {}
+    for item in (spec or "").split(","):
+        name, sep, every = item.partition("=")
+        if sep and name.strip() and every.strip().isdigit():
+            rates[name.strip()] = int(every)
+    return rates
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a logger in the ``app`` namespace."""
+    if name != APP_LOGGER and not name.startswith(APP_LOGGER + "."):
+        name = f"{APP_LOGGER}.{name}"
+    return logging.getLogger(name)
+
+
+def setup_logging(level: str = "INFO", sampling: str = "") -> logging.handlers.QueueListener:
+    """
+    Configure the ``app`` logger with a non-blocking queue handler.
+
+    Safe to call more than once; the previous listener is stopped first.
+
+    Args:
+        level: Log level name (e.g. "DEBUG", "INFO")
+        sampling: Comma-separated ``logger=N`` pairs for sampled loggers
+
+    Returns:
+        QueueListener: The running listener (stopped by ``shutdown_logging``)
+    """
+    global _listener
+    shutdown_logging()
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    app_logger = logging.getLogger(APP_LOGGER)
+    for handler in list(app_logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            app_logger.removeHandler(handler)
+    app_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    app_logger.setLevel(level.upper())
+    app_logger.propagate = False
+
+    for name, every in parse_sampling(sampling).items():
+        sampled = logging.getLogger(name)
+        for existing in [f for f in sampled.filters if isinstance(f, SamplingFilter)]:
+            sampled.removeFilter(existing)
+        sampled.addFilter(SamplingFilter(every))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Stop the queue listener, flushing any records still queued."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+__all__ = ["SamplingFilter", "get_logger", "parse_sampling", "setup_logging", "shutdown_logging"]
@@ -0,0 +1,41 @@
+"""
+Keyset Pagination Cursors
+
+History pages are keyset-paginated on ``(device_id, time)``: the cursor
+names the last row of a page and the next page starts strictly after it.
+Cursors are opaque to clients (URL-safe base64 of a small JSON object) so
+the key can grow without breaking them.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Tuple
+
+from app.utils.serialization import dumps, loads
+
+
+def encode_cursor(device_id: str, time: datetime) -> str:
+    """Cursor pointing just past the row ``(device_id, time)``."""
+    raw = dumps({"d": device_id, "t": time.isoformat()})
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, datetime]:
+    """
+    Decode a cursor produced by ``encode_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = loads(raw)
+        return data["d"], datetime.fromisoformat(data["t"])
+    except (binascii.Error, KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from exc
+
+
+__all__ = ["decode_cursor", "encode_cursor"]
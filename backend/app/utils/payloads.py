@@ -0,0 +1,170 @@
+"""
+Payload Formats
+
+Content negotiation between JSON and MessagePack for device traffic.
+MessagePack carries the same maps as the JSON payloads with smaller
+frames and cheaper parsing on the ESP32.
+
+REST: routes built with ``NegotiatedRoute`` accept a MessagePack body
+(``Content-Type: application/msgpack``) and answer in MessagePack when the
+request sends ``Accept: application/msgpack``. Validation is unchanged; the
+decoded map goes through the same Pydantic models as a JSON body.
+
+WebSocket: a device selects MessagePack with the ``msgpack`` subprotocol or
+``?format=msgpack``. Every frame on that socket, including the auth
+handshake and commands, is then a binary MessagePack frame.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Coroutine, Optional
+
+import msgpack
+from fastapi import Request, Response, WebSocket
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute, get_request_handler
+from starlette.responses import JSONResponse
+from starlette.websockets import WebSocketDisconnect
+
+from app.utils.serialization import dumps_text, loads
+
+FORMAT_JSON = "json"
+FORMAT_MSGPACK = "msgpack"
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = {MSGPACK_MEDIA_TYPE, "application/x-msgpack", "application/vnd.msgpack"}
+
+
+def _media_types(header: Optional[str]):
+    for part in (header or "").split(","):
+        yield part.split(";", 1)[0].strip().lower()
+
+
+def is_msgpack(content_type: Optional[str]) -> bool:
+    """True if a Content-Type header names MessagePack."""
+    return next(_media_types(content_type), "") in MSGPACK_MEDIA_TYPES
+
+
+def wants_msgpack(accept: Optional[str]) -> bool:
+    """True if an Accept header lists a MessagePack media type."""
+    return any(media_type in MSGPACK_MEDIA_TYPES for media_type in _media_types(accept))
+
+
+def pack(obj: Any) -> bytes:
+    return msgpack.packb(obj, use_bin_type=True)
+
+
+def unpack(data: bytes) -> Any:
+    return msgpack.unpackb(data, raw=False)
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def render(self, content: Any) -> bytes:
+        return pack(content)
+
+
+class _MsgPackRequest(Request):
+    """Request whose ``json()`` decodes a MessagePack body."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = unpack(await self.body())
+        return self._json
+
+
+def _json_content_type_scope(scope: dict) -> dict:
+    # FastAPI only hands the body to ``request.json()`` for JSON content
+    # types, so the decoded request presents itself as one.
+    headers = [(k, v) for k, v in scope["headers"] if k != b"content-type"]
+    headers.append((b"content-type", b"application/json"))
+    return {**scope, "headers": headers}
+
+
+class NegotiatedRoute(APIRoute):
+    """APIRoute that also speaks MessagePack for request and response bodies."""
+
+    def _request_handler(self, response_class: Any) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        return get_request_handler(
+            dependant=self.dependant,
+            body_field=self.body_field,
+            status_code=self.status_code,
+            response_class=response_class,
+            response_field=self.secure_cloned_response_field,
+            response_model_include=self.response_model_include,
+            response_model_exclude=self.response_model_exclude,
+            response_model_by_alias=self.response_model_by_alias,
+            response_model_exclude_unset=self.response_model_exclude_unset,
+            response_model_exclude_defaults=self.response_model_exclude_defaults,
+            response_model_exclude_none=self.response_model_exclude_none,
+            dependency_overrides_provider=self.dependency_overrides_provider,
+        )
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        handler = super().get_route_handler()
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        # The endpoint's serialized return value is packed straight into the
+        # MessagePack response; routes with a non-JSON response class keep it.
+        msgpack_handler = (
+            self._request_handler(MsgPackResponse) if issubclass(response_class, JSONResponse) else handler
+        )
+
+        async def negotiated_handler(request: Request) -> Response:
+            reply_msgpack = wants_msgpack(request.headers.get("accept"))
+            if is_msgpack(request.headers.get("content-type")):
+                request = _MsgPackRequest(_json_content_type_scope(request.scope), request.receive)
+            return await (msgpack_handler if reply_msgpack else handler)(request)
+
+        return negotiated_handler
+
+
+def websocket_format(websocket: WebSocket) -> str:
+    """Format requested by a connecting socket (subprotocol or ?format=)."""
+    if websocket.query_params.get("format", "").lower() == FORMAT_MSGPACK:
+        return FORMAT_MSGPACK
+    if FORMAT_MSGPACK in websocket.scope.get("subprotocols", []):
+        return FORMAT_MSGPACK
+    return FORMAT_JSON
+
+
+async def send_message(websocket: WebSocket, message: Any, fmt: str = FORMAT_JSON) -> None:
+    """Send a message as a text (JSON) or binary (MessagePack) frame."""
+    if fmt == FORMAT_MSGPACK:
+        await websocket.send_bytes(pack(message))
+    else:
+        await websocket.send_text(dumps_text(message))
+
+
+async def receive_message(websocket: WebSocket) -> Any:
+    """
+    Receive and decode one frame; binary frames are MessagePack, text is JSON.
+
+    Raises:
+        WebSocketDisconnect: If the peer closed the socket
+        ValueError: If the frame cannot be decoded
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    if message.get("bytes") is not None:
+        return unpack(message["bytes"])
+    return loads(message["text"])
+
+
+__all__ = [
+    "FORMAT_JSON",
+    "FORMAT_MSGPACK",
+    "MSGPACK_MEDIA_TYPE",
+    "MsgPackResponse",
+    "NegotiatedRoute",
+    "is_msgpack",
+    "pack",
+    "receive_message",
+    "send_message",
+    "unpack",
+    "wants_msgpack",
+    "websocket_format",
+]
@@ -0,0 +1,128 @@
+"""
+JSON Serialization
+
+One JSON codec for REST responses and WebSocket text frames. orjson is
+used when installed (several times faster than the stdlib for the
+payload shapes we broadcast); otherwise the stdlib ``json`` module is used
+with the same output types.
+
+Both codecs encode ``datetime``/``date``/``UUID`` natively (ISO 8601 /
+string) and Pydantic models via ``model_dump(mode="json")``, so handlers
+and the WebSocket manager can hand over their objects without a
+``jsonable_encoder`` pass. Output is compact (no spaces) and UTF-8.
+
+``JSON_CODEC`` selects the codec: ``auto`` (orjson if importable),
+``orjson`` or ``stdlib``. ``use_codec`` switches it at runtime, e.g. for
+benchmarks.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+HAS_ORJSON = orjson is not None
+
+
+def _default(obj: Any) -> Any:
+    """Types neither codec handles on its own."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _orjson_dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+_CODECS: Dict[str, tuple] = {"stdlib": (_stdlib_dumps, json.loads)}
+if HAS_ORJSON:
+    _CODECS["orjson"] = (_orjson_dumps, orjson.loads)
+
+_dumps: Callable[[Any], bytes]
+_loads: Callable[[Union[str, bytes]], Any]
+codec_name = ""
+
+
+def use_codec(name: str) -> str:
+    """
+    Select the JSON codec.
+
+    Args:
+        name: "auto", "orjson" or "stdlib"; "auto" and an unavailable
+            "orjson" fall back to the stdlib
+
+    Returns:
+        str: Name of the codec now in use
+    """
+    global _dumps, _loads, codec_name
+    if name == "auto" or name not in _CODECS:
+        name = "orjson" if HAS_ORJSON else "stdlib"
+    _dumps, _loads = _CODECS[name]
+    codec_name = name
+    return name
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode to compact UTF-8 JSON bytes."""
+    return _dumps(obj)
+
+
+def dumps_text(obj: Any) -> str:
+    """Encode to a JSON string (for WebSocket text frames)."""
+    return _dumps(obj).decode("utf-8")
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Decode JSON text or bytes.
+
+    Raises:
+        ValueError: If the data is not valid JSON
+    """
+    return _loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with the configured codec (app default response class)."""
+
+    def render(self, content: Any) -> bytes:
+        return _dumps(content)
+
+
+use_codec(settings.JSON_CODEC)
+
+
+__all__ = [
+    "FastJSONResponse",
+    "HAS_ORJSON",
+    "dumps",
+    "dumps_text",
+    "loads",
+    "use_codec",
+]
@@ -0,0 +1 @@
+"""Performance benchmarks (run manually against a local TimescaleDB; not collected by pytest)."""
@@ -0,0 +1,112 @@
+"""
+Event-loop latency of an inline database write: synchronous vs async client.
+
+Requires a reachable TimescaleDB at DATABASE_URL with init.sql and seed.sql
+applied. Run from the backend directory:
+
+    python -m benchmarks.bench_async_db --rate 400 --requests 4000 --slow-ms 200
+
+Requests arrive open-loop at ``--rate`` per second; each one writes an
+access-log row directly (``log_access_attempt``, as the access check
+does). A background task repeatedly runs a ``pg_sleep`` query standing
+in for a slow history export. Latency is measured from each request's scheduled
+arrival, so time spent waiting for a blocked event loop is included.
+
+- sync:  DatabaseClient called inside the coroutine (blocks the event loop)
+- async: AsyncDatabaseClient awaited (the event loop stays free)
+
+This is the situation of handlers that query inline on the event loop
+(access check, automation rules), which use the async client. The sensor
+ingest endpoints do not: their database stages run through
+``ingest_pipeline`` in worker threads (mostly enqueueing to the
+write-behind buffer), so these numbers are not ingest endpoint latency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+from app.services.async_db_client import async_db_client
+from app.services.db_client import db_client
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run(mode: str, args) -> list:
+    loop = asyncio.get_running_loop()
+    base = datetime.now(timezone.utc)
+    latencies = []
+    stop = asyncio.Event()
+
+    async def slow_query():
+        while not stop.is_set():
+            if mode == "sync":
+                with db_client.get_session() as session:
+                    session.execute(text("SELECT pg_sleep(:s)"), {"s": args.slow_ms / 1000})
+            else:
+                async with async_db_client.get_session() as session:
+                    await session.execute(text("SELECT pg_sleep(:s)"), {"s": args.slow_ms / 1000})
+            await asyncio.sleep(0)
+
+    async def ingest(i: int, scheduled: float):
+        attempt = {
+            "card_uid": args.card_uid,
+            "device_id": args.device_id,
+            "granted": True,
+            "reason": "benchmark",
+            "timestamp": (base + timedelta(microseconds=i)).isoformat(),
+        }
+        if mode == "sync":
+            db_client.log_access_attempt(**attempt)
+        else:
+            await async_db_client.log_access_attempt(**attempt)
+        latencies.append(loop.time() - scheduled)
+
+    slow_task = asyncio.create_task(slow_query())
+    start = loop.time()
+    tasks = []
+    for i in range(args.requests):
+        scheduled = start + i / args.rate
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(ingest(i, scheduled)))
+    await asyncio.gather(*tasks)
+    stop.set()
+    await slow_task
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--rate", type=float, default=400.0, help="arrivals per second")
+    parser.add_argument("--slow-ms", type=int, default=200, help="duration of the competing slow query")
+    parser.add_argument("--device-id", default="door-control-01")
+    parser.add_argument("--card-uid", default="04:A3:2B:F2:1C:80")
+    args = parser.parse_args()
+
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+    print(f"{'mode':<6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for mode in modes:
+        latencies = asyncio.run(_run(mode, args))
+        ms = [v * 1000 for v in latencies]
+        print(
+            f"{mode:<6} {statistics.median(ms):9.1f} {_percentile(ms, 95):9.1f} "
+            f"{_percentile(ms, 99):9.1f} {max(ms):9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Dashboard broadcast path: stdlib json vs orjson.
+
+Needs no database or network. Run from the backend directory:
+
+    python -m benchmarks.bench_broadcast --clients 100 250 --messages 2000
+
+Each connected client is an in-memory socket whose ``send_text`` only
+counts frames, so the numbers are the server's own cost per broadcast:
+stamping, encoding the message once and handing the frame to every
+socket. For each codec and client count it reports:
+
+- broadcasts/s: ``ConnectionManager.broadcast_to_clients`` calls per second
+- frames/s:     frames handed to sockets per second
+- encode/s:     encoding the room-node broadcast message alone
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+
+from app.services.websocket_manager import ConnectionManager
+from app.utils import serialization
+from app.utils.serialization import dumps_text, use_codec
+
+
+class _CountingSocket:
+    def __init__(self) -> None:
+        self.frames = 0
+
+    async def send_text(self, data: str) -> None:
+        self.frames += 1
+
+
+def _message(i: int) -> dict:
+    return {
+        "type": "room_node_data",
+        "device_id": f"room-node-{i % 8:02d}",
+        "data": {
+            "device_id": f"room-node-{i % 8:02d}",
+            "room": "living-room",
+            "timestamp": datetime(2026, 1, 1, tzinfo=timezone.utc).isoformat(),
+            "time": datetime.now(timezone.utc),
+            "temperature": 21.0 + (i % 10) * 0.01,
+            "humidity": 45.2,
+            "pressure": 1013.25,
+            "light_level": 42.0,
+            "light_lux": 420.0,
+            "dimmer_brightness": 60,
+            "daylight_harvest_mode": True,
+            "fan_on": False,
+            "relays": [False, True, False, False],
+        },
+    }
+
+
+async def _broadcast_rate(clients: int, messages: int) -> tuple:
+    manager = ConnectionManager()
+    sockets = [_CountingSocket() for _ in range(clients)]
+    manager.client_connections.update(sockets)
+    batch = [_message(i) for i in range(messages)]
+
+    start = time.perf_counter()
+    for message in batch:
+        await manager.broadcast_to_clients(message)
+    elapsed = time.perf_counter() - start
+    frames = sum(socket.frames for socket in sockets)
+    return messages / elapsed, frames / elapsed
+
+
+def _encode_rate(messages: int) -> float:
+    message = _message(0)
+    start = time.perf_counter()
+    for _ in range(messages):
+        dumps_text(message)
+    return messages / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, nargs="+", default=[100, 250])
+    parser.add_argument("--messages", type=int, default=2000)
+    args = parser.parse_args()
+
+    codecs = ["stdlib"] + (["orjson"] if serialization.HAS_ORJSON else [])
+    print(f"{'codec':<9}{'clients':>8}{'broadcasts/s':>15}{'frames/s':>14}{'encode/s':>12}")
+    for name in codecs:
+        use_codec(name)
+        encode = _encode_rate(args.messages * 10)
+        for clients in args.clients:
+            broadcasts, frames = asyncio.run(_broadcast_rate(clients, args.messages))
+            print(f"{name:<9}{clients:>8}{broadcasts:>15,.0f}{frames:>14,.0f}{encode:>12,.0f}")
+    use_codec("auto")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Per-call cost of the hot database calls: ORM queries vs Core fast paths.
+
+Requires a reachable TimescaleDB at DATABASE_URL with init.sql applied.
+Run from the backend directory:
+
+    python -m benchmarks.bench_db_hot_paths --calls 2000
+
+Seeds a dedicated device, RFID card and a few automation rules (pass
+``--cleanup`` to delete them and their rows afterwards), then times each
+call one at a time, sequentially, on the client the request handlers use:
+
+- access check and rules (``access.py``, ``rules.py``, the rules engine):
+  ``async_db_client`` methods, awaited on one event loop;
+- device lookups from ingest: the sync registry's miss path
+  (``_fetch_devices``); a registry hit never reaches the database;
+- state inserts: the write-behind writer (``bulk_insert``), one row per
+  call since the buffer is not started.
+
+Each call is timed in two modes:
+
+- orm:  the previous implementation (session ``get``/``query``/``scalars``
+        or ``add`` of mapped instances, dicts built by hand)
+- core: the current method (precompiled Core statement, bound parameters,
+        rows mapped straight to dicts)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import inspect
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.lighting import AccessLog, AutomationRule, Device, DimmerState, RelayState, RFIDCard
+from app.services.async_db_client import async_db_client
+from app.services.db_client import _device_dict, db_client
+
+DEVICE_ID = "bench-hot-01"
+CARD_UID = "BE:NC:H0:00:00:01"
+RULES = 10
+
+
+def _seed() -> None:
+    with db_client.get_session() as session:
+        session.execute(text(
+            "INSERT INTO devices (device_id, device_type, name, status) "
+            "VALUES (:d, 'lighting_control', 'Hot path benchmark', 'online') "
+            "ON CONFLICT (device_id) DO NOTHING"
+        ), {"d": DEVICE_ID})
+        session.execute(text(
+            "INSERT INTO rfid_cards (card_uid, user_id, label, active) "
+            "VALUES (:c, 'bench-user', 'Benchmark', true) ON CONFLICT (card_uid) DO NOTHING"
+        ), {"c": CARD_UID})
+        for i in range(RULES):
+            session.execute(text(
+                "INSERT INTO automation_rules "
+                "(rule_id, name, trigger, comparator, threshold, action, action_value, enabled) "
+                "VALUES (:r, :n, 'temperature', '>', 28, 'fan', 'on', true) "
+                "ON CONFLICT (rule_id) DO NOTHING"
+            ), {"r": f"bench-rule-{i}", "n": f"Benchmark rule {i}"})
+
+
+def _cleanup() -> None:
+    with db_client.get_session() as session:
+        for table in ("relay_state", "dimmer_state"):
+            session.execute(text(f"DELETE FROM {table} WHERE device_id = :d"), {"d": DEVICE_ID})
+        session.execute(text("DELETE FROM automation_rules WHERE rule_id LIKE 'bench-rule-%'"))
+        session.execute(text("DELETE FROM access_log WHERE card_uid = :c"), {"c": CARD_UID})
+        session.execute(text("DELETE FROM rfid_cards WHERE card_uid = :c"), {"c": CARD_UID})
+        session.execute(text("DELETE FROM devices WHERE device_id = :d"), {"d": DEVICE_ID})
+
+
+# Previous ORM implementations, kept here as the baseline.
+
+async def _orm_get_rfid_card(card_uid):
+    async with async_db_client.get_session() as session:
+        card = await session.get(RFIDCard, card_uid)
+        if card:
+            return {'card_uid': card.card_uid, 'user_id': card.user_id,
+                    'label': card.label, 'active': card.active}
+        return None
+
+
+def _orm_fetch_devices(device_ids):
+    with db_client.get_session() as session:
+        devices = session.query(Device).filter(Device.device_id.in_(device_ids)).all()
+        return {device.device_id: _device_dict(device) for device in devices}
+
+
+async def _orm_list_automation_rules():
+    async with async_db_client.get_session() as session:
+        rules = await session.scalars(select(AutomationRule).order_by(AutomationRule.created_at.asc()))
+        return [
+            {"id": r.rule_id, "name": r.name, "trigger": r.trigger, "comparator": r.comparator,
+             "threshold": r.threshold, "action": r.action, "action_value": r.action_value,
+             "enabled": r.enabled,
+             "created_at": r.created_at.isoformat() if r.created_at else None,
+             "updated_at": r.updated_at.isoformat() if r.updated_at else None}
+            for r in rules
+        ]
+
+
+def _orm_insert(model, row):
+    with db_client.get_session() as session:
+        session.execute(pg_insert(model).on_conflict_do_nothing(), [row])
+
+
+async def _orm_log_access_attempt(card_uid, device_id, granted, reason, timestamp):
+    async with async_db_client.get_session() as session:
+        session.add(AccessLog(
+            card_uid=card_uid, device_id=device_id, granted=granted, reason=reason,
+            timestamp=datetime.fromisoformat(timestamp.replace('Z', '+00:00')),
+        ))
+
+
+def _cases(base: datetime):
+    step = iter(range(10 ** 9))
+
+    def at() -> datetime:
+        return base + timedelta(microseconds=next(step))
+
+    stamp = base.isoformat()
+    return {
+        "get_rfid_card": (
+            lambda: _orm_get_rfid_card(CARD_UID),
+            lambda: async_db_client.get_rfid_card(CARD_UID),
+        ),
+        "get_device (miss)": (
+            lambda: _orm_fetch_devices([DEVICE_ID]),
+            lambda: db_client._fetch_devices([DEVICE_ID]),
+        ),
+        "list_automation_rules": (
+            _orm_list_automation_rules,
+            async_db_client.list_automation_rules,
+        ),
+        "insert_relay_state": (
+            lambda: _orm_insert(RelayState, {'time': at(), 'device_id': DEVICE_ID, 'channel': 1, 'state': True}),
+            lambda: db_client.bulk_insert('relay_state', [
+                {'time': at(), 'device_id': DEVICE_ID, 'channel': 1, 'state': True}]),
+        ),
+        "insert_dimmer_state": (
+            lambda: _orm_insert(DimmerState, {'time': at(), 'device_id': DEVICE_ID, 'brightness': 50}),
+            lambda: db_client.bulk_insert('dimmer_state', [
+                {'time': at(), 'device_id': DEVICE_ID, 'brightness': 50}]),
+        ),
+        "log_access_attempt": (
+            lambda: _orm_log_access_attempt(CARD_UID, DEVICE_ID, True, "benchmark", stamp),
+            lambda: async_db_client.log_access_attempt(CARD_UID, DEVICE_ID, True, "benchmark", stamp),
+        ),
+    }
+
+
+async def _call(call):
+    result = call()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def _time(call, calls: int, warmup: int) -> list:
+    for _ in range(warmup):
+        await _call(call)
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await _call(call)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+async def _run(args) -> None:
+    # Distinct timestamps per run so inserts never hit ON CONFLICT.
+    cases = _cases(datetime.now(timezone.utc) - timedelta(days=365))
+
+    print(f"{'method':<24}{'mode':<6}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}{'speedup':>9}")
+    for name, (orm_call, core_call) in cases.items():
+        orm = await _time(orm_call, args.calls, args.warmup)
+        core = await _time(core_call, args.calls, args.warmup)
+        for mode, samples in (("orm", orm), ("core", core)):
+            speedup = statistics.mean(orm) / statistics.mean(samples)
+            print(f"{name:<24}{mode:<6}{statistics.mean(samples):>10.1f}"
+                  f"{_percentile(samples, 50):>10.1f}{_percentile(samples, 95):>10.1f}{speedup:>8.2f}x")
+    await async_db_client.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--cleanup", action="store_true", help="delete the seeded rows afterwards")
+    args = parser.parse_args()
+
+    _seed()
+    asyncio.run(_run(args))
+
+    if args.cleanup:
+        _cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+History export: materialised list vs streamed from a server-side cursor.
+
+Requires a reachable TimescaleDB at DATABASE_URL with init.sql applied.
+Run from the backend directory:
+
+    python -m benchmarks.bench_history_export --rows 1000000
+
+Seeds ``--rows`` 1 Hz lighting readings for a dedicated device (once;
+pass ``--cleanup`` to delete them afterwards) and exports them as NDJSON
+two ways:
+
+- list:   every row loaded as an ORM object, then encoded (the old
+          ``get_lighting_history`` shape without its 1000-row cap)
+- stream: ``iter_lighting_history`` (stream_results + yield_per) through
+          the endpoint's chunked NDJSON encoder
+
+For each it reports time to first byte, total time, and peak Python heap
+(tracemalloc) while exporting.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+from sqlalchemy import text
+
+from app.api.sensors import _ndjson_chunk, _stream_history
+from app.models.lighting import LightingSensorData
+from app.services.db_client import _lighting_history_dict, db_client
+
+DEVICE_ID = "bench-history-01"
+
+
+def _seed(rows: int) -> None:
+    with db_client.get_session() as session:
+        session.execute(text(
+            "INSERT INTO devices (device_id, device_type, name, status) "
+            "VALUES (:d, 'lighting_control', 'History benchmark', 'offline') "
+            "ON CONFLICT (device_id) DO NOTHING"
+        ), {"d": DEVICE_ID})
+        existing = session.execute(text(
+            "SELECT count(*) FROM lighting_sensor_data WHERE device_id = :d"
+        ), {"d": DEVICE_ID}).scalar()
+        if existing >= rows:
+            return
+        session.execute(text(
+            "INSERT INTO lighting_sensor_data "
+            "(time, device_id, light_level, light_lux, dimmer_brightness, daylight_harvest_mode) "
+            "SELECT NOW() - make_interval(secs => n), :d, (n % 100)::float, (n % 1000)::float, "
+            "n % 101, n % 2 = 0 FROM generate_series(1, :rows) AS n "
+            "ON CONFLICT DO NOTHING"
+        ), {"d": DEVICE_ID, "rows": rows})
+
+
+def _export_list():
+    with db_client.get_session() as session:
+        results = session.query(LightingSensorData).filter(
+            LightingSensorData.device_id == DEVICE_ID
+        ).order_by(LightingSensorData.time.asc()).all()
+        rows = [_lighting_history_dict(r) for r in results]
+    for start in range(0, len(rows), 500):
+        yield _ndjson_chunk(rows[start:start + 500])
+
+
+def _export_stream():
+    return _stream_history(db_client.iter_lighting_history(DEVICE_ID), "ndjson")
+
+
+def _measure(export) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    first_byte = None
+    total_bytes = 0
+    for chunk in export():
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        total_bytes += len(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_byte or elapsed, elapsed, peak, total_bytes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--mode", choices=["list", "stream", "both"], default="both")
+    parser.add_argument("--cleanup", action="store_true", help="delete the seeded rows afterwards")
+    args = parser.parse_args()
+
+    _seed(args.rows)
+    modes = {"list": _export_list, "stream": _export_stream}
+    selected = list(modes) if args.mode == "both" else [args.mode]
+
+    print(f"{'mode':<8}{'TTFB ms':>10}{'total s':>10}{'peak MB':>10}{'MB out':>10}")
+    for name in selected:
+        ttfb, elapsed, peak, size = _measure(modes[name])
+        print(f"{name:<8}{ttfb * 1000:>10.1f}{elapsed:>10.2f}{peak / 2**20:>10.1f}{size / 2**20:>10.1f}")
+
+    if args.cleanup:
+        with db_client.get_session() as session:
+            session.execute(text("DELETE FROM devices WHERE device_id = :d"), {"d": DEVICE_ID})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+LTTB downsampling throughput: vectorised NumPy vs the pure-Python reference.
+
+Needs no database. Run from the backend directory:
+
+    python -m benchmarks.bench_lttb --rows 100000 1000000 10000000 --points 1000
+
+Input is a synthetic day-long light-level series (epoch seconds, noisy
+sine with occasional spikes), already in float64 arrays as
+``DatabaseClient.get_lighting_lttb`` builds them from the cursor. For each
+size it reports rows/s and wall time; the reference is only run up to
+``--reference-max`` rows (it is slow) and its output is checked against
+the vectorised one.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from app.utils.downsampling import lttb_indices
+
+
+def _series(rows: int) -> tuple:
+    rng = np.random.default_rng(rows)
+    x = 1_767_225_600.0 + np.arange(rows, dtype=np.float64) * (86400.0 / rows)
+    y = 50 + 40 * np.sin(np.linspace(0, 2 * math.pi, rows)) + rng.normal(0, 2, rows)
+    y[rng.integers(0, rows, max(rows // 10_000, 1))] = 100.0
+    return x, y
+
+
+def _reference(data: list, threshold: int) -> list:
+    n = len(data)
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    sampled = [0]
+    for i in range(threshold - 2):
+        avg_start = int(math.floor((i + 1) * every)) + 1
+        avg_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = sum(p[0] for p in data[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(p[1] for p in data[avg_start:avg_end]) / (avg_end - avg_start)
+        ax, ay = data[a]
+        max_area, next_a = -1.0, 0
+        for j in range(int(math.floor(i * every)) + 1, int(math.floor((i + 1) * every)) + 1):
+            area = abs((ax - avg_x) * (data[j][1] - ay) - (ax - data[j][0]) * (avg_y - ay))
+            if area > max_area:
+                max_area, next_a = area, j
+        sampled.append(next_a)
+        a = next_a
+    sampled.append(n - 1)
+    return sampled
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--reference-max", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>12}{'impl':>11}{'seconds':>10}{'rows/s':>16}")
+    for rows in args.rows:
+        x, y = _series(rows)
+        start = time.perf_counter()
+        kept = lttb_indices(x, y, args.points)
+        elapsed = time.perf_counter() - start
+        print(f"{rows:>12,}{'numpy':>11}{elapsed:>10.3f}{rows / elapsed:>16,.0f}")
+
+        if rows <= args.reference_max:
+            data = list(zip(x.tolist(), y.tolist()))
+            start = time.perf_counter()
+            expected = _reference(data, args.points)
+            elapsed = time.perf_counter() - start
+            match = "" if expected == kept.tolist() else "  MISMATCH"
+            print(f"{rows:>12,}{'reference':>11}{elapsed:>10.3f}{rows / elapsed:>16,.0f}{match}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Payload format: JSON vs MessagePack for device ingest and commands.
+
+Needs no database. Run from the backend directory:
+
+    python -m benchmarks.bench_payload_codec --iterations 20000 --batch-size 500
+
+For a single room-node reading, a batch upload and a device command it
+reports:
+
+- bytes:      encoded size on the wire
+- round trip: encode + decode, operations per second
+- ingest:     decode + Pydantic validation, the work the server does per
+              request before the handler runs
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.api.sensors import BatchIngestRequest, RoomNodeSensorData
+from app.utils.payloads import pack, unpack
+
+
+def _room_node_reading(i: int) -> dict:
+    ts = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=i)
+    return {
+        "device_id": "room-node-01",
+        "room": "living-room",
+        "timestamp": ts.isoformat(),
+        "temperature": 21.0 + (i % 10) * 0.01,
+        "humidity": 45.2,
+        "pressure": 1013.25,
+        "light_level": 42.0,
+        "light_lux": 420.0,
+        "dimmer_brightness": 60,
+        "daylight_harvest_mode": True,
+        "fan_on": False,
+        "relays": [False, True, False, False],
+    }
+
+
+CODECS = {
+    "json": (lambda obj: json.dumps(obj).encode(), json.loads),
+    "msgpack": (pack, unpack),
+}
+
+
+def _rate(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    single = _room_node_reading(0)
+    batch = {"readings": [{"type": "room_node", **_room_node_reading(i)} for i in range(args.batch_size)]}
+    command = {"command": "dimmer", "value": 65}
+    batch_iterations = max(1, args.iterations // args.batch_size)
+
+    cases = [
+        ("room-node reading", single, args.iterations, RoomNodeSensorData),
+        (f"batch of {args.batch_size}", batch, batch_iterations, BatchIngestRequest),
+        ("dimmer command", command, args.iterations, None),
+    ]
+
+    print(f"{'payload':<22}{'format':<9}{'bytes':>9}{'round trip/s':>15}{'ingest/s':>12}")
+    for label, payload, iterations, model in cases:
+        for name, (encode, decode) in CODECS.items():
+            encoded = encode(payload)
+            assert decode(encoded) == payload
+            round_trip = _rate(lambda: decode(encode(payload)), iterations)
+            ingest = (
+                f"{_rate(lambda: model.model_validate(decode(encoded)), iterations):>12,.0f}"
+                if model else f"{'-':>12}"
+            )
+            print(f"{label:<22}{name:<9}{len(encoded):>9,}{round_trip:>15,.0f}{ingest}")
+
+
+if __name__ == "__main__":
+    main()
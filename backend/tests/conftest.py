@@ -5,6 +5,21 @@ Shared test fixtures for the smart home backend test suite.
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
+from app.services import (
+    device_clocks, device_rate_limiter, ingest_compressor, ingest_dedup, ingest_pipeline,
+)
+
+INGEST_STATE = (ingest_dedup, ingest_compressor, device_rate_limiter, device_clocks, ingest_pipeline)
+
+
+@pytest.fixture(autouse=True)
+def reset_ingest_state():
+    """Tests reuse payloads and devices, so start each one with empty ingest state."""
+    for state in INGEST_STATE:
+        state.clear()
+    yield
+    for state in INGEST_STATE:
+        state.clear()
 
 
 @pytest.fixture
@@ -88,7 +88,7 @@ def test_bme280_environmental_ingest(report, scenario, temp, hum, press):
     payload = _env_payload(temp, hum, press)
     t0 = time.monotonic()
 
-    with patch("app.api.sensors.broker") as mock_broker:
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"):
         mock_broker.publish = AsyncMock(return_value=None)
         response = client.post("/api/sensors/ingest/environmental", json=payload)
 
@@ -122,7 +122,7 @@ def test_bme280_partial_payload_temperature_only(report):
         "temperature": 22.5,
     }
     t0 = time.monotonic()
-    with patch("app.api.sensors.broker") as mock_broker:
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"):
         mock_broker.publish = AsyncMock(return_value=None)
         response = client.post("/api/sensors/ingest/environmental", json=payload)
     duration_ms = (time.monotonic() - t0) * 1000
@@ -161,7 +161,7 @@ def test_bme280_broker_failure_still_returns_202(report):
     """
     payload = _env_payload()
     t0 = time.monotonic()
-    with patch("app.api.sensors.broker") as mock_broker:
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"):
         mock_broker.publish = AsyncMock(side_effect=RuntimeError("broker down"))
         response = client.post("/api/sensors/ingest/environmental", json=payload)
     duration_ms = (time.monotonic() - t0) * 1000
@@ -226,7 +226,7 @@ def test_bme280_room_node_ingest(report, scenario, temp, hum, press):
 def test_bme280_response_contains_expected_fields(report):
     """202 response body must include status, message, device_id, timestamp."""
     payload = _env_payload()
-    with patch("app.api.sensors.broker") as mock_broker:
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"):
         mock_broker.publish = AsyncMock(return_value=None)
         response = client.post("/api/sensors/ingest/environmental", json=payload)
 
@@ -23,7 +23,7 @@ What is tested
 """
 
 import time
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -67,7 +67,7 @@ def test_door_node_grant_flow(report):
     The backend response is what drives the solenoid relay.
     """
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_ALICE
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_scan(CARD_ALICE))
@@ -96,7 +96,7 @@ def test_door_node_grant_flow(report):
 def test_door_node_deny_flow_unknown_card(report):
     """Deny flow: unknown card → solenoid stays locked."""
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = None
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_scan(CARD_UNKNOWN))
@@ -121,7 +121,7 @@ def test_door_node_deny_flow_unknown_card(report):
 def test_door_node_deny_flow_inactive_card(report):
     """Deny flow: deactivated card → solenoid stays locked."""
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_INACTIVE
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_scan(CARD_INACTIVE))
@@ -153,7 +153,7 @@ def test_door_node_fail_secure_on_db_error(report):
     This is the most critical safety requirement for the door node.
     """
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.side_effect = Exception("connection reset")
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_scan(CARD_ALICE))
@@ -191,7 +191,7 @@ DEMO_SEQUENCE = [
 def test_door_node_demo_sequence(report, card_uid, mock_card, expected_granted, description):
     """Simulates a realistic door-use sequence for the final demo."""
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = mock_card
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_scan(card_uid))
@@ -227,7 +227,7 @@ def test_door_node_response_has_required_fields(report):
     The ESP32 firmware parses: granted, reason, checked_at, card_uid, device_id.
     All must be present in every response.
     """
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_ALICE
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_scan(CARD_ALICE))
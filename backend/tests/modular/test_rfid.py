@@ -34,7 +34,7 @@ Card management:
 """
 
 import time
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -85,7 +85,7 @@ def _check_payload(card_uid: str = CARD_ALICE):
 def test_rfid_authorized_card_granted(report):
     """Active whitelisted card → granted=True."""
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_ACTIVE_CARD
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_check_payload(CARD_ALICE))
@@ -111,7 +111,7 @@ def test_rfid_authorized_card_granted(report):
 def test_rfid_unknown_card_denied(report):
     """Unregistered card UID → granted=False, reason contains 'not registered'."""
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = None
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_check_payload(CARD_UNKNOWN))
@@ -136,7 +136,7 @@ def test_rfid_unknown_card_denied(report):
 def test_rfid_deactivated_card_denied(report):
     """Deactivated card → granted=False, reason='card deactivated'."""
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_INACTIVE_CARD
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_check_payload(CARD_INACTIVE))
@@ -169,7 +169,7 @@ def test_rfid_fail_secure_db_error(report):
     This ensures the solenoid remains in the locked (secure) state.
     """
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.side_effect = RuntimeError("DB unreachable")
         mock_db.log_access_attempt.return_value = True
         response = client.post("/api/access/check", json=_check_payload(CARD_ALICE))
@@ -196,7 +196,7 @@ def test_rfid_log_failure_does_not_break_access(report):
     The card is still authorized; only the log write fails.
     """
     t0 = time.monotonic()
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_ACTIVE_CARD
         mock_db.log_access_attempt.side_effect = RuntimeError("log DB down")
         response = client.post("/api/access/check", json=_check_payload(CARD_ALICE))
@@ -223,7 +223,7 @@ def test_rfid_log_failure_does_not_break_access(report):
 
 def test_rfid_register_new_card(report):
     """POST /api/access/cards → 201 with correct card_uid and user_id."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.upsert_rfid_card.return_value = True
         response = client.post(
             "/api/access/cards",
@@ -245,7 +245,7 @@ def test_rfid_register_new_card(report):
 def test_rfid_list_cards(report):
     """GET /api/access/cards returns the card whitelist."""
     cards = [MOCK_ACTIVE_CARD, MOCK_INACTIVE_CARD]
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.list_rfid_cards.return_value = cards
         response = client.get("/api/access/cards")
     report.record(
@@ -267,7 +267,7 @@ def test_rfid_access_log_entries(report):
         {"log_id": 2, "card_uid": CARD_UNKNOWN, "device_id": DEVICE_ID,
          "granted": False, "reason": "card not registered", "timestamp": TIMESTAMP},
     ]
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_access_logs.return_value = logs
         response = client.get("/api/access/logs")
     report.record(
@@ -307,7 +307,7 @@ def test_rfid_check_missing_card_uid(report):
 
 def test_rfid_register_missing_user_id(report):
     """Missing user_id on card registration → 422."""
-    with patch("app.api.access.db_client"):
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock):
         response = client.post(
             "/api/access/cards",
             json={"card_uid": CARD_BOB, "label": "no user"},
@@ -1,11 +1,11 @@
 """
 Tests for the access control endpoints.
 
-All external services (db_client) are patched so these tests run without
+All external services (async_db_client) are patched so these tests run without
 a real database.
 """
 
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -48,7 +48,7 @@ MOCK_INACTIVE_CARD = {
 
 def test_access_check_authorized():
     """Authorized active card returns granted=True."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_ACTIVE_CARD
         mock_db.log_access_attempt.return_value = True
 
@@ -65,7 +65,7 @@ def test_access_check_authorized():
 
 def test_access_check_unknown_card():
     """Card not in whitelist returns granted=False."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = None
         mock_db.log_access_attempt.return_value = True
 
@@ -82,7 +82,7 @@ def test_access_check_unknown_card():
 
 def test_access_check_inactive_card():
     """Deactivated card returns granted=False."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_INACTIVE_CARD
         mock_db.log_access_attempt.return_value = True
 
@@ -102,7 +102,7 @@ def test_access_check_db_error_denies_access():
     Any database error during card check must result in granted=False
     (fail-secure behaviour).
     """
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.side_effect = RuntimeError("DB down")
         mock_db.log_access_attempt.return_value = True
 
@@ -121,7 +121,7 @@ def test_access_check_missing_fields():
 
 def test_access_check_log_failure_does_not_break_response():
     """Audit log failure must not affect the access check response."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_rfid_card.return_value = MOCK_ACTIVE_CARD
         mock_db.log_access_attempt.side_effect = RuntimeError("log DB down")
 
@@ -141,7 +141,7 @@ def test_access_check_log_failure_does_not_break_response():
 def test_list_cards_success():
     """Returns list of RFID cards."""
     cards = [MOCK_ACTIVE_CARD, MOCK_INACTIVE_CARD]
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.list_rfid_cards.return_value = cards
         response = client.get("/api/access/cards")
 
@@ -152,7 +152,7 @@ def test_list_cards_success():
 
 def test_list_cards_db_error():
     """Returns 500 when db raises an exception."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.list_rfid_cards.side_effect = RuntimeError("DB down")
         response = client.get("/api/access/cards")
 
@@ -166,7 +166,7 @@ def test_list_cards_db_error():
 
 def test_register_card_success():
     """Registering a new card returns 201."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.upsert_rfid_card.return_value = True
         response = client.post(
             "/api/access/cards",
@@ -192,7 +192,7 @@ def test_register_card_missing_fields():
 
 def test_register_card_db_error():
     """DB error during card registration returns 500."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.upsert_rfid_card.side_effect = RuntimeError("DB down")
         response = client.post(
             "/api/access/cards",
@@ -219,7 +219,7 @@ def test_get_access_logs_success():
             "timestamp": TIMESTAMP,
         }
     ]
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_access_logs.return_value = logs
         response = client.get("/api/access/logs")
 
@@ -231,7 +231,7 @@ def test_get_access_logs_success():
 
 def test_get_access_logs_db_error():
     """Returns 500 on database error."""
-    with patch("app.api.access.db_client") as mock_db:
+    with patch("app.api.access.async_db_client", new_callable=AsyncMock) as mock_db:
         mock_db.get_access_logs.side_effect = RuntimeError("DB down")
         response = client.get("/api/access/logs")
 
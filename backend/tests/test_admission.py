@@ -0,0 +1,175 @@
+"""
+Tests for ingest admission control and load shedding.
+"""
+
+import asyncio
+import logging
+
+import pytest
+from fastapi import BackgroundTasks, FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware import AdmissionControlMiddleware
+from app.services.admission import SHED_QUEUE_FULL, SHED_TIMEOUT, AdmissionController
+
+
+def _controller(**overrides):
+    params = dict(max_concurrency=1, queue_depth=1, queue_timeout_seconds=1.0, retry_after_seconds=5)
+    params.update(overrides)
+    return AdmissionController(**params)
+
+
+@pytest.mark.asyncio
+async def test_admits_up_to_concurrency_limit():
+    controller = _controller(max_concurrency=2, queue_depth=0)
+    assert await controller.acquire() is None
+    assert await controller.acquire() is None
+    assert await controller.acquire() == SHED_QUEUE_FULL
+    assert controller.stats()["shed_queue_full"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queued_request_gets_released_slot():
+    controller = _controller()
+    await controller.acquire()
+    queued = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    assert controller.waiting == 1
+
+    controller.release()
+
+    assert await queued is None
+    assert controller.in_flight == 1
+    assert controller.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_queued_request_times_out():
+    controller = _controller(queue_timeout_seconds=0.01)
+    await controller.acquire()
+    assert await controller.acquire() == SHED_TIMEOUT
+    assert controller.waiting == 0
+
+    controller.release()
+    assert controller.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_passes_on_a_handed_slot():
+    controller = _controller()
+    await controller.acquire()
+    queued = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+
+    # The request is cancelled, then handed a slot before it gets to resume.
+    queued.cancel()
+    controller.release()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+
+    assert controller.in_flight == 0
+    assert controller.waiting == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    controller = _controller()
+    await controller.acquire()
+    queued = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+
+    assert controller.waiting == 0
+    controller.release()
+    assert controller.in_flight == 0
+
+
+def test_retry_after_is_jittered_within_bounds():
+    controller = _controller(retry_after_seconds=5)
+    assert all(5 <= controller.retry_after() <= 10 for _ in range(50))
+
+
+def _app_with(controller, background=None):
+    test_app = FastAPI()
+
+    @test_app.post("/api/sensors/ingest/environmental")
+    async def ingest(background_tasks: BackgroundTasks):
+        if background is not None:
+            background_tasks.add_task(background)
+        return {"ok": True}
+
+    @test_app.post("/api/access/check")
+    async def access():
+        return {"ok": True}
+
+    test_app.add_middleware(
+        AdmissionControlMiddleware,
+        controller=controller,
+        path_prefixes=("/api/sensors/ingest",),
+    )
+    return TestClient(test_app)
+
+
+def test_shed_requests_get_503_with_retry_after():
+    controller = _controller(queue_depth=0)
+    controller.in_flight = 1  # saturated
+
+    response = _app_with(controller).post("/api/sensors/ingest/environmental")
+
+    assert response.status_code == 503
+    assert 5 <= int(response.headers["Retry-After"]) <= 10
+    assert response.json()["reason"] == SHED_QUEUE_FULL
+
+
+def test_paths_outside_prefixes_are_never_shed():
+    controller = _controller(queue_depth=0)
+    controller.in_flight = 1
+
+    response = _app_with(controller).post("/api/access/check")
+
+    assert response.status_code == 200
+    assert controller.stats()["shed_queue_full"] == 0
+
+
+def test_slot_released_after_request():
+    controller = _controller()
+    client = _app_with(controller)
+    for _ in range(3):
+        assert client.post("/api/sensors/ingest/environmental").status_code == 200
+    assert controller.in_flight == 0
+    assert controller.stats()["admitted"] == 3
+
+
+def test_slot_released_before_background_tasks_run():
+    controller = _controller()
+    in_flight = []
+
+    def store():
+        in_flight.append(controller.in_flight)
+
+    assert _app_with(controller, store).post("/api/sensors/ingest/environmental").status_code == 200
+    assert in_flight == [0]
+    assert controller.in_flight == 0
+
+
+def test_shed_requests_are_not_logged_as_warnings(caplog):
+    controller = _controller(queue_depth=0)
+    controller.in_flight = 1
+    client = _app_with(controller)
+
+    with caplog.at_level(logging.INFO):
+        for _ in range(3):
+            assert client.post("/api/sensors/ingest/environmental").status_code == 503
+
+    assert not [record for record in caplog.records if record.levelno >= logging.WARNING]
+    assert controller.stats()["shed_queue_full"] == 3
+
+
+def test_metrics_endpoint_reports_shed_counters():
+    response = TestClient(app).get("/health/metrics")
+    assert response.status_code == 200
+    assert "shed_queue_full" in response.json()["ingest_admission"]
@@ -0,0 +1,171 @@
+"""
+Unit tests for the asyncpg-backed AsyncDatabaseClient.
+
+No connections are opened; these tests cover configuration, parity
+with the synchronous DatabaseClient surface used by request handlers and
+the Core statements behind the hot lookups (connections are faked).
+"""
+
+import inspect
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.services.async_db_client import AsyncDatabaseClient, _async_database_url
+from app.services.db_client import (
+    _INSERT_ACCESS_LOG, _INSERT_AUTOMATION_RULE, _SELECT_AUTOMATION_RULES, _SELECT_DEVICES_BY_ID,
+    _SELECT_RFID_CARD, DatabaseClient,
+)
+
+URL = "postgresql://u:p@localhost/x"
+
+# Methods handlers may call on either client.
+SHARED_METHODS = [
+    "get_device",
+    "get_devices",
+    "update_device_status",
+    "get_rfid_card",
+    "upsert_rfid_card",
+    "list_rfid_cards",
+    "log_access_attempt",
+    "get_access_logs",
+    "list_automation_rules",
+    "create_automation_rule",
+    "update_automation_rule",
+    "toggle_automation_rule",
+    "delete_automation_rule",
+]
+
+
+def test_database_url_uses_asyncpg_driver():
+    assert _async_database_url("postgresql://u:p@db:5432/smart_home") == (
+        "postgresql+asyncpg://u:p@db:5432/smart_home"
+    )
+    assert _async_database_url("postgresql+psycopg2://u:p@db/x").startswith("postgresql+asyncpg://")
+
+
+def test_database_url_keeps_explicit_async_driver():
+    url = "postgresql+asyncpg://u:p@db/x"
+    assert _async_database_url(url) == url
+
+
+def test_async_client_has_its_own_pool():
+    client = AsyncDatabaseClient("postgresql://u:p@localhost/x")
+    assert client.engine.dialect.driver == "asyncpg"
+    assert client.engine.pool is not DatabaseClient("postgresql://u:p@localhost/x").engine.pool
+
+
+def test_method_surface_matches_sync_client():
+    for name in SHARED_METHODS:
+        async_method = getattr(AsyncDatabaseClient, name)
+        sync_method = getattr(DatabaseClient, name)
+        assert inspect.iscoroutinefunction(async_method), name
+        assert list(inspect.signature(async_method).parameters) == list(
+            inspect.signature(sync_method).parameters
+        ), name
+
+
+def _fake_connection(result):
+    connection = MagicMock()
+    connection.execute = AsyncMock(return_value=result)
+
+    @asynccontextmanager
+    async def open_connection():
+        yield connection
+
+    return connection, open_connection
+
+
+async def test_get_rfid_card_runs_core_statement():
+    client = AsyncDatabaseClient(URL)
+    result = MagicMock()
+    result.first.return_value = SimpleNamespace(card_uid="04:A3", user_id="alice", label="Front", active=True)
+    connection, open_connection = _fake_connection(result)
+    with patch.object(client, "connect", open_connection):
+        card = await client.get_rfid_card("04:A3")
+
+    assert card == {"card_uid": "04:A3", "user_id": "alice", "label": "Front", "active": True}
+    assert connection.execute.call_args.args == (_SELECT_RFID_CARD, {"card_uid": "04:A3"})
+
+
+async def test_log_access_attempt_inserts_in_a_transaction():
+    client = AsyncDatabaseClient(URL)
+    connection, open_connection = _fake_connection(MagicMock())
+    with patch.object(client, "begin", open_connection):
+        assert await client.log_access_attempt("04:A3", "door-01", True, "ok", "2026-01-01T00:00:00Z")
+
+    statement, params = connection.execute.call_args.args
+    assert statement is _INSERT_ACCESS_LOG
+    assert params["timestamp"] == datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+async def test_list_automation_rules_matches_sync_shape():
+    client = AsyncDatabaseClient(URL)
+    created = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    rows = [SimpleNamespace(rule_id="r1", name="Hot", trigger="temperature", comparator=">",
+                            threshold=28.0, action="fan", action_value="on", enabled=True,
+                            created_at=created, updated_at=None)]
+    connection, open_connection = _fake_connection(rows)
+    with patch.object(client, "connect", open_connection):
+        rules = await client.list_automation_rules()
+
+    assert connection.execute.call_args.args == (_SELECT_AUTOMATION_RULES,)
+    assert rules[0]["id"] == "r1"
+    assert rules[0]["created_at"] == created.isoformat()
+
+
+def _rule_row(**overrides):
+    row = dict(rule_id="r1", name="Hot", trigger="temperature", comparator=">", threshold=28.0,
+               action="fan", action_value="on", enabled=True,
+               created_at=datetime(2026, 1, 1, tzinfo=timezone.utc), updated_at=None)
+    return SimpleNamespace(**{**row, **overrides})
+
+
+async def test_create_and_update_return_the_list_shape():
+    client = AsyncDatabaseClient(URL)
+    result = MagicMock()
+    result.one.return_value = _rule_row()
+    result.first.return_value = _rule_row(threshold=30.0)
+    connection, open_connection = _fake_connection(result)
+    with patch.object(client, "begin", open_connection):
+        created = await client.create_automation_rule(
+            {"name": "Hot", "trigger": "temperature", "comparator": ">", "threshold": 28, "action": "fan"})
+        statement, values = connection.execute.call_args.args
+        updated = await client.update_automation_rule("r1", {"threshold": "30"})
+
+    assert statement is _INSERT_AUTOMATION_RULE
+    assert values["rule_id"].startswith("rule-") and values["threshold"] == 28.0
+    assert set(created) == set(updated) == {
+        "id", "name", "trigger", "comparator", "threshold", "action", "action_value", "enabled",
+        "created_at", "updated_at",
+    }
+    assert updated["threshold"] == 30.0
+
+
+async def test_get_device_queries_by_id():
+    client = AsyncDatabaseClient(URL)
+    rows = [SimpleNamespace(device_id="door-01", device_type="access_control", name="Door",
+                            location=None, status="online", last_seen=None)]
+    connection, open_connection = _fake_connection(rows)
+    with patch.object(client, "connect", open_connection):
+        device = await client.get_device("door-01")
+
+    assert device["device_id"] == "door-01"
+    assert connection.execute.call_args.args == (_SELECT_DEVICES_BY_ID, {"device_ids": ["door-01"]})
+
+
+async def test_status_update_evicts_sync_registry():
+    client = AsyncDatabaseClient(URL)
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(rowcount=1))
+
+    @asynccontextmanager
+    async def open_session():
+        yield session
+
+    with patch.object(client, "get_session", open_session), \
+            patch("app.services.async_db_client.db_client") as mock_sync:
+        assert await client.update_device_status("door-01", "online") is True
+
+    mock_sync.invalidate_device.assert_called_once_with("door-01")
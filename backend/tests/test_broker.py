@@ -3,6 +3,7 @@ Unit tests for the message broker service (MQTT and Redis implementations).
 """
 
 import asyncio
+import logging
 from unittest.mock import patch
 
 import pytest
@@ -16,12 +17,12 @@ from app.services.broker import MQTTBroker, RedisBroker, _create_broker
 
 
 @pytest.mark.asyncio
-async def test_mqtt_broker_publish(capsys):
+async def test_mqtt_broker_publish(caplog):
+    caplog.set_level(logging.DEBUG, logger="app.services.broker")
     broker = MQTTBroker("mqtt://localhost:1883")
     await broker.publish("sensors/temperature", {"value": 22.5})
-    captured = capsys.readouterr()
-    assert "MQTT" in captured.out
-    assert "sensors/temperature" in captured.out
+    assert "MQTT" in caplog.text
+    assert "sensors/temperature" in caplog.text
 
 
 # ---------------------------------------------------------------------------
@@ -30,12 +31,12 @@ async def test_mqtt_broker_publish(capsys):
 
 
 @pytest.mark.asyncio
-async def test_redis_broker_publish(capsys):
+async def test_redis_broker_publish(caplog):
+    caplog.set_level(logging.DEBUG, logger="app.services.broker")
     broker = RedisBroker("redis://localhost:6379/0")
     await broker.publish("sensors/humidity", {"value": 55.0})
-    captured = capsys.readouterr()
-    assert "REDIS" in captured.out
-    assert "sensors/humidity" in captured.out
+    assert "REDIS" in caplog.text
+    assert "sensors/humidity" in caplog.text
 
 
 # ---------------------------------------------------------------------------
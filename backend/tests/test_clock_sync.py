@@ -0,0 +1,101 @@
+"""
+Tests for per-device clock models and timestamp normalisation.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.clock_sync import CLOCK_UPTIME, CLOCK_WALL, ClockSync, parse_device_time
+
+NOW = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc).timestamp()
+
+
+def _epoch(value: datetime) -> float:
+    return value.timestamp()
+
+
+def test_parse_device_time():
+    assert parse_device_time("2026-01-01T12:00:00Z") == (CLOCK_WALL, NOW)
+    assert parse_device_time("2026-01-01T12:00:00") == (CLOCK_WALL, NOW)
+    assert parse_device_time("2026-01-01T13:00:00+01:00") == (CLOCK_WALL, NOW)
+    assert parse_device_time("123456") == (CLOCK_UPTIME, 123.456)
+    for bad in ("", "soon", "-5", "nan"):
+        with pytest.raises(ValueError):
+            parse_device_time(bad)
+
+
+def test_synced_wall_clock_is_stored_as_sent():
+    sync = ClockSync(trusted_skew_seconds=2.0)
+    at = sync.normalise("dev", "2026-01-01T12:00:00Z", received=NOW + 0.3)
+    assert _epoch(at) == NOW
+    assert at.tzinfo is not None
+    assert sync.stats()["corrected"] == 0
+
+
+def test_skewed_wall_clock_is_corrected():
+    sync = ClockSync()
+    # Device clock never set: it thinks it is 1970 plus uptime.
+    for i in range(10):
+        at = sync.normalise("dev", f"1970-01-01T00:{i:02d}:00Z", received=NOW + 60 * i + 0.05)
+        assert abs(_epoch(at) - (NOW + 60 * i)) < 0.1
+    assert sync.estimate("dev")["clock"] == CLOCK_WALL
+    assert sync.stats()["corrected"] == 10
+
+
+def test_uptime_timestamps_are_mapped_to_server_time():
+    sync = ClockSync()
+    boot = NOW - 3600
+    for i in range(20):
+        uptime_ms = (3600 + 10 * i) * 1000
+        at = sync.normalise("dev", str(uptime_ms), received=boot + uptime_ms / 1000 + 0.02)
+        assert abs(_epoch(at) - (boot + uptime_ms / 1000)) < 0.05
+    assert sync.stats()["uptime_clocks"] == 1
+
+
+def test_drift_is_estimated():
+    sync = ClockSync()
+    # Device clock runs 100 ppm slow.
+    for i in range(50):
+        device = NOW + 60 * i * (1 - 100e-6)
+        sync.normalise("dev", str(int((device - NOW + 1000) * 1000)), received=NOW + 60 * i)
+    assert sync.estimate("dev")["drift_ppm"] == pytest.approx(100, abs=5)
+
+
+def test_normalised_time_is_never_in_the_future():
+    sync = ClockSync()
+    sync.normalise("dev", "1000", received=NOW)
+    # Delivered faster than the first sample: clamp to receive time.
+    at = sync.normalise("dev", "2000", received=NOW + 0.5)
+    assert _epoch(at) <= NOW + 0.5
+
+
+def test_reboot_restarts_the_model():
+    sync = ClockSync()
+    sync.normalise("dev", "500000", received=NOW)
+    at = sync.normalise("dev", "1000", received=NOW + 30)
+    assert _epoch(at) == pytest.approx(NOW + 30)
+    assert sync.estimate("dev")["resets"] == 1
+
+
+def test_buffered_readings_do_not_train_the_model():
+    sync = ClockSync()
+    sync.normalise("dev", "600000", received=NOW)
+    at = sync.normalise("dev", "300000", received=NOW + 1, learn=False)
+    assert _epoch(at) == pytest.approx(NOW - 300)
+    assert sync.estimate("dev")["samples"] == 1
+
+
+def test_unparseable_timestamp_falls_back_to_receive_time():
+    sync = ClockSync()
+    at = sync.normalise("dev", "not-a-time", received=NOW)
+    assert _epoch(at) == NOW
+    assert sync.stats()["invalid"] == 1
+
+
+def test_devices_are_bounded():
+    sync = ClockSync(max_devices=2)
+    for device_id in ("a", "b", "c"):
+        sync.normalise(device_id, "1000", received=NOW)
+    assert sync.estimate("a") is None
+    assert sync.stats()["devices"] == 2
@@ -0,0 +1,93 @@
+"""
+Unit tests for the ingest stream compressor.
+"""
+
+import pytest
+
+from app.services.compression import StreamCompressor, parse_tolerances
+
+
+def test_parse_tolerances():
+    assert parse_tolerances("temperature=0.1, humidity=0.5,bad,pressure=x") == {
+        "temperature": 0.1,
+        "humidity": 0.5,
+    }
+
+
+def test_deadband_drops_changes_within_tolerance():
+    compressor = StreamCompressor({"temperature": 0.1})
+    assert compressor.sample("dev", {"temperature": 21.00}, at=0) == {"temperature"}
+    assert compressor.sample("dev", {"temperature": 21.05}, at=1) == set()
+    assert compressor.sample("dev", {"temperature": 21.09}, at=2) == set()
+    assert compressor.sample("dev", {"temperature": 21.20}, at=3) == {"temperature"}
+
+
+def test_fields_without_tolerance_are_kept_on_change():
+    compressor = StreamCompressor({"temperature": 1.0})
+    compressor.sample("dev", {"temperature": 21.0, "fan_on": False}, at=0)
+    assert compressor.sample("dev", {"temperature": 21.0, "fan_on": False}, at=1) == set()
+    assert compressor.sample("dev", {"temperature": 21.0, "fan_on": True}, at=2) == {"fan_on"}
+
+
+def test_keepalive_forces_a_full_sample():
+    compressor = StreamCompressor({"temperature": 1.0, "humidity": 1.0}, keepalive_seconds=10)
+    compressor.sample("dev", {"temperature": 21.0, "humidity": 40.0}, at=0)
+    assert compressor.sample("dev", {"temperature": 21.0, "humidity": 40.0}, at=5) == set()
+    assert compressor.sample("dev", {"temperature": 21.0, "humidity": 40.0}, at=10) == {
+        "temperature",
+        "humidity",
+    }
+
+
+def test_devices_are_compressed_independently():
+    compressor = StreamCompressor({"temperature": 1.0})
+    compressor.sample("dev-1", {"temperature": 21.0}, at=0)
+    assert compressor.sample("dev-2", {"temperature": 21.0}, at=1) == {"temperature"}
+
+
+def test_swinging_door_drops_points_on_a_straight_line():
+    compressor = StreamCompressor({"temperature": 0.05}, mode="swinging_door")
+    kept = [
+        compressor.sample("dev", {"temperature": 20.0 + 0.1 * t}, at=t) for t in range(10)
+    ]
+    # A steady ramp is one segment: deadband would keep every other sample.
+    assert sum(1 for k in kept if k) == 1
+
+
+def test_swinging_door_keeps_a_change_of_slope():
+    compressor = StreamCompressor({"temperature": 0.05}, mode="swinging_door")
+    for t in range(5):
+        compressor.sample("dev", {"temperature": 20.0 + 0.1 * t}, at=t)
+    assert compressor.sample("dev", {"temperature": 20.0}, at=5) == {"temperature"}
+
+
+def test_report_includes_reconstruction_error():
+    compressor = StreamCompressor({"temperature": 0.1})
+    for t, value in enumerate([21.0, 21.05, 20.95, 21.5]):
+        compressor.sample("dev", {"temperature": value}, at=t)
+
+    metric = compressor.report()["metrics"]["temperature"]
+    assert metric["offered"] == 4
+    assert metric["kept"] == 2
+    assert metric["dropped"] == 2
+    assert metric["compression_ratio"] == 2.0
+    assert metric["max_error"] == pytest.approx(0.05)
+    assert metric["rms_error"] == pytest.approx(0.05)
+
+
+def test_reset_keeps_next_reading():
+    compressor = StreamCompressor({"temperature": 1.0})
+    compressor.sample("dev", {"temperature": 21.0}, at=0)
+    compressor.reset("dev")
+    assert compressor.sample("dev", {"temperature": 21.0}, at=1) == {"temperature"}
+
+
+def test_off_mode_keeps_everything():
+    compressor = StreamCompressor({"temperature": 1.0}, mode="off")
+    compressor.sample("dev", {"temperature": 21.0}, at=0)
+    assert compressor.sample("dev", {"temperature": 21.0, "humidity": None}, at=1) == {"temperature"}
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        StreamCompressor({}, mode="gzip")
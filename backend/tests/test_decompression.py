@@ -0,0 +1,98 @@
+"""
+Tests for gzip/deflate request-body decompression on the ingest routes.
+"""
+
+import gzip
+import json
+import zlib
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.middleware import RequestDecompressionMiddleware
+
+client = TestClient(app)
+
+ENVIRONMENTAL_PAYLOAD = {
+    "device_id": "sensor-01",
+    "timestamp": "2026-01-01T00:00:00Z",
+    "temperature": 22.5,
+    "humidity": 55.0,
+    "pressure": 1013.0,
+}
+
+
+def _echo_app(max_body_bytes=1024):
+    echo = FastAPI()
+
+    @echo.post("/ingest")
+    async def ingest(request: Request):
+        body = await request.body()
+        return {
+            "size": len(body),
+            "content_length": request.headers.get("content-length"),
+            "content_encoding": request.headers.get("content-encoding"),
+        }
+
+    echo.add_middleware(RequestDecompressionMiddleware, max_body_bytes=max_body_bytes,
+                        path_prefixes=("/ingest",))
+    return TestClient(echo)
+
+
+@pytest.mark.parametrize("encoding, compress", [
+    ("gzip", gzip.compress),
+    ("deflate", zlib.compress),
+    ("deflate", lambda data: zlib.compress(data)[2:-4]),  # raw deflate
+])
+def test_compressed_ingest_is_accepted(encoding, compress):
+    body = json.dumps(ENVIRONMENTAL_PAYLOAD).encode()
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client") as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        response = client.post(
+            "/api/sensors/ingest/environmental",
+            content=compress(body),
+            headers={"Content-Type": "application/json", "Content-Encoding": encoding},
+        )
+        stored = mock_db.insert_sensor_readings.call_args[0][0][0]
+
+    assert response.status_code == 202
+    assert stored["temperature"] == 22.5
+
+
+def test_headers_describe_the_inflated_body():
+    body = b"x" * 500
+    response = _echo_app().post("/ingest", content=gzip.compress(body),
+                                headers={"Content-Encoding": "gzip"})
+    assert response.json() == {"size": 500, "content_length": "500", "content_encoding": None}
+
+
+def test_zip_bomb_rejected_with_413():
+    bomb = gzip.compress(b"\0" * 10_000_000)
+    response = _echo_app(max_body_bytes=1024).post("/ingest", content=bomb,
+                                                   headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 413
+
+
+def test_corrupt_body_rejected_with_400():
+    response = _echo_app().post("/ingest", content=b"not gzip at all",
+                                headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 400
+
+
+def test_truncated_body_rejected_with_400():
+    response = _echo_app().post("/ingest", content=gzip.compress(b"x" * 100)[:-10],
+                                headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 400
+
+
+def test_unsupported_encoding_rejected_with_415():
+    response = _echo_app().post("/ingest", content=b"...", headers={"Content-Encoding": "br"})
+    assert response.status_code == 415
+
+
+def test_uncompressed_requests_pass_through():
+    response = _echo_app().post("/ingest", content=b"plain")
+    assert response.json()["size"] == 5
@@ -0,0 +1,47 @@
+"""
+Unit tests for the ingest replay filter.
+"""
+
+from app.services.dedup import ReplayFilter
+
+
+def test_first_reading_is_not_a_replay():
+    replays = ReplayFilter()
+    assert replays.seen("dev-1", "2026-01-01T00:00:00Z") is False
+    assert replays.seen("dev-1", "2026-01-01T00:00:00Z") is True
+    assert replays.stats() == {"devices": 1, "checked": 2, "replays": 1}
+
+
+def test_keys_are_scoped_by_device_and_kind():
+    replays = ReplayFilter()
+    replays.seen("dev-1", "t0", "lighting")
+    assert replays.seen("dev-2", "t0", "lighting") is False
+    assert replays.seen("dev-1", "t0", "environmental") is False
+
+
+def test_per_device_keys_are_bounded():
+    replays = ReplayFilter(max_keys_per_device=2)
+    for ts in ("t0", "t1", "t2"):
+        replays.seen("dev-1", ts)
+    # t0 was evicted, so it is treated as new again
+    assert replays.seen("dev-1", "t0") is False
+    assert replays.seen("dev-1", "t2") is True
+
+
+def test_least_recently_seen_device_is_evicted():
+    replays = ReplayFilter(max_devices=2)
+    replays.seen("dev-1", "t0")
+    replays.seen("dev-2", "t0")
+    replays.seen("dev-1", "t1")
+    replays.seen("dev-3", "t0")
+
+    assert replays.stats()["devices"] == 2
+    assert replays.seen("dev-1", "t0") is True
+    assert replays.seen("dev-2", "t0") is False
+
+
+def test_forget_allows_retry():
+    replays = ReplayFilter()
+    replays.seen("dev-1", "t0", "lighting")
+    replays.forget("dev-1", "t0", "lighting")
+    assert replays.seen("dev-1", "t0", "lighting") is False
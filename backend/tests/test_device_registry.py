@@ -0,0 +1,107 @@
+"""
+Unit tests for the in-memory device registry cache.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.services.device_registry import DeviceRegistry
+
+DEVICE = {"device_id": "room-node-01", "device_type": "room_node", "status": "offline"}
+
+
+class FakeDevicesTable:
+    def __init__(self, *devices):
+        self.rows = {d["device_id"]: dict(d) for d in devices}
+        self.calls = []
+
+    def __call__(self, device_ids):
+        self.calls.append(sorted(device_ids))
+        return {i: dict(self.rows[i]) for i in device_ids if i in self.rows}
+
+
+@pytest.fixture
+def table():
+    return FakeDevicesTable(DEVICE)
+
+
+def test_loaded_devices_are_served_without_fetch(table):
+    registry = DeviceRegistry(table)
+    assert registry.load([DEVICE]) == 1
+
+    assert registry.get("room-node-01") == DEVICE
+    assert table.calls == []
+    assert registry.stats()["hits"] == 1
+
+
+def test_miss_fetches_once_then_hits(table):
+    registry = DeviceRegistry(table)
+    registry.get("room-node-01")
+    registry.get("room-node-01")
+    assert table.calls == [["room-node-01"]]
+
+
+def test_returned_rows_are_copies(table):
+    registry = DeviceRegistry(table)
+    registry.get("room-node-01")["status"] = "mutated"
+    assert registry.get("room-node-01")["status"] == "offline"
+
+
+def test_unknown_device_is_negatively_cached(table):
+    registry = DeviceRegistry(table, negative_ttl_seconds=30)
+    for _ in range(5):
+        assert registry.get("ghost") is None
+    assert table.calls == [["ghost"]]
+
+
+def test_negative_cache_can_be_disabled(table):
+    registry = DeviceRegistry(table, negative_ttl_seconds=0)
+    registry.get("ghost")
+    registry.get("ghost")
+    assert len(table.calls) == 2
+
+
+def test_negative_cache_is_bounded(table):
+    registry = DeviceRegistry(table, max_negative_entries=3)
+    for n in range(10):
+        registry.get(f"ghost-{n}")
+    assert registry.stats()["negative_entries"] == 3
+
+
+def test_expired_entries_are_refetched(table):
+    registry = DeviceRegistry(table, ttl_seconds=10)
+    with patch("app.services.device_registry.time.monotonic", return_value=1000.0):
+        registry.get("room-node-01")
+    with patch("app.services.device_registry.time.monotonic", return_value=1011.0):
+        registry.get("room-node-01")
+    assert len(table.calls) == 2
+
+
+def test_get_many_fetches_only_misses_in_one_call(table):
+    table.rows["door-01"] = {"device_id": "door-01"}
+    registry = DeviceRegistry(table)
+    registry.load([DEVICE])
+
+    found = registry.get_many(["room-node-01", "door-01", "ghost"])
+    assert set(found) == {"room-node-01", "door-01"}
+    assert table.calls == [["door-01", "ghost"]]
+
+
+def test_update_and_invalidate(table):
+    registry = DeviceRegistry(table)
+    registry.load([DEVICE])
+    registry.update("room-node-01", status="online")
+    assert registry.get("room-node-01")["status"] == "online"
+
+    registry.invalidate("room-node-01")
+    assert registry.get("room-node-01")["status"] == "offline"
+    assert table.calls == [["room-node-01"]]
+
+
+def test_invalidate_all_clears_negative_entries(table):
+    registry = DeviceRegistry(table)
+    registry.get("ghost")
+    table.rows["ghost"] = {"device_id": "ghost"}
+    registry.invalidate()
+    assert registry.get("ghost") == {"device_id": "ghost"}
@@ -0,0 +1,91 @@
+"""
+Tests for LTTB downsampling, checked against a pure-Python reference.
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from app.utils.downsampling import lttb_indices, stack_batches
+
+
+def reference_lttb(data, threshold):
+    """Steinarsson's reference LTTB; returns the indices of the kept points."""
+    n = len(data)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    sampled = [0]
+    for i in range(threshold - 2):
+        avg_start = int(math.floor((i + 1) * every)) + 1
+        avg_end = min(int(math.floor((i + 2) * every)) + 1, n)
+        avg_x = sum(point[0] for point in data[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(point[1] for point in data[avg_start:avg_end]) / (avg_end - avg_start)
+
+        range_start = int(math.floor(i * every)) + 1
+        range_end = int(math.floor((i + 1) * every)) + 1
+        ax, ay = data[a]
+        max_area = -1.0
+        next_a = range_start
+        for j in range(range_start, range_end):
+            area = abs((ax - avg_x) * (data[j][1] - ay) - (ax - data[j][0]) * (avg_y - ay)) * 0.5
+            if area > max_area:
+                max_area = area
+                next_a = j
+        sampled.append(next_a)
+        a = next_a
+    sampled.append(n - 1)
+    return sampled
+
+
+@pytest.mark.parametrize("n,threshold", [
+    (5, 3), (10, 4), (100, 3), (1000, 100), (12345, 1000), (5000, 4999),
+])
+def test_matches_reference_on_random_walk(n, threshold):
+    rng = np.random.default_rng(n + threshold)
+    x = np.cumsum(rng.random(n) + 0.01)
+    y = rng.normal(size=n).cumsum()
+
+    expected = reference_lttb(list(zip(x.tolist(), y.tolist())), threshold)
+    assert lttb_indices(x, y, threshold).tolist() == expected
+
+
+def test_matches_reference_with_ties():
+    x = np.arange(200, dtype=float)
+    y = np.tile([0.0, 1.0, 1.0, 0.0], 50)
+
+    expected = reference_lttb(list(zip(x.tolist(), y.tolist())), 20)
+    assert lttb_indices(x, y, 20).tolist() == expected
+
+
+def test_keeps_endpoints_and_spike():
+    x = np.arange(10_000, dtype=float)
+    y = np.zeros(10_000)
+    y[4321] = 100.0
+
+    kept = lttb_indices(x, y, 50)
+
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 9999
+    assert 4321 in kept
+    assert np.all(np.diff(kept) > 0)
+
+
+@pytest.mark.parametrize("threshold", [0, 2, 10, 11])
+def test_short_series_returned_whole(threshold):
+    x = np.arange(10, dtype=float)
+    assert lttb_indices(x, x, threshold).tolist() == list(range(10))
+
+
+def test_stack_batches_maps_none_and_bools():
+    rows = stack_batches([[(1.0, None, True)], [], [(2.0, 3, False)]], 3)
+
+    assert rows.shape == (2, 3)
+    assert math.isnan(rows[0, 1])
+    assert rows[:, 2].tolist() == [1.0, 0.0]
+
+
+def test_stack_batches_empty():
+    assert stack_batches([], 5).shape == (0, 5)
@@ -0,0 +1,111 @@
+"""
+Unit tests for the latest-state tracker that coalesces device_latest_state upserts.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import exc as sa_exc
+
+from app.services.latest_state import LatestStateTracker, latest_state_dict, merge_state
+
+T0 = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _row(device_id, time, **metrics):
+    return {"device_id": device_id, "time": time, **metrics}
+
+
+class RecordingWriter:
+    def __init__(self, fail=False, poison=()):
+        self.batches = []
+        self.fail = fail
+        self.poison = set(poison)
+
+    def __call__(self, rows):
+        if self.fail:
+            raise sa_exc.OperationalError("INSERT", {}, Exception("db down"))
+        if any(row["device_id"] in self.poison for row in rows):
+            raise sa_exc.IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        self.batches.append({row["device_id"]: row for row in rows})
+        return len(rows)
+
+
+def test_merge_keeps_unreported_metrics():
+    state = merge_state(None, _row("room-node-01", T0, temperature=21.0, humidity=40.0))
+    state = merge_state(state, _row("room-node-01", T0 + timedelta(seconds=5), temperature=21.5, humidity=None))
+
+    assert state["time"] == T0 + timedelta(seconds=5)
+    assert state["temperature"] == 21.5
+    assert state["humidity"] == 40.0
+    assert state["fan_on"] is None
+
+
+def test_merge_ignores_older_readings():
+    state = merge_state(None, _row("room-node-01", T0, temperature=21.0))
+    assert merge_state(state, _row("room-node-01", T0 - timedelta(seconds=1), temperature=5.0)) == state
+
+
+def test_readings_are_coalesced_per_device():
+    writer = RecordingWriter()
+    tracker = LatestStateTracker(writer)
+    tracker.record([
+        _row("room-node-01", T0, temperature=21.0),
+        _row("room-node-01", T0 + timedelta(seconds=1), light_lux=300.0),
+        _row("sensor-01", T0, dimmer_brightness=60),
+    ])
+
+    assert tracker.flush() == 2
+    batch = writer.batches[0]
+    assert batch["room-node-01"]["temperature"] == 21.0
+    assert batch["room-node-01"]["light_lux"] == 300.0
+    assert batch["sensor-01"]["dimmer_brightness"] == 60
+    assert tracker.stats()["recorded"] == 3
+    assert tracker.pending() == {}
+
+
+def test_flush_without_rows_skips_writer():
+    writer = RecordingWriter()
+    assert LatestStateTracker(writer).flush() == 0
+    assert writer.batches == []
+
+
+def test_failed_flush_merges_rows_back():
+    writer = RecordingWriter(fail=True)
+    tracker = LatestStateTracker(writer)
+    tracker.record([_row("room-node-01", T0, temperature=21.0, humidity=40.0)])
+
+    assert tracker.flush() == 0
+    assert tracker.stats()["failed_flushes"] == 1
+    tracker.record([_row("room-node-01", T0 + timedelta(seconds=1), temperature=22.0)])
+
+    writer.fail = False
+    tracker.flush()
+    row = writer.batches[0]["room-node-01"]
+    assert (row["temperature"], row["humidity"]) == (22.0, 40.0)
+
+
+def test_rejected_device_does_not_block_the_others():
+    writer = RecordingWriter(poison={"deleted-node"})
+    tracker = LatestStateTracker(writer)
+    tracker.record([_row(device_id, T0, temperature=21.0)
+                    for device_id in ("room-node-01", "deleted-node", "room-node-02")])
+
+    assert tracker.flush() == 2
+    assert sorted(device for batch in writer.batches for device in batch) == ["room-node-01", "room-node-02"]
+    stats = tracker.stats()
+    assert (stats["pending"], stats["rejected_rows"], stats["failed_flushes"]) == (0, 1, 0)
+
+
+def test_stop_flushes_pending():
+    writer = RecordingWriter()
+    tracker = LatestStateTracker(writer, flush_interval_seconds=60)
+    tracker.start()
+    tracker.record([_row("room-node-01", T0, fan_on=True)])
+    tracker.stop()
+    assert writer.batches[0]["room-node-01"]["fan_on"] is True
+
+
+def test_latest_state_dict_formats_time():
+    state = latest_state_dict(merge_state(None, _row("room-node-01", T0, relays=[True, False])))
+    assert state["time"] == "2026-01-01T12:00:00+00:00"
+    assert state["relays"] == [True, False]
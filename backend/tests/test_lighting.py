@@ -5,6 +5,7 @@ External services (db_client, ws_manager) are patched so these tests
 run without a real database or device connection.
 """
 
+import asyncio
 from unittest.mock import AsyncMock, patch
 
 import pytest
@@ -86,6 +87,37 @@ def test_set_dimmer_success():
     assert "75%" in body["message"]
 
 
+def test_set_dimmer_queries_database_off_the_event_loop():
+    """Device lookup and state insert run in worker threads, not on the event loop."""
+    calls = []
+
+    def on_loop(name):
+        def call(*args):
+            try:
+                asyncio.get_running_loop()
+                calls.append((name, True))
+            except RuntimeError:
+                calls.append((name, False))
+            return MOCK_DEVICE
+        return call
+
+    with (
+        patch("app.api.lighting.db_client") as mock_db,
+        patch("app.api.lighting.ws_manager") as mock_ws,
+    ):
+        mock_db.get_device.side_effect = on_loop("get_device")
+        mock_db.insert_dimmer_state.side_effect = on_loop("insert_dimmer_state")
+        mock_ws.is_device_connected.return_value = True
+        mock_ws.send_dimmer_command = AsyncMock(return_value=True)
+
+        response = client.post(
+            f"/api/lighting/dimmer/{DEVICE_ID}", json={"brightness": 75}
+        )
+
+    assert response.status_code == 200
+    assert calls == [("get_device", False), ("insert_dimmer_state", False)]
+
+
 def test_set_dimmer_invalid_brightness():
     """Brightness outside [0, 100] should be rejected with 422."""
     response = client.post(
@@ -300,6 +332,7 @@ def test_get_device_status_from_db():
     ):
         mock_db.get_device.return_value = MOCK_DEVICE
         mock_ws.get_device_state.return_value = {}
+        mock_db.get_latest_state.return_value = None
         mock_db.get_latest_lighting_data.return_value = db_state
         mock_ws.is_device_connected.return_value = False
 
@@ -311,6 +344,25 @@ def test_get_device_status_from_db():
     assert body["online"] is False
 
 
+def test_get_device_status_prefers_latest_state_table():
+    latest = {"device_id": DEVICE_ID, "time": "2026-01-01T00:00:00+00:00", "dimmer_brightness": 70}
+
+    with (
+        patch("app.api.lighting.db_client") as mock_db,
+        patch("app.api.lighting.ws_manager") as mock_ws,
+    ):
+        mock_db.get_device.return_value = MOCK_DEVICE
+        mock_ws.get_device_state.return_value = {}
+        mock_db.get_latest_state.return_value = latest
+        mock_ws.is_device_connected.return_value = False
+
+        response = client.get(f"/api/lighting/status/{DEVICE_ID}")
+
+        mock_db.get_latest_lighting_data.assert_not_called()
+
+    assert response.json()["current_state"] == latest
+
+
 def test_get_device_status_no_state():
     """Device exists but has no cached or persisted state."""
     with (
@@ -319,6 +371,7 @@ def test_get_device_status_no_state():
     ):
         mock_db.get_device.return_value = MOCK_DEVICE
         mock_ws.get_device_state.return_value = {}
+        mock_db.get_latest_state.return_value = None
         mock_db.get_latest_lighting_data.return_value = None
         mock_ws.is_device_connected.return_value = False
 
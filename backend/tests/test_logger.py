@@ -0,0 +1,83 @@
+"""
+Unit tests for the logging setup (queue handler and per-logger sampling).
+"""
+
+import logging
+import logging.handlers
+
+import pytest
+
+from app.utils.logger import (
+    SamplingFilter,
+    get_logger,
+    parse_sampling,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+def _record(level=logging.INFO, msg="Broadcasted to 3 clients"):
+    return logging.LogRecord("app.ws.broadcast", level, __file__, 1, msg, None, None)
+
+
+def test_sampling_filter_keeps_one_in_n():
+    sampler = SamplingFilter(every=10)
+    kept = [sampler.filter(_record()) for _ in range(100)]
+    assert sum(kept) == 10
+    assert sampler.suppressed == 90
+
+
+def test_sampling_filter_never_drops_warnings():
+    sampler = SamplingFilter(every=1000)
+    assert all(sampler.filter(_record(logging.WARNING)) for _ in range(5))
+
+
+def test_parse_sampling_ignores_malformed_entries():
+    assert parse_sampling("app.ws.broadcast=100, app.ws.send=20,bad,x=y") == {
+        "app.ws.broadcast": 100,
+        "app.ws.send": 20,
+    }
+    assert parse_sampling("") == {}
+
+
+def test_get_logger_uses_app_namespace():
+    assert get_logger("app.api.sensors").name == "app.api.sensors"
+    assert get_logger("benchmarks").name == "app.benchmarks"
+
+
+@pytest.fixture
+def configured_logging():
+    app_logger = logging.getLogger("app")
+    saved = (app_logger.level, app_logger.propagate, list(app_logger.handlers))
+    sampled = logging.getLogger("app.test.sampled")
+    yield app_logger, sampled
+    shutdown_logging()
+    app_logger.setLevel(saved[0])
+    app_logger.propagate = saved[1]
+    app_logger.handlers[:] = saved[2]
+    sampled.filters.clear()
+
+
+def test_setup_logging_uses_queue_handler(configured_logging):
+    app_logger, sampled = configured_logging
+    listener = setup_logging("warning", "app.test.sampled=5")
+
+    assert app_logger.level == logging.WARNING
+    queue_handlers = [
+        h for h in app_logger.handlers if isinstance(h, logging.handlers.QueueHandler)
+    ]
+    assert len(queue_handlers) == 1
+    assert listener is not None
+    assert [f.every for f in sampled.filters if isinstance(f, SamplingFilter)] == [5]
+
+
+def test_setup_logging_is_idempotent(configured_logging):
+    app_logger, sampled = configured_logging
+    setup_logging("INFO", "app.test.sampled=5")
+    setup_logging("INFO", "app.test.sampled=7")
+
+    queue_handlers = [
+        h for h in app_logger.handlers if isinstance(h, logging.handlers.QueueHandler)
+    ]
+    assert len(queue_handlers) == 1
+    assert [f.every for f in sampled.filters if isinstance(f, SamplingFilter)] == [7]
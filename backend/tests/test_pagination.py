@@ -0,0 +1,23 @@
+"""
+Tests for keyset pagination cursors.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    at = datetime(2026, 1, 1, 12, 30, 0, 123456, tzinfo=timezone.utc)
+    cursor = encode_cursor("room-node-01", at)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == ("room-node-01", at)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "e30", "WzFd"])
+def test_invalid_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
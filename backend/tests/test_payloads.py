@@ -0,0 +1,140 @@
+"""
+Tests for MessagePack content negotiation on REST ingest and the device socket.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services.websocket_manager import ConnectionManager
+from app.utils.payloads import is_msgpack, wants_msgpack
+from app.utils.serialization import FastJSONResponse
+
+client = TestClient(app)
+
+ENVIRONMENTAL_PAYLOAD = {
+    "device_id": "sensor-01",
+    "timestamp": "2026-01-01T00:00:00Z",
+    "temperature": 22.5,
+    "humidity": 55.0,
+    "pressure": 1013.0,
+}
+
+
+def test_media_type_detection():
+    assert is_msgpack("application/msgpack")
+    assert is_msgpack("application/x-msgpack; charset=binary")
+    assert not is_msgpack("application/json")
+    assert not is_msgpack(None)
+    assert wants_msgpack("application/json, application/msgpack;q=0.9")
+    assert not wants_msgpack("*/*")
+
+
+def test_msgpack_ingest_body_is_validated_like_json():
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client") as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        response = client.post(
+            "/api/sensors/ingest/environmental",
+            content=msgpack.packb(ENVIRONMENTAL_PAYLOAD),
+            headers={"Content-Type": "application/msgpack"},
+        )
+        stored = mock_db.insert_sensor_readings.call_args[0][0][0]
+
+    assert response.status_code == 202
+    assert response.headers["content-type"].startswith("application/json")
+    assert stored["temperature"] == 22.5
+
+
+def test_msgpack_response_when_accepted():
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"):
+        mock_broker.publish = AsyncMock(return_value=None)
+        response = client.post(
+            "/api/sensors/ingest/environmental",
+            content=msgpack.packb(ENVIRONMENTAL_PAYLOAD),
+            headers={"Content-Type": "application/msgpack", "Accept": "application/msgpack"},
+        )
+
+    assert response.status_code == 202
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["device_id"] == "sensor-01"
+
+
+def test_msgpack_response_skips_json_render():
+    states = [{"device_id": "sensor-01", "temperature": 21.5, "time": "2026-01-01T00:00:00+00:00"}]
+    with patch("app.api.sensors.db_client") as mock_db, \
+            patch.object(FastJSONResponse, "render", side_effect=AssertionError("rendered JSON")):
+        mock_db.get_latest_states.return_value = states
+        response = client.get("/api/sensors/latest", headers={"Accept": "application/msgpack"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == {"devices": states, "count": 1}
+
+
+def test_msgpack_validation_errors_still_422():
+    response = client.post(
+        "/api/sensors/ingest/environmental",
+        content=msgpack.packb({"device_id": "sensor-01"}),
+        headers={"Content-Type": "application/msgpack"},
+    )
+    assert response.status_code == 422
+
+
+def test_malformed_msgpack_body_rejected():
+    response = client.post(
+        "/api/sensors/ingest/environmental",
+        content=b"\xc1",
+        headers={"Content-Type": "application/msgpack"},
+    )
+    assert response.status_code == 400
+
+
+def _auth_reply(challenge, device_id="room-node-01"):
+    message = ConnectionManager._canonical_auth_payload(
+        "device", device_id, challenge["nonce"], challenge["issued_at"]
+    )
+    return {
+        "type": "ws_auth",
+        "role": "device",
+        "id": device_id,
+        "nonce": challenge["nonce"],
+        "issued_at": challenge["issued_at"],
+        "signature": ConnectionManager._signature_hex(message, settings.WS_DEVICE_SECRET),
+    }
+
+
+@pytest.mark.parametrize("connect_kwargs, url", [
+    ({"subprotocols": ["msgpack"]}, "/ws"),
+    ({}, "/ws?format=msgpack"),
+])
+def test_device_socket_speaks_msgpack(connect_kwargs, url):
+    with patch("app.api.websocket.ws_manager.handle_device_message", new_callable=AsyncMock) as handle:
+        with client.websocket_connect(url, **connect_kwargs) as ws:
+            challenge = msgpack.unpackb(ws.receive_bytes())
+            assert challenge["type"] == "ws_challenge"
+            ws.send_bytes(msgpack.packb(_auth_reply(challenge)))
+            confirmed = msgpack.unpackb(ws.receive_bytes())
+            assert confirmed["type"] == "ws_authenticated"
+            assert confirmed["format"] == "msgpack"
+            ws.send_bytes(msgpack.packb({"temperature": 21.5}))
+            ws.close()
+
+    handle.assert_awaited_once_with("room-node-01", {"temperature": 21.5})
+
+
+@pytest.mark.asyncio
+async def test_commands_follow_device_format():
+    manager = ConnectionManager()
+    ws = MagicMock()
+    ws.send_bytes = AsyncMock()
+    ws.send_text = AsyncMock()
+    await manager.connect_device("room-node-01", ws, "msgpack")
+
+    assert await manager.send_fan_command("room-node-01", True)
+
+    ws.send_text.assert_not_called()
+    assert msgpack.unpackb(ws.send_bytes.call_args[0][0]) == {"command": "fan", "value": 1}
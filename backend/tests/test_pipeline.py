@@ -0,0 +1,83 @@
+"""
+Tests for concurrent, timed ingest pipeline stages.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.services.pipeline import IngestPipeline
+
+
+@pytest.mark.asyncio
+async def test_coroutine_functions_are_awaited_concurrently():
+    pipeline = IngestPipeline()
+    both_started = asyncio.Event()
+    started = []
+
+    async def first():
+        started.append("first")
+        await asyncio.wait_for(both_started.wait(), timeout=1)
+
+    async def second():
+        started.append("second")
+        both_started.set()
+
+    outcome = await pipeline.run("test", {"first": first, "second": second})
+
+    assert outcome == {"first": None, "second": None}
+    assert started == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_sync_stages_run_off_the_event_loop():
+    pipeline = IngestPipeline()
+    threads = []
+
+    await pipeline.run("test", {"store": lambda: threads.append(threading.current_thread())})
+
+    assert threads and threads[0] is not threading.main_thread()
+
+
+@pytest.mark.asyncio
+async def test_failed_stage_does_not_cancel_siblings():
+    pipeline = IngestPipeline()
+    ran = []
+
+    async def broken():
+        raise RuntimeError("broker down")
+
+    async def healthy():
+        await asyncio.sleep(0)
+        ran.append("healthy")
+
+    outcome = await pipeline.run("test", {"publish": broken, "broadcast": healthy})
+
+    assert isinstance(outcome["publish"], RuntimeError)
+    assert outcome["broadcast"] is None
+    assert ran == ["healthy"]
+
+
+@pytest.mark.asyncio
+async def test_stats_report_per_stage_timing():
+    pipeline = IngestPipeline()
+
+    async def slow():
+        await asyncio.sleep(0.01)
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    for _ in range(3):
+        await pipeline.run("room_node", {"broadcast": slow, "rules": broken})
+
+    stats = pipeline.stats()
+    assert stats["room_node.broadcast"]["count"] == 3
+    assert stats["room_node.broadcast"]["errors"] == 0
+    assert stats["room_node.broadcast"]["p50_ms"] >= 10
+    assert stats["room_node.rules"]["errors"] == 3
+    assert stats["room_node.broadcast"]["max_ms"] >= stats["room_node.broadcast"]["p95_ms"]
+
+    pipeline.clear()
+    assert pipeline.stats() == {}
@@ -0,0 +1,72 @@
+"""
+Unit tests for the presence tracker that coalesces last_seen heartbeats.
+"""
+
+from datetime import datetime, timedelta
+
+from app.services.presence import PresenceTracker
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+class RecordingWriter:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, last_seen):
+        if self.fail:
+            raise RuntimeError("db down")
+        self.batches.append(dict(last_seen))
+        return len(last_seen)
+
+
+def test_touches_are_coalesced_per_device():
+    writer = RecordingWriter()
+    tracker = PresenceTracker(writer)
+    for n in range(10):
+        tracker.touch("room-node-01", T0 + timedelta(seconds=n))
+    tracker.touch("door-01", T0)
+
+    assert tracker.flush() == 2
+    assert writer.batches == [{
+        "room-node-01": T0 + timedelta(seconds=9),
+        "door-01": T0,
+    }]
+    assert tracker.stats()["touches"] == 11
+
+
+def test_out_of_order_touch_keeps_newest():
+    tracker = PresenceTracker(RecordingWriter())
+    tracker.touch("room-node-01", T0 + timedelta(seconds=5))
+    tracker.touch("room-node-01", T0)
+    assert tracker.pending() == {"room-node-01": T0 + timedelta(seconds=5)}
+
+
+def test_flush_without_heartbeats_skips_writer():
+    writer = RecordingWriter()
+    assert PresenceTracker(writer).flush() == 0
+    assert writer.batches == []
+
+
+def test_failed_flush_retains_heartbeats():
+    writer = RecordingWriter(fail=True)
+    tracker = PresenceTracker(writer)
+    tracker.touch("room-node-01", T0)
+
+    assert tracker.flush() == 0
+    assert tracker.stats()["failed_flushes"] == 1
+    tracker.touch("room-node-01", T0 + timedelta(seconds=1))
+
+    writer.fail = False
+    tracker.flush()
+    assert writer.batches == [{"room-node-01": T0 + timedelta(seconds=1)}]
+
+
+def test_stop_flushes_pending():
+    writer = RecordingWriter()
+    tracker = PresenceTracker(writer, flush_interval_seconds=60)
+    tracker.start()
+    tracker.touch("room-node-01", T0)
+    tracker.stop()
+    assert writer.batches == [{"room-node-01": T0}]
@@ -0,0 +1,187 @@
+"""
+Tests for per-device token-bucket rate limiting.
+"""
+
+from concurrent.futures import Future
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.main import app
+from app.services import device_rate_limiter
+from app.services.rate_limit import MAX_RETRY_AFTER_SECONDS, DeviceRateLimiter, parse_rate_limits
+from app.services.websocket_manager import ConnectionManager, ws_manager
+
+client = TestClient(app)
+
+ENVIRONMENTAL_PAYLOAD = {
+    "device_id": "sensor-01",
+    "timestamp": "2026-01-01T00:00:00Z",
+    "temperature": 22.5,
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with patch("app.services.rate_limit.time.monotonic", fake):
+        yield fake
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("room_node=1:10, default=0.5:3,bad,x=1") == {
+        "room_node": (1.0, 10.0),
+        "default": (0.5, 3.0),
+    }
+
+
+def test_burst_then_refill(clock):
+    limiter = DeviceRateLimiter({"room_node": (2.0, 3.0)})
+    assert [limiter.acquire("rn-1", "room_node") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.acquire("rn-1", "room_node") == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert limiter.acquire("rn-1", "room_node") == 0.0
+
+
+def test_devices_have_independent_buckets(clock):
+    limiter = DeviceRateLimiter({"default": (1.0, 1.0)})
+    assert limiter.acquire("a") == 0.0
+    assert limiter.acquire("a") > 0
+    assert limiter.acquire("b") == 0.0
+
+
+def test_unknown_type_uses_default(clock):
+    limiter = DeviceRateLimiter({"default": (1.0, 1.0)})
+    limiter.acquire("a", "mystery")
+    assert limiter.acquire("a", "mystery") > 0
+
+
+def test_stats_report_noisiest_devices(clock):
+    limiter = DeviceRateLimiter({"default": (1.0, 1.0)})
+    for _ in range(5):
+        limiter.acquire("noisy")
+    limiter.acquire("quiet")
+
+    stats = limiter.stats()
+    assert stats["limited"] == 4
+    assert stats["noisiest"] == [{"device_id": "noisy", "allowed": 1, "limited": 4}]
+
+
+def test_rest_ingest_returns_429_with_retry_after():
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"), \
+            patch.object(device_rate_limiter, "acquire", return_value=2.5):
+        mock_broker.publish = AsyncMock(return_value=None)
+        response = client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+
+
+def test_limited_lighting_request_is_not_stored():
+    with patch("app.api.sensors.db_client") as mock_db, \
+            patch.object(device_rate_limiter, "acquire", return_value=1.0):
+        mock_db.get_device.return_value = {"device_id": "lighting-control-01", "device_type": "lighting_control"}
+        response = client.post("/api/sensors/ingest/lighting", json={
+            "device_id": "lighting-control-01", "timestamp": "2026-01-01T00:00:00Z",
+        })
+
+    assert response.status_code == 429
+    mock_db.insert_lighting_data.assert_not_called()
+
+
+def test_rest_ingest_limits_by_registered_device_type():
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client") as mock_db, \
+            patch.object(device_rate_limiter, "acquire", return_value=0.0) as acquire:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_db.get_device.return_value = {"device_id": "sensor-01", "device_type": "room_node"}
+        client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+
+    acquire.assert_called_once_with("sensor-01", "room_node")
+
+
+def test_zero_rate_limit_returns_capped_retry_after():
+    limiter = DeviceRateLimiter({"default": (0.0, 1.0)})
+    limiter.acquire("sensor-01")
+    with patch("app.api.sensors.db_client") as mock_db, \
+            patch.object(device_rate_limiter, "acquire", side_effect=limiter.acquire):
+        mock_db.get_device.return_value = {"device_id": "sensor-01"}
+        response = client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == str(MAX_RETRY_AFTER_SECONDS)
+
+
+def test_batch_rejects_readings_from_limited_devices():
+    def acquire(device_id, device_type):
+        return 1.0 if device_id == "noisy-01" else 0.0
+
+    batch = {"readings": [
+        {"type": "environmental", **ENVIRONMENTAL_PAYLOAD},
+        {"type": "environmental", **ENVIRONMENTAL_PAYLOAD, "device_id": "noisy-01"},
+    ]}
+    with patch("app.api.sensors.broker") as mock_broker, \
+            patch("app.api.sensors.ws_manager") as mock_ws, \
+            patch("app.api.sensors.db_client") as mock_db, \
+            patch.object(device_rate_limiter, "acquire", side_effect=acquire):
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_devices.return_value = {
+            "sensor-01": {"device_id": "sensor-01"},
+            "noisy-01": {"device_id": "noisy-01"},
+        }
+        mock_db.insert_sensor_readings_batch.return_value = Future()
+        mock_db.insert_sensor_readings_batch.return_value.set_result(None)
+        response = client.post("/api/sensors/ingest/batch", json=batch)
+
+        assert mock_db.get_devices.call_args[0][0] == {"sensor-01", "noisy-01"}
+
+    body = response.json()
+    assert body["accepted"] == 1
+    assert body["errors"] == [{"index": 1, "device_id": "noisy-01", "reason": "rate limited"}]
+
+
+def test_batch_all_devices_limited_returns_429():
+    batch = {"readings": [{"type": "environmental", **ENVIRONMENTAL_PAYLOAD}]}
+    with patch("app.api.sensors.db_client") as mock_db, \
+            patch.object(device_rate_limiter, "acquire", return_value=4.0):
+        mock_db.get_devices.return_value = {"sensor-01": {"device_id": "sensor-01"}}
+        response = client.post("/api/sensors/ingest/batch", json=batch)
+        mock_db.insert_sensor_readings_batch.assert_not_called()
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "4"
+
+
+def test_websocket_messages_over_limit_are_coalesced():
+    with patch("app.api.websocket.db_client") as mock_db, \
+            patch.object(ws_manager, "handle_device_message", new_callable=AsyncMock) as handle, \
+            patch.object(device_rate_limiter, "acquire", side_effect=[0.0, 1.0]):
+        mock_db.get_device.return_value = {"device_id": "room-node-01", "device_type": "room_node"}
+        with client.websocket_connect("/ws") as ws:
+            challenge = ws.receive_json()
+            signed = ConnectionManager._canonical_auth_payload(
+                "device", "room-node-01", challenge["nonce"], challenge["issued_at"]
+            )
+            ws.send_json({
+                "type": "ws_auth", "role": "device", "id": "room-node-01",
+                "nonce": challenge["nonce"], "issued_at": challenge["issued_at"],
+                "signature": ConnectionManager._signature_hex(signed, settings.WS_DEVICE_SECRET),
+            })
+            ws.receive_json()
+            ws.send_json({"temperature": 21.0})
+            ws.send_json({"temperature": 21.4})
+            ws.close()
+
+    handle.assert_awaited_once_with("room-node-01", {"temperature": 21.0})
+    assert ws_manager.get_device_state("room-node-01")["temperature"] == 21.4
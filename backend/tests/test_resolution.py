@@ -0,0 +1,109 @@
+"""
+Tests for the history resolution planner.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.resolution import (
+    RESOLUTION_BUCKET,
+    RESOLUTION_HOURLY,
+    RESOLUTION_RAW,
+    RESOLUTION_ROLLUP_15M,
+    RESOLUTION_ROLLUP_1M,
+    nice_bucket_seconds,
+    parse_bucket_width,
+    plan_resolution,
+)
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("30", 30), ("30s", 30), ("5m", 300), ("1h", 3600), ("1d", 86400), ("2w", 1209600), (90, 90),
+])
+def test_parse_bucket_width(value, expected):
+    assert parse_bucket_width(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "5x", "1.5h", "-1m", "0", 0])
+def test_parse_bucket_width_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_bucket_width(value)
+
+
+def test_nice_bucket_seconds_rounds_up():
+    assert nice_bucket_seconds(0.3) == 1
+    assert nice_bucket_seconds(61) == 120
+    assert nice_bucket_seconds(3600) == 3600
+    assert nice_bucket_seconds(8 * 86400 + 1) == 9 * 86400
+
+
+def test_short_range_is_served_raw():
+    plan = plan_resolution(START, START + timedelta(minutes=10), points=600)
+    assert plan.source == RESOLUTION_RAW
+    assert plan.bucket_seconds is None
+
+
+def test_day_at_300_points_uses_time_bucket():
+    plan = plan_resolution(START, START + timedelta(days=1), points=300)
+    assert plan.source == RESOLUTION_BUCKET
+    assert plan.bucket_seconds == 300
+
+
+def test_month_uses_hourly_aggregate():
+    plan = plan_resolution(START, START + timedelta(days=30), points=500)
+    assert plan.source == RESOLUTION_HOURLY
+    assert plan.bucket_seconds == 7200
+
+
+def test_explicit_bucket_is_kept():
+    plan = plan_resolution(START, START + timedelta(days=1), bucket_seconds=45)
+    assert plan == (RESOLUTION_BUCKET, 45)
+
+
+def test_explicit_bucket_widened_to_point_cap():
+    plan = plan_resolution(
+        START, START + timedelta(days=365), bucket_seconds=1, max_points=1000,
+    )
+    # 365 days / 1000 points = 8.76 h, rounded up to 12 h
+    assert plan == (RESOLUTION_HOURLY, 43200)
+
+
+def test_non_hour_multiple_above_an_hour_rolls_up_raw():
+    plan = plan_resolution(START, START + timedelta(days=7), bucket_seconds=5400)
+    assert plan == (RESOLUTION_BUCKET, 5400)
+
+
+def test_no_target_uses_finest_resolution_under_cap():
+    assert plan_resolution(START, START + timedelta(hours=1), max_points=5000).source == RESOLUTION_RAW
+    plan = plan_resolution(START, START + timedelta(days=30), max_points=5000)
+    assert plan == (RESOLUTION_BUCKET, 600)
+
+
+TIERS = {
+    RESOLUTION_ROLLUP_1M: (60, START - timedelta(days=30)),
+    RESOLUTION_ROLLUP_15M: (900, START - timedelta(days=365)),
+}
+
+
+def test_sub_hour_widths_use_coarsest_dividing_tier():
+    six_hours = START + timedelta(hours=6)
+    assert plan_resolution(START, six_hours, points=360, rollup_tiers=TIERS) == (RESOLUTION_ROLLUP_1M, 60)
+    assert plan_resolution(START, six_hours, points=24, rollup_tiers=TIERS) == (RESOLUTION_ROLLUP_15M, 900)
+    assert plan_resolution(START, six_hours, bucket_seconds=1800, rollup_tiers=TIERS) == (
+        RESOLUTION_ROLLUP_15M, 1800,
+    )
+    assert plan_resolution(START, six_hours, bucket_seconds=45, rollup_tiers=TIERS) == (RESOLUTION_BUCKET, 45)
+
+
+def test_tier_skipped_beyond_its_retention():
+    start = START - timedelta(days=60)
+    plan = plan_resolution(start, start + timedelta(hours=6), points=360, rollup_tiers=TIERS)
+    assert plan == (RESOLUTION_BUCKET, 60)
+
+
+def test_whole_hours_still_use_hourly_aggregate():
+    plan = plan_resolution(START, START + timedelta(days=7), points=168, rollup_tiers=TIERS)
+    assert plan == (RESOLUTION_HOURLY, 3600)
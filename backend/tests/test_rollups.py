@@ -0,0 +1,163 @@
+"""
+Unit tests for the ingest-time 1m/15m rollup accumulators.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import exc as sa_exc
+
+from app.services.rollups import RollupAccumulator, rollup_rows
+
+T0 = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _reading(seconds, device_id="room-node-01", **metrics):
+    return {"device_id": device_id, "time": T0 + timedelta(seconds=seconds), **metrics}
+
+
+class RecordingWriter:
+    def __init__(self, fail=False, poison=()):
+        self.batches = []
+        self.fail = fail
+        self.poison = set(poison)
+
+    def __call__(self, tier, rows):
+        if self.fail:
+            raise sa_exc.OperationalError("INSERT", {}, Exception("db down"))
+        if any(row["device_id"] in self.poison for row in rows):
+            raise sa_exc.IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        self.batches.append((tier, rows))
+        return len(rows)
+
+    def rows(self, tier):
+        return [row for batch_tier, rows in self.batches if batch_tier == tier for row in rows]
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now.timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+def test_accumulates_count_sum_min_max_last():
+    writer = RecordingWriter()
+    rollups = RollupAccumulator(writer, clock=Clock(T0 + timedelta(hours=1)))
+    rollups.record([
+        _reading(5, temperature=21.0),
+        _reading(30, temperature=23.0, humidity=40.0),
+        _reading(20, temperature=19.0),
+    ])
+
+    rollups.flush()
+
+    minute = {row["metric"]: row for row in writer.rows("1m")}
+    assert minute["temperature"]["bucket"] == T0
+    assert minute["temperature"]["count"] == 3
+    assert minute["temperature"]["sum"] == 63.0
+    assert (minute["temperature"]["min"], minute["temperature"]["max"]) == (19.0, 23.0)
+    # "last" follows reading time, not arrival order
+    assert minute["temperature"]["last"] == 23.0
+    assert minute["temperature"]["last_time"] == T0 + timedelta(seconds=30)
+    assert minute["humidity"]["count"] == 1
+    assert len(writer.rows("15m")) == 2
+
+
+def test_readings_split_across_buckets_and_tiers():
+    writer = RecordingWriter()
+    rollups = RollupAccumulator(writer, clock=Clock(T0 + timedelta(hours=1)))
+    rollups.record([_reading(seconds, light_lux=float(seconds)) for seconds in (0, 59, 60, 899, 900)])
+
+    rollups.flush()
+
+    assert [(row["bucket"] - T0).total_seconds() for row in writer.rows("1m")] == [0, 60, 840, 900]
+    fifteen = writer.rows("15m")
+    assert [row["count"] for row in fifteen] == [4, 1]
+
+
+def test_only_closed_buckets_flush_until_stop():
+    writer = RecordingWriter()
+    clock = Clock(T0 + timedelta(seconds=90))
+    rollups = RollupAccumulator(writer, grace_seconds=5.0, clock=clock)
+    rollups.record([_reading(10, temperature=20.0), _reading(70, temperature=21.0)])
+
+    assert rollups.flush() == 1
+    assert [row["bucket"] for row in writer.rows("1m")] == [T0]
+    assert rollups.stats()["open_buckets"] == {"1m": 1, "15m": 1}
+    assert len(rollups.open_buckets("1m", "room-node-01")) == 1
+
+    rollups.stop()
+
+    assert len(writer.rows("1m")) == 2
+    assert len(writer.rows("15m")) == 1
+    assert rollups.stats()["open_buckets"] == {"1m": 0, "15m": 0}
+
+
+def test_grace_period_delays_flush():
+    writer = RecordingWriter()
+    clock = Clock(T0 + timedelta(seconds=62))
+    rollups = RollupAccumulator(writer, grace_seconds=5.0, clock=clock)
+    rollups.record([_reading(10, temperature=20.0)])
+
+    assert rollups.flush() == 0
+    clock.now += 5
+    assert rollups.flush() == 1
+
+
+def test_failed_flush_merges_buckets_back():
+    writer = RecordingWriter(fail=True)
+    rollups = RollupAccumulator(writer, clock=Clock(T0 + timedelta(hours=1)))
+    rollups.record([_reading(10, temperature=20.0)])
+
+    assert rollups.flush() == 0
+    rollups.record([_reading(20, temperature=30.0)])
+    writer.fail = False
+    rollups.flush()
+
+    (row,) = writer.rows("1m")
+    assert (row["count"], row["sum"], row["min"], row["max"], row["last"]) == (2, 50.0, 20.0, 30.0, 30.0)
+    assert rollups.stats()["failed_flushes"] == 2
+
+
+def test_rejected_bucket_is_dropped_and_the_rest_written():
+    writer = RecordingWriter(poison={"deleted-node"})
+    rollups = RollupAccumulator(writer, tiers={"1m": 60}, clock=Clock(T0 + timedelta(hours=1)))
+    rollups.record([_reading(10, device_id, temperature=20.0)
+                    for device_id in ("room-node-01", "deleted-node", "room-node-02")])
+
+    assert rollups.flush() == 2
+    assert sorted(row["device_id"] for row in writer.rows("1m")) == ["room-node-01", "room-node-02"]
+    stats = rollups.stats()
+    assert (stats["open_buckets"]["1m"], stats["rejected_buckets"], stats["failed_flushes"]) == (0, 1, 0)
+    assert rollups.flush() == 0
+
+
+def test_requeue_is_capped_during_outage():
+    writer = RecordingWriter(fail=True)
+    rollups = RollupAccumulator(writer, tiers={"1m": 60}, max_requeue_buckets=2,
+                                clock=Clock(T0 + timedelta(hours=1)))
+    rollups.record([_reading(minute * 60, temperature=20.0) for minute in range(5)])
+
+    rollups.flush()
+
+    stats = rollups.stats()
+    assert (stats["open_buckets"]["1m"], stats["dropped_buckets"]) == (2, 3)
+    writer.fail = False
+    rollups.flush()
+    assert [row["bucket"] for row in writer.rows("1m")] == [T0 + timedelta(minutes=4), T0 + timedelta(minutes=3)]
+
+
+def test_readings_without_rollup_metrics_are_ignored():
+    writer = RecordingWriter()
+    rollups = RollupAccumulator(writer)
+
+    assert rollups.record([_reading(0, fan_on=True, temperature=None)]) == 0
+    assert rollups.stats()["open_buckets"] == {"1m": 0, "15m": 0}
+
+
+def test_rollup_rows_aggregates_without_state():
+    rows = rollup_rows([_reading(0, light_level=10.0), _reading(1, light_level=30.0)])
+
+    assert [(row["count"], row["sum"]) for row in rows["1m"]] == [(2, 40.0)]
+    assert [(row["count"], row["sum"]) for row in rows["15m"]] == [(2, 40.0)]
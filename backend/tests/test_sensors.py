@@ -5,6 +5,12 @@ External services (db_client, ws_manager, broker) are patched so that
 these tests run without a real database or message broker.
 """
 
+import asyncio
+import csv
+import io
+import json
+from concurrent.futures import Future
+from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -14,6 +20,13 @@ from app.main import app
 
 client = TestClient(app)
 
+
+def _stored():
+    """Flush acknowledgement of a mocked write-behind insert."""
+    ack = Future()
+    ack.set_result(None)
+    return ack
+
 DEVICE_ID = "sensor-01"
 TIMESTAMP = "2026-01-01T00:00:00Z"
 
@@ -43,7 +56,7 @@ LIGHTING_PAYLOAD = {
 
 def test_ingest_environmental_success():
     """Environmental ingest succeeds when the broker publish succeeds."""
-    with patch("app.api.sensors.broker") as mock_broker:
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"):
         mock_broker.publish = AsyncMock(return_value=None)
         response = client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
 
@@ -55,7 +68,7 @@ def test_ingest_environmental_success():
 
 def test_ingest_environmental_broker_failure():
     """Environmental ingest still returns 202 when the broker publish fails."""
-    with patch("app.api.sensors.broker") as mock_broker:
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"):
         mock_broker.publish = AsyncMock(side_effect=RuntimeError("broker down"))
         response = client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
 
@@ -64,6 +77,37 @@ def test_ingest_environmental_broker_failure():
     assert body["status"] == "accepted"
 
 
+def test_ingest_environmental_device_not_found():
+    """Environmental ingest returns 404 and stores nothing for an unregistered device."""
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client") as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_db.get_device.return_value = None
+        response = client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+
+    assert response.status_code == 404
+    mock_broker.publish.assert_not_called()
+    mock_db.insert_sensor_readings.assert_not_called()
+
+
+def test_ingest_device_lookup_runs_off_the_event_loop():
+    """A registry miss queries the database in a worker thread, not on the event loop."""
+    loops = []
+
+    def get_device(device_id):
+        try:
+            loops.append(asyncio.get_running_loop())
+        except RuntimeError:
+            loops.append(None)
+        return None
+
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.side_effect = get_device
+        response = client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+
+    assert response.status_code == 404
+    assert loops == [None]
+
+
 def test_ingest_environmental_missing_required_fields():
     """Environmental ingest returns 422 when required fields are absent."""
     response = client.post("/api/sensors/ingest/environmental", json={})
@@ -93,7 +137,7 @@ def test_ingest_lighting_success():
         patch("app.api.sensors.ws_manager") as mock_ws,
     ):
         mock_db.get_device.return_value = mock_device
-        mock_db.insert_lighting_data.return_value = True
+        mock_db.insert_lighting_data.return_value = _stored()
         mock_db.update_device_status.return_value = True
         mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
 
@@ -167,6 +211,7 @@ def test_get_latest_from_database():
     ):
         mock_db.get_device.return_value = mock_device
         mock_ws.get_device_state.return_value = {}
+        mock_db.get_latest_state.return_value = None
         mock_db.get_latest_lighting_data.return_value = db_data
 
         response = client.get(f"/api/sensors/latest/{DEVICE_ID}")
@@ -186,6 +231,7 @@ def test_get_latest_no_data():
     ):
         mock_db.get_device.return_value = mock_device
         mock_ws.get_device_state.return_value = {}
+        mock_db.get_latest_state.return_value = None
         mock_db.get_latest_lighting_data.return_value = None
 
         response = client.get(f"/api/sensors/latest/{DEVICE_ID}")
@@ -193,6 +239,45 @@ def test_get_latest_no_data():
     assert response.status_code == 404
 
 
+def test_get_latest_prefers_latest_state_table():
+    latest = {"device_id": DEVICE_ID, "time": TIMESTAMP, "temperature": 21.5}
+
+    with (
+        patch("app.api.sensors.db_client") as mock_db,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+    ):
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_ws.get_device_state.return_value = {}
+        mock_db.get_latest_state.return_value = latest
+
+        response = client.get(f"/api/sensors/latest/{DEVICE_ID}")
+
+        mock_db.get_latest_lighting_data.assert_not_called()
+
+    assert response.json() == {"device_id": DEVICE_ID, "source": "database", "data": latest}
+
+
+def test_get_latest_for_all_devices():
+    states = [
+        {"device_id": "room-node-01", "time": TIMESTAMP, "temperature": 21.5},
+        {"device_id": DEVICE_ID, "time": TIMESTAMP, "light_lux": 420.0},
+    ]
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_latest_states.return_value = states
+        response = client.get("/api/sensors/latest")
+
+    assert response.status_code == 200
+    assert response.json() == {"devices": states, "count": 2}
+
+
+def test_get_latest_for_all_devices_db_error():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_latest_states.side_effect = RuntimeError("db down")
+        response = client.get("/api/sensors/latest")
+
+    assert response.status_code == 500
+
+
 # ---------------------------------------------------------------------------
 # Sensor history
 # ---------------------------------------------------------------------------
@@ -246,6 +331,109 @@ def test_get_history_invalid_end_time():
     assert response.status_code == 400
 
 
+def test_get_history_returns_keyset_cursor_for_full_page():
+    history = [
+        {"time": "2026-01-01T00:00:02+00:00", "light_level": 50.0},
+        {"time": "2026-01-01T00:00:01+00:00", "light_level": 49.0},
+    ]
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.get_lighting_history.return_value = history
+        first = client.get(f"/api/sensors/history/{DEVICE_ID}?limit=2").json()
+
+        mock_db.get_lighting_history.return_value = history[1:]
+        second = client.get(
+            f"/api/sensors/history/{DEVICE_ID}?limit=2&cursor={first['next_cursor']}"
+        ).json()
+        before = mock_db.get_lighting_history.call_args.kwargs["before"]
+
+    assert first["next_cursor"]
+    assert before == datetime(2026, 1, 1, 0, 0, 1, tzinfo=timezone.utc)
+    assert second["next_cursor"] is None
+
+
+def test_get_history_rejects_cursor_for_other_device():
+    from app.utils.pagination import encode_cursor
+
+    cursor = encode_cursor("other-device", datetime(2026, 1, 1, tzinfo=timezone.utc))
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        bad_device = client.get(f"/api/sensors/history/{DEVICE_ID}?cursor={cursor}")
+        garbage = client.get(f"/api/sensors/history/{DEVICE_ID}?cursor=not-a-cursor")
+
+    assert bad_device.status_code == garbage.status_code == 400
+
+
+def test_get_history_page_is_capped():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.get_lighting_history.return_value = []
+        response = client.get(f"/api/sensors/history/{DEVICE_ID}?limit=5000")
+
+        assert mock_db.get_lighting_history.call_args.kwargs["limit"] == 1000
+
+    assert response.json()["next_cursor"] is None
+
+
+HISTORY_ROWS = [
+    {"time": f"2026-01-01T00:00:0{i}+00:00", "device_id": DEVICE_ID, "light_level": 40.0 + i,
+     "light_lux": 400.0, "dimmer_brightness": 60, "daylight_harvest_mode": True}
+    for i in range(3)
+]
+
+
+def test_get_history_streams_ndjson():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.iter_lighting_history.return_value = iter(HISTORY_ROWS)
+        response = client.get(f"/api/sensors/history/{DEVICE_ID}?format=ndjson")
+
+        assert mock_db.iter_lighting_history.call_args.kwargs["limit"] is None
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert [json.loads(line) for line in lines] == HISTORY_ROWS
+
+
+def test_get_history_streams_csv():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.iter_lighting_history.return_value = iter(HISTORY_ROWS)
+        response = client.get(f"/api/sensors/history/{DEVICE_ID}?format=csv")
+
+    assert response.headers["content-type"].startswith("text/csv")
+    assert "attachment" in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["time", "device_id", "light_level", "light_lux",
+                       "dimmer_brightness", "daylight_harvest_mode"]
+    assert len(rows) == 4
+    assert rows[1][2] == "40.0"
+
+
+def test_get_history_empty_csv_has_header():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.iter_lighting_history.return_value = iter([])
+        response = client.get(f"/api/sensors/history/{DEVICE_ID}?format=csv")
+
+    assert response.text.startswith("time,device_id")
+    assert len(response.text.splitlines()) == 1
+
+
+def test_get_history_stream_db_error_is_500():
+    def failing():
+        raise RuntimeError("db down")
+        yield
+
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.iter_lighting_history.return_value = failing()
+        response = client.get(f"/api/sensors/history/{DEVICE_ID}?format=ndjson")
+
+    assert response.status_code == 500
+
+
 def test_get_history_db_error():
     mock_device = {"device_id": DEVICE_ID}
 
@@ -257,6 +445,126 @@ def test_get_history_db_error():
     assert response.status_code == 500
 
 
+def test_get_history_downsampled_by_points():
+    rollup = {
+        "resolution": "hourly",
+        "bucket_seconds": 3600,
+        "data": [{"time": "2026-01-01T00:00:00+00:00", "count": 60, "light_level_avg": 40.0}],
+    }
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.get_lighting_rollup.return_value = rollup
+        response = client.get(
+            f"/api/sensors/history/{DEVICE_ID}?points=500"
+            "&start_time=2026-01-01T00:00:00Z&end_time=2026-02-01T00:00:00Z"
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["resolution"] == "hourly"
+    assert body["bucket_seconds"] == 3600
+    assert body["total_records"] == 1
+    kwargs = mock_db.get_lighting_rollup.call_args.kwargs
+    assert kwargs["points"] == 500
+    assert kwargs["bucket_seconds"] is None
+    assert kwargs["start_time"] == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    mock_db.get_lighting_history.assert_not_called()
+
+
+def test_get_history_bucket_width_defaults_to_last_day():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.get_lighting_rollup.return_value = {
+            "resolution": "bucket", "bucket_seconds": 300, "data": [],
+        }
+        response = client.get(f"/api/sensors/history/{DEVICE_ID}?bucket=5m")
+
+    assert response.status_code == 200
+    kwargs = mock_db.get_lighting_rollup.call_args.kwargs
+    assert kwargs["bucket_seconds"] == 300
+    assert (kwargs["end_time"] - kwargs["start_time"]).total_seconds() == 86400
+
+
+@pytest.mark.parametrize("query", [
+    "bucket=5x",
+    "bucket=0",
+    "points=100&format=csv",
+    "downsample=lttb&format=ndjson",
+    "points=100&start_time=2026-02-01T00:00:00Z&end_time=2026-01-01T00:00:00Z",
+])
+def test_get_history_rejects_bad_downsampling_params(query):
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        response = client.get(f"/api/sensors/history/{DEVICE_ID}?{query}")
+
+    assert response.status_code == 400
+    mock_db.get_lighting_rollup.assert_not_called()
+
+
+def test_get_history_lttb_downsampling():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.get_lighting_lttb.return_value = {
+            "source_rows": 86400,
+            "data": [{"time": "2026-01-01T00:00:00+00:00", "light_level": 40.0}],
+        }
+        response = client.get(
+            f"/api/sensors/history/{DEVICE_ID}?downsample=lttb&metric=light_lux"
+            "&start_time=2026-01-01T00:00:00Z&end_time=2026-01-02T00:00:00Z"
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["resolution"] == "lttb"
+    assert body["source_rows"] == 86400
+    kwargs = mock_db.get_lighting_lttb.call_args.kwargs
+    assert kwargs["points"] == 1000
+    assert kwargs["metric"] == "light_lux"
+    mock_db.get_lighting_rollup.assert_not_called()
+
+
+def test_get_history_lttb_oversized_range_is_400():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.get_lighting_lttb.side_effect = ValueError("Range holds more than 2 rows")
+        response = client.get(f"/api/sensors/history/{DEVICE_ID}?downsample=lttb&points=500")
+
+    assert response.status_code == 400
+
+
+def test_get_readings_aggregates_per_interval():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.get_sensor_readings_rollup.return_value = {
+            "resolution": "bucket",
+            "bucket_seconds": 60,
+            "data": [{"timestamp": "2026-01-01T00:00:00+00:00", "count": 4, "temperature_avg": 22.5}],
+        }
+        response = client.get(
+            f"/api/sensors/readings?device_id={DEVICE_ID}&interval=1m"
+            "&start_time=2026-01-01T00:00:00Z&end_time=2026-01-01T23:59:59Z"
+        )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["interval"] == "1m"
+    assert body["count"] == 1
+    assert body["readings"][0]["temperature_avg"] == 22.5
+    assert mock_db.get_sensor_readings_rollup.call_args.kwargs["bucket_seconds"] == 60
+
+
+def test_get_readings_db_error():
+    with patch("app.api.sensors.db_client") as mock_db:
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.get_sensor_readings_rollup.side_effect = RuntimeError("db error")
+        response = client.get(
+            f"/api/sensors/readings?device_id={DEVICE_ID}"
+            "&start_time=2026-01-01T00:00:00Z&end_time=2026-01-02T00:00:00Z"
+        )
+
+    assert response.status_code == 500
+
+
 # ---------------------------------------------------------------------------
 # Room-node ingest
 # ---------------------------------------------------------------------------
@@ -314,6 +622,25 @@ def test_ingest_room_node_broker_failure_still_returns_202():
     assert response.status_code == 202
 
 
+def test_ingest_room_node_device_not_found():
+    """Room-node ingest returns 404 and stores nothing for an unregistered device."""
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+        patch("app.api.sensors.db_client") as mock_db,
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_device.return_value = None
+
+        response = client.post("/api/sensors/ingest/room-node", json=ROOM_NODE_PAYLOAD)
+
+    assert response.status_code == 404
+    mock_ws.broadcast_to_clients.assert_not_called()
+    mock_db.insert_sensor_readings.assert_not_called()
+    mock_db.record_latest_state.assert_not_called()
+
+
 def test_ingest_room_node_missing_required_fields():
     """Missing required fields returns 422."""
     response = client.post("/api/sensors/ingest/room-node", json={})
@@ -336,3 +663,440 @@ def test_ingest_room_node_minimal_payload():
         response = client.post("/api/sensors/ingest/room-node", json=minimal)
 
     assert response.status_code == 202
+
+
+# ---------------------------------------------------------------------------
+# Batch ingest
+# ---------------------------------------------------------------------------
+
+BATCH_PAYLOAD = {
+    "readings": [
+        {"type": "lighting", **LIGHTING_PAYLOAD},
+        {"type": "lighting", **LIGHTING_PAYLOAD, "timestamp": "2026-01-01T00:00:01Z",
+         "light_lux": 520.0},
+        {"type": "environmental", **ENVIRONMENTAL_PAYLOAD},
+        {"type": "room_node", **ROOM_NODE_PAYLOAD},
+    ]
+}
+
+
+def _patch_batch_services():
+    return (
+        patch("app.api.sensors.broker"),
+        patch("app.api.sensors.ws_manager"),
+        patch("app.api.sensors.db_client", **{
+            "insert_lighting_data_batch.return_value": _stored(),
+            "insert_sensor_readings_batch.return_value": _stored(),
+        }),
+    )
+
+
+def test_ingest_batch_success():
+    """All readings are written with one batch insert and one status update."""
+    p_broker, p_ws, p_db = _patch_batch_services()
+    with p_broker as mock_broker, p_ws as mock_ws, p_db as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_devices.return_value = {
+            DEVICE_ID: {"device_id": DEVICE_ID},
+            "room-node-01": {"device_id": "room-node-01"},
+        }
+
+        response = client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+
+        mock_db.get_devices.assert_called_once()
+        mock_db.insert_lighting_data_batch.assert_called_once()
+        rows = mock_db.insert_lighting_data_batch.call_args[0][0]
+        assert len(rows) == 2
+        assert "type" not in rows[0]
+        assert len(mock_db.insert_sensor_readings_batch.call_args[0][0]) == 2
+        mock_db.update_devices_status.assert_called_once_with(
+            {DEVICE_ID, "room-node-01"}, "online"
+        )
+        assert mock_broker.publish.await_count == 2
+        # Only the newest reading per (type, device) is broadcast.
+        assert mock_ws.broadcast_to_clients.await_count == 3
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["accepted"] == 4
+    assert body["rejected"] == 0
+    assert body["errors"] == []
+
+
+def test_ingest_batch_rejects_unknown_devices_individually():
+    p_broker, p_ws, p_db = _patch_batch_services()
+    with p_broker as mock_broker, p_ws as mock_ws, p_db as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_devices.return_value = {DEVICE_ID: {"device_id": DEVICE_ID}}
+
+        response = client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+
+    assert response.status_code == 202
+    body = response.json()
+    assert body["accepted"] == 3
+    assert body["rejected"] == 1
+    assert body["errors"][0] == {
+        "index": 3,
+        "device_id": "room-node-01",
+        "reason": "device not registered",
+    }
+
+
+def test_ingest_batch_db_error():
+    p_broker, p_ws, p_db = _patch_batch_services()
+    with p_broker as mock_broker, p_ws as mock_ws, p_db as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_devices.return_value = {DEVICE_ID: {"device_id": DEVICE_ID}}
+        mock_db.insert_lighting_data_batch.side_effect = RuntimeError("db error")
+
+        response = client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+
+    assert response.status_code == 500
+
+
+def test_batch_retry_after_lighting_failure_stores_every_reading():
+    p_broker, p_ws, p_db = _patch_batch_services()
+    with p_broker as mock_broker, p_ws as mock_ws, p_db as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_devices.return_value = {
+            DEVICE_ID: {"device_id": DEVICE_ID},
+            "room-node-01": {"device_id": "room-node-01"},
+        }
+        mock_db.insert_lighting_data_batch.side_effect = [RuntimeError("db error"), _stored()]
+
+        failed = client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+        retried = client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+
+        stored = mock_db.insert_sensor_readings_batch.call_args[0][0]
+
+    assert failed.status_code == 500
+    assert retried.status_code == 202
+    assert retried.json()["duplicates"] == 0
+    assert retried.json()["accepted"] == 4
+    assert {row["device_id"] for row in stored} == {DEVICE_ID, "room-node-01"}
+
+
+def test_batch_sensor_readings_failure_answers_500_and_retries_in_full():
+    p_broker, p_ws, p_db = _patch_batch_services()
+    with p_broker as mock_broker, p_ws as mock_ws, p_db as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_devices.return_value = {
+            DEVICE_ID: {"device_id": DEVICE_ID},
+            "room-node-01": {"device_id": "room-node-01"},
+        }
+        mock_db.insert_sensor_readings_batch.side_effect = [RuntimeError("db error"), _stored()]
+
+        failed = client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+        mock_db.update_devices_status.assert_not_called()
+        retried = client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+
+        assert mock_db.insert_lighting_data_batch.call_count == 2
+
+    assert failed.status_code == 500
+    assert retried.status_code == 202
+    assert retried.json()["accepted"] == 4
+
+
+def test_ingest_batch_invalid_reading_type():
+    response = client.post(
+        "/api/sensors/ingest/batch",
+        json={"readings": [{"type": "unknown", **LIGHTING_PAYLOAD}]},
+    )
+    assert response.status_code == 422
+
+
+def test_ingest_batch_empty():
+    response = client.post("/api/sensors/ingest/batch", json={"readings": []})
+    assert response.status_code == 422
+
+
+def test_ingest_environmental_persists_sensor_readings():
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.db_client") as mock_db,
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        response = client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+
+        mock_db.insert_sensor_readings.assert_called_once()
+        stored = mock_db.insert_sensor_readings.call_args[0][0]
+        assert stored[0]["temperature"] == 22.5
+
+    assert response.status_code == 202
+
+
+def test_ingest_room_node_storage_failure_still_returns_202():
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+        patch("app.api.sensors.db_client") as mock_db,
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.insert_sensor_readings.side_effect = RuntimeError("db down")
+
+        response = client.post("/api/sensors/ingest/room-node", json=ROOM_NODE_PAYLOAD)
+
+    assert response.status_code == 202
+
+
+# ---------------------------------------------------------------------------
+# Replay suppression
+# ---------------------------------------------------------------------------
+
+
+def test_replayed_lighting_reading_is_acknowledged_without_reprocessing():
+    with (
+        patch("app.api.sensors.db_client") as mock_db,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+    ):
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.insert_lighting_data.return_value = _stored()
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+
+        first = client.post("/api/sensors/ingest/lighting", json=LIGHTING_PAYLOAD)
+        replay = client.post("/api/sensors/ingest/lighting", json=LIGHTING_PAYLOAD)
+
+        mock_db.insert_lighting_data.assert_called_once()
+        mock_ws.broadcast_to_clients.assert_awaited_once()
+
+    assert first.status_code == replay.status_code == 202
+    assert replay.json() == first.json()
+
+
+def test_lighting_retry_after_db_error_is_processed():
+    with (
+        patch("app.api.sensors.db_client") as mock_db,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+    ):
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.insert_lighting_data.side_effect = [RuntimeError("db error"), _stored()]
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+
+        failed = client.post("/api/sensors/ingest/lighting", json=LIGHTING_PAYLOAD)
+        retried = client.post("/api/sensors/ingest/lighting", json=LIGHTING_PAYLOAD)
+
+        assert mock_db.insert_lighting_data.call_count == 2
+
+    assert failed.status_code == 500
+    assert retried.status_code == 202
+
+
+def test_replayed_environmental_reading_skips_broker_and_storage():
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.db_client") as mock_db,
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+        response = client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+
+        mock_broker.publish.assert_awaited_once()
+        mock_db.insert_sensor_readings.assert_called_once()
+
+    assert response.status_code == 202
+
+
+def test_replayed_batch_counts_duplicates():
+    p_broker, p_ws, p_db = _patch_batch_services()
+    with p_broker as mock_broker, p_ws as mock_ws, p_db as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_devices.return_value = {
+            DEVICE_ID: {"device_id": DEVICE_ID},
+            "room-node-01": {"device_id": "room-node-01"},
+        }
+
+        client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+        response = client.post("/api/sensors/ingest/batch", json=BATCH_PAYLOAD)
+
+        assert mock_ws.broadcast_to_clients.await_count == 3
+
+    body = response.json()
+    assert response.status_code == 202
+    assert body["accepted"] == 0
+    assert body["duplicates"] == 4
+
+
+# ---------------------------------------------------------------------------
+# Ingest compression
+# ---------------------------------------------------------------------------
+
+
+def test_flat_room_node_reading_is_not_stored_or_broadcast():
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+        patch("app.api.sensors.db_client") as mock_db,
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+
+        client.post("/api/sensors/ingest/room-node", json=ROOM_NODE_PAYLOAD)
+        flat = {**ROOM_NODE_PAYLOAD, "timestamp": "2026-01-01T00:00:05Z"}
+        response = client.post("/api/sensors/ingest/room-node", json=flat)
+
+        mock_db.insert_sensor_readings.assert_called_once()
+        mock_ws.broadcast_to_clients.assert_awaited_once()
+        assert mock_db.update_device_status.call_count == 2
+
+    assert response.status_code == 202
+
+
+def test_partially_changed_reading_stores_only_changed_metrics():
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.db_client") as mock_db,
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+
+        client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+        warmer = {**ENVIRONMENTAL_PAYLOAD, "timestamp": "2026-01-01T00:00:05Z", "temperature": 23.5}
+        client.post("/api/sensors/ingest/environmental", json=warmer)
+
+        stored = mock_db.insert_sensor_readings.call_args[0][0][0]
+        assert stored["temperature"] == 23.5
+        assert stored["humidity"] is None
+        assert stored["pressure"] is None
+
+
+def test_compression_report_endpoint():
+    with patch("app.api.sensors.broker") as mock_broker, patch("app.api.sensors.db_client"):
+        mock_broker.publish = AsyncMock(return_value=None)
+        client.post("/api/sensors/ingest/environmental", json=ENVIRONMENTAL_PAYLOAD)
+
+    response = client.get("/api/sensors/compression")
+    assert response.status_code == 200
+    assert response.json()["metrics"]["temperature"]["offered"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Timestamp normalisation
+# ---------------------------------------------------------------------------
+
+
+def test_lighting_uptime_timestamp_is_stored_at_server_time():
+    """Uptime (ms since boot) timestamps used to crash the lighting insert."""
+    with (
+        patch("app.api.sensors.db_client") as mock_db,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+    ):
+        mock_db.get_device.return_value = {"device_id": DEVICE_ID}
+        mock_db.insert_lighting_data.return_value = _stored()
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+
+        before = datetime.now(timezone.utc)
+        response = client.post(
+            "/api/sensors/ingest/lighting", json={**LIGHTING_PAYLOAD, "timestamp": "123456"}
+        )
+        stored = mock_db.insert_lighting_data.call_args[0][0]
+
+    assert response.status_code == 202
+    assert response.json()["timestamp"] == "123456"
+    assert before <= stored["time"] <= datetime.now(timezone.utc)
+
+
+def test_batch_uptime_readings_keep_their_spacing():
+    readings = [
+        {"type": "room_node", **ROOM_NODE_PAYLOAD, "timestamp": str(ms), "temperature": 20.0 + i}
+        for i, ms in enumerate((60_000, 120_000, 180_000))
+    ]
+    p_broker, p_ws, p_db = _patch_batch_services()
+    with p_broker as mock_broker, p_ws as mock_ws, p_db as mock_db:
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        mock_db.get_devices.return_value = {"room-node-01": {"device_id": "room-node-01"}}
+
+        response = client.post("/api/sensors/ingest/batch", json={"readings": readings})
+        stored = mock_db.insert_sensor_readings_batch.call_args[0][0]
+        published = mock_broker.publish.call_args.kwargs["payload"]["readings"]
+
+    assert response.json()["accepted"] == 3
+    times = [row["time"] for row in stored]
+    assert [(later - times[0]).total_seconds() for later in times] == pytest.approx([0, 60, 120])
+    assert all("time" not in row for row in published)
+
+
+# ---------------------------------------------------------------------------
+# Staged ingest pipeline
+# ---------------------------------------------------------------------------
+
+
+def test_room_node_broadcast_does_not_wait_for_rules_or_storage():
+    calls = []
+
+    async def broadcast(message):
+        calls.append("broadcast")
+
+    async def rules(context):
+        calls.append("rules")
+
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+        patch("app.api.sensors.db_client") as mock_db,
+        patch("app.api.sensors.evaluate_and_execute", side_effect=rules),
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(side_effect=broadcast)
+        mock_db.insert_sensor_readings.side_effect = lambda rows: calls.append("store")
+
+        response = client.post("/api/sensors/ingest/room-node", json=ROOM_NODE_PAYLOAD)
+
+    assert response.status_code == 202
+    assert calls[0] == "broadcast"
+    assert set(calls[1:]) == {"rules", "store"}
+
+
+def test_ingest_stage_timings_are_exposed():
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+        patch("app.api.sensors.db_client"),
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        client.post("/api/sensors/ingest/room-node", json=ROOM_NODE_PAYLOAD)
+
+    stages = client.get("/health/metrics").json()["ingest_stages"]
+    assert {"room_node.broadcast", "room_node.publish", "room_node.store", "room_node.status"} <= set(stages)
+    assert stages["room_node.broadcast"]["count"] == 1
+
+
+def test_ingest_records_latest_state():
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+        patch("app.api.sensors.db_client") as mock_db,
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        client.post("/api/sensors/ingest/room-node", json=ROOM_NODE_PAYLOAD)
+
+        recorded = mock_db.record_latest_state.call_args[0][0]
+
+    assert recorded[0]["device_id"] == "room-node-01"
+    assert recorded[0]["temperature"] == ROOM_NODE_PAYLOAD["temperature"]
+    assert "time" in recorded[0]
+
+
+def test_ingest_records_rollups():
+    with (
+        patch("app.api.sensors.broker") as mock_broker,
+        patch("app.api.sensors.ws_manager") as mock_ws,
+        patch("app.api.sensors.db_client") as mock_db,
+    ):
+        mock_broker.publish = AsyncMock(return_value=None)
+        mock_ws.broadcast_to_clients = AsyncMock(return_value=None)
+        client.post("/api/sensors/ingest/room-node", json=ROOM_NODE_PAYLOAD)
+
+        recorded = mock_db.record_rollups.call_args[0][0]
+
+    assert recorded[0]["device_id"] == "room-node-01"
+    assert recorded[0]["light_lux"] == ROOM_NODE_PAYLOAD["light_lux"]
+    assert "time" in recorded[0]
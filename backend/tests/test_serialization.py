@@ -0,0 +1,92 @@
+"""
+Tests for the pluggable JSON codec.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import BaseModel
+
+from app.main import app
+from app.utils import serialization
+from app.utils.serialization import FastJSONResponse, dumps, dumps_text, loads, use_codec
+
+CODECS = ["stdlib"] + (["orjson"] if serialization.HAS_ORJSON else [])
+
+
+class Reading(BaseModel):
+    device_id: str
+    time: datetime
+
+
+PAYLOAD = {
+    "type": "room_node_data",
+    "device_id": "room-node-01",
+    "time": datetime(2026, 1, 1, 12, 0, 0, 123456, tzinfo=timezone.utc),
+    "naive": datetime(2026, 1, 1, 12, 0),
+    "reading": Reading(device_id="room-node-01", time=datetime(2026, 1, 1, tzinfo=timezone.utc)),
+    "price": Decimal("1.5"),
+    "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+    "room": "Küche",
+    "relays": [False, True],
+}
+
+EXPECTED = {
+    "type": "room_node_data",
+    "device_id": "room-node-01",
+    "time": "2026-01-01T12:00:00.123456+00:00",
+    "naive": "2026-01-01T12:00:00",
+    "reading": {"device_id": "room-node-01", "time": "2026-01-01T00:00:00Z"},
+    "price": 1.5,
+    "uuid": "12345678-1234-5678-1234-567812345678",
+    "room": "Küche",
+    "relays": [False, True],
+}
+
+
+@pytest.fixture(params=CODECS)
+def codec(request):
+    previous = serialization.codec_name
+    yield use_codec(request.param)
+    use_codec(previous)
+
+
+def test_codecs_encode_rich_types_identically(codec):
+    encoded = dumps(PAYLOAD)
+    assert isinstance(encoded, bytes)
+    assert b" " not in encoded.replace("Küche".encode(), b"")
+    assert loads(encoded) == EXPECTED
+    assert loads(dumps_text(PAYLOAD)) == EXPECTED
+
+
+def test_invalid_json_raises_value_error(codec):
+    with pytest.raises(ValueError):
+        loads("{not json")
+
+
+def test_unknown_type_raises_type_error(codec):
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_unknown_codec_falls_back_to_auto():
+    previous = serialization.codec_name
+    try:
+        assert use_codec("simdjson") == ("orjson" if serialization.HAS_ORJSON else "stdlib")
+    finally:
+        use_codec(previous)
+
+
+def test_fast_json_response_renders_with_codec(codec):
+    response = FastJSONResponse({"time": PAYLOAD["time"]})
+    assert response.media_type == "application/json"
+    assert loads(response.body) == {"time": EXPECTED["time"]}
+
+
+def test_app_uses_fast_json_response_by_default():
+    response = TestClient(app).get("/health")
+    assert response.headers["content-type"] == "application/json"
+    assert b": " not in response.content
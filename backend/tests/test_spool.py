@@ -0,0 +1,255 @@
+"""
+Unit tests for the local disk spool and its replayer.
+"""
+
+import os
+from datetime import datetime, timezone
+
+from psycopg2.errors import QueryCanceled
+from sqlalchemy import exc as sa_exc
+
+from app.services.spool import DiskSpool, SpoolReplayer
+
+T0 = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _down():
+    return sa_exc.OperationalError("INSERT", {}, Exception("db down"))
+
+
+class RecordingWriter:
+    def __init__(self, fail=False, poison=()):
+        self.batches = []
+        self.fail = fail
+        self.poison = set(poison)
+
+    def __call__(self, table, rows):
+        if self.fail:
+            raise _down()
+        if any(row.get("light_level") in self.poison for row in rows):
+            raise sa_exc.IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        self.batches.append((table, rows))
+        return len(rows)
+
+    def rows(self, table=None):
+        return [row for batch_table, rows in self.batches if table in (None, batch_table) for row in rows]
+
+
+def _rows(count, start=0):
+    return [{"time": T0, "device_id": "room-node-01", "light_level": float(i)} for i in range(start, start + count)]
+
+
+def _segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".seg"))
+
+
+def test_append_is_lazy_and_counts_backlog(tmp_path):
+    directory = tmp_path / "spool"
+    spool = DiskSpool(str(directory))
+    assert not directory.exists()
+
+    spool.append("lighting_sensor_data", _rows(3))
+    spool.append("dimmer_state", _rows(1))
+
+    stats = spool.stats()
+    assert stats["backlog_records"] == 2
+    assert stats["segments"] == 1
+    assert stats["backlog_bytes"] == os.path.getsize(directory / _segments(directory)[0])
+
+
+def test_fsync_is_batched_by_interval(tmp_path):
+    clock = Clock()
+    spool = DiskSpool(str(tmp_path), fsync_interval_seconds=1.0, clock=clock)
+
+    spool.append("lighting_sensor_data", _rows(1))
+    spool.append("lighting_sensor_data", _rows(1))
+    assert spool.syncs == 1
+
+    clock.now += 1.0
+    spool.append("lighting_sensor_data", _rows(1))
+    assert spool.syncs == 2
+
+    spool.sync()
+    assert spool.syncs == 2
+
+
+def test_rolls_segments_at_size(tmp_path):
+    spool = DiskSpool(str(tmp_path), segment_bytes=200)
+    for i in range(5):
+        spool.append("lighting_sensor_data", _rows(1, start=i))
+
+    assert len(_segments(tmp_path)) == 5
+    assert spool.backlog_records == 5
+
+
+def test_evicts_oldest_segments_beyond_max_bytes(tmp_path):
+    spool = DiskSpool(str(tmp_path), segment_bytes=200, max_bytes=500)
+    for i in range(6):
+        spool.append("lighting_sensor_data", _rows(1, start=i))
+
+    stats = spool.stats()
+    assert stats["backlog_bytes"] <= 500
+    assert stats["evicted_records"] == 6 - stats["backlog_records"]
+    replayer = SpoolReplayer(spool, RecordingWriter())
+    replayer.replay()
+    levels = [row["light_level"] for row in replayer.writer.rows()]
+    assert levels == [5.0 - i for i in reversed(range(len(levels)))]
+
+
+def test_replays_in_order_and_deletes_drained_segments(tmp_path):
+    spool = DiskSpool(str(tmp_path), segment_bytes=300)
+    for i in range(4):
+        spool.append("lighting_sensor_data", _rows(2, start=2 * i))
+    spool.append("fan_state", [{"time": T0, "device_id": "fan-01", "speed": 3}])
+    writer = RecordingWriter()
+    replayer = SpoolReplayer(spool, writer)
+
+    assert replayer.replay() == 9
+
+    assert [row["light_level"] for row in writer.rows("lighting_sensor_data")] == [float(i) for i in range(8)]
+    assert writer.rows("fan_state")[0]["time"] == T0.isoformat()
+    assert _segments(tmp_path) == []
+    assert spool.stats()["backlog_records"] == 0
+    assert replayer.stats()["replayed_records"] == 5
+
+
+def test_replay_batches_rows(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    for i in range(5):
+        spool.append("lighting_sensor_data", _rows(2, start=2 * i))
+    writer = RecordingWriter()
+
+    SpoolReplayer(spool, writer, batch_rows=4).replay()
+
+    assert [len(rows) for _, rows in writer.batches] == [4, 4, 2]
+
+
+def test_failed_replay_keeps_backlog_and_resumes(tmp_path):
+    clock = Clock()
+    spool = DiskSpool(str(tmp_path))
+    for i in range(3):
+        spool.append("lighting_sensor_data", _rows(1, start=i))
+    writer = RecordingWriter(fail=True)
+    replayer = SpoolReplayer(spool, writer, batch_rows=1, retry_seconds=5.0, clock=clock)
+
+    replayer.run_once()
+    assert not replayer.healthy
+    assert spool.backlog_records == 3
+    assert replayer.replay_failures == 1
+
+    writer.fail = False
+    replayer.run_once()
+    assert writer.batches == []
+
+    clock.now += 5.0
+    replayer.run_once()
+    assert replayer.healthy
+    assert [row["light_level"] for row in writer.rows()] == [0.0, 1.0, 2.0]
+    assert spool.backlog_records == 0
+
+
+def test_replay_resumes_after_partial_segment(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    for i in range(3):
+        spool.append("lighting_sensor_data", _rows(1, start=i))
+    calls = []
+
+    def flaky(table, rows):
+        calls.append(rows[0]["light_level"])
+        if len(calls) == 2:
+            raise _down()
+        return len(rows)
+
+    replayer = SpoolReplayer(spool, flaky, batch_rows=1)
+    replayer.replay()
+    assert spool.backlog_records == 2
+
+    replayer.replay()
+    assert calls == [0.0, 1.0, 1.0, 2.0]
+    assert spool.backlog_records == 0
+
+
+def test_rejected_rows_are_skipped_without_pausing_replay(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.append("lighting_sensor_data", _rows(4))
+    spool.append("lighting_sensor_data", _rows(2, start=4))
+    writer = RecordingWriter(poison={1.0})
+    replayer = SpoolReplayer(spool, writer, batch_rows=100)
+
+    assert replayer.replay() == 5
+
+    assert replayer.healthy
+    assert [row["light_level"] for row in writer.rows()] == [0.0, 2.0, 3.0, 4.0, 5.0]
+    assert spool.backlog_records == 0
+    stats = replayer.stats()
+    assert (stats["rejected_rows"], stats["replay_failures"]) == (1, 0)
+
+
+def test_statement_timeout_pauses_replay_without_marking_database_down(tmp_path):
+    clock = Clock()
+    spool = DiskSpool(str(tmp_path))
+    spool.append("lighting_sensor_data", _rows(4))
+
+    def slow(table, rows):
+        raise sa_exc.OperationalError("INSERT", {}, QueryCanceled("canceling statement due to statement timeout"))
+
+    replayer = SpoolReplayer(spool, slow, batch_rows=100, retry_seconds=5.0, clock=clock)
+    replayer.run_once()
+
+    assert replayer.healthy
+    assert spool.backlog_records == 1
+    stats = replayer.stats()
+    assert (stats["rejected_rows"], stats["replay_failures"]) == (0, 1)
+
+
+def test_reopen_indexes_existing_segments(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.append("lighting_sensor_data", _rows(2))
+    spool.append("lighting_sensor_data", _rows(2, start=2))
+    spool.close()
+
+    reopened = DiskSpool(str(tmp_path))
+    reopened.open()
+    assert reopened.backlog_records == 2
+
+    reopened.append("lighting_sensor_data", _rows(1, start=4))
+    assert len(_segments(tmp_path)) == 2
+    writer = RecordingWriter()
+    SpoolReplayer(reopened, writer).replay()
+    assert [row["light_level"] for row in writer.rows()] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+def test_torn_tail_is_skipped(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.append("lighting_sensor_data", _rows(1))
+    spool.append("lighting_sensor_data", _rows(1, start=1))
+    spool.close()
+    path = tmp_path / _segments(tmp_path)[0]
+    with open(path, "r+b") as handle:
+        handle.truncate(os.path.getsize(path) - 3)
+
+    reopened = DiskSpool(str(tmp_path))
+    writer = RecordingWriter()
+    SpoolReplayer(reopened, writer).replay()
+
+    assert [row["light_level"] for row in writer.rows()] == [0.0]
+    assert reopened.stats()["corrupt_records"] == 1
+    assert _segments(tmp_path) == []
+
+
+def test_unhealthy_replayer_retries_without_backlog(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    replayer = SpoolReplayer(spool, RecordingWriter())
+    replayer.mark_unavailable(RuntimeError("connection refused"))
+    assert not replayer.healthy
+
+    replayer.run_once()
+    assert replayer.healthy
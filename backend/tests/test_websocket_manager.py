@@ -6,6 +6,7 @@ No network connections are made; we mock WebSocket objects.
 
 import asyncio
 import json
+import logging
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -100,9 +101,11 @@ def test_disconnect_client(manager):
 
 
 @pytest.mark.asyncio
-async def test_send_to_device_not_connected(manager):
-    result = await manager.send_to_device("dev-99", {"cmd": "test"})
+async def test_send_to_device_not_connected(manager, caplog):
+    with caplog.at_level(logging.INFO, logger="app.ws.send"):
+        result = await manager.send_to_device("dev-99", {"cmd": "test"})
     assert result is False
+    assert caplog.records == []
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,228 @@
+"""
+Unit tests for the write-behind buffer used for sensor/state inserts.
+
+A fake writer records batches so no database is needed.
+"""
+
+import time
+
+import psycopg2
+import pytest
+from psycopg2.errors import QueryCanceled
+from sqlalchemy import exc as sa_exc
+
+from app.services.write_buffer import WriteBehindBuffer, WriteRejected
+from app.services.write_errors import is_timeout, is_unavailable
+
+
+class RecordingWriter:
+    def __init__(self, fail=False, poison=()):
+        self.batches = []
+        self.fail = fail
+        self.poison = set(poison)
+
+    def __call__(self, table, rows):
+        if self.fail:
+            raise sa_exc.OperationalError("INSERT", {}, Exception("db down"))
+        if any(row.get("n") in self.poison for row in rows):
+            raise sa_exc.IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        self.batches.append((table, list(rows)))
+
+
+@pytest.fixture
+def writer():
+    return RecordingWriter()
+
+
+def test_flush_writes_one_batch_per_table(writer):
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=1000)
+    buf.submit("dimmer_state", {"brightness": 10})
+    buf.submit("dimmer_state", {"brightness": 20})
+    buf.submit("fan_state", {"fan_on": True})
+
+    assert buf.depth == 3
+    assert buf.flush() == 3
+    assert buf.depth == 0
+    assert sorted((t, len(rows)) for t, rows in writer.batches) == [
+        ("dimmer_state", 2),
+        ("fan_state", 1),
+    ]
+
+
+def test_flush_empty_buffer_is_noop(writer):
+    buf = WriteBehindBuffer(writer)
+    assert buf.flush() == 0
+    assert writer.batches == []
+    assert buf.stats()["flushes"] == 0
+
+
+def test_failed_flush_keeps_rows_in_order():
+    writer = RecordingWriter(fail=True)
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=1000)
+    buf.submit_many("relay_state", [{"n": 1}, {"n": 2}])
+
+    assert buf.flush() == 0
+    assert buf.depth == 2
+    assert buf.stats()["failed_flushes"] == 1
+
+    writer.fail = False
+    buf.submit("relay_state", {"n": 3})
+    buf.flush()
+    assert [r["n"] for r in writer.batches[0][1]] == [1, 2, 3]
+
+
+def test_rejected_rows_do_not_block_the_queue():
+    writer = RecordingWriter(poison={3})
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=1000)
+    buf.submit_many("sensor_readings", [{"n": n} for n in range(6)])
+
+    assert buf.flush() == 5
+    assert buf.depth == 0
+    written = [row["n"] for _, rows in writer.batches for row in rows]
+    assert sorted(written) == [0, 1, 2, 4, 5]
+    stats = buf.stats()
+    assert stats["rejected_rows"] == 1
+    assert stats["failed_flushes"] == 0
+
+
+def test_outage_mid_isolation_requeues_only_unwritten_rows():
+    writer = RecordingWriter(poison={0})
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=1000)
+    buf.submit_many("sensor_readings", [{"n": n} for n in range(4)])
+    calls = []
+    original = writer.__call__
+
+    def flaky(table, rows):
+        calls.append(len(rows))
+        # Database goes away once row 0 has been isolated and rejected.
+        if len(calls) > 3:
+            writer.fail = True
+        return original(table, rows)
+
+    buf.writer = flaky
+    buf.flush()
+
+    assert buf.stats()["failed_flushes"] == 1
+    assert buf.depth == 3
+    assert buf.stats()["rejected_rows"] == 1
+    writer.fail = False
+    buf.writer = writer
+    buf.flush()
+    assert sorted(row["n"] for _, rows in writer.batches for row in rows) == [1, 2, 3]
+
+
+def _timed_out():
+    return sa_exc.OperationalError("INSERT", {}, QueryCanceled("canceling statement due to statement timeout"))
+
+
+def test_statement_timeout_is_not_an_outage():
+    assert is_timeout(_timed_out())
+    assert not is_unavailable(_timed_out())
+    assert not is_unavailable(QueryCanceled("canceling statement due to statement timeout"))
+    assert is_unavailable(psycopg2.OperationalError("could not connect to server"))
+
+
+def test_timed_out_flush_requeues_rows_without_rejecting():
+    calls = []
+
+    def slow(table, rows):
+        calls.append(len(rows))
+        raise _timed_out()
+
+    buf = WriteBehindBuffer(slow, batch_size=100, max_depth=1000)
+    buf.submit_many("sensor_readings", [{"n": n} for n in range(4)])
+    buf.flush()
+
+    assert calls == [4]
+    assert buf.depth == 4
+    assert buf.stats()["rejected_rows"] == 0
+    assert buf.stats()["failed_flushes"] == 1
+
+
+def test_over_capacity_flushes_inline(writer):
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=3)
+    for n in range(3):
+        buf.submit("fan_state", {"n": n})
+
+    assert buf.depth == 0
+    assert len(writer.batches) == 1
+
+
+def test_over_capacity_with_db_down_drops_oldest():
+    writer = RecordingWriter(fail=True)
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=3)
+    for n in range(5):
+        buf.submit("fan_state", {"n": n})
+
+    assert buf.depth < 3
+    assert buf.stats()["dropped_rows"] > 0
+
+
+def test_worker_flushes_on_interval(writer):
+    buf = WriteBehindBuffer(writer, flush_interval_ms=10, batch_size=100)
+    buf.start()
+    try:
+        buf.submit("dimmer_state", {"brightness": 50})
+        deadline = time.monotonic() + 2
+        while not writer.batches and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        buf.stop()
+
+    assert writer.batches == [("dimmer_state", [{"brightness": 50}])]
+
+
+def test_stop_flushes_pending_rows(writer):
+    buf = WriteBehindBuffer(writer, flush_interval_ms=60000, batch_size=100)
+    buf.start()
+    buf.submit("dimmer_state", {"brightness": 75})
+    buf.stop()
+
+    assert not buf.running
+    assert writer.batches == [("dimmer_state", [{"brightness": 75}])]
+
+
+def test_acked_rows_resolve_once_flushed(writer):
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=1000)
+    ack = buf.submit_acked("lighting_sensor_data", [{"n": 1}, {"n": 2}])
+    buf.submit("lighting_sensor_data", {"n": 3})
+
+    assert not ack.done()
+    buf.flush()
+    assert ack.result(timeout=0) is None
+    assert [r["n"] for r in writer.batches[0][1]] == [1, 2, 3]
+
+
+def test_acked_rows_fail_when_rejected():
+    writer = RecordingWriter(poison={2})
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=1000)
+    bad = buf.submit_acked("lighting_sensor_data", [{"n": 1}, {"n": 2}])
+    good = buf.submit_acked("lighting_sensor_data", [{"n": 3}])
+    buf.flush()
+
+    with pytest.raises(WriteRejected):
+        bad.result(timeout=0)
+    assert good.result(timeout=0) is None
+
+
+def test_acked_rows_fail_on_outage_and_stay_queued():
+    writer = RecordingWriter(fail=True)
+    buf = WriteBehindBuffer(writer, batch_size=100, max_depth=1000)
+    ack = buf.submit_acked("lighting_sensor_data", [{"n": 1}])
+    buf.flush()
+
+    with pytest.raises(sa_exc.OperationalError):
+        ack.result(timeout=0)
+    assert buf.depth == 1
+
+
+def test_acked_submit_wakes_the_worker(writer):
+    buf = WriteBehindBuffer(writer, flush_interval_ms=60000, batch_size=100)
+    buf.start()
+    try:
+        ack = buf.submit_acked("lighting_sensor_data", [{"n": 1}])
+        ack.result(timeout=2)
+    finally:
+        buf.stop()
+
+    assert writer.batches == [("lighting_sensor_data", [{"n": 1}])]
@@ -495,7 +495,9 @@ export function SmartHomeProvider({ children }) {
         const response = await getSensorHistory(deviceIds.lighting, {
           startTime: startTime.toISOString(),
           endTime: endTime.toISOString(),
-          limit: 1500,
+          // Server-side LTTB: as many points as the chart keeps, spread over the whole range
+          points: MAX_DATA_POINTS,
+          downsample: 'lttb',
         });
 
         const rows = Array.isArray(response?.data)
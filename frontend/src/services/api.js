@@ -79,10 +79,17 @@ export async function getLatestSensorData(deviceId) {
   return api.get(`/api/sensors/latest/${encodeURIComponent(deviceId)}`).then(unwrap);
 }
 
-export async function getSensorHistory(deviceId, { startTime, endTime, limit = 100 } = {}) {
-  const params = { limit };
+export async function getSensorHistory(
+  deviceId,
+  { startTime, endTime, limit = 100, points, downsample, metric } = {}
+) {
+  // Downsampled requests return `points` rows over the whole range; limit does not apply.
+  const params = points || downsample ? {} : { limit };
   if (startTime) params.start_time = startTime;
   if (endTime) params.end_time = endTime;
+  if (points) params.points = points;
+  if (downsample) params.downsample = downsample;
+  if (metric) params.metric = metric;
 
   return api.get(`/api/sensors/history/${encodeURIComponent(deviceId)}`, { params }).then(unwrap);
 }
@@ -26,6 +26,10 @@ CREATE TABLE IF NOT EXISTS sensor_readings (
     sensor_type VARCHAR(50) NOT NULL,
     value DOUBLE PRECISION NOT NULL,
     unit VARCHAR(20),
+    -- Makes spool replays and ingest COPY loads (both ON CONFLICT DO NOTHING)
+    -- idempotent;
+    -- older databases get an equivalent unique index from the storage bootstrap
+    PRIMARY KEY (time, device_id, sensor_type),
     FOREIGN KEY (device_id) REFERENCES devices(device_id) ON DELETE CASCADE
 );
 
@@ -87,6 +91,8 @@ FROM sensor_readings
 GROUP BY bucket, device_id, sensor_type
 WITH NO DATA;
 
+ALTER MATERIALIZED VIEW sensor_readings_hourly SET (timescaledb.materialized_only = false);
+
 -- Refresh policy for continuous aggregate
 SELECT add_continuous_aggregate_policy('sensor_readings_hourly',
     start_offset => INTERVAL '2 hours',
@@ -131,6 +137,11 @@ SELECT create_hypertable('lighting_sensor_data', 'time', if_not_exists => TRUE);
 CREATE INDEX IF NOT EXISTS idx_lighting_sensor_data_device_time 
     ON lighting_sensor_data (device_id, time DESC);
 
+-- One reading per device per timestamp; replayed POSTs are dropped by
+-- INSERT ... ON CONFLICT DO NOTHING against this index
+CREATE UNIQUE INDEX IF NOT EXISTS idx_lighting_sensor_data_device_time_unique
+    ON lighting_sensor_data (device_id, time);
+
 -- Relay state history table
 CREATE TABLE IF NOT EXISTS relay_state (
     time TIMESTAMPTZ NOT NULL,
@@ -149,6 +160,11 @@ CREATE INDEX IF NOT EXISTS idx_relay_state_device_time
 CREATE INDEX IF NOT EXISTS idx_relay_state_device_channel_time 
     ON relay_state (device_id, channel, time DESC);
 
+-- One row per channel per timestamp; spool replays are dropped by
+-- INSERT ... ON CONFLICT DO NOTHING against this index
+CREATE UNIQUE INDEX IF NOT EXISTS idx_relay_state_device_channel_time_unique
+    ON relay_state (device_id, channel, time);
+
 -- Dimmer state history table
 CREATE TABLE IF NOT EXISTS dimmer_state (
     time TIMESTAMPTZ NOT NULL,
@@ -164,6 +180,9 @@ SELECT create_hypertable('dimmer_state', 'time', if_not_exists => TRUE);
 CREATE INDEX IF NOT EXISTS idx_dimmer_state_device_time 
     ON dimmer_state (device_id, time DESC);
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_dimmer_state_device_time_unique
+    ON dimmer_state (device_id, time);
+
 -- Automated data retention policy for lighting data (keep 90 days)
 SELECT add_retention_policy('lighting_sensor_data', INTERVAL '90 days', if_not_exists => TRUE);
 SELECT add_retention_policy('relay_state', INTERVAL '90 days', if_not_exists => TRUE);
@@ -179,12 +198,20 @@ SELECT
     MIN(light_level) AS min_light_level,
     MAX(light_level) AS max_light_level,
     AVG(light_lux) AS avg_light_lux,
+    MIN(light_lux) AS min_light_lux,
+    MAX(light_lux) AS max_light_lux,
     AVG(dimmer_brightness) AS avg_dimmer_brightness,
+    MIN(dimmer_brightness) AS min_dimmer_brightness,
+    MAX(dimmer_brightness) AS max_dimmer_brightness,
     COUNT(*) AS reading_count
 FROM lighting_sensor_data
 GROUP BY bucket, device_id
 WITH NO DATA;
 
+-- Real-time aggregation: history rollups read the aggregate, so include the
+-- not-yet-materialized last hours from the raw table.
+ALTER MATERIALIZED VIEW lighting_sensor_data_hourly SET (timescaledb.materialized_only = false);
+
 -- Refresh policy for lighting continuous aggregate
 SELECT add_continuous_aggregate_policy('lighting_sensor_data_hourly',
     start_offset => INTERVAL '2 hours',
@@ -208,8 +235,71 @@ SELECT create_hypertable('fan_state', 'time', if_not_exists => TRUE);
 CREATE INDEX IF NOT EXISTS idx_fan_state_device_time
     ON fan_state (device_id, time DESC);
 
+CREATE UNIQUE INDEX IF NOT EXISTS idx_fan_state_device_time_unique
+    ON fan_state (device_id, time);
+
 SELECT add_retention_policy('fan_state', INTERVAL '90 days', if_not_exists => TRUE);
 
+-- ============================================================================
+-- Latest State (one row per device, upserted by ingest)
+-- ============================================================================
+-- Current value of every metric, so dashboards read the whole house with one
+-- primary-key scan instead of ORDER BY time DESC LIMIT 1 per device.
+
+CREATE TABLE IF NOT EXISTS device_latest_state (
+    device_id VARCHAR(50) PRIMARY KEY REFERENCES devices(device_id) ON DELETE CASCADE,
+    time TIMESTAMPTZ NOT NULL,
+    temperature DOUBLE PRECISION,
+    humidity DOUBLE PRECISION,
+    pressure DOUBLE PRECISION,
+    light_level DOUBLE PRECISION,
+    light_lux DOUBLE PRECISION,
+    dimmer_brightness INTEGER,
+    daylight_harvest_mode BOOLEAN,
+    fan_on BOOLEAN,
+    relays BOOLEAN[],
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- ============================================================================
+-- Ingest-Time Rollup Tiers
+-- ============================================================================
+-- count/sum/min/max/last per (bucket, device, metric), upserted by the backend
+-- as 1-minute and 15-minute buckets close. Fresh to within a minute, unlike the
+-- hourly continuous aggregates, so "last few hours" charts avoid raw chunks.
+
+CREATE TABLE IF NOT EXISTS sensor_rollup_1m (
+    bucket TIMESTAMPTZ NOT NULL,
+    device_id VARCHAR(50) NOT NULL REFERENCES devices(device_id) ON DELETE CASCADE,
+    metric VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL,
+    sum DOUBLE PRECISION NOT NULL,
+    min DOUBLE PRECISION NOT NULL,
+    max DOUBLE PRECISION NOT NULL,
+    last DOUBLE PRECISION NOT NULL,
+    last_time TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (device_id, metric, bucket)
+);
+
+SELECT create_hypertable('sensor_rollup_1m', 'bucket', chunk_time_interval => INTERVAL '1 day', if_not_exists => TRUE);
+SELECT add_retention_policy('sensor_rollup_1m', INTERVAL '30 days', if_not_exists => TRUE);
+
+CREATE TABLE IF NOT EXISTS sensor_rollup_15m (
+    bucket TIMESTAMPTZ NOT NULL,
+    device_id VARCHAR(50) NOT NULL REFERENCES devices(device_id) ON DELETE CASCADE,
+    metric VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL,
+    sum DOUBLE PRECISION NOT NULL,
+    min DOUBLE PRECISION NOT NULL,
+    max DOUBLE PRECISION NOT NULL,
+    last DOUBLE PRECISION NOT NULL,
+    last_time TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (device_id, metric, bucket)
+);
+
+SELECT create_hypertable('sensor_rollup_15m', 'bucket', chunk_time_interval => INTERVAL '7 days', if_not_exists => TRUE);
+SELECT add_retention_policy('sensor_rollup_15m', INTERVAL '365 days', if_not_exists => TRUE);
+
 -- ============================================================================
 -- RFID Card Whitelist (door-control ESP32)
 -- ============================================================================
@@ -231,19 +321,28 @@ CREATE INDEX IF NOT EXISTS idx_rfid_cards_user
 -- ============================================================================
 
 CREATE TABLE IF NOT EXISTS access_log (
-    log_id    SERIAL PRIMARY KEY,
+    log_id    SERIAL,
     card_uid  VARCHAR(30) NOT NULL,
     device_id VARCHAR(50) NOT NULL,
     granted   BOOLEAN NOT NULL,
     reason    TEXT,
-    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    timestamp TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    -- Includes the time column so the table can be a hypertable
+    PRIMARY KEY (log_id, timestamp)
 );
 
+SELECT create_hypertable('access_log', 'timestamp', chunk_time_interval => INTERVAL '30 days', if_not_exists => TRUE);
+
 CREATE INDEX IF NOT EXISTS idx_access_log_timestamp
     ON access_log (timestamp DESC);
 CREATE INDEX IF NOT EXISTS idx_access_log_device_time
     ON access_log (device_id, timestamp DESC);
 
+-- Chunk intervals, native compression (segmented by device_id) and the
+-- retention settings for lighting_sensor_data, sensor_readings, dimmer_state,
+-- fan_state, relay_state and access_log are applied idempotently by the
+-- backend at startup (app/services/storage.py, STORAGE_* settings).
+
 -- Grant permissions
 GRANT ALL PRIVILEGES ON ALL TABLES IN SCHEMA public TO smart_home_user;
 GRANT ALL PRIVILEGES ON ALL SEQUENCES IN SCHEMA public TO smart_home_user;